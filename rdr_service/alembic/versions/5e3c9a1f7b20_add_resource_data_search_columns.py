@@ -0,0 +1,71 @@
+"""add resource_data search columns
+
+Revision ID: 5e3c9a1f7b20
+Revises: 8b1f2c7d9e4a
+Create Date: 2022-06-20 09:41:17.532890
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '5e3c9a1f7b20'
+down_revision = '8b1f2c7d9e4a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade(engine_name):
+    globals()["upgrade_%s" % engine_name]()
+
+
+def downgrade(engine_name):
+    globals()["downgrade_%s" % engine_name]()
+
+
+def _json_integer(path):
+    return f"if(json_type(json_extract(`resource`, '{path}')) = 'INTEGER', json_extract(`resource`, '{path}'), NULL)"
+
+
+def upgrade_rdr():
+    # Virtual columns are computed when read, so adding them doesn't rewrite the resource_data table.
+    op.execute(f"""
+        ALTER TABLE resource_data
+            ADD COLUMN search_participant_origin VARCHAR(80)
+                GENERATED ALWAYS AS (json_unquote(json_extract(`resource`, '$.participant_origin'))) VIRTUAL,
+            ADD COLUMN search_enrollment_status_id INTEGER
+                GENERATED ALWAYS AS ({_json_integer('$.enrollment_status_id')}) VIRTUAL,
+            ADD COLUMN search_withdrawal_status_id INTEGER
+                GENERATED ALWAYS AS ({_json_integer('$.withdrawal_status_id')}) VIRTUAL,
+            ADD COLUMN search_organization_id INTEGER
+                GENERATED ALWAYS AS ({_json_integer('$.organization_id')}) VIRTUAL
+    """)
+    op.create_index('ix_res_data_type_search_origin', 'resource_data',
+                    ['resource_type_id', 'search_participant_origin'], unique=False)
+    op.create_index('ix_res_data_type_search_enrl_status', 'resource_data',
+                    ['resource_type_id', 'search_enrollment_status_id'], unique=False)
+    op.create_index('ix_res_data_type_search_wdrl_status', 'resource_data',
+                    ['resource_type_id', 'search_withdrawal_status_id'], unique=False)
+    op.create_index('ix_res_data_type_search_org_id', 'resource_data',
+                    ['resource_type_id', 'search_organization_id'], unique=False)
+    op.create_index('ix_res_search_results_created', 'resource_search_results', ['created'], unique=False)
+
+
+def downgrade_rdr():
+    op.drop_index('ix_res_search_results_created', table_name='resource_search_results')
+    op.drop_index('ix_res_data_type_search_org_id', table_name='resource_data')
+    op.drop_index('ix_res_data_type_search_wdrl_status', table_name='resource_data')
+    op.drop_index('ix_res_data_type_search_enrl_status', table_name='resource_data')
+    op.drop_index('ix_res_data_type_search_origin', table_name='resource_data')
+    op.drop_column('resource_data', 'search_organization_id')
+    op.drop_column('resource_data', 'search_withdrawal_status_id')
+    op.drop_column('resource_data', 'search_enrollment_status_id')
+    op.drop_column('resource_data', 'search_participant_origin')
+
+
+def upgrade_metrics():
+    pass
+
+
+def downgrade_metrics():
+    pass
@@ -1,5 +1,6 @@
 import json
 import logging
+import re
 
 from flask import jsonify, request, url_for
 from flask_restful import Resource
@@ -16,11 +17,15 @@ from rdr_service.model.requests_log import RequestsLog
 from rdr_service.model.utils import to_client_participant_id
 from rdr_service.query import OrderBy, Query
 from rdr_service.resource.generators.participant import rebuild_participant_summary_resource
+from rdr_service.services.participant_rebuild_dispatcher import get_rebuild_dispatcher
+from rdr_service.services.request_log_writer import get_request_log_writer
 from rdr_service.cloud_utils.gcp_cloud_tasks import GCPCloudTask
 
 
 DEFAULT_MAX_RESULTS = 100
 MAX_MAX_RESULTS = 10000
+# Ids that are the same in a URL path as they are in the resource JSON.
+_URL_SAFE_ID = re.compile(r"^[A-Za-z0-9_.~-]+$")
 
 
 def log_api_request(log: RequestsLog = None, model_obj=None):
@@ -94,7 +99,30 @@ def log_api_request(log: RequestsLog = None, model_obj=None):
         except Exception:  # pylint: disable=broad-except
             logging.error('Error setting request log data', exc_info=True)
 
-    return save_raw_request_record(log)
+    writer = _get_request_log_writer()
+    if writer is None:
+        return save_raw_request_record(log)
+
+    # With the background writer the record is only saved once, when the request is done.
+    if log.complete and not getattr(request, 'log_queued', False):
+        request.log_queued = True
+        writer.write(log)
+    return log
+
+
+def log_failed_api_request(log: RequestsLog):
+    """ Save the incomplete request record of a request that raised an error before it was logged """
+    writer = _get_request_log_writer()
+    if writer is not None and log is not None and not getattr(request, 'log_queued', False):
+        request.log_queued = True
+        writer.write(log)
+
+
+def _get_request_log_writer():
+    # Archiving request logs on the test environment needs the id of the record while handling the request.
+    if GAE_PROJECT == RdrEnvironment.TEST.value:
+        return None
+    return get_request_log_writer()
 
 
 class BaseApi(Resource):
@@ -166,6 +194,25 @@ class BaseApi(Resource):
     def _do_insert(self, m):
         return self.dao.insert(m)
 
+    def _rebuild_participant(self, participant_id):
+        """
+        Rebuild the participant's Resource and BigQuery data after a write.  Outside of localhost a rebuild task is
+        created for the write, unless a rebuild window is configured to coalesce it with other writes for the
+        participant.
+        """
+        if GAE_PROJECT == 'localhost':
+            bq_participant_summary_update_task(participant_id)
+            rebuild_participant_summary_resource(participant_id)
+            return
+
+        dispatcher = get_rebuild_dispatcher()
+        if dispatcher.window_seconds > 0:
+            dispatcher.mark_dirty(participant_id)
+        else:
+            params = {'p_id': participant_id}
+            self._task.execute('rebuild_one_participant_task',
+                               queue='resource-tasks', payload=params, in_seconds=5)
+
     def post(self, participant_id=None):
         """
         Handles a POST (insert) request.
@@ -183,14 +230,7 @@ class BaseApi(Resource):
         if participant_id or (result and hasattr(result, 'participantId')):
             if not participant_id:
                 participant_id = getattr(result, 'participantId')
-            # Rebuild participant for BigQuery
-            if GAE_PROJECT == 'localhost':
-                bq_participant_summary_update_task(participant_id)
-                rebuild_participant_summary_resource(participant_id)
-            else:
-                params = {'p_id': participant_id}
-                self._task.execute('rebuild_one_participant_task',
-                                    queue='resource-tasks', payload=params, in_seconds=5)
+            self._rebuild_participant(participant_id)
 
         log_api_request(log=request.log_record, model_obj=result)
         self._archive_request_log()
@@ -229,7 +269,7 @@ class BaseApi(Resource):
         pagination_token = None
         order_by = None
         missing_id_list = ["awardee", "organization", "site"]
-        invalid_exclusion = ["_includeTotal", "_offset", "_sync", "_backfill"]
+        invalid_exclusion = ["_includeTotal", "_offset", "_sync", "_backfill", "_stream"]
         include_total = request.args.get("_includeTotal", False)
         offset = request.args.get("_offset", False)
 
@@ -281,15 +321,35 @@ class BaseApi(Resource):
             next_url = main.api.url_for(self.__class__, _external=True, **query_params.to_dict(flat=False))
             bundle_dict["link"] = [{"relation": "next", "url": next_url}]
         entries = []
+        make_resource_url = self._resource_url_maker(id_field, participant_id)
         for item in results.items:
             response_json = self._make_response(item)
-            full_url = self._make_resource_url(response_json, id_field, participant_id)
+            full_url = make_resource_url(response_json)
             entries.append({"fullUrl": full_url, "resource": response_json})
         bundle_dict["entry"] = entries
         if results.total is not None:
             bundle_dict["total"] = results.total
         return bundle_dict
 
+    def _resource_url_maker(self, id_field, participant_id):
+        """Return a function making the resource URL of each result of a request. The URL is built once,
+    for the first result, and the URLs of the others reuse the parts around its id."""
+        url_parts = None
+
+        def make_resource_url(response_json):
+            nonlocal url_parts
+            resource_id = str(response_json[id_field])
+            is_url_safe = _URL_SAFE_ID.match(resource_id) is not None
+            if url_parts and is_url_safe:
+                return url_parts[0] + resource_id + url_parts[1]
+
+            url = self._make_resource_url(response_json, id_field, participant_id)
+            if url_parts is None and is_url_safe:
+                url_parts = _split_url_on_id(url, resource_id) or False
+            return url
+
+        return make_resource_url
+
     def _make_resource_url(self, response_json, id_field, participant_id):
         from rdr_service import main
 
@@ -370,14 +430,7 @@ class UpdatableApi(BaseApi):
         if participant_id or (m and hasattr(m, 'participantId')):
             if not participant_id:
                 participant_id = getattr(m, 'participantId')
-            # Rebuild participant for BigQuery
-            if GAE_PROJECT == 'localhost':
-                bq_participant_summary_update_task(participant_id)
-                rebuild_participant_summary_resource(participant_id)
-            else:
-                params = {'p_id': participant_id}
-                self._task.execute('rebuild_one_participant_task',
-                                    queue='resource-tasks', payload=params, in_seconds=5)
+            self._rebuild_participant(participant_id)
 
         log_api_request(log=request.log_record, model_obj=m)
         self._archive_request_log()
@@ -405,14 +458,7 @@ class UpdatableApi(BaseApi):
         # Try to determine if id_ is a participant id
         participant_id = getattr(obj, 'participantId', None)
         if participant_id:
-            # Rebuild participant for BigQuery
-            if GAE_PROJECT == 'localhost':
-                bq_participant_summary_update_task(participant_id)
-                rebuild_participant_summary_resource(participant_id)
-            else:
-                params = {'p_id': participant_id}
-                self._task.execute('rebuild_one_participant_task',
-                                   queue='resource-tasks', payload=params, in_seconds=5)
+            self._rebuild_participant(participant_id)
 
         log_api_request(log=request.log_record, model_obj=obj)
         self._archive_request_log()
@@ -423,6 +469,18 @@ class UpdatableApi(BaseApi):
         raise NotImplementedError(f"update_with_patch not implemented in {self.__class__}")
 
 
+def _split_url_on_id(url, resource_id):
+    """Split a URL into the parts before and after the path segment holding the id."""
+    segment = "/" + resource_id
+    index = url.rfind(segment)
+    while index != -1:
+        end = index + len(segment)
+        if end == len(url) or url[end] in "/?":
+            return url[:index + 1], url[end:]
+        index = url.rfind(segment, 0, index)
+    return None
+
+
 def _make_etag(version):
     return 'W/"{}"'.format(str(version))
 
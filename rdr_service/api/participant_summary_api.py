@@ -1,6 +1,6 @@
 import logging
 
-from flask import request
+from flask import Response, request, stream_with_context
 from werkzeug.exceptions import BadRequest, Forbidden, InternalServerError, NotFound
 
 from rdr_service.api.base_api import BaseApi, make_sync_results_for_request
@@ -12,11 +12,13 @@ from rdr_service.dao.participant_dao import ParticipantDao
 from rdr_service.dao.participant_incentives_dao import ParticipantIncentivesDao
 from rdr_service.dao.participant_summary_dao import ParticipantSummaryDao
 from rdr_service.dao.site_dao import SiteDao
+from rdr_service.json_encoder import RdrJsonEncoder
 from rdr_service.model.hpo import HPO
 from rdr_service.model.participant_summary import ParticipantSummary
 from rdr_service.config import getSettingList, HPO_LITE_AWARDEE
 from rdr_service.code_constants import UNSET
 from rdr_service.participant_enums import ParticipantSummaryRecord
+from rdr_service.query import Results
 
 PTC_ALLOWED_ENVIRONMENTS = [
     'all-of-us-rdr-sandbox',
@@ -146,12 +148,12 @@ class ParticipantSummaryApi(BaseApi):
         logging.info(f"Preparing query for {self.dao.model_type}.")
 
         query = self._make_query()
-        results = self.dao.query(query)
-        participant_ids = [obj.participantId for obj in results.items if hasattr(obj, 'participantId')]
+        if self._get_request_arg_bool("_stream") and not self._get_request_arg_bool("_sync"):
+            logging.info("Streaming results.")
+            return self._make_streamed_bundle(query, id_field, participant_id)
 
-        if any(role in ['healthpro'] for role in self.user_info.get('roles')) and participant_ids:
-            self._fetch_hpro_consents(participant_ids)
-            self._fetch_participant_incentives(participant_ids)
+        results = self.dao.query(query)
+        self._prepare_chunk(results.items)
 
         logging.info("Query complete, bundling results.")
 
@@ -160,6 +162,63 @@ class ParticipantSummaryApi(BaseApi):
 
         return response
 
+    def _make_streamed_bundle(self, query, id_field, participant_id):
+        """
+        Return a response that writes the bundle entries as the results are read from the database, so memory
+        use doesn't grow with _count.  The first chunk of results is read before the response is returned, so
+        errors in the query get an error status.  The next link and total are written after the entries, since
+        they are only known once all the results have been read.
+
+        Once the response has started the status can't be changed, so if reading the later results fails the
+        entry list is closed and the bundle ends with an "error" field instead of the link and total.  Clients
+        must treat a bundle with an "error" field as incomplete.
+        """
+        from rdr_service import main
+
+        results = Results([])
+        make_resource_url = self._resource_url_maker(id_field, participant_id)
+        json_encoder = RdrJsonEncoder()
+        query_params = request.args.copy()
+        chunks = self.dao.query_chunks(query, results)
+        first_chunk = next(chunks, None)
+
+        def generate():
+            yield '{"resourceType": "Bundle", "type": "searchset", "entry": ['
+            separator = ""
+            chunk = first_chunk
+            try:
+                while chunk is not None:
+                    self._prepare_chunk(chunk)
+                    for item in chunk:
+                        response_json = self._make_response(item)
+                        entry = {"fullUrl": make_resource_url(response_json), "resource": response_json}
+                        yield separator + json_encoder.encode(entry)
+                        separator = ", "
+                    chunk = next(chunks, None)
+            except Exception:  # pylint: disable=broad-except
+                logging.error("Failed to stream participant summary results.", exc_info=True)
+                yield '], "error": "Failed to read all the results, the bundle is incomplete."}'
+                return
+
+            yield "]"
+            if results.pagination_token:
+                query_params["_token"] = results.pagination_token
+                next_url = main.api.url_for(self.__class__, _external=True, **query_params.to_dict(flat=False))
+                yield ', "link": ' + json_encoder.encode([{"relation": "next", "url": next_url}])
+            if results.total is not None:
+                yield f', "total": {results.total}'
+            yield "}"
+
+        return Response(stream_with_context(generate()), mimetype="application/json")
+
+    def _prepare_chunk(self, items):
+        """ Prefetch the healthpro data for a page, or a chunk of a streamed page, of participant summaries """
+        participant_ids = [obj.participantId for obj in items if hasattr(obj, 'participantId')]
+
+        if any(role in ['healthpro'] for role in self.user_info.get('roles')) and participant_ids:
+            self._fetch_hpro_consents(participant_ids)
+            self._fetch_participant_incentives(participant_ids)
+
     def _fetch_hpro_consents(self, pids):
         if type(pids) is not list:
             self.dao.hpro_consents = self.hpro_consent_dao.get_by_participant(pids)
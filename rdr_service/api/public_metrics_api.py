@@ -1,15 +1,18 @@
 import datetime
+import threading
 
 from flask import request
 from flask_restful import Resource
 from werkzeug.exceptions import BadRequest
 
 from rdr_service.api_util import STOREFRONT, convert_to_datetime, get_awardee_id_from_name
+from rdr_service import config
 from rdr_service.app_util import auth_required
 from rdr_service.dao.calendar_dao import INTERVAL_DAY
 from rdr_service.dao.hpo_dao import HPODao
 from rdr_service.dao.metrics_cache_dao import (
     MetricsAgeCacheDao,
+    MetricsCacheJobStatusDao,
     MetricsEnrollmentStatusCacheDao,
     MetricsGenderCacheDao,
     MetricsLanguageCacheDao,
@@ -20,9 +23,28 @@ from rdr_service.dao.metrics_cache_dao import (
 )
 from rdr_service.dao.metrics_ehr_service import MetricsEhrService
 from rdr_service.participant_enums import EnrollmentStatus, MetricsAPIVersion, MetricsCacheType, Stratifications
+from rdr_service.services.response_cache import VersionedResponseCache
 
 DATE_FORMAT = "%Y-%m-%d"
 DAYS_LIMIT_FOR_HISTORY_DATA = 600
+# Stratifications that aren't read from the metrics cache tables, so their results can't be cached by version.
+UNCACHED_STRATIFICATIONS = (Stratifications.EHR_METRICS, Stratifications.SITES_COUNT)
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """ Return the process wide cache of PublicMetrics responses """
+    global _response_cache
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                _response_cache = VersionedResponseCache(
+                    max_bytes=config.getSettingJson(config.PUBLIC_METRICS_CACHE_MAX_BYTES,
+                                                    VersionedResponseCache.DEFAULT_MAX_BYTES)
+                )
+    return _response_cache
 
 
 class PublicMetricsApi(Resource):
@@ -40,9 +62,25 @@ class PublicMetricsApi(Resource):
         }
 
         filters = self.validate_params(params)
-        results = self.get_filtered_results(**filters)
-
-        return results
+        if filters["stratification"] in UNCACHED_STRATIFICATIONS:
+            return self.get_filtered_results(**filters)
+
+        # The metrics cache tables only change when the metrics cron job finishes a stage.
+        version = MetricsCacheJobStatusDao().get_cache_version()
+        return get_response_cache().get(self.get_cache_key(filters), version,
+                                        lambda: self.get_filtered_results(**filters))
+
+    @staticmethod
+    def get_cache_key(filters):
+        """ Normalize the filters, so requests listing the same awardees or statuses in any order share results """
+        return (
+            filters["stratification"],
+            filters["start_date"],
+            filters["end_date"],
+            tuple(sorted(filters["awardee_ids"])),
+            tuple(sorted(filters["enrollment_statuses"])),
+            filters["version"]
+        )
 
     def get_filtered_results(self, stratification, start_date, end_date, awardee_ids, enrollment_statuses, version):
         """Queries DB, returns results in format consumed by front-end
@@ -6,15 +6,18 @@ import importlib
 import json
 import os
 import re
+from datetime import timedelta
 
 from flask import request
 from flask_restful import Resource
 from sqlalchemy.sql.functions import max as _max, coalesce as _coalesce
 from werkzeug.exceptions import NotFound, BadRequest
 
+from rdr_service import config
 from rdr_service.api_util import RESOURCE
 from rdr_service.app_util import auth_required
 from rdr_service.dao.resource_dao import ResourceDataDao
+from rdr_service.dao.resource_search_dao import ResourceSearchDao
 from rdr_service.model.resource_data import ResourceData
 from rdr_service.model.resource_schema import ResourceSchema
 from rdr_service.model.resource_type import ResourceType
@@ -130,6 +133,13 @@ class ResourceRequestApi(Resource):
         METHOD /[prefix]/[resource]/{[suffix]|/?[argument{:modifiers}={prefix}value,...]}
     """
     dao = ResourceDataDao()
+    search_dao = ResourceSearchDao()
+
+    # Number of search results in each page, unless the request has a _page_size argument.
+    DEFAULT_SEARCH_PAGE_SIZE = 100
+    MAX_SEARCH_PAGE_SIZE = 1000
+    DEFAULT_SEARCH_MAX_RESULTS = 10000
+    DEFAULT_SEARCH_RESULTS_EXPIRATION_MINUTES = 60
 
     @auth_required(RESOURCE)
     def get(self, path):  # pylint: disable=unused-argument
@@ -145,7 +155,7 @@ class ResourceRequestApi(Resource):
         elif resource.suffix == '_meta':
             resp = self._get_meta(resource)
         elif resource.suffix == '_search':
-            raise BadRequest('Not Implemented Yet')
+            resp = self._search(resource)
         elif resource.suffix == '_batch':
             BadRequest('Batch requests are not allowed with GET method.')
         else:
@@ -182,6 +192,9 @@ class ResourceRequestApi(Resource):
 
         # https://stackoverflow.com/questions/14845196/dynamically-constructing-filters-in-sqlalchemy
         for field_name, op, value in resource.uri_args_filter:
+            # Skip request argument modifiers, IE: _count, _page.
+            if field_name.startswith('_'):
+                continue
             column = getattr(ResourceData, field_name, None)
             if column:
                 try:
@@ -190,11 +203,77 @@ class ResourceRequestApi(Resource):
                 except IndexError:
                     raise BadRequest(f'Invalid filter operator ({op})')
             else:
-                # TODO: implement filtering by resource JSON here.
-                continue
+                # Filter by the resource JSON field, fields the schema doesn't have are ignored.
+                json_filter = self.search_dao.get_field_filter(resource.schema, field_name, op, value)
+                if json_filter is not None:
+                    query = query.filter(json_filter)
 
         return query
 
+    @staticmethod
+    def _get_int_arg(resource, name, default=None):
+        value = resource.uri_args.get(name, default)
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            raise BadRequest(f'Invalid {name} value ({value}).')
+
+    def _search(self, resource):
+        """
+        Search the resource records by the fields in their resource JSON, IE: "Participant/_search?hpo=PITT".
+        The ids of the matching records are stored in pages, the other pages are requested with the search key
+        in the response instead of running the search again, IE: "Participant/_search?_search_key=123&_page=2".
+        :param resource: RequestResource object
+        :return: search results page json.
+        """
+        if resource.pk_id or resource.pk_alt_id:
+            raise BadRequest('A search request may not be used together with resource id')
+
+        expiration = timedelta(minutes=config.getSettingJson(config.RESOURCE_SEARCH_RESULTS_EXPIRATION_MINUTES,
+                                                             self.DEFAULT_SEARCH_RESULTS_EXPIRATION_MINUTES))
+        page_no = self._get_int_arg(resource, '_page', 1)
+        response = dict()
+
+        with self.search_dao.session() as session:
+            if '_search_key' in resource.uri_args:
+                search_key = self._get_int_arg(resource, '_search_key')
+                self.search_dao.delete_expired_results(session, expiration)
+            else:
+                type_id = session.query(ResourceType.id).filter(ResourceType.resourceURI == resource.resource_uri).\
+                    scalar()
+                query = session.query(ResourceData.id).filter(ResourceData.resourceTypeID == type_id)
+                query = self._add_arg_filters(resource, query)
+                # sql = self.dao.query_to_text(query)
+                if '_count' in resource.uri_args:
+                    return {"count": query.count()}
+
+                page_size = self._get_int_arg(resource, '_page_size', self.DEFAULT_SEARCH_PAGE_SIZE)
+                if not 0 < page_size <= self.MAX_SEARCH_PAGE_SIZE:
+                    raise BadRequest(f'_page_size must be between 1 and {self.MAX_SEARCH_PAGE_SIZE}.')
+                max_results = config.getSettingJson(config.RESOURCE_SEARCH_MAX_RESULTS,
+                                                    self.DEFAULT_SEARCH_MAX_RESULTS)
+
+                self.search_dao.delete_expired_results(session, expiration)
+                search_key, _, truncated = self.search_dao.store_search_results(
+                    session, query.order_by(ResourceData.id), page_size, max_results)
+                response['truncated'] = truncated
+
+            records, pages, total = self.search_dao.get_search_page(session, search_key, page_no)
+
+        if '_search_key' in resource.uri_args and not total:
+            raise NotFound(f'Search results not found for search key {search_key}, they may have expired.')
+        if page_no < 1 or page_no > max(pages, 1):
+            raise NotFound(f'Search results page {page_no} not found.')
+
+        response.update({
+            'search_key': search_key,
+            'page': page_no,
+            'pages': pages,
+            'total': total,
+            'results': [self.dao.to_dict(rec) for rec in records]
+        })
+        return response
+
     def _get_resource(self, resource):
         """
         Return the requested resource.
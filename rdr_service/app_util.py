@@ -6,6 +6,7 @@ from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 import logging
 from requests.exceptions import RequestException
+import threading
 from time import sleep
 from typing import Callable, Collection
 import urllib.parse
@@ -19,6 +20,7 @@ from werkzeug.exceptions import Forbidden, Unauthorized, GatewayTimeout
 from rdr_service import clock, config
 from rdr_service.api import base_api
 from rdr_service.config import GAE_PROJECT
+from rdr_service.services.token_cache import TokenVerificationCache
 
 _GMT = pytz.timezone("GMT")
 SCOPE = "https://www.googleapis.com/auth/userinfo.email"
@@ -114,49 +116,61 @@ def get_oauth_id():
     if flask.g and GLOBAL_CLIENT_ID_KEY in flask.g:
         return getattr(flask.g, GLOBAL_CLIENT_ID_KEY)
 
+    if GAE_PROJECT == 'localhost':  # NOTE: 2019-08-15 mimic devappserver.py behavior
+        return config.LOCAL_AUTH_USER
+
+    try:
+        token = get_auth_token()
+    except ValueError as e:
+        logging.info(f"Invalid Authorization Token: {e}")
+        return None
+
+    user_email = get_token_cache().get_user_email(token)
+    if flask.g:
+        setattr(flask.g, GLOBAL_CLIENT_ID_KEY, user_email)
+    return user_email
+
+
+def verify_token(token):
+    """
+    Verify the token with Google.
+    :return: The user email, and the number of seconds until the token expires if it is known.
+    """
     retries = 5
     use_tokeninfo_endpoint = False
 
     while retries:
         retries -= 1
 
-        if GAE_PROJECT == 'localhost':  # NOTE: 2019-08-15 mimic devappserver.py behavior
-            return config.LOCAL_AUTH_USER
-
         try:
-            token = get_auth_token()
-        except ValueError as e:
-            logging.info(f"Invalid Authorization Token: {e}")
-            return None
+            response = get_token_info_response(token, use_tokeninfo=use_tokeninfo_endpoint)
+        except RequestException as e:  # Catching any connection or decoding errors that could be thrown
+            logging.warning(f'Error validating token: {e}')
         else:
-            try:
-                response = get_token_info_response(token, use_tokeninfo=use_tokeninfo_endpoint)
-            except RequestException as e:  # Catching any connection or decoding errors that could be thrown
-                logging.warning(f'Error validating token: {e}')
-            else:
-                if response.status_code == 200:
-                    data = response.json()
-
-                    if use_tokeninfo_endpoint:  # UserInfo doesn't return expiry info :(
-                        token_expiry_seconds = data.get('expires_in')
-                        logging.info(f'Token expiring in {token_expiry_seconds} seconds')
-
-                    user_email = data.get('email')
-                    if user_email is None:
-                        logging.error('UserInfo endpoint did not return the email')
-                        use_tokeninfo_endpoint = True
-                    else:
-                        if flask.g:
-                            setattr(flask.g, GLOBAL_CLIENT_ID_KEY, user_email)
-                        return user_email
+            if response.status_code == 200:
+                data = response.json()
+
+                token_expiry_seconds = None
+                if use_tokeninfo_endpoint:  # UserInfo doesn't return expiry info :(
+                    token_expiry_seconds = data.get('expires_in')
+                    logging.info(f'Token expiring in {token_expiry_seconds} seconds')
+
+                user_email = data.get('email')
+                if user_email is None:
+                    logging.error('UserInfo endpoint did not return the email')
+                    use_tokeninfo_endpoint = True
                 else:
-                    logging.info(f"Oauth failure: {response.content} (status: {response.status_code})")
+                    if token_expiry_seconds is not None:
+                        token_expiry_seconds = int(token_expiry_seconds)
+                    return user_email, token_expiry_seconds
+            else:
+                logging.info(f"Oauth failure: {response.content} (status: {response.status_code})")
 
-                    if response.status_code in [400, 401]:  # tokeninfo returns 400
-                        raise Unauthorized
-                    elif not use_tokeninfo_endpoint:
-                        logging.error("UserInfo failed, falling back on Tokeninfo")
-                        use_tokeninfo_endpoint = True
+                if response.status_code in [400, 401]:  # tokeninfo returns 400
+                    raise Unauthorized
+                elif not use_tokeninfo_endpoint:
+                    logging.error("UserInfo failed, falling back on Tokeninfo")
+                    use_tokeninfo_endpoint = True
 
         sleep(0.25)
         logging.info('Retrying authentication call to Google after failure.')
@@ -164,6 +178,30 @@ def get_oauth_id():
     raise GatewayTimeout('Google authentication services is not available, try again later.')
 
 
+_token_cache = None
+_token_cache_lock = threading.Lock()
+
+
+def get_token_cache():
+    """ Return the process wide cache of verified tokens, configured from the oauth token cache settings """
+    global _token_cache
+    if _token_cache is None:
+        with _token_cache_lock:
+            if _token_cache is None:
+                _token_cache = TokenVerificationCache(
+                    verify_token,
+                    ttl_seconds=config.getSettingJson(config.OAUTH_TOKEN_CACHE_TTL_SECONDS,
+                                                      TokenVerificationCache.DEFAULT_TTL_SECONDS),
+                    max_size=config.getSettingJson(config.OAUTH_TOKEN_CACHE_MAX_SIZE,
+                                                   TokenVerificationCache.DEFAULT_MAX_SIZE),
+                    unknown_expiry_ttl_seconds=config.getSettingJson(
+                        config.OAUTH_TOKEN_CACHE_UNKNOWN_EXPIRY_TTL_SECONDS,
+                        TokenVerificationCache.DEFAULT_UNKNOWN_EXPIRY_TTL_SECONDS
+                    )
+                )
+    return _token_cache
+
+
 def check_cron():
     """Raises Forbidden if the current user is not a cron job."""
     if request.headers.get("X-Appengine-Cron"):
@@ -284,16 +322,20 @@ def auth_required(role_allowed_list):
         def wrapped(*args, **kwargs):
             appid = GAE_PROJECT
             request.log_record = base_api.log_api_request()
-            # Only enforce HTTPS and auth for external requests; requests made for data generation
-            # are allowed through (when enabled).
-            acceptable_hosts = ("None", "testbed-test", "testapp", "localhost", "127.0.0.1")
-            # logging.info(str(request.headers))
-            if not is_self_request():
-                if request.scheme.lower() != "https" and appid not in acceptable_hosts:
-                    raise Unauthorized(f"HTTPS is required for {appid}", www_authenticate='Bearer realm="rdr"')
-                check_auth(role_allowed_list)
-            request.logged = False
-            result = func(*args, **kwargs)
+            try:
+                # Only enforce HTTPS and auth for external requests; requests made for data generation
+                # are allowed through (when enabled).
+                acceptable_hosts = ("None", "testbed-test", "testapp", "localhost", "127.0.0.1")
+                # logging.info(str(request.headers))
+                if not is_self_request():
+                    if request.scheme.lower() != "https" and appid not in acceptable_hosts:
+                        raise Unauthorized(f"HTTPS is required for {appid}", www_authenticate='Bearer realm="rdr"')
+                    check_auth(role_allowed_list)
+                request.logged = False
+                result = func(*args, **kwargs)
+            except Exception:
+                base_api.log_failed_api_request(request.log_record)
+                raise
             if request.logged is False:
                 try:
                     base_api.log_api_request(log=request.log_record)
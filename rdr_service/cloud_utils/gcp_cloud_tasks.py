@@ -1,44 +1,81 @@
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta, date
 import json
 import logging
-from time import sleep
+import threading
+import time
+from types import SimpleNamespace
+from typing import Iterable, List
 
 from google.api_core.exceptions import InternalServerError, GoogleAPICallError
 from google.cloud import tasks_v2
 from google.protobuf import timestamp_pb2
 
+from rdr_service import config
 from rdr_service.config import GAE_PROJECT
 from rdr_service.services.flask import TASK_PREFIX
 
 
+@dataclass
+class CloudTaskFailure:
+    payload: dict
+    error: Exception
+
+
+@dataclass
+class CloudTaskBatchResult:
+    created: int = 0
+    failures: List[CloudTaskFailure] = field(default_factory=list)
+
+
+def _json_serial(obj):
+    """JSON serializer for objects not serializable by default json code"""
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    return obj.__repr__()
+
+
 class GCPCloudTask(object):
     """
     Use the GCP Cloud Tasks API to run a task later.
     """
-    # Create a client.
+    # Default number of tasks execute_batch() creates at the same time.
+    DEFAULT_BATCH_WORKERS = 16
+    # Number of times creating a task is attempted before it fails.
+    CREATE_ATTEMPTS = 5
+    RETRY_DELAY_SECONDS = 0.25
+
+    # Client shared by every instance in the process.
     _client = None
+    _client_lock = threading.Lock()
+    # Endpoint name -> task url rule, validated against the resource app's url map once per process.
+    _task_routes = {}
 
-    def execute(self, endpoint: str, payload: (dict, list)=None, in_seconds: int = 0, project_id: str = GAE_PROJECT,
-               location: str = 'us-central1', queue: str = 'default', quiet=False):
+    def __init__(self, client=None):
         """
-        Make GCP Cloud Task API request to run task later.
-        :param endpoint: Flask API endpoint to call.
-        :param payload: dict containing data to send to task.
-        :param in_seconds: delay before starting task in seconds, default to run immediately.
-        :param project_id: target project id.
-        :param location: target location.
-        :param queue: target cloud task queue.
-        :param quiet: suppress logging.
+        :param client: Cloud Tasks client to create the tasks with, by default one shared by the process is used.
         """
-        if not project_id or project_id == 'localhost':
-            raise ValueError('Invalid GCP project id')
-        if not self._client:
-            self._client = tasks_v2.CloudTasksClient()
+        self._task_client = client
+
+    def _get_client(self):
+        if self._task_client is None:
+            with GCPCloudTask._client_lock:
+                if GCPCloudTask._client is None:
+                    GCPCloudTask._client = tasks_v2.CloudTasksClient()
+            self._task_client = GCPCloudTask._client
+        return self._task_client
+
+    @classmethod
+    def _get_task_route(cls, endpoint):
+        """ Return the url rule of the task endpoint, raises ValueError if it isn't a registered task endpoint """
+        route = cls._task_routes.get(endpoint)
+        if route is not None:
+            return route
 
         if not endpoint:
             raise ValueError('endpoint value must be provided.')
-        if payload and not isinstance(payload, dict):
-            raise TypeError('payload must be a dict object.')
 
         from rdr_service.resource.main import app
         if endpoint not in app.url_map._rules_by_endpoint:
@@ -48,27 +85,23 @@ class GCPCloudTask(object):
         if not res.rule.startswith(TASK_PREFIX):
             raise ValueError('endpoint is not configured using the task prefix.')
 
-        def json_serial(obj):
-            """JSON serializer for objects not serializable by default json code"""
-            if isinstance(obj, (datetime, date)):
-                return obj.isoformat()
-            return obj.__repr__()
+        cls._task_routes[endpoint] = res.rule
+        return res.rule
 
-        if payload:
-            payload = json.dumps(payload, default=json_serial).encode()
-
-        # Construct the fully qualified queue name.
-        parent = self._client.queue_path(project_id, location, queue)
+    @staticmethod
+    def _build_task(route, payload, in_seconds):
+        if payload and not isinstance(payload, dict):
+            raise TypeError('payload must be a dict object.')
 
         task = {
             "app_engine_http_request": {
                 "http_method": "POST",
-                "relative_uri": res.rule
+                "relative_uri": route
             }
         }
 
         if payload:
-            task['app_engine_http_request']['body'] = payload
+            task['app_engine_http_request']['body'] = json.dumps(payload, default=_json_serial).encode()
 
         if in_seconds:
             run_ts = datetime.utcnow() + timedelta(seconds=in_seconds)
@@ -76,15 +109,136 @@ class GCPCloudTask(object):
             timestamp.FromDatetime(run_ts)
             task['schedule_time'] = timestamp
 
-        # Use the client to build and send the task.
-        retry = 5
-        while retry:
-            retry -= 1
+        return task
+
+    def _get_queue_path(self, endpoint, project_id, location, queue):
+        if not project_id or project_id == 'localhost':
+            raise ValueError('Invalid GCP project id')
+        client = self._get_client()
+        self._get_task_route(endpoint)
+
+        # Construct the fully qualified queue name.
+        return client.queue_path(project_id, location, queue)
+
+    def _create_task(self, parent, task):
+        """ Send the task, trying again if the Cloud Tasks API fails. Raises the last error if every attempt fails """
+        for attempt in range(1, self.CREATE_ATTEMPTS + 1):
             try:
-                response = self._client.create_task(parent=parent, task=task)
-                if not quiet:
-                    logging.info('Created task {0}'.format(response.name))
-                return
+                return self._get_client().create_task(parent=parent, task=task)
             except (InternalServerError, GoogleAPICallError):
-                sleep(0.25)
-        logging.error('Create Cloud Task Failed.')
+                if attempt == self.CREATE_ATTEMPTS:
+                    raise
+                time.sleep(self.RETRY_DELAY_SECONDS)
+
+    def execute(self, endpoint: str, payload: (dict, list)=None, in_seconds: int = 0, project_id: str = GAE_PROJECT,
+               location: str = 'us-central1', queue: str = 'default', quiet=False):
+        """
+        Make GCP Cloud Task API request to run task later.
+        :param endpoint: Flask API endpoint to call.
+        :param payload: dict containing data to send to task.
+        :param in_seconds: delay before starting task in seconds, default to run immediately.
+        :param project_id: target project id.
+        :param location: target location.
+        :param queue: target cloud task queue.
+        :param quiet: suppress logging.
+        """
+        parent = self._get_queue_path(endpoint, project_id, location, queue)
+        task = self._build_task(self._get_task_route(endpoint), payload, in_seconds)
+
+        # Use the client to build and send the task.
+        try:
+            response = self._create_task(parent, task)
+        except (InternalServerError, GoogleAPICallError):
+            logging.error('Create Cloud Task Failed.')
+            return
+        if not quiet:
+            logging.info('Created task {0}'.format(response.name))
+
+    def execute_batch(self, endpoint: str, payloads: Iterable[dict], in_seconds: int = 0,
+                      project_id: str = GAE_PROJECT, location: str = 'us-central1', queue: str = 'default',
+                      quiet=False, max_workers=None) -> CloudTaskBatchResult:
+        """
+        Create a task for each payload, sending them to the Cloud Tasks API from a bounded pool of threads.
+        Payloads are read as tasks are created, so they can be generated lazily. A task that can't be created
+        doesn't stop the others, each failure is returned with its payload.
+        :param endpoint: Flask API endpoint to call.
+        :param payloads: dicts containing data to send to each task.
+        :param in_seconds: delay before starting the tasks in seconds, default to run immediately.
+        :param project_id: target project id.
+        :param location: target location.
+        :param queue: target cloud task queue.
+        :param quiet: suppress logging of the number of tasks created.
+        :param max_workers: number of tasks created at the same time, defaults to the cloud task dispatch setting.
+        """
+        parent = self._get_queue_path(endpoint, project_id, location, queue)
+        route = self._get_task_route(endpoint)
+        if max_workers is None:
+            max_workers = config.getSettingJson(config.CLOUD_TASK_DISPATCH_WORKERS, self.DEFAULT_BATCH_WORKERS)
+
+        result = CloudTaskBatchResult()
+
+        def collect(futures):
+            for future in futures:
+                payload = in_flight.pop(future)
+                try:
+                    future.result()
+                except Exception as e:  # pylint: disable=broad-except
+                    result.failures.append(CloudTaskFailure(payload=payload, error=e))
+                else:
+                    result.created += 1
+
+        start_time = time.monotonic()
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            in_flight = {}
+            for payload in payloads:
+                if len(in_flight) >= max_workers:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    collect(done)
+                try:
+                    task = self._build_task(route, payload, in_seconds)
+                except TypeError as e:
+                    result.failures.append(CloudTaskFailure(payload=payload, error=e))
+                    continue
+                in_flight[executor.submit(self._create_task, parent, task)] = payload
+            collect(list(in_flight))
+
+        elapsed_seconds = time.monotonic() - start_time
+        if not quiet:
+            tasks_per_second = result.created / elapsed_seconds if elapsed_seconds else 0
+            logging.info(f'Created {result.created} {endpoint} tasks in {elapsed_seconds:.2f}s '
+                         f'({tasks_per_second:.1f} tasks/sec)')
+        if result.failures:
+            logging.error(f'Failed to create {len(result.failures)} {endpoint} tasks, '
+                          f'first error: {result.failures[0].error}')
+        return result
+
+
+class InMemoryCloudTasksClient:
+    """
+    Stand-in for the Cloud Tasks client that keeps the created tasks in memory, so task dispatching can be
+    tested and benchmarked without GCP.
+    """
+    def __init__(self, latency_seconds=0, failures=0):
+        """
+        :param latency_seconds: Seconds each create_task call takes, to simulate the API's response time.
+        :param failures: Number of create_task calls that fail, before the following calls succeed.
+        """
+        self.latency_seconds = latency_seconds
+        self._failures_left = failures
+        self._lock = threading.Lock()
+        # Queue path -> tasks created in the queue.
+        self.tasks = defaultdict(list)
+
+    @staticmethod
+    def queue_path(project, location, queue):
+        return f'projects/{project}/locations/{location}/queues/{queue}'
+
+    def create_task(self, parent, task):
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        with self._lock:
+            if self._failures_left:
+                self._failures_left -= 1
+                raise InternalServerError('Simulated Cloud Tasks failure')
+            self.tasks[parent].append(task)
+            return SimpleNamespace(name=f'{parent}/tasks/{len(self.tasks[parent])}')
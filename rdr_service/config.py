@@ -209,6 +209,63 @@ DECEASED_REPORT_FILTER_EXCEPTIONS = "deceased_report_filter_exceptions"
 
 PTSC_SERVICE_DESK_EMAIL = "ptsc_service_desk_email"
 
+# Keep serving expired code/HPO/site/organization caches while a single background thread reloads them.
+CACHE_STALE_WHILE_REVALIDATE = "cache_stale_while_revalidate"
+# Seconds past expiration a cache may be served before it is reloaded synchronously, defaults to the cache TTL.
+CACHE_MAX_STALE_SECONDS = "cache_max_stale_seconds"
+
+# Seconds participant ids changed by API writes are collected in memory, so repeated writes for a participant are
+# rebuilt once. Zero (the default) dispatches a rebuild task for every write; pending ids are lost if the instance
+# is killed before the window ends.
+PARTICIPANT_REBUILD_WINDOW_SECONDS = "participant_rebuild_window_seconds"
+# Number of pending participants that dispatches their rebuild tasks before the end of the window.
+PARTICIPANT_REBUILD_BATCH_SIZE = "participant_rebuild_batch_size"
+# Seconds an oauth token verified with Google is trusted before it is verified again. Zero disables the cache.
+OAUTH_TOKEN_CACHE_TTL_SECONDS = "oauth_token_cache_ttl_seconds"
+# Maximum number of verified oauth tokens cached by each process.
+OAUTH_TOKEN_CACHE_MAX_SIZE = "oauth_token_cache_max_size"
+# Seconds a verified oauth token is trusted when Google didn't return its expiry. This is how long a revoked
+# token can still be accepted.
+OAUTH_TOKEN_CACHE_UNKNOWN_EXPIRY_TTL_SECONDS = "oauth_token_cache_unknown_expiry_ttl_seconds"
+# Seconds the questionnaire and survey definitions loaded to validate responses are reused. Zero disables the cache.
+SURVEY_DEFINITION_CACHE_TTL_SECONDS = "survey_definition_cache_ttl_seconds"
+# Maximum number of questionnaire versions whose definitions are cached by each process.
+SURVEY_DEFINITION_CACHE_MAX_SIZE = "survey_definition_cache_max_size"
+# Save requests_log records from a background thread with multi-row inserts, instead of during each request.
+REQUEST_LOG_WRITER_ENABLED = "request_log_writer_enabled"
+# Maximum number of requests_log records waiting to be saved by the background writer.
+REQUEST_LOG_QUEUE_SIZE = "request_log_queue_size"
+# Maximum number of requests_log records saved by each insert of the background writer.
+REQUEST_LOG_BATCH_SIZE = "request_log_batch_size"
+# Maximum number of seconds a requests_log record waits before the background writer saves it.
+REQUEST_LOG_FLUSH_SECONDS = "request_log_flush_seconds"
+# What to do with requests_log records when the writer's queue is full: "drop", "block" or "sync".
+REQUEST_LOG_OVERFLOW_POLICY = "request_log_overflow_policy"
+# Maximum JSON size in bytes of the PublicMetrics responses cached by each process. Zero disables the cache.
+PUBLIC_METRICS_CACHE_MAX_BYTES = "public_metrics_cache_max_bytes"
+# Number of HPOs the metrics cron job refreshes at the same time, each on its own database connection.
+METRICS_CACHE_REFRESH_WORKERS = "metrics_cache_refresh_workers"
+# Number of participants whose consent files are downloaded and validated at the same time.
+CONSENT_VALIDATION_WORKERS = "consent_validation_workers"
+# Memory in MB each consent validation worker may use before the job waits for the others to finish.
+CONSENT_VALIDATION_WORKER_MEMORY_MB = "consent_validation_worker_memory_mb"
+# Number of consent files copied, downloaded or listed at the same time when syncing consent files.
+CONSENT_SYNC_WORKERS = "consent_sync_workers"
+# Send message broker messages from background threads, instead of waiting for the destination during the request.
+MESSAGE_BROKER_ASYNC_DELIVERY = "message_broker_async_delivery"
+# Number of message broker messages sent at the same time by the background sender.
+MESSAGE_BROKER_SENDER_WORKERS = "message_broker_sender_workers"
+# Maximum number of messages waiting for the background sender, further messages are sent during the request.
+MESSAGE_BROKER_SENDER_QUEUE_SIZE = "message_broker_sender_queue_size"
+# Maximum number of times the background sender tries to deliver a message.
+MESSAGE_BROKER_MAX_DELIVERY_ATTEMPTS = "message_broker_max_delivery_attempts"
+# Number of Cloud Tasks created at the same time when dispatching a batch of tasks.
+CLOUD_TASK_DISPATCH_WORKERS = "cloud_task_dispatch_workers"
+# Maximum number of results stored by a Resource API search.
+RESOURCE_SEARCH_MAX_RESULTS = "resource_search_max_results"
+# Minutes Resource API search results are kept for paging, before the search has to be run again.
+RESOURCE_SEARCH_RESULTS_EXPIRATION_MINUTES = "resource_search_results_expiration_minutes"
+
 # Overrides for testing scenarios
 CONFIG_OVERRIDES = {}
 
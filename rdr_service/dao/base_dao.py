@@ -357,6 +357,43 @@ class BaseDao(object):
             )
             return Results(items, token, more_available=False, total=total)
 
+    def query_chunks(self, query_def, results, chunk_size=500):
+        """Generator version of query() for large pages. Yields the items in lists of up to chunk_size
+    items as they are read from an unbuffered cursor, so only one chunk is held in memory. The
+    pagination token, more_available flag and total are set on results once all the items are read."""
+        if query_def.invalid_filters and not query_def.field_filters:
+            raise BadRequest("No valid fields were provided")
+
+        if not self.order_by_ending:
+            raise BadRequest(f"Can't query on type {self.model_type} -- no order by ending specified")
+
+        with self.session() as session:
+            if query_def.include_total:
+                results.total = self._count_query(session, query_def)
+
+            query, field_names = self._make_query(session, query_def)
+            query = query.execution_options(stream_results=True).yield_per(chunk_size)
+
+            chunk = []
+            count = 0
+            last_item = None
+            for item in query:
+                if count == query_def.max_results:
+                    # The extra item only tells us there are more results.
+                    results.more_available = True
+                    break
+                count += 1
+                last_item = item
+                chunk.append(item)
+                if len(chunk) == chunk_size:
+                    yield chunk
+                    chunk = []
+            if chunk:
+                yield chunk
+
+            if last_item is not None and (results.more_available or query_def.always_return_token):
+                results.pagination_token = self._make_pagination_token(last_item.asdict(), field_names)
+
     @staticmethod
     def _make_pagination_token(item_dict, field_names):
         vals = [item_dict.get(field_name) for field_name in field_names]
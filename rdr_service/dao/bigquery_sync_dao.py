@@ -1,3 +1,4 @@
+from rdr_service import clock
 from rdr_service.dao.base_dao import UpsertableDao
 from rdr_service.model.bigquery_sync import BigQuerySync
 from rdr_service.model.code import Code
@@ -34,6 +35,29 @@ class BigQueryGenerator(object):
         if not w_dao or not w_session:
             raise ValueError('Invalid BigQuerySyncDao dao or session argument.')
 
+        for project_id, dataset_id, table_id in self._get_table_mappings(bqtable, project_id):
+            bqs_rec = w_session.query(BigQuerySync.id). \
+                filter(BigQuerySync.pk_id == pk_id, BigQuerySync.projectId == project_id,
+                       BigQuerySync.datasetId == dataset_id, BigQuerySync.tableId == table_id).first()
+
+            bqs = BigQuerySync()
+            bqs.id = bqs_rec.id if bqs_rec else None
+            bqs.pk_id = pk_id
+            bqs.projectId = project_id
+            bqs.datasetId = dataset_id
+            bqs.tableId = table_id
+            bqs.resource = bqrecord.to_dict(serialize=True)
+            w_dao.upsert_with_session(w_session, bqs)
+            # we don't call session flush here, because we might be part of a batch process.
+
+    @staticmethod
+    def _get_table_mappings(bqtable, project_id=None):
+        """
+        Return the (project id, dataset id, table id) destinations of a BQTable in the bigquery_sync table.
+        :param bqtable: BQTable object.
+        :param project_id: Project ID override value.
+        :return: list
+        """
         # see if there is a project id override value.
         if project_id:
             cur_id = project_id
@@ -49,28 +73,68 @@ class BigQueryGenerator(object):
             except AttributeError:
                 pass
 
-        mappings = bqtable.get_project_map(cur_id)
-
-        for project_id, dataset_id, table_id in mappings:
+        mappings = list()
+        for project_id, dataset_id, table_id in bqtable.get_project_map(cur_id):
             # See if this table is disabled from being sent to BigQuery or not.  If it is disabled, we still
             # insert the record into the bigquery sync table, but the sync cron job ignores it.
             if dataset_id is None:
                 project_id = None
                 dataset_id = 'disabled'
+            mappings.append((project_id, dataset_id, table_id))
+        return mappings
 
-            bqs_rec = w_session.query(BigQuerySync.id). \
-                filter(BigQuerySync.pk_id == pk_id, BigQuerySync.projectId == project_id,
-                       BigQuerySync.datasetId == dataset_id, BigQuerySync.tableId == table_id).first()
+    # Maximum number of primary key values to include in a single IN clause.
+    SAVE_CHUNK_SIZE = 1000
 
-            bqs = BigQuerySync()
-            bqs.id = bqs_rec.id if bqs_rec else None
-            bqs.pk_id = pk_id
-            bqs.projectId = project_id
-            bqs.datasetId = dataset_id
-            bqs.tableId = table_id
-            bqs.resource = bqrecord.to_dict(serialize=True)
-            w_dao.upsert_with_session(w_session, bqs)
-            # we don't call session flush here, because we might be part of a batch process.
+    def save_bqrecords(self, records, bqtable, w_session, project_id=None):
+        """
+        Save a list of BQRecord objects into the bigquery_sync table with bulk inserts and updates.  Existing
+        records are found with one query per chunk, instead of one query per record.
+        :param records: List of (primary key id value, BQRecord object) tuples.
+        :param bqtable: BQTable object.
+        :param w_session: Session from a writable BigQuerySyncDao object
+        :param project_id: Project ID override value.
+        :return: Number of bigquery_sync records saved.
+        """
+        if not w_session:
+            raise ValueError('Invalid BigQuerySyncDao session argument.')
+        # Serialize each record once, a later record with the same primary key replaces an earlier one.
+        resources = dict()
+        for pk_id, bqrecord in records:
+            if not isinstance(pk_id, int):
+                raise ValueError('Invalid primary key value, value must be an integer.')
+            resources[pk_id] = bqrecord.to_dict(serialize=True)
+
+        pk_ids = list(resources.keys())
+        now = clock.CLOCK.now()
+        count = 0
+        for project_id, dataset_id, table_id in self._get_table_mappings(bqtable, project_id):
+            existing = dict()
+            for index in range(0, len(pk_ids), self.SAVE_CHUNK_SIZE):
+                query = w_session.query(BigQuerySync.id, BigQuerySync.pk_id). \
+                    filter(BigQuerySync.pk_id.in_(pk_ids[index:index + self.SAVE_CHUNK_SIZE]),
+                           BigQuerySync.projectId == project_id, BigQuerySync.datasetId == dataset_id,
+                           BigQuerySync.tableId == table_id)
+                existing.update({row.pk_id: row.id for row in query})
+
+            inserts = list()
+            updates = list()
+            for pk_id, resource in resources.items():
+                # Bulk operations skip the model event listeners, so set the timestamps here.
+                mapping = {'pk_id': pk_id, 'projectId': project_id, 'datasetId': dataset_id, 'tableId': table_id,
+                           'resource': resource, 'modified': now}
+                if pk_id in existing:
+                    mapping['id'] = existing[pk_id]
+                    updates.append(mapping)
+                else:
+                    mapping['created'] = now
+                    inserts.append(mapping)
+
+            w_session.bulk_insert_mappings(BigQuerySync, inserts)
+            w_session.bulk_update_mappings(BigQuerySync, updates)
+            count += len(resources)
+
+        return count
 
     def _merge_schema_dicts(self, dict1, dict2):
         """
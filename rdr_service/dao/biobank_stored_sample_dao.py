@@ -1,5 +1,10 @@
 import logging
+from collections import defaultdict
 
+from sqlalchemy import case, inspect, literal_column, not_, or_
+from sqlalchemy.dialects.mysql import insert
+
+from rdr_service import clock
 from rdr_service.code_constants import BIOBANK_TESTS_SET
 from rdr_service.dao.base_dao import BaseDao
 from rdr_service.model.biobank_order import BiobankOrderIdentifier, BiobankOrder
@@ -9,6 +14,8 @@ from rdr_service.model.site import Site
 
 class BiobankStoredSampleDao(BaseDao):
     """Batch operations for updating samples. Individual insert/get operations are testing only."""
+    # Number of samples written by each upsert statement
+    UPSERT_BATCH_SIZE = 500
 
     def __init__(self):
         super(BiobankStoredSampleDao, self).__init__(BiobankStoredSample)
@@ -17,26 +24,90 @@ class BiobankStoredSampleDao(BaseDao):
         return obj.biobankStoredSampleId
 
     def upsert_all(self, samples):
-        """Inserts/updates samples. """
+        """Inserts/updates samples with multi-row INSERT .. ON DUPLICATE KEY UPDATE statements. """
         # Ensure that the sample set can be re-iterated if the operation needs to be retried
         samples = list(samples)
 
         def upsert(session):
-            # TODO(DA-230) Scale this to handle full study data.  SQLAlchemy does not provide batch
-            # upserting; individual session.merge() calls as below may be expensive but cannot be
-            # effectively batched, see stackoverflow.com/questions/25955200. If this proves to be a
-            # bottleneck, we can switch to generating "INSERT .. ON DUPLICATE KEY UPDATE".
             written = 0
+            # Samples are upserted together when they have values for the same columns
+            rows_by_columns = defaultdict(list)
             for sample in samples:
                 if sample.test not in BIOBANK_TESTS_SET:
                     logging.warn("test sample %s not recognized." % sample.test)
                 else:
-                    session.merge(sample)
+                    row = self._get_upsert_row(sample)
+                    rows_by_columns[tuple(sorted(row))].append(row)
                     written += 1
+
+            now = clock.CLOCK.now()
+            for columns, rows in rows_by_columns.items():
+                for start in range(0, len(rows), self.UPSERT_BATCH_SIZE):
+                    session.execute(self._make_upsert_statement(columns, rows[start:start + self.UPSERT_BATCH_SIZE],
+                                                                now))
             return written
 
         return self._database.autoretry(upsert)
 
+    @staticmethod
+    def _get_upsert_row(sample):
+        """ Values of the sample's columns that have been set, like session.merge() would copy """
+        set_values = inspect(sample).dict
+        return {
+            attr.columns[0].name: set_values[attr.key]
+            for attr in inspect(BiobankStoredSample).column_attrs
+            if attr.key in set_values and attr.key not in ('rdrCreated', 'modified')
+        }
+
+    @staticmethod
+    def _make_upsert_statement(columns, rows, now):
+        table = BiobankStoredSample.__table__
+        statement = insert(table).values([dict(row, rdr_created=now, modified=now) for row in rows])
+        update_columns = [column for column in columns if column != 'biobank_stored_sample_id']
+        # Like the update listener, only set modified when one of the values changes.  SQLAlchemy 1.3 only
+        # renders statement.inserted for the column being assigned, so the VALUES() references are written out.
+        is_changed = or_(*[
+            not_(table.c[column].op('<=>', is_comparison=True)(literal_column(f'VALUES(`{column}`)')))
+            for column in update_columns
+        ])
+        # MySQL applies the assignments in order, so modified has to be checked before the values are updated
+        return statement.on_duplicate_key_update(
+            [('modified', case([(is_changed, statement.inserted.modified)], else_=table.c.modified))] +
+            [(column, statement.inserted[column]) for column in update_columns]
+        )
+
+    def get_biobank_ids_by_sample_id(self, biobank_stored_sample_ids):
+        """ Returns a dictionary of the biobank ID for each of the samples that exist """
+        with self.session() as session:
+            results = session.query(
+                BiobankStoredSample.biobankStoredSampleId,
+                BiobankStoredSample.biobankId
+            ).filter(
+                BiobankStoredSample.biobankStoredSampleId.in_(biobank_stored_sample_ids)
+            ).all()
+            return {result.biobankStoredSampleId: result.biobankId for result in results}
+
+    def get_diversion_pouch_site_ids(self, biobank_stored_sample_ids):
+        """ Returns a dictionary of the diversion pouch site ID for each of the samples collected at one """
+        with self.session() as session:
+            results = session.query(
+                BiobankStoredSample.biobankStoredSampleId,
+                Site.siteId
+            ).join(
+                BiobankOrderIdentifier,
+                BiobankOrderIdentifier.value == BiobankStoredSample.biobankOrderIdentifier
+            ).join(
+                BiobankOrder,
+                BiobankOrder.biobankOrderId == BiobankOrderIdentifier.biobankOrderId
+            ).join(
+                Site,
+                Site.siteId == BiobankOrder.collectedSiteId
+            ).filter(
+                Site.siteType == "Diversion Pouch",
+                BiobankStoredSample.biobankStoredSampleId.in_(biobank_stored_sample_ids)
+            ).distinct().all()
+            return {result.biobankStoredSampleId: result.siteId for result in results}
+
     def get_diversion_pouch_site_id(self, biobank_stored_sample_id):
         with self.session() as session:
             results = session.query(
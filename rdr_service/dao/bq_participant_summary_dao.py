@@ -53,16 +53,18 @@ class BQParticipantSummaryGenerator(BigQueryGenerator):
                 data[nk] = [self._fix_prefixes(k, r) for r in st_data[k]]
         return data
 
-    def make_bqrecord(self, p_id, convert_to_enum=False):
+    def make_bqrecord(self, p_id, convert_to_enum=False, res=None):
         """
         Build a Participant Summary BQRecord object for the given participant id.
         :param p_id: participant id
         :param convert_to_enum: If schema field description includes Enum class info, convert value to Enum.
+        :param res: A participant summary ResourceRecordSet object already built for this participant.
         :return: BQRecord object
         """
         # NOTE: Generator code is now only in 'rdr_service/resource/generators/participant.py'.
 
-        res = ParticipantSummaryGenerator().make_resource(p_id)
+        if not res:
+            res = ParticipantSummaryGenerator().make_resource(p_id)
         summary = res.get_data()
 
         # Add sub-table field prefixes back in and map a few other fields.
@@ -1,7 +1,7 @@
 from sqlalchemy.orm.session import make_transient
 
 from .base_dao import UpdatableDao
-from rdr_service import singletons
+from rdr_service import config, singletons
 
 
 class EntityCache(object):
@@ -51,14 +51,26 @@ class CacheAllDao(UpdatableDao):
         self.index_field_keys = index_field_keys
         self.cache_index = cache_index
         self.cache_ttl_seconds = cache_ttl_seconds
+        # (stale_while_revalidate, max_stale_seconds), read from the config on first use.
+        self._refresh_settings = None
 
     def _load_cache(self):
         with self.session() as session:
             all_entities = session.query(self.model_type).all()
         return EntityCache(self, all_entities, self.index_field_keys)
 
+    def _get_refresh_settings(self):
+        if self._refresh_settings is None:
+            self._refresh_settings = (
+                bool(config.getSettingJson(config.CACHE_STALE_WHILE_REVALIDATE, False)),
+                config.getSettingJson(config.CACHE_MAX_STALE_SECONDS, None)
+            )
+        return self._refresh_settings
+
     def _get_cache(self):
-        return singletons.get(self.cache_index, (lambda: self._load_cache()), self.cache_ttl_seconds)
+        stale_while_revalidate, max_stale_seconds = self._get_refresh_settings()
+        return singletons.get(self.cache_index, (lambda: self._load_cache()), self.cache_ttl_seconds,
+                              stale_while_revalidate=stale_while_revalidate, max_stale_seconds=max_stale_seconds)
 
     def get_with_session(self, session, obj_id, **kwargs):
         # pylint: disable=unused-argument
@@ -69,6 +81,10 @@ class CacheAllDao(UpdatableDao):
     def get(self, obj_id):
         return self._get_cache().id_to_entity.get(obj_id)
 
+    def get_entity_map(self):
+        """Return the cached entities keyed by id, for callers that look up many ids in a row."""
+        return self._get_cache().id_to_entity
+
     def _invalidate_cache(self):
         singletons.invalidate(self.cache_index)
 
@@ -477,6 +477,33 @@ class GenomicSetMemberDao(UpdatableDao, GenomicDaoUtils):
                 )
             return members.all()
 
+    def get_members_from_collection_tubes(self, tube_ids):
+        """
+        Returns the genomicSetMember objects, not in the IGNORE state, for a list of collection tube IDs
+        :param tube_ids:
+        :return: list of GenomicSetMember objects ordered by ID
+        """
+        with self.session() as session:
+            return session.query(GenomicSetMember).filter(
+                GenomicSetMember.collectionTubeId.in_(tube_ids),
+                GenomicSetMember.genomicWorkflowState != GenomicWorkflowState.IGNORE,
+            ).order_by(GenomicSetMember.id).all()
+
+    def get_members_from_biobank_ids_in_states(self, biobank_ids, states):
+        """
+        Returns the genomicSetMember objects with a null sample ID
+        for a list of biobank IDs and genomic_workflow_states
+        :param biobank_ids:
+        :param states: list of genomic_workflow_states
+        :return: list of GenomicSetMember objects ordered by ID
+        """
+        with self.session() as session:
+            return session.query(GenomicSetMember).filter(
+                GenomicSetMember.biobankId.in_(biobank_ids),
+                GenomicSetMember.genomicWorkflowState.in_(states),
+                GenomicSetMember.sampleId.is_(None),
+            ).order_by(GenomicSetMember.id).all()
+
     def get_members_from_member_ids(self, member_ids):
         with self.session() as session:
             return session.query(GenomicSetMember).filter(
@@ -988,6 +1015,36 @@ class GenomicSetMemberDao(UpdatableDao, GenomicDaoUtils):
                 GenomicSetMember.genomeType == genome_type
             ).one_or_none()
 
+    def get_control_sample_parents(self, sample_ids):
+        """
+        Returns the GenomicSetMember parent records for a list of control sample IDs
+        :param sample_ids:
+        :return: list of GenomicSetMember objects
+        """
+        with self.session() as session:
+            return session.query(
+                GenomicSetMember
+            ).filter(
+                GenomicSetMember.genomicWorkflowState == GenomicWorkflowState.CONTROL_SAMPLE,
+                GenomicSetMember.sampleId.in_(sample_ids)
+            ).all()
+
+    def get_control_samples_for_gc(self, _site, sample_ids):
+        """
+        Returns the GenomicSetMember records for control samples received by a GC site
+        :param _site:
+        :param sample_ids:
+        :return: list of GenomicSetMember objects
+        """
+        with self.session() as session:
+            return session.query(
+                GenomicSetMember
+            ).filter(
+                GenomicSetMember.sampleId.in_(sample_ids),
+                GenomicSetMember.gcSiteId == _site,
+                GenomicSetMember.genomicWorkflowState != GenomicWorkflowState.IGNORE
+            ).all()
+
     def get_control_sample_for_gc_and_genome_type(self, _site, genome_type, biobank_id,
                                                   collection_tube_id, sample_id):
         """
@@ -1235,6 +1292,27 @@ class GenomicSetMemberDao(UpdatableDao, GenomicDaoUtils):
         self.update_member_wf_states(obj)
         super(GenomicSetMemberDao, self).update(obj)
 
+    def update_members(self, members):
+        """
+        Saves changes to existing members with bulk updates.
+        The model listeners don't run for bulk updates, so the modified time is set here.
+        :param members: list of GenomicSetMember objects
+        """
+        members = list(members)
+        if not members:
+            return
+
+        now = clock.CLOCK.now()
+        column_keys = [attr.key for attr in sqlalchemy.inspect(GenomicSetMember).column_attrs]
+        mappings = []
+        for member in members:
+            self.update_member_wf_states(member)
+            member.modified = now
+            mappings.append({key: getattr(member, key) for key in column_keys})
+
+        with self.session() as session:
+            session.bulk_update_mappings(GenomicSetMember, mappings)
+
     @classmethod
     def _is_valid_set_member_job_field(cls, job_field_name):
         return job_field_name is not None and hasattr(GenomicSetMember, job_field_name)
@@ -1461,6 +1539,32 @@ class GenomicFileProcessedDao(UpdatableDao, GenomicDaoUtils):
 
         return self.insert(processing_file)
 
+    def get_resumable_row_count(self, file_obj):
+        """
+        Returns the number of rows ingested by the latest earlier attempt to ingest the same upload of a file,
+        if that attempt didn't complete, so the ingestion can resume after them
+        :param file_obj: GenomicFileProcessed object being ingested
+        :return: number of rows to skip
+        """
+        with self.session() as session:
+            previous_file = session.query(GenomicFileProcessed).filter(
+                GenomicFileProcessed.filePath == file_obj.filePath,
+                GenomicFileProcessed.id < file_obj.id
+            ).order_by(GenomicFileProcessed.id.desc()).first()
+
+        if previous_file is None or previous_file.fileStatus == GenomicSubProcessStatus.COMPLETED \
+                or previous_file.uploadDate != file_obj.uploadDate:
+            return 0
+        return previous_file.ingestedRowCount or 0
+
+    def update_ingested_row_count(self, file_id, ingested_row_count):
+        with self.session() as session:
+            session.query(GenomicFileProcessed).filter(
+                GenomicFileProcessed.id == file_id
+            ).update({
+                GenomicFileProcessed.ingestedRowCount: ingested_row_count
+            }, synchronize_session=False)
+
     def update_file_record(self, file_id, file_status, file_result):
         with self.session() as session:
             return self._update_file_record_with_session(session, file_id,
@@ -1576,6 +1680,30 @@ class GenomicGCValidationMetricsDao(UpsertableDao, GenomicDaoUtils):
 
         return upserted_metrics_obj
 
+    def upsert_gc_validation_metrics_from_dicts(self, data_to_upsert):
+        """
+        Upsert GC validation metrics with bulk inserts and updates
+        :param data_to_upsert: list of (row-data dictionary from AW2 file, existing metrics ID or None) tuples
+        """
+        now = clock.CLOCK.now()
+        inserts, updates = [], []
+        for data, existing_id in data_to_upsert:
+            mapping = {key: data.get(self.data_mappings[key]) for key in self.data_mappings.keys()}
+            mapping['modified'] = now
+            if existing_id is None:
+                mapping['created'] = now
+                inserts.append(mapping)
+            else:
+                mapping['id'] = existing_id
+                updates.append(mapping)
+
+        logging.info(f'Inserting GC Metrics for {len(inserts)} members and updating {len(updates)}.')
+        with self.session() as session:
+            if inserts:
+                session.bulk_insert_mappings(GenomicGCValidationMetrics, inserts)
+            if updates:
+                session.bulk_update_mappings(GenomicGCValidationMetrics, updates)
+
     def update_gc_validation_metrics_deleted_flags_from_dict(self, data_to_upsert, existing_id):
         """
         Upsert a GC validation metrics object
@@ -1716,6 +1844,20 @@ class GenomicGCValidationMetricsDao(UpsertableDao, GenomicDaoUtils):
                 .one_or_none()
             )
 
+    def get_metrics_by_member_ids(self, member_ids):
+        """
+        Retrieves gc metric records for a list of member IDs
+        :param: member_ids
+        :return: list of GenomicGCValidationMetrics objects
+        """
+        with self.session() as session:
+            return (
+                session.query(GenomicGCValidationMetrics)
+                .filter(GenomicGCValidationMetrics.genomicSetMemberId.in_(member_ids),
+                        GenomicGCValidationMetrics.ignoreFlag != 1)
+                .all()
+            )
+
     def get_metric_record_counts_from_filepath(self, filepath):
         with self.session() as session:
             return session.query(
@@ -2301,17 +2443,18 @@ class GenomicManifestFeedbackDao(UpdatableDao, GenomicDaoUtils):
                 GenomicManifestFeedback.ignoreFlag == 0
             ).one_or_none()
 
-    def increment_feedback_count(self, manifest_id):
+    def increment_feedback_count(self, manifest_id, count=1):
         """
         Update the manifest feedback record's count
         :param manifest_id:
+        :param count: number of feedback records to add
         :return:
         """
         fb = self.get_feedback_record_from_manifest_id(manifest_id)
 
         # Increment and update the record
         if fb is not None:
-            fb.feedbackRecordCount += 1
+            fb.feedbackRecordCount += count
 
             with self.session() as session:
                 session.merge(fb)
@@ -1,3 +1,5 @@
+from functools import partial
+
 from rdr_service import clock
 from werkzeug.exceptions import BadRequest
 
@@ -8,6 +10,7 @@ from rdr_service.model.utils import from_client_participant_id, to_client_partic
 from rdr_service.dao.base_dao import BaseDao
 from rdr_service.dao.participant_dao import ParticipantDao
 from rdr_service.model.message_broker import MessageBrokerRecord, MessageBrokerEventData
+from rdr_service.message_broker.delivery import get_message_sender
 from rdr_service.message_broker.message_broker import MessageBrokerFactory
 
 
@@ -49,12 +52,18 @@ class MessageBrokerDao(BaseDao):
         return participant.participantOrigin
 
     def insert(self, message):
-        response_code, response_body, response_error = self.send_message(message)
-        message.responseCode = response_code
-        message.responseBody = response_body
-        message.responseError = response_error
-        message.responseTime = clock.CLOCK.now()
-        super(MessageBrokerDao, self).insert(message)
+        sender = get_message_sender()
+        if sender is None:
+            self._set_response(message, *self.send_message(message))
+            super(MessageBrokerDao, self).insert(message)
+        else:
+            # Record the message now, the response is saved once the background sender has delivered it
+            message_broker = MessageBrokerFactory.create(message)
+            super(MessageBrokerDao, self).insert(message)
+            if not sender.send(message_broker, on_response=partial(self.save_response, message.id)):
+                self._set_response(message, *message_broker.send_request())
+                self.save_response(message.id, message.responseCode, message.responseBody, message.responseError)
+
         # store the data to RDR table asynchronous
         if GAE_PROJECT != 'localhost':
             payload = {
@@ -71,6 +80,27 @@ class MessageBrokerDao(BaseDao):
 
         return message
 
+    @staticmethod
+    def _set_response(message, response_code, response_body, response_error):
+        message.responseCode = response_code
+        message.responseBody = response_body
+        message.responseError = response_error
+        message.responseTime = clock.CLOCK.now()
+
+    def save_response(self, message_id, response_code, response_body, response_error):
+        """Saves the response returned by the destination of a message that was sent after it was recorded"""
+        now = clock.CLOCK.now()
+        with self.session() as session:
+            session.query(MessageBrokerRecord).filter(
+                MessageBrokerRecord.id == message_id
+            ).update({
+                MessageBrokerRecord.responseCode: response_code,
+                MessageBrokerRecord.responseBody: response_body,
+                MessageBrokerRecord.responseError: response_error,
+                MessageBrokerRecord.responseTime: now,
+                MessageBrokerRecord.modified: now
+            }, synchronize_session=False)
+
     def to_client_json(self, message):
         response_json = {
             "event": message.eventType,
@@ -67,6 +67,23 @@ class MetricsCacheJobStatusDao(UpdatableDao):
             record = query.first()
             return record
 
+    def get_cache_version(self):
+        """
+        Return a value that changes whenever a metrics cron job starts or completes a stage, so it changes
+        every time new data is served from the metrics cache tables.  Returns None when there are no jobs.
+        """
+        with self.session() as session:
+            version = session.query(
+                func.count(MetricsCacheJobStatus.id),
+                func.max(MetricsCacheJobStatus.id),
+                func.max(MetricsCacheJobStatus.dateInserted),
+                func.sum(MetricsCacheJobStatus.stage_one_complete),
+                func.sum(MetricsCacheJobStatus.stage_two_complete)
+            ).one()
+        if not version[0]:
+            return None
+        return tuple(version)
+
     def get_last_complete_stage_two_data_inserted_time(self, table_name, cache_type=None):
         with self.session() as session:
             query = session.query(MetricsCacheJobStatus.dateInserted)
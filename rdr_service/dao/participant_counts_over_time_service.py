@@ -1,9 +1,12 @@
 import datetime
 import logging
+import time
 import warnings
+from concurrent.futures import ThreadPoolExecutor
 
 from werkzeug.exceptions import BadRequest
 
+from rdr_service import config
 from rdr_service.dao.base_dao import BaseDao
 from rdr_service.dao.hpo_dao import HPODao
 from rdr_service.dao.metrics_cache_dao import (
@@ -32,6 +35,11 @@ from rdr_service.participant_enums import (
 )
 from rdr_service.dao.metrics_cache_dao import TEMP_TABLE_PREFIX
 
+# Default number of HPOs refreshed at the same time, each on its own database connection.
+DEFAULT_REFRESH_WORKERS = 4
+# New cache rows are inserted with this date_inserted, then moved to the job's version all at once.
+STAGING_DATE_INSERTED = datetime.datetime(1970, 1, 1)
+
 
 class ParticipantCountsOverTimeService(BaseDao):
     def __init__(self):
@@ -42,89 +50,40 @@ class ParticipantCountsOverTimeService(BaseDao):
         self.end_date = datetime.datetime.now().date() + datetime.timedelta(days=10)
         self.stage_number = MetricsCronJobStage.STAGE_ONE
         self.cronjob_time = datetime.datetime.now().replace(microsecond=0)
+        self.max_workers = config.getSettingJson(config.METRICS_CACHE_REFRESH_WORKERS, DEFAULT_REFRESH_WORKERS)
+        # Seconds spent on each step of the refresh, to find the slow cache types.
+        self.timings = {}
+
+    def _get_hpo_ids(self):
+        return [hpo.hpoId for hpo in HPODao().get_all() if hpo.hpoId != self.test_hpo_id]
+
+    def _run_for_each_hpo(self, func, *args):
+        """
+        Call func(*args, hpo_id) for every HPO, on a bounded pool of workers that each use their own
+        database connection.  Raises the first error after all the calls finish.
+        """
+        hpo_ids = self._get_hpo_ids()
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(hpo_ids) or 1))) as pool:
+            futures = [pool.submit(func, *args, hpo_id) for hpo_id in hpo_ids]
+        for future in futures:
+            future.result()
+
+    def _log_timing(self, name, seconds):
+        self.timings[name] = self.timings.get(name, 0.0) + seconds
+        logging.info(f'{name} took {seconds:.1f} seconds.')
+
+    def log_timings(self):
+        """ Log the time taken by each step of the refresh, slowest first """
+        for name, seconds in sorted(self.timings.items(), key=lambda item: item[1], reverse=True):
+            logging.info(f'{name}: {seconds:.1f} seconds')
 
     def init_tmp_table(self):
-        with self.session() as session:
-            hpo_dao = HPODao()
-            hpo_list = hpo_dao.get_all()
-            for hpo in hpo_list:
-                if hpo.hpoId == self.test_hpo_id:
-                    continue
-                temp_table_name = TEMP_TABLE_PREFIX + str(hpo.hpoId)
-                with warnings.catch_warnings():
-                    warnings.simplefilter('ignore')
-                    session.execute('DROP TABLE IF EXISTS {};'.format(temp_table_name))
-                # generated columns can not be inserted any value, need to drop them
-                exclude_columns = ['retention_eligible_time', 'retention_eligible_status', 'was_ehr_data_available']
-                session.execute('CREATE TABLE {} LIKE participant_summary'.format(temp_table_name))
-
-                indexes_cursor = session.execute('SHOW INDEX FROM {}'.format(temp_table_name))
-                for exclude_column_name in exclude_columns:
-                    session.execute('ALTER TABLE {} DROP COLUMN  {}'.format(temp_table_name, exclude_column_name))
-
-                index_name_list = []
-                for index in indexes_cursor:
-                    index_name_list.append(index[2])
-                index_name_list = list(set(index_name_list))
-
-                for index_name in index_name_list:
-                    if index_name != 'PRIMARY':
-                        session.execute('ALTER TABLE {} DROP INDEX  {}'.format(temp_table_name, index_name))
-
-                # The ParticipantSummary table requires these, but there may not be a participant_summary for
-                # all participants that we insert
-                session.execute('ALTER TABLE {} MODIFY first_name VARCHAR(255)'.format(temp_table_name))
-                session.execute('ALTER TABLE {} MODIFY last_name VARCHAR(255)'.format(temp_table_name))
-                session.execute('ALTER TABLE {} MODIFY suspension_status SMALLINT'.format(temp_table_name))
-                session.execute('ALTER TABLE {} MODIFY participant_origin VARCHAR(80)'.format(temp_table_name))
-                session.execute('ALTER TABLE {} MODIFY deceased_status SMALLINT'.format(temp_table_name))
-                session.execute('ALTER TABLE {} MODIFY is_ehr_data_available TINYINT(1)'.format(temp_table_name))
-
-                columns_cursor = session.execute('SELECT * FROM {} LIMIT 0'.format(temp_table_name))
-
-                participant_fields = ['participant_id', 'biobank_id', 'sign_up_time', 'withdrawal_status',
-                                      'hpo_id', 'organization_id', 'site_id', 'participant_origin']
-
-                def get_field_name(name):
-                    if name in participant_fields:
-                        return 'p.' + name
-                    else:
-                        return 'ps.' + name
-
-                columns = map(get_field_name, columns_cursor.keys())
-                columns_str = ','.join(columns)
-
-                participant_sql = """
-                  INSERT INTO
-                  """ + temp_table_name + """
-                  SELECT
-                  """ + columns_str + """
-                  FROM participant p
-                  left join participant_summary ps on p.participant_id = ps.participant_id
-                  WHERE p.hpo_id <> :test_hpo_id
-                  AND p.is_ghost_id IS NOT TRUE
-                  AND p.is_test_participant IS NOT TRUE
-                  AND (ps.email IS NULL OR NOT ps.email LIKE :test_email_pattern)
-                  AND p.withdrawal_status = :not_withdraw
-                  AND p.hpo_id = :hpo_id
-                """
-                params = {'test_hpo_id': self.test_hpo_id, 'test_email_pattern': self.test_email_pattern,
-                          'not_withdraw': int(WithdrawalStatus.NOT_WITHDRAWN), 'hpo_id': hpo.hpoId}
-
-                session.execute('CREATE INDEX idx_sign_up_time ON {} (sign_up_time)'.format(temp_table_name))
-                session.execute('CREATE INDEX idx_date_of_birth ON {} (date_of_birth)'.format(temp_table_name))
-                session.execute('CREATE INDEX idx_consent_time ON {} (consent_for_study_enrollment_time)'
-                                .format(temp_table_name))
-                session.execute('CREATE INDEX idx_member_time ON {} (enrollment_status_member_time)'
-                                .format(temp_table_name))
-                session.execute('CREATE INDEX idx_sample_time ON {} (enrollment_status_core_stored_sample_time)'
-                                .format(temp_table_name))
-                session.execute('CREATE INDEX idx_participant_origin ON {} (participant_origin)'
-                                .format(temp_table_name))
-
-                session.execute(participant_sql, params)
-                logging.info('crete temp table for hpo_id: ' + str(hpo.hpoId))
+        start = time.perf_counter()
+        # Stale temp tables are dropped before the workers start, catch_warnings() isn't thread safe.
+        self.clean_tmp_tables()
+        self._run_for_each_hpo(self._create_tmp_table)
 
+        with self.session() as session:
             session.execute('DROP TABLE IF EXISTS metrics_tmp_participant_origin;')
             session.execute('CREATE TABLE metrics_tmp_participant_origin (participant_origin VARCHAR(50))')
             participant_origin_sql = """
@@ -133,16 +92,87 @@ class ParticipantCountsOverTimeService(BaseDao):
             """
             session.execute(participant_origin_sql)
 
-            logging.info('Init temp table for metrics cron job.')
+        self._log_timing('Init temp tables', time.perf_counter() - start)
+
+    def _create_tmp_table(self, hpo_id):
+        """ Copy the participants of an HPO to the temp table the metrics cache SQL of every cache type reads """
+        with self.session() as session:
+            temp_table_name = TEMP_TABLE_PREFIX + str(hpo_id)
+            # generated columns can not be inserted any value, need to drop them
+            exclude_columns = ['retention_eligible_time', 'retention_eligible_status', 'was_ehr_data_available']
+            session.execute('CREATE TABLE {} LIKE participant_summary'.format(temp_table_name))
+
+            indexes_cursor = session.execute('SHOW INDEX FROM {}'.format(temp_table_name))
+            for exclude_column_name in exclude_columns:
+                session.execute('ALTER TABLE {} DROP COLUMN  {}'.format(temp_table_name, exclude_column_name))
+
+            index_name_list = []
+            for index in indexes_cursor:
+                index_name_list.append(index[2])
+            index_name_list = list(set(index_name_list))
+
+            for index_name in index_name_list:
+                if index_name != 'PRIMARY':
+                    session.execute('ALTER TABLE {} DROP INDEX  {}'.format(temp_table_name, index_name))
+
+            # The ParticipantSummary table requires these, but there may not be a participant_summary for
+            # all participants that we insert
+            session.execute('ALTER TABLE {} MODIFY first_name VARCHAR(255)'.format(temp_table_name))
+            session.execute('ALTER TABLE {} MODIFY last_name VARCHAR(255)'.format(temp_table_name))
+            session.execute('ALTER TABLE {} MODIFY suspension_status SMALLINT'.format(temp_table_name))
+            session.execute('ALTER TABLE {} MODIFY participant_origin VARCHAR(80)'.format(temp_table_name))
+            session.execute('ALTER TABLE {} MODIFY deceased_status SMALLINT'.format(temp_table_name))
+            session.execute('ALTER TABLE {} MODIFY is_ehr_data_available TINYINT(1)'.format(temp_table_name))
+
+            columns_cursor = session.execute('SELECT * FROM {} LIMIT 0'.format(temp_table_name))
+
+            participant_fields = ['participant_id', 'biobank_id', 'sign_up_time', 'withdrawal_status',
+                                  'hpo_id', 'organization_id', 'site_id', 'participant_origin']
+
+            def get_field_name(name):
+                if name in participant_fields:
+                    return 'p.' + name
+                else:
+                    return 'ps.' + name
+
+            columns = map(get_field_name, columns_cursor.keys())
+            columns_str = ','.join(columns)
+
+            participant_sql = """
+              INSERT INTO
+              """ + temp_table_name + """
+              SELECT
+              """ + columns_str + """
+              FROM participant p
+              left join participant_summary ps on p.participant_id = ps.participant_id
+              WHERE p.hpo_id <> :test_hpo_id
+              AND p.is_ghost_id IS NOT TRUE
+              AND p.is_test_participant IS NOT TRUE
+              AND (ps.email IS NULL OR NOT ps.email LIKE :test_email_pattern)
+              AND p.withdrawal_status = :not_withdraw
+              AND p.hpo_id = :hpo_id
+            """
+            params = {'test_hpo_id': self.test_hpo_id, 'test_email_pattern': self.test_email_pattern,
+                      'not_withdraw': int(WithdrawalStatus.NOT_WITHDRAWN), 'hpo_id': hpo_id}
+
+            session.execute('CREATE INDEX idx_sign_up_time ON {} (sign_up_time)'.format(temp_table_name))
+            session.execute('CREATE INDEX idx_date_of_birth ON {} (date_of_birth)'.format(temp_table_name))
+            session.execute('CREATE INDEX idx_consent_time ON {} (consent_for_study_enrollment_time)'
+                            .format(temp_table_name))
+            session.execute('CREATE INDEX idx_member_time ON {} (enrollment_status_member_time)'
+                            .format(temp_table_name))
+            session.execute('CREATE INDEX idx_sample_time ON {} (enrollment_status_core_stored_sample_time)'
+                            .format(temp_table_name))
+            session.execute('CREATE INDEX idx_participant_origin ON {} (participant_origin)'
+                            .format(temp_table_name))
+
+            session.execute(participant_sql, params)
+            logging.info('crete temp table for hpo_id: ' + str(hpo_id))
 
     def clean_tmp_tables(self):
         with self.session() as session:
-            hpo_dao = HPODao()
-            hpo_list = hpo_dao.get_all()
-            for hpo in hpo_list:
-                if hpo.hpoId == self.test_hpo_id:
-                    continue
-                temp_table_name = TEMP_TABLE_PREFIX + str(hpo.hpoId)
+            for hpo_id in self._get_hpo_ids():
+                temp_table_name = TEMP_TABLE_PREFIX + str(hpo_id)
                 with warnings.catch_warnings():
                     warnings.simplefilter('ignore')
                     session.execute('DROP TABLE IF EXISTS {};'.format(temp_table_name))
@@ -151,17 +181,14 @@ class ParticipantCountsOverTimeService(BaseDao):
         self.start_date = start_date
         self.end_date = end_date
         self.stage_number = stage_number
+        start = time.perf_counter()
 
         # For public metrics job, calculate new result for stage one, and copy history result for stage two
         if stage_number == MetricsCronJobStage.STAGE_ONE:
             self.refresh_data_for_metrics_cache(MetricsLifecycleCacheDao(MetricsCacheType.PUBLIC_METRICS_EXPORT_API))
-            logging.info("Refresh MetricsLifecycleCache for Public Metrics API done.")
             self.refresh_data_for_metrics_cache(MetricsGenderCacheDao(MetricsCacheType.PUBLIC_METRICS_EXPORT_API))
-            logging.info("Refresh MetricsGenderCache for Public Metrics API done.")
             self.refresh_data_for_metrics_cache(MetricsAgeCacheDao(MetricsCacheType.PUBLIC_METRICS_EXPORT_API))
-            logging.info("Refresh MetricsAgeCache for Public Metrics API done.")
             self.refresh_data_for_metrics_cache(MetricsRaceCacheDao(MetricsCacheType.PUBLIC_METRICS_EXPORT_API))
-            logging.info("Refresh MetricsRaceCache for Public Metrics API done.")
         elif stage_number == MetricsCronJobStage.STAGE_TWO:
             self.refresh_data_for_public_metrics_cache_stage_two(
                 MetricsLifecycleCacheDao(MetricsCacheType.PUBLIC_METRICS_EXPORT_API))
@@ -173,15 +200,15 @@ class ParticipantCountsOverTimeService(BaseDao):
                 MetricsRaceCacheDao(MetricsCacheType.PUBLIC_METRICS_EXPORT_API))
 
         self.refresh_data_for_metrics_cache(MetricsEnrollmentStatusCacheDao())
-        logging.info("Refresh MetricsEnrollmentStatusCache done.")
         self.refresh_data_for_metrics_cache(MetricsRegionCacheDao())
-        logging.info("Refresh MetricsRegionCache done.")
         self.refresh_data_for_metrics_cache(MetricsLanguageCacheDao())
-        logging.info("Refresh MetricsLanguageCache done.")
         self.refresh_data_for_metrics_cache(MetricsGenderCacheDao(MetricsCacheType.METRICS_V2_API))
-        logging.info("Refresh MetricsGenderCache for Metrics2API done.")
         self.refresh_data_for_metrics_cache(MetricsRaceCacheDao(MetricsCacheType.METRICS_V2_API))
-        logging.info("Refresh MetricsRaceCache for Metrics2API done.")
+
+        self._log_timing(f'Metrics cache stage {int(stage_number)}', time.perf_counter() - start)
+
+    def _get_timing_name(self, dao):
+        return f'Refresh {dao.table_name} ({dao.cache_type}) stage {int(self.stage_number)}'
 
     def refresh_data_for_metrics_cache(self, dao):
         status_dao = MetricsCacheJobStatusDao()
@@ -197,12 +224,15 @@ class ParticipantCountsOverTimeService(BaseDao):
             job_status_obj = MetricsCacheJobStatus(**kwargs)
             status_dao.insert(job_status_obj)
 
-        hpo_dao = HPODao()
-        hpo_list = hpo_dao.get_all()
-        for hpo in hpo_list:
-            if hpo.hpoId == self.test_hpo_id:
-                continue
-            self.insert_cache_by_hpo(dao, hpo.hpoId)
+        start = time.perf_counter()
+        self._delete_staged_rows(dao)
+        self._run_for_each_hpo(self.insert_cache_by_hpo, dao)
+        inserted = time.perf_counter()
+        self._publish_staged_rows(dao)
+        timing_name = self._get_timing_name(dao)
+        self._log_timing(timing_name, time.perf_counter() - start)
+        logging.info(f'{timing_name}: inserts took {inserted - start:.1f} seconds, publishing took '
+                     f'{time.perf_counter() - inserted:.1f} seconds.')
 
         status_dao.set_to_complete(dao.cache_type, dao.table_name, self.cronjob_time, self.stage_number)
         if self.stage_number == MetricsCronJobStage.STAGE_TWO:
@@ -218,20 +248,48 @@ class ParticipantCountsOverTimeService(BaseDao):
             logging.info(f'No last success stage two found for {dao.table_name}, calculate new data for stage two')
             self.refresh_data_for_metrics_cache(dao)
         else:
+            start = time.perf_counter()
             dao.update_historical_cache_data(self.cronjob_time, last_success_stage_two.dateInserted,
                                              self.start_date, self.end_date)
+            self._log_timing(self._get_timing_name(dao), time.perf_counter() - start)
             status_dao.set_to_complete(dao.cache_type, dao.table_name, self.cronjob_time, self.stage_number)
             dao.delete_old_records(n_days_ago=30)
 
-    def insert_cache_by_hpo(self, dao, hpo_id):
+    def insert_cache_by_hpo(self, dao, hpo_id, date_inserted=STAGING_DATE_INSERTED):
         sql_arr = dao.get_metrics_cache_sql(hpo_id)
 
         params = {'hpo_id': hpo_id, 'start_date': self.start_date, 'end_date': self.end_date,
-                  'date_inserted': self.cronjob_time}
+                  'date_inserted': date_inserted}
         with dao.session() as session:
             for sql in sql_arr:
                 session.execute(sql, params)
 
+    @staticmethod
+    def _get_staged_rows_filter(dao):
+        """ Return the where clause and parameters selecting the rows staged for the dao's cache type """
+        params = {'staging_date_inserted': STAGING_DATE_INSERTED}
+        where = 'date_inserted = :staging_date_inserted'
+        if 'type' in dao.model_type.__table__.columns:
+            where += ' AND type = :cache_type'
+            params['cache_type'] = str(dao.cache_type)
+        return where, params
+
+    def _delete_staged_rows(self, dao):
+        """ Remove rows left staged by a refresh that failed """
+        where, params = self._get_staged_rows_filter(dao)
+        with dao.session() as session:
+            session.execute(f'DELETE FROM {dao.table_name} WHERE {where}', params)
+
+    def _publish_staged_rows(self, dao):
+        """
+        Move the rows inserted for every HPO to the job's version with a single statement, so readers
+        never see the version with only some of the HPOs.
+        """
+        where, params = self._get_staged_rows_filter(dao)
+        params['date_inserted'] = self.cronjob_time
+        with dao.session() as session:
+            session.execute(f'UPDATE {dao.table_name} SET date_inserted = :date_inserted WHERE {where}', params)
+
     def get_filtered_results(
         self, stratification, start_date, end_date, history, awardee_ids, enrollment_statuses, sample_time_def,
         participant_origins, version
@@ -366,6 +366,14 @@ class ParticipantDao(UpdatableDao):
                 Participant.biobankId == biobank_id
             ).one_or_none()
 
+    @staticmethod
+    def get_existing_biobank_ids(session, biobank_ids):
+        """Returns the set of the given biobank IDs that belong to a participant."""
+        if not biobank_ids:
+            return set()
+        results = session.query(Participant.biobankId).filter(Participant.biobankId.in_(biobank_ids)).all()
+        return {result.biobankId for result in results}
+
     def validate_participant_reference(self, session, obj):
         """Raises BadRequest if an object has a missing or invalid participantId reference,
     or if the participant has a withdrawal status of NO_USE."""
@@ -1,7 +1,9 @@
 import datetime
 import faker
+import operator
 import re
 import threading
+from collections import defaultdict
 
 import sqlalchemy
 import sqlalchemy.orm
@@ -15,17 +17,11 @@ from typing import Collection
 from werkzeug.exceptions import BadRequest, NotFound
 
 from rdr_service import clock, config
-from rdr_service.api_util import (
-    format_json_code,
-    format_json_date,
-    format_json_enum,
-    format_json_hpo,
-    format_json_org,
-    format_json_site,
-    parse_json_enum
-)
+from rdr_service.api_util import parse_json_enum
 from rdr_service.app_util import is_care_evo_and_not_prod
-from rdr_service.code_constants import BIOBANK_TESTS, ORIGINATING_SOURCES, PMI_SKIP_CODE, PPI_SYSTEM, UNSET
+from rdr_service.code_constants import (
+    BIOBANK_TESTS, ORIGINATING_SOURCES, PMI_SKIP_CODE, PPI_SYSTEM, UNMAPPED, UNSET
+)
 from rdr_service.dao.base_dao import UpdatableDao
 from rdr_service.dao.code_dao import CodeDao
 from rdr_service.dao.database_utils import get_sql_and_params_for_array, replace_null_safe_equals
@@ -91,6 +87,9 @@ _DATE_FIELDS = set()
 _ENUM_FIELDS = set()
 _CODE_FIELDS = set()
 _fields_lock = threading.RLock()
+_client_json_plan = None
+# Code fields that are mapped to PMI_Skip when unset and TheBasics was submitted.
+_DEMOGRAPHIC_CODE_FIELDS = ("educationId", "incomeId", "sexualOrientationId", "sexId")
 
 # Query used to update the enrollment status for all participant summaries after
 # a Biobank samples import.
@@ -454,6 +453,30 @@ class ParticipantSummaryDao(UpdatableDao):
         self.hpro_consents = []
         self.participant_incentives = []
 
+    @property
+    def hpro_consents(self):
+        return self._hpro_consents
+
+    @hpro_consents.setter
+    def hpro_consents(self, records):
+        # Index the consent file paths prefetched for a page of results by participant once,
+        # so that to_client_json doesn't scan every record for each participant.
+        self._hpro_consents = records
+        self._hpro_consent_paths = defaultdict(dict)
+        for record in records or []:
+            self._hpro_consent_paths[record.participant_id].setdefault(record.consent_type, record.file_path)
+
+    @property
+    def participant_incentives(self):
+        return self._participant_incentives
+
+    @participant_incentives.setter
+    def participant_incentives(self, records):
+        self._participant_incentives = records
+        self._participant_incentive_records = defaultdict(list)
+        for record in records or []:
+            self._participant_incentive_records[record.participantId].append(record)
+
     # pylint: disable=unused-argument
     def from_client_json(self, resource, participant_id, client_id):
         column_names = self.to_dict(self.model_type)
@@ -994,28 +1017,25 @@ class ParticipantSummaryDao(UpdatableDao):
             ConsentType.EHR: 'consentForElectronicHealthRecords',
             ConsentType.GROR: 'consentForGenomicsROR'
         }
-        participant_id = result['participantId']
-        records = list(filter(lambda obj: obj.participant_id == participant_id, self.hpro_consents))
+        consent_paths = self._hpro_consent_paths.get(result['participantId'])
+        if not consent_paths:
+            return result
 
         for consent_type, consent_name in consents_map.items():
-            value_path_key = f'{consent_name}FilePath'
-            has_consent_path = [obj for obj in records if consent_type == obj.consent_type]
-
-            if has_consent_path:
-                result[value_path_key] = has_consent_path[0].file_path
+            file_path = consent_paths.get(consent_type)
+            if file_path is not None:
+                result[f'{consent_name}FilePath'] = file_path
 
         return result
 
     def get_participant_incentives(self, result):
-        participant_id = result['participantId']
-
-        records = list(filter(lambda obj: obj.participantId == participant_id, self.participant_incentives))
-
+        records = self._participant_incentive_records.get(result['participantId'], [])
         records = [self.incentive_dao.convert_json_obj(obj) for obj in records]
         return records
 
     def to_client_json(self, model: ParticipantSummary, strip_none_values=True):
-        result = model.asdict()
+        plan = _get_client_json_plan()
+        result = plan.asdict(model)
 
         if self.hpro_consents:
             result = self.get_hpro_consent_paths(result)
@@ -1023,86 +1043,7 @@ class ParticipantSummaryDao(UpdatableDao):
         if self.participant_incentives:
             result['participantIncentives'] = self.get_participant_incentives(result)
 
-        is_the_basics_complete = model.questionnaireOnTheBasics == QuestionnaireStatus.SUBMITTED
-
-        # Participants that withdrew more than 48 hours ago should have fields other than
-        # WITHDRAWN_PARTICIPANT_FIELDS cleared.
-        should_clear_fields_for_withdrawal = model.withdrawalStatus == WithdrawalStatus.NO_USE and (
-            model.withdrawalTime is None
-            or model.withdrawalTime < clock.CLOCK.now() - WITHDRAWN_PARTICIPANT_VISIBILITY_TIME
-        )
-        if should_clear_fields_for_withdrawal:
-            result = {k: result.get(k) for k in WITHDRAWN_PARTICIPANT_FIELDS}
-
-        result["participantId"] = to_client_participant_id(model.participantId)
-        biobank_id = result.get("biobankId")
-        if biobank_id:
-            result["biobankId"] = to_client_biobank_id(biobank_id)
-
-        date_of_birth = result.get("dateOfBirth")
-        if date_of_birth:
-            result["ageRange"] = get_bucketed_age(date_of_birth, clock.CLOCK.now())
-        else:
-            result["ageRange"] = UNSET
-
-        if not result.get("primaryLanguage"):
-            result["primaryLanguage"] = UNSET
-
-        if "organizationId" in result:
-            result["organization"] = result["organizationId"]
-            del result["organizationId"]
-            format_json_org(result, self.organization_dao, "organization")
-
-        if result.get("genderIdentityId"):
-            del result["genderIdentityId"]  # deprecated in favor of genderIdentity
-
-        # Map demographic Enums if TheBasics was submitted and Skip wasn't in use
-        if is_the_basics_complete and not should_clear_fields_for_withdrawal:
-            if model.genderIdentity is None or model.genderIdentity == GenderIdentity.UNSET:
-                result['genderIdentity'] = GenderIdentity.PMI_Skip
-
-            if model.race is None or model.race == Race.UNSET:
-                result['race'] = Race.PMI_Skip
-
-        result["patientStatus"] = model.patientStatus
-
-        format_json_hpo(result, self.hpo_dao, "hpoId")
-        result["awardee"] = result["hpoId"]
-        _initialize_field_type_sets()
-
-        for new_field_name, existing_field_name in self.get_aliased_field_map().items():
-            result[new_field_name] = getattr(model, existing_field_name)
-
-            # register new field as date if field is date
-            if type(result[new_field_name]) is datetime.datetime:
-                _DATE_FIELDS.add(new_field_name)
-
-        for fieldname in _DATE_FIELDS:
-            format_json_date(result, fieldname)
-        for fieldname in _CODE_FIELDS:
-            is_demographic_field = fieldname in ['educationId', 'incomeId', 'sexualOrientationId', 'sexId']
-            should_map_unset_to_skip = (
-                is_the_basics_complete and is_demographic_field and not should_clear_fields_for_withdrawal
-            )
-            format_json_code(
-                result, self.code_dao, fieldname,
-                unset_value=PMI_SKIP_CODE if should_map_unset_to_skip else UNSET
-            )
-        for fieldname in _ENUM_FIELDS:
-            format_json_enum(result, fieldname)
-        for fieldname in _SITE_FIELDS:
-            format_json_site(result, self.site_dao, fieldname)
-        if model.withdrawalStatus == WithdrawalStatus.NO_USE\
-                or model.suspensionStatus == SuspensionStatus.NO_CONTACT\
-                or model.deceasedStatus == DeceasedStatus.APPROVED:
-            result["recontactMethod"] = "NO_CONTACT"
-
-        # Strip None values.
-        if strip_none_values is True:
-            result = {k: v for k, v in list(result.items()) if v is not None}
-
-
-        return result
+        return plan.format(self, model, result, strip_none_values)
 
     @staticmethod
     def get_aliased_field_map():
@@ -1236,6 +1177,148 @@ def _initialize_field_type_sets():
                                 break
 
 
+class _ClientJsonPlan(object):
+    """The field conversions applied by ParticipantSummaryDao.to_client_json, resolved once from the
+  ParticipantSummary schema rather than for every summary. Each step adds, replaces and removes
+  the same keys in the same order as the generic format_json_* helpers, so the JSON produced is
+  unchanged.
+  """
+
+    def __init__(self):
+        _initialize_field_type_sets()
+        mapper = sqlalchemy.inspect(ParticipantSummary)
+        # The attributes model.asdict() returns, in the same order.
+        column_keys = [attr.key for attr in mapper.column_attrs] + [attr.key for attr in mapper.synonyms]
+        self.column_keys = tuple(key for key in column_keys if not key.startswith("_"))
+        self._get_column_values = operator.attrgetter(*self.column_keys)
+
+        self.aliased_fields = tuple(ParticipantSummaryDao.get_aliased_field_map().items())
+        aliases = {field_name for field_name, _ in self.aliased_fields}
+        self.date_fields = tuple(field_name for field_name in _DATE_FIELDS if field_name not in aliases)
+        # The field sets aren't modified once initialized, so iterating these tuples adds any missing keys
+        # in the same order that iterating the sets does.
+        self.code_fields = tuple(
+            (field_name, field_name[:-2], field_name in _DEMOGRAPHIC_CODE_FIELDS) for field_name in _CODE_FIELDS
+        )
+        self.enum_fields = tuple(_ENUM_FIELDS)
+        self.site_fields = tuple((field_name + "Id", field_name) for field_name in _SITE_FIELDS)
+
+    def asdict(self, model):
+        return dict(zip(self.column_keys, self._get_column_values(model)))
+
+    def format(self, dao, model, result, strip_none_values):
+        is_the_basics_complete = model.questionnaireOnTheBasics == QuestionnaireStatus.SUBMITTED
+
+        # Participants that withdrew more than 48 hours ago should have fields other than
+        # WITHDRAWN_PARTICIPANT_FIELDS cleared.
+        should_clear_fields_for_withdrawal = model.withdrawalStatus == WithdrawalStatus.NO_USE and (
+            model.withdrawalTime is None
+            or model.withdrawalTime < clock.CLOCK.now() - WITHDRAWN_PARTICIPANT_VISIBILITY_TIME
+        )
+        if should_clear_fields_for_withdrawal:
+            result = {k: result.get(k) for k in WITHDRAWN_PARTICIPANT_FIELDS}
+
+        result["participantId"] = to_client_participant_id(model.participantId)
+        biobank_id = result.get("biobankId")
+        if biobank_id:
+            result["biobankId"] = to_client_biobank_id(biobank_id)
+
+        date_of_birth = result.get("dateOfBirth")
+        if date_of_birth:
+            result["ageRange"] = get_bucketed_age(date_of_birth, clock.CLOCK.now())
+        else:
+            result["ageRange"] = UNSET
+
+        if not result.get("primaryLanguage"):
+            result["primaryLanguage"] = UNSET
+
+        if "organizationId" in result:
+            organization_id = result.pop("organizationId")
+            if organization_id:
+                result["organization"] = dao.organization_dao.get_entity_map().get(organization_id).externalId
+            else:
+                result["organization"] = UNSET
+
+        if result.get("genderIdentityId"):
+            del result["genderIdentityId"]  # deprecated in favor of genderIdentity
+
+        # Map demographic Enums if TheBasics was submitted and Skip wasn't in use
+        if is_the_basics_complete and not should_clear_fields_for_withdrawal:
+            if model.genderIdentity is None or model.genderIdentity == GenderIdentity.UNSET:
+                result['genderIdentity'] = GenderIdentity.PMI_Skip
+
+            if model.race is None or model.race == Race.UNSET:
+                result['race'] = Race.PMI_Skip
+
+        result["patientStatus"] = model.patientStatus
+
+        hpo_id = result["hpoId"]
+        result["hpoId"] = dao.hpo_dao.get_entity_map().get(hpo_id).name if hpo_id else UNSET
+        result["awardee"] = result["hpoId"]
+
+        for field_name, model_field_name in self.aliased_fields:
+            value = getattr(model, model_field_name)
+            # register new field as date if field is date
+            if type(value) is datetime.datetime:
+                _DATE_FIELDS.add(field_name)
+            if field_name not in _DATE_FIELDS:
+                result[field_name] = value
+            elif value is not None:
+                result[field_name] = value.isoformat()
+
+        for field_name in self.date_fields:
+            if field_name in result:
+                value = result[field_name]
+                if value is None:
+                    del result[field_name]
+                else:
+                    result[field_name] = value.isoformat()
+
+        map_unset_to_skip = is_the_basics_complete and not should_clear_fields_for_withdrawal
+        codes = dao.code_dao.get_entity_map()
+        for field_name, field_without_id, is_demographic_field in self.code_fields:
+            code_id = result.get(field_name)
+            if code_id:
+                code = codes.get(code_id)
+                result[field_without_id] = code.value if code.mapped else UNMAPPED
+                del result[field_name]
+            else:
+                result[field_without_id] = PMI_SKIP_CODE if map_unset_to_skip and is_demographic_field else UNSET
+
+        for field_name in self.enum_fields:
+            value = result.get(field_name)
+            result[field_name] = UNSET if value is None else str(value)
+
+        sites = dao.site_dao.get_entity_map()
+        for id_field_name, field_name in self.site_fields:
+            site_id = result.get(id_field_name)
+            if site_id is not None:
+                result[field_name] = sites.get(site_id).googleGroup
+                del result[id_field_name]
+            else:
+                result[field_name] = UNSET
+
+        if model.withdrawalStatus == WithdrawalStatus.NO_USE\
+                or model.suspensionStatus == SuspensionStatus.NO_CONTACT\
+                or model.deceasedStatus == DeceasedStatus.APPROVED:
+            result["recontactMethod"] = "NO_CONTACT"
+
+        # Strip None values.
+        if strip_none_values is True:
+            result = {k: v for k, v in result.items() if v is not None}
+
+        return result
+
+
+def _get_client_json_plan():
+    global _client_json_plan
+    if _client_json_plan is None:
+        with _fields_lock:
+            if _client_json_plan is None:
+                _client_json_plan = _ClientJsonPlan()
+    return _client_json_plan
+
+
 class PatientStatusFieldFilter(FieldFilter):
     """
   FieldFilter class for patientStatus relationship field
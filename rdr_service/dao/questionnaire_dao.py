@@ -14,6 +14,7 @@ from rdr_service.model.questionnaire import (
     QuestionnaireHistory,
     QuestionnaireQuestion,
 )
+from rdr_service.services.survey_definition_cache import get_survey_definition_cache
 
 _SEMANTIC_DESCRIPTION_EXTENSION = "http://all-of-us.org/fhir/forms/semantic-description"
 _IRB_MAPPING_EXTENSION = "http://all-of-us.org/fhir/forms/irb-mapping"
@@ -98,6 +99,7 @@ class QuestionnaireDao(UpdatableDao):
         history = self._make_history(questionnaire, concepts, questions)
         history.questionnaireId = questionnaire.questionnaireId
         QuestionnaireHistoryDao().insert_with_session(session, history)
+        get_survey_definition_cache().invalidate(questionnaire.questionnaireId)
         return questionnaire
 
     def _do_update(self, session, obj, existing_obj):
@@ -117,6 +119,7 @@ class QuestionnaireDao(UpdatableDao):
         QuestionnaireHistoryDao().insert_with_session(
             session, self._make_history(questionnaire, questionnaire.concepts, questionnaire.questions)
         )
+        get_survey_definition_cache().invalidate(questionnaire.questionnaireId)
 
     @classmethod
     def from_client_json(cls, resource_json, id_=None, expected_version=None, client_id=None):
@@ -267,7 +270,8 @@ class QuestionnaireHistoryDao(BaseDao):
 
     def get_with_children_with_session(self, session, questionnaire_id_and_semantic_version):
         query = session.query(QuestionnaireHistory) \
-            .options(subqueryload(QuestionnaireHistory.concepts), subqueryload(QuestionnaireHistory.questions)) \
+            .options(subqueryload(QuestionnaireHistory.concepts),
+                     subqueryload(QuestionnaireHistory.questions).joinedload(QuestionnaireQuestion.code)) \
             .filter(QuestionnaireHistory.questionnaireId == questionnaire_id_and_semantic_version[0],
                     QuestionnaireHistory.semanticVersion == questionnaire_id_and_semantic_version[1])
         return query.first()
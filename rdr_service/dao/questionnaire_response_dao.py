@@ -1,4 +1,4 @@
-from collections import defaultdict
+from collections import defaultdict, namedtuple
 import json
 import logging
 import os
@@ -99,6 +99,7 @@ from rdr_service.participant_enums import (
     get_race,
     ParticipantCohort,
     ConsentExpireStatus)
+from rdr_service.services.survey_definition_cache import get_survey_definition_cache
 
 _QUESTIONNAIRE_PREFIX = "Questionnaire/"
 _QUESTIONNAIRE_HISTORY_SEGMENT = "/_history/"
@@ -145,22 +146,24 @@ def get_first_completed_baseline_time(participant_summary):
 
 class ResponseValidator:
     def __init__(self, questionnaire_history: QuestionnaireHistory, session):
-        self.session = session
+        # Everything used to check responses is loaded here, so validators can be cached and shared
+        # between threads once the session is closed.
         self._questionnaire_question_map = self._build_question_id_map(questionnaire_history)
 
-        self.survey = self._get_survey_for_questionnaire_history(questionnaire_history)
+        self.survey = self._get_survey_for_questionnaire_history(questionnaire_history, session)
         if self.survey is not None:
             self._code_to_question_map = self._build_code_to_question_map()
             if self.survey.redcapProjectId is not None:
                 logging.info('Validating imported survey')
 
         # Get the skip code id
-        self.skip_code_id = self.session.query(Code.codeId).filter(Code.value == PMI_SKIP_CODE).scalar()
+        self.skip_code_id = session.query(Code.codeId).filter(Code.value == PMI_SKIP_CODE).scalar()
         if self.skip_code_id is None:
             logging.error('Unable to load PMI_SKIP code')
 
-    def _get_survey_for_questionnaire_history(self, questionnaire_history: QuestionnaireHistory):
-        survey_query = self.session.query(Survey).filter(
+    @staticmethod
+    def _get_survey_for_questionnaire_history(questionnaire_history: QuestionnaireHistory, session):
+        survey_query = session.query(Survey).filter(
             Survey.codeId.in_([concept.codeId for concept in questionnaire_history.concepts]),
             Survey.importTime < questionnaire_history.created,
             or_(
@@ -168,6 +171,7 @@ class ResponseValidator:
                 Survey.replacedTime > questionnaire_history.created
             )
         ).options(
+            joinedload(Survey.questions).joinedload(SurveyQuestion.code),
             joinedload(Survey.questions).joinedload(SurveyQuestion.options).joinedload(SurveyQuestionOption.code)
         )
         num_surveys_found = survey_query.count()
@@ -300,6 +304,11 @@ class ResponseValidator:
                             question_codes_answered.add(survey_question.codeId)
 
 
+# The questionnaire history for a version of a questionnaire, with the validator for its responses.
+# They're shared by the requests that use them, so neither can be changed once they are loaded.
+QuestionnaireDefinition = namedtuple('QuestionnaireDefinition', ['questionnaire_history', 'answer_validator'])
+
+
 class QuestionnaireResponseDao(BaseDao):
     def __init__(self):
         super(QuestionnaireResponseDao, self).__init__(QuestionnaireResponse)
@@ -410,12 +419,56 @@ class QuestionnaireResponseDao(BaseDao):
             if street_address_2_code and street_address_2_code.codeId not in code_ids:
                 code_ids.append(street_address_2_code.codeId)
 
+    @staticmethod
+    def _load_questionnaire_definition(questionnaire_id, semantic_version):
+        """
+        Loads the questionnaire history and its response validator on their own session, so they aren't
+        affected by what happens to the session of the request that loaded them and can be cached.
+        :return: QuestionnaireDefinition, or None if the questionnaire version isn't found
+        """
+        history_dao = QuestionnaireHistoryDao()
+        with history_dao.session() as session:
+            questionnaire_history = history_dao.get_with_children_with_session(
+                session, [questionnaire_id, semantic_version]
+            )
+            if not questionnaire_history:
+                return None
+
+            try:
+                answer_validator = ResponseValidator(questionnaire_history, session)
+            except (AttributeError, ValueError, TypeError, LookupError):
+                logging.error('Code error encountered when loading the response validator', exc_info=True)
+                answer_validator = None
+
+            return QuestionnaireDefinition(questionnaire_history, answer_validator)
+
+    @staticmethod
+    def _get_answered_questions(session, questionnaire_history, question_ids):
+        """ Return the questions answered, from the questionnaire history if it has all of them """
+        history_questions = {question.questionnaireQuestionId: question for question in questionnaire_history.questions}
+        question_ids = sorted(set(question_ids))
+        if all(question_id in history_questions for question_id in question_ids):
+            return [history_questions[question_id] for question_id in question_ids]
+        return QuestionnaireQuestionDao().get_all_with_session(session, question_ids)
+
     def insert_with_session(self, session, questionnaire_response):
 
         # Look for a questionnaire that matches any of the questionnaire history records.
-        questionnaire_history = QuestionnaireHistoryDao().get_with_children_with_session(
-            session, [questionnaire_response.questionnaireId, questionnaire_response.questionnaireSemanticVersion]
+        questionnaire_definition = get_survey_definition_cache().get(
+            questionnaire_response.questionnaireId,
+            questionnaire_response.questionnaireSemanticVersion,
+            lambda: self._load_questionnaire_definition(
+                questionnaire_response.questionnaireId, questionnaire_response.questionnaireSemanticVersion
+            )
         )
+        if questionnaire_definition:
+            questionnaire_history, answer_validator = questionnaire_definition
+        else:
+            # The questionnaire may only exist in the transaction of this session
+            questionnaire_history = QuestionnaireHistoryDao().get_with_children_with_session(
+                session, [questionnaire_response.questionnaireId, questionnaire_response.questionnaireSemanticVersion]
+            )
+            answer_validator = None
 
         if not questionnaire_history:
             raise BadRequest(
@@ -424,8 +477,10 @@ class QuestionnaireResponseDao(BaseDao):
             )
 
         try:
-            answer_validator = ResponseValidator(questionnaire_history, session)
-            answer_validator.check_response(questionnaire_response)
+            if not questionnaire_definition:
+                answer_validator = ResponseValidator(questionnaire_history, session)
+            if answer_validator:
+                answer_validator.check_response(questionnaire_response)
         except (AttributeError, ValueError, TypeError, LookupError):
             logging.error('Code error encountered when validating the response', exc_info=True)
 
@@ -443,7 +498,7 @@ class QuestionnaireResponseDao(BaseDao):
 
         # Gather the question ids and records that match the questions in the response
         question_ids = [answer.questionId for answer in questionnaire_response.answers]
-        questions = QuestionnaireQuestionDao().get_all_with_session(session, question_ids)
+        questions = self._get_answered_questions(session, questionnaire_history, question_ids)
 
         # DA-623: raise error when response link ids do not match our question link ids.
         # Gather the valid link ids for this question
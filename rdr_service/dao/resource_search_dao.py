@@ -0,0 +1,123 @@
+#
+# This file is subject to the terms and conditions defined in the
+# file 'LICENSE', which is part of this source code package.
+#
+import operator
+import random
+
+from marshmallow import fields
+from sqlalchemy import func
+from werkzeug.exceptions import BadRequest
+
+from rdr_service.clock import CLOCK
+from rdr_service.dao.base_dao import BaseDao
+from rdr_service.model.resource_data import ResourceData, RESOURCE_DATA_SEARCH_COLUMNS
+from rdr_service.model.resource_search_results import ResourceSearchResults
+
+_random = random.SystemRandom()
+
+
+class ResourceSearchDao(BaseDao):
+    """
+    Searches resource_data records by the fields in their resource JSON, and stores the matching record ids in
+    pages of search results so they can be read by search key without running the search again.
+    """
+    # Largest search key, search_key is a signed 32 bit column.
+    MAX_SEARCH_KEY = 2 ** 31 - 1
+
+    def __init__(self):
+        super().__init__(ResourceSearchResults)
+
+    @staticmethod
+    def get_field_filter(schema, field_name, op, value):
+        """
+        Return a filter on a field of the resource JSON, using the field's generated column if it has one.
+        :param schema: Resource schema object.
+        :param field_name: Name of the resource field.
+        :param op: Comparison operator name, IE: 'eq', 'gt'.
+        :param value: String value from the request.
+        :return: SQLAlchemy filter, or None if the field can't be searched.
+        """
+        field = schema.get_field(field_name)
+        if field is None or isinstance(field, fields.Nested) or not hasattr(operator, op):
+            return None
+
+        column = RESOURCE_DATA_SEARCH_COLUMNS.get(field_name)
+        json_value = func.json_extract(ResourceData.resource, f'$.{field_name}')
+        try:
+            if isinstance(field, fields.Integer):
+                value = int(value)
+            elif isinstance(field, (fields.Float, fields.Decimal)):
+                value = float(value)
+            elif isinstance(field, fields.Boolean):
+                value = 'true' if value.lower() in ('true', '1') else 'false'
+                json_value = func.json_unquote(json_value)
+            else:
+                json_value = func.json_unquote(json_value)
+        except ValueError:
+            raise BadRequest(f'Invalid value for {field_name} filter ({value}).')
+
+        return getattr(operator, op)(column if column is not None else json_value, value)
+
+    def _new_search_key(self, session):
+        while True:
+            search_key = _random.randint(1, self.MAX_SEARCH_KEY)
+            if not session.query(ResourceSearchResults.id).filter(
+                    ResourceSearchResults.searchKey == search_key).first():
+                return search_key
+
+    def store_search_results(self, session, query, page_size, max_results):
+        """
+        Run the search and store the matching record ids in pages.
+        :param session: Database session.
+        :param query: Query selecting the ResourceData.id values of the search results, in order.
+        :param page_size: Number of results in each page.
+        :param max_results: Maximum number of results stored.
+        :return: Search key, number of results stored and whether results were left out because of max_results.
+        """
+        ids = [row.id for row in query.limit(max_results + 1)]
+        truncated = len(ids) > max_results
+        ids = ids[:max_results]
+
+        search_key = self._new_search_key(session)
+        # Bulk inserts skip the model listeners, so the timestamps are set here.
+        now = CLOCK.now()
+        session.bulk_insert_mappings(ResourceSearchResults, [{
+            'created': now,
+            'modified': now,
+            'searchKey': search_key,
+            'pageNo': index // page_size + 1,
+            'resourceDataID': resource_data_id
+        } for index, resource_data_id in enumerate(ids)])
+        return search_key, len(ids), truncated
+
+    @staticmethod
+    def get_search_page(session, search_key, page_no):
+        """
+        Return the resource records on a page of search results.
+        :return: List of records, number of pages and number of results for the search key.
+        """
+        pages, total = session.query(
+            func.max(ResourceSearchResults.pageNo),
+            func.count(ResourceSearchResults.id)
+        ).filter(ResourceSearchResults.searchKey == search_key).one()
+
+        records = session.query(
+            ResourceData.id, ResourceData.created, ResourceData.modified, ResourceData.resource
+        ).join(
+            ResourceSearchResults, ResourceSearchResults.resourceDataID == ResourceData.id
+        ).filter(
+            ResourceSearchResults.searchKey == search_key,
+            ResourceSearchResults.pageNo == page_no
+        ).order_by(ResourceSearchResults.id).all()
+        return records, pages or 0, total
+
+    @staticmethod
+    def delete_expired_results(session, expiration):
+        """
+        Delete the search results stored before the expiration period.
+        :param expiration: timedelta search results are kept for.
+        """
+        return session.query(ResourceSearchResults).filter(
+            ResourceSearchResults.created < CLOCK.now() - expiration
+        ).delete(synchronize_session=False)
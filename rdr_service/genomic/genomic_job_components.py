@@ -7,13 +7,15 @@ import csv
 import logging
 import re
 import pytz
-from collections import deque, namedtuple
+from collections import defaultdict, deque, namedtuple
 from copy import deepcopy
+from itertools import chain, islice
 from dateutil.parser import parse
 import sqlalchemy
 from werkzeug.exceptions import NotFound
 
 from rdr_service import clock, config
+from rdr_service.dao import database_factory
 from rdr_service.dao.code_dao import CodeDao
 from rdr_service.dao.participant_dao import ParticipantDao
 from rdr_service.genomic import genomic_mappings
@@ -93,10 +95,28 @@ from rdr_service.code_constants import COHORT_1_REVIEW_CONSENT_YES_CODE
 from sqlalchemy.orm import aliased
 
 
+class StreamedDataRows:
+    """
+    The rows of a genomic data file, read from the file each time they are iterated
+    so a large file is never held in memory
+    """
+
+    def __init__(self, open_file, path):
+        self.open_file = open_file
+        self.path = path
+
+    def __iter__(self):
+        with self.open_file(self.path) as csv_file:
+            for row in csv.DictReader(csv_file, delimiter=","):
+                yield GenomicFileIngester._clean_empty_keys(row)
+
+
 class GenomicFileIngester:
     """
     This class ingests a file from a source GC bucket into the destination table
     """
+    # Maximum number of manifest rows that have their records looked up and saved together
+    INGEST_BATCH_SIZE = 1000
 
     def __init__(self, job_id=None,
                  job_run_id=None,
@@ -270,7 +290,7 @@ class GenomicFileIngester:
         :return: A GenomicSubProcessResultCode
         """
         self.file_obj = file_obj
-        data_to_ingest = self._retrieve_data_from_path(self.file_obj.filePath)
+        data_to_ingest = self._stream_data_to_ingest(self.file_obj.filePath)
 
         if data_to_ingest == GenomicSubProcessResult.ERROR:
             return GenomicSubProcessResult.ERROR
@@ -319,10 +339,18 @@ class GenomicFileIngester:
 
             try:
                 ingestion_type = ingestion_map[self.job_id]
-                ingestions = self._set_data_ingest_iterations(data_to_ingest['rows'])
 
-                for row in ingestions:
-                    ingestion_type(row)
+                # Skip the rows committed by an earlier attempt that failed
+                ingested_row_count = self.file_processed_dao.get_resumable_row_count(self.file_obj)
+                if ingested_row_count:
+                    logging.info(f'Resuming ingestion of {self.file_obj.fileName} after row {ingested_row_count}.')
+                    self.file_processed_dao.update_ingested_row_count(self.file_obj.id, ingested_row_count)
+
+                for rows in self._iter_data_ingest_chunks(data_to_ingest['rows'], skip_rows=ingested_row_count):
+                    ingestion_type(rows)
+
+                    ingested_row_count += len(rows)
+                    self.file_processed_dao.update_ingested_row_count(self.file_obj.id, ingested_row_count)
 
                 self._set_manifest_file_resolved()
 
@@ -335,23 +363,23 @@ class GenomicFileIngester:
             logging.info("No data to ingest.")
             return GenomicSubProcessResult.NO_FILES
 
-    def _set_data_ingest_iterations(self, data_rows):
-        all_ingestions = []
-        if self.controller.max_num and len(data_rows) > self.controller.max_num:
-            current_rows = []
-            for row in data_rows:
-                current_rows.append(row)
-                if len(current_rows) == self.controller.max_num:
-                    all_ingestions.append(current_rows.copy())
-                    current_rows.clear()
-
-            if current_rows:
-                all_ingestions.append(current_rows)
-
-        else:
-            all_ingestions.append(data_rows)
+    def _iter_data_ingest_chunks(self, data_rows, skip_rows=0):
+        """
+        Yields the rows to ingest in chunks of max_num rows, or INGEST_BATCH_SIZE rows if that isn't set,
+        so only one chunk of a streamed file is held in memory
+        :param data_rows: iterable of row dictionaries
+        :param skip_rows: number of rows at the start of the file to skip
+        """
+        chunk_size = self.controller.max_num or self.INGEST_BATCH_SIZE
+        current_rows = []
+        for row in islice(data_rows, skip_rows, None):
+            current_rows.append(row)
+            if len(current_rows) == chunk_size:
+                yield current_rows
+                current_rows = []
 
-        return all_ingestions
+        if current_rows:
+            yield current_rows
 
     def _set_manifest_file_resolved(self):
         if not self.file_obj:
@@ -394,6 +422,14 @@ class GenomicFileIngester:
             'gcManifestFailureDescription': 'failuremodedesc',
         }
 
+    def _get_ingest_batches(self, rows):
+        """
+        Splits the rows of an ingestion into the batches
+        that have their records looked up and saved together
+        """
+        for i in range(0, len(rows), self.INGEST_BATCH_SIZE):
+            yield rows[i:i + self.INGEST_BATCH_SIZE]
+
     def _ingest_aw1_manifest(self, rows):
         """
         AW1 ingestion method: Updates the GenomicSetMember with AW1 data
@@ -402,9 +438,22 @@ class GenomicFileIngester:
         :param rows:
         :return: result code
         """
+        for batch in self._get_ingest_batches(rows):
+            self._ingest_aw1_batch(batch)
+
+        return GenomicSubProcessResult.SUCCESS
+
+    def _ingest_aw1_batch(self, rows):
+        """
+        Ingests a batch of AW1 rows.
+        The members, control samples and samples for the batch are looked up with a few queries
+        and the changed members are saved together after every row has been processed.
+        :param rows:
+        """
         _states = [GenomicWorkflowState.AW0, GenomicWorkflowState.EXTRACT_REQUESTED]
         _site = self._get_site_from_aw1()
 
+        row_copies = []
         for row in rows:
             row_copy = self._clean_row_keys(row)
 
@@ -413,10 +462,47 @@ class GenomicFileIngester:
             if row_copy['biobankid'] == "":
                 continue
 
+            row_copies.append(row_copy)
+
+        if not row_copies:
+            return
+
+        tube_ids = {row_copy['collectiontubeid'] for row_copy in row_copies}
+        parent_sample_ids = {str(int(row_copy['parentsampleid'])) for row_copy in row_copies}
+        biobank_ids = {self._strip_biobank_id_prefix(row_copy['biobankid']) for row_copy in row_copies}
+
+        # Members are shared between the lookups, so changes made by a row are seen by the later rows
+        members_by_id = {}
+
+        def _unique(members):
+            return [members_by_id.setdefault(member.id, member) for member in members]
+
+        control_sample_parents = {
+            (member.genomeType, member.sampleId): member
+            for member in self.member_dao.get_control_sample_parents(parent_sample_ids)
+        }
+        members_by_tube = defaultdict(list)
+        for member in _unique(self.member_dao.get_members_from_collection_tubes(tube_ids)):
+            members_by_tube[member.collectionTubeId].append(member)
+        members_by_biobank_id = defaultdict(list)
+        for member in _unique(self.member_dao.get_members_from_biobank_ids_in_states(biobank_ids, _states)):
+            members_by_biobank_id[member.biobankId].append(member)
+        control_samples = set()
+        if control_sample_parents:
+            control_samples = {
+                (member.genomeType, member.biobankId, member.collectionTubeId, member.sampleId)
+                for member in self.member_dao.get_control_samples_for_gc(
+                    _site, {row_copy['sampleid'] for row_copy in row_copies}
+                )
+            }
+        sample_biobank_ids = self.sample_dao.get_biobank_ids_by_sample_id(tube_ids)
+        div_pouch_site_ids = self.sample_dao.get_diversion_pouch_site_ids(tube_ids)
+
+        changed_members = {}
+        for row_copy in row_copies:
             # Check if this sample has a control sample parent tube
-            control_sample_parent = self.member_dao.get_control_sample_parent(
-                row_copy['genometype'],
-                int(row_copy['parentsampleid'])
+            control_sample_parent = control_sample_parents.get(
+                (row_copy['genometype'], str(int(row_copy['parentsampleid'])))
             )
 
             # Create new set member record if the sample
@@ -432,52 +518,50 @@ class GenomicFileIngester:
 
                 # Check if the control sample member exists for this GC, BID, collection tube, and sample ID
                 # Since the Biobank is reusing the sample and collection tube IDs (which are supposed to be unique)
-                cntrl_sample_member = self.member_dao.get_control_sample_for_gc_and_genome_type(
-                    _site,
+                control_sample_key = (
                     row_copy['genometype'],
                     row_copy['biobankid'],
                     row_copy['collectiontubeid'],
                     row_copy['sampleid']
                 )
 
-                if not cntrl_sample_member:
+                if control_sample_key not in control_samples:
                     # Insert new GenomicSetMember record if none exists
                     # for this control sample, genome type, and gc site
                     self.create_new_member_from_aw1_control_sample(row_copy)
+                    control_samples.add(control_sample_key)
 
                 # Skip rest of iteration and go to next row
                 continue
 
             # Find the existing GenomicSetMember
             if self.job_id == GenomicJob.AW1F_MANIFEST:
-                # Set the member based on collection tube ID will null sample
-                member = self.member_dao.get_member_from_collection_tube(
-                    row_copy['collectiontubeid'],
-                    row_copy['genometype'],
-                    state=GenomicWorkflowState.AW1
-                )
+                # Set the member based on collection tube ID in the AW1 state
+                member = next((
+                    m for m in members_by_tube[row_copy['collectiontubeid']]
+                    if m.genomeType == row_copy['genometype'] and m.genomicWorkflowState == GenomicWorkflowState.AW1
+                ), None)
             else:
                 # Set the member based on collection tube ID will null sample
-                member = self.member_dao.get_member_from_collection_tube_with_null_sample_id(
-                    row_copy['collectiontubeid'],
-                    row_copy['genometype'])
+                member = next((
+                    m for m in members_by_tube[row_copy['collectiontubeid']]
+                    if m.genomeType == row_copy['genometype'] and m.sampleId is None
+                ), None)
 
             # Since member not found, and not a control sample,
             # check if collection tube id was swapped by Biobank
             if not member:
-                bid = row_copy['biobankid']
+                bid = self._strip_biobank_id_prefix(row_copy['biobankid'])
 
-                # Strip biobank prefix if it's there
-                if bid[0] in [get_biobank_id_prefix(), 'T']:
-                    bid = bid[1:]
-                member = self.member_dao.get_member_from_biobank_id_in_state(
-                    bid,
-                    row_copy['genometype'],
-                    _states
-                )
+                member = next((
+                    m for m in members_by_biobank_id[bid]
+                    if m.genomeType == row_copy['genometype'] and m.genomicWorkflowState in _states
+                    and m.sampleId is None
+                ), None)
                 # If member found, validate new collection tube ID, set collection tube ID
                 if member:
-                    if self._validate_collection_tube_id(row_copy['collectiontubeid'], bid):
+                    sample_biobank_id = sample_biobank_ids.get(row_copy['collectiontubeid'])
+                    if sample_biobank_id is not None and int(sample_biobank_id) == int(bid):
                         if member.genomeType in [GENOME_TYPE_ARRAY, GENOME_TYPE_WGS]:
                             if member.collectionTubeId:
                                 with self.member_dao.session() as session:
@@ -503,16 +587,22 @@ class GenomicFileIngester:
                     continue
 
             # Check for diversion pouch site
-            div_pouch_site_id = self.sample_dao.get_diversion_pouch_site_id(row_copy['collectiontubeid'])
-            if div_pouch_site_id:
+            if div_pouch_site_ids.get(row_copy['collectiontubeid']):
                 member.diversionPouchSiteFlag = 1
 
             # Process the attribute data
             member_changed, member = self._process_aw1_attribute_data(row_copy, member)
             if member_changed:
-                self.member_dao.update(member)
+                changed_members[member.id] = member
 
-        return GenomicSubProcessResult.SUCCESS
+        self.member_dao.update_members(changed_members.values())
+
+    @staticmethod
+    def _strip_biobank_id_prefix(biobank_id):
+        # Strip biobank prefix if it's there
+        if biobank_id[0] in [get_biobank_id_prefix(), 'T']:
+            return biobank_id[1:]
+        return biobank_id
 
     def create_investigation_member_record_from_aw1(self, aw1_data):
         # Create genomic_set
@@ -780,6 +870,10 @@ class GenomicFileIngester:
         :param member:
         """
 
+        self._set_member_attributes_for_aw2(member)
+        self.member_dao.update(member)
+
+    def _set_member_attributes_for_aw2(self, member: GenomicSetMember):
         member.aw2FileProcessedId = self.file_obj.id
 
         # Only update the state if it was AW1
@@ -788,8 +882,6 @@ class GenomicFileIngester:
             member.genomicWorkflowStateStr = GenomicWorkflowState.AW2.name
             member.genomicWorkflowStateModifiedTime = clock.CLOCK.now()
 
-        self.member_dao.update(member)
-
     def _ingest_gem_a2_manifest(self, rows):
         """
         Processes the GEM A2 manifest file data
@@ -969,27 +1061,54 @@ class GenomicFileIngester:
                 'Opening CSV file from queue {}: {}.'
                             .format(path.split('/')[1], filename)
             )
-            if self.controller.storage_provider:
-                with self.controller.storage_provider.open(path, 'r') as csv_file:
-                    return self._read_data_to_ingest(csv_file)
-            else:
-                with open_cloud_file(path) as csv_file:
-                    return self._read_data_to_ingest(csv_file)
+            with self._open_data_file(path) as csv_file:
+                return self._read_data_to_ingest(csv_file)
+
+        except FileNotFoundError:
+            logging.error(f"File path '{path}' not found")
+            return GenomicSubProcessResult.ERROR
+
+    def _stream_data_to_ingest(self, path):
+        """
+        Reads the header of a genomic data file, the rows are read from the file as they are iterated
+        :param path: The source file to ingest
+        :return: CSV fieldnames and rows as a dictionary, None if the file is empty
+        """
+        try:
+            logging.info(f'Opening CSV file from queue: {path}.')
+            with self._open_data_file(path) as csv_file:
+                fieldnames = csv.DictReader(csv_file, delimiter=",").fieldnames
 
         except FileNotFoundError:
             logging.error(f"File path '{path}' not found")
             return GenomicSubProcessResult.ERROR
 
+        if not fieldnames:
+            return None
+        return {
+            'fieldnames': fieldnames,
+            'rows': StreamedDataRows(self._open_data_file, path)
+        }
+
+    def _open_data_file(self, path):
+        if self.controller.storage_provider:
+            return self.controller.storage_provider.open(path, 'r')
+        return open_cloud_file(path)
+
     @staticmethod
-    def _read_data_to_ingest(csv_file):
+    def _clean_empty_keys(row):
+        for key in row.copy():
+            if not key:
+                del row[key]
+        return row
+
+    @classmethod
+    def _read_data_to_ingest(cls, csv_file):
         data_to_ingest = {'rows': []}
         csv_reader = csv.DictReader(csv_file, delimiter=",")
         data_to_ingest['fieldnames'] = csv_reader.fieldnames
         for row in csv_reader:
-            for key in row.copy():
-                if not key:
-                    del row[key]
-            data_to_ingest['rows'].append(row)
+            data_to_ingest['rows'].append(cls._clean_empty_keys(row))
         return data_to_ingest
 
     def _process_aw1_attribute_data(self, aw1_data, member):
@@ -1124,14 +1243,44 @@ class GenomicFileIngester:
         :param rows:
         :return result code
         """
-        # iterate over each row from CSV and insert into gc metrics table
-        for row in rows:
-            # change all key names to lower
-            row_copy = self._clean_row_keys(row)
+        for batch in self._get_ingest_batches(rows):
+            self._process_gc_metrics_batch(batch)
 
-            member = self.member_dao.get_member_from_sample_id(
-                int(row_copy['sampleid']),
+        return GenomicSubProcessResult.SUCCESS
+
+    def _process_gc_metrics_batch(self, rows):
+        """
+        Ingests a batch of AW2 rows.
+        The members and existing metrics for the batch are looked up with a few queries
+        and the metrics and members are saved together after every row has been processed.
+        :param rows:
+        """
+        # change all key names to lower
+        row_copies = [self._clean_row_keys(row) for row in rows]
+
+        members_by_sample_id = {}
+        for member in sorted(
+            self.member_dao.get_members_from_sample_ids({str(int(row_copy['sampleid'])) for row_copy in row_copies}),
+            key=lambda m: m.id
+        ):
+            members_by_sample_id.setdefault(member.sampleId, member)
+
+        existing_metric_ids = {
+            metrics.genomicSetMemberId: metrics.id
+            for metrics in self.metrics_dao.get_metrics_by_member_ids(
+                [member.id for member in members_by_sample_id.values()]
             )
+        }
+
+        # Member ID -> (row, existing metrics ID)
+        metrics_to_upsert = {}
+        changed_members = {}
+        aw1_files = {}
+        feedback_counts = defaultdict(int)
+
+        # iterate over each row from CSV and insert into gc metrics table
+        for row_copy in row_copies:
+            member = members_by_sample_id.get(str(int(row_copy['sampleid'])))
 
             if member:
                 row_copy = self.prep_aw2_row_attributes(row_copy, member)
@@ -1140,16 +1289,18 @@ class GenomicFileIngester:
                     continue
 
                 # check whether metrics object exists for that member
-                existing_metrics_obj = self.metrics_dao.get_metrics_by_member_id(member.id)
+                metrics_exist = member.id in existing_metric_ids or member.id in metrics_to_upsert
 
-                if existing_metrics_obj is not None:
+                if metrics_exist:
 
                     if self.controller.skip_updates:
                         # when running tool, updates can be skipped
                         continue
 
+                    elif member.id in metrics_to_upsert:
+                        metric_id = metrics_to_upsert[member.id][1]
                     else:
-                        metric_id = existing_metrics_obj.id
+                        metric_id = existing_metric_ids[member.id]
                 else:
                     metric_id = None
                     if member.genomeType in [GENOME_TYPE_ARRAY, GENOME_TYPE_WGS]:
@@ -1159,18 +1310,19 @@ class GenomicFileIngester:
                             # Insert a new member
                             self.insert_member_for_replating(member, row_copy['contamination_category'])
 
-                self.metrics_dao.upsert_gc_validation_metrics_from_dict(row_copy, metric_id)
-                self.update_member_for_aw2(member)
+                metrics_to_upsert[member.id] = (row_copy, metric_id)
+                self._set_member_attributes_for_aw2(member)
+                changed_members[member.id] = member
 
                 # For feedback manifest loop
                 # Get the genomic_manifest_file
-                manifest_file = self.file_processed_dao.get(member.aw1FileProcessedId)
-                if manifest_file is not None and existing_metrics_obj is None:
-                    self.feedback_dao.increment_feedback_count(manifest_file.genomicManifestFileId)
+                if member.aw1FileProcessedId not in aw1_files:
+                    aw1_files[member.aw1FileProcessedId] = self.file_processed_dao.get(member.aw1FileProcessedId)
+                manifest_file = aw1_files[member.aw1FileProcessedId]
+                if manifest_file is not None and not metrics_exist:
+                    feedback_counts[manifest_file.genomicManifestFileId] += 1
             else:
-                bid = row_copy['biobankid']
-                if bid[0] in [get_biobank_id_prefix(), 'T']:
-                    bid = bid[1:]
+                bid = self._strip_biobank_id_prefix(row_copy['biobankid'])
                 # Couldn't find genomic set member based on either biobank ID or sample ID
                 _message = f"{self.job_id.name}: Cannot find genomic set member for bid, sample_id: " \
                            f"{row_copy['biobankid']}, {row_copy['sampleid']}"
@@ -1183,7 +1335,11 @@ class GenomicFileIngester:
                                                 sample_id=row_copy['sampleid'],
                                                 )
 
-        return GenomicSubProcessResult.SUCCESS
+        self.metrics_dao.upsert_gc_validation_metrics_from_dicts(metrics_to_upsert.values())
+        self.member_dao.update_members(changed_members.values())
+
+        for manifest_file_id, count in feedback_counts.items():
+            self.feedback_dao.increment_feedback_count(manifest_file_id, count)
 
     def copy_member_for_replating(
         self,
@@ -3594,11 +3750,83 @@ class ManifestDefinitionProvider:
         )
 
 
+class _InvalidManifestSourceData(Exception):
+    pass
+
+
+class ManifestSourceDataValidator:
+    """
+    Validates manifest source rows one at a time as they are streamed,
+    keeping only the sample ids seen so far to find duplicates
+    """
+    # Checks in the order their errors are reported
+    BIOBANK_ID_PREFIX, DUPLICATE_SAMPLE_ID, SEX_AT_BIRTH, PATH = range(4)
+
+    def __init__(self, columns):
+        self.prefix = get_biobank_id_prefix()
+        self.biobank_id_position, self.sample_id_position, self.sex_at_birth_position = None, None, None
+        self.path_positions = []
+
+        for i, col in enumerate(columns):
+            if 'sample_id' in col:
+                self.sample_id_position = i
+            if 'biobank_id' in col:
+                self.biobank_id_position = i
+            if 'sex_at_birth' in col:
+                self.sex_at_birth_position = i
+            if '_path' in col:
+                self.path_positions.append(i)
+
+        self.seen_sample_ids = set()
+        # Duplicated sample ids, in the order they were found
+        self.duplicate_sample_ids = {}
+        self.errors = {}
+
+    def check_row(self, row):
+        if self.biobank_id_position is not None:
+            biobank_id = row[self.biobank_id_position]
+            if biobank_id and self.prefix not in biobank_id:
+                self.errors.setdefault(self.BIOBANK_ID_PREFIX, 'Biobank IDs are missing correct prefix')
+
+        if self.sample_id_position is not None:
+            sample_id = row[self.sample_id_position]
+            if sample_id in self.seen_sample_ids:
+                self.duplicate_sample_ids[sample_id] = None
+            else:
+                self.seen_sample_ids.add(sample_id)
+
+        if self.sex_at_birth_position is not None:
+            sex_at_birth = row[self.sex_at_birth_position]
+            if sex_at_birth and sex_at_birth not in ['M', 'F', 'NA']:
+                self.errors.setdefault(self.SEX_AT_BIRTH, 'Invalid Sex at Birth values')
+
+        if self.PATH not in self.errors:
+            for i in self.path_positions:
+                val = row[i]
+                if val and (not val.startswith('gs://') or len(val.split('gs://')[1].split('/')) < 3):
+                    self.errors[self.PATH] = f'Path {val} is invalid formatting'
+                    break
+
+    def get_error_message(self):
+        """
+        :return: error message of the first failed check for the rows checked so far, or None if they are valid
+        """
+        if self.duplicate_sample_ids:
+            self.errors[self.DUPLICATE_SAMPLE_ID] = \
+                f'Sample IDs {list(self.duplicate_sample_ids)} are not distinct'
+        if not self.errors:
+            return None
+        return self.errors[min(self.errors)]
+
+
 class ManifestCompiler:
     """
     This component compiles Genomic manifests
     based on definitions provided by ManifestDefinitionProvider
     """
+    # Number of source rows fetched from the cursor and written to the manifest at a time
+    SOURCE_DATA_BATCH_SIZE = 1000
+
     def __init__(
         self,
         run_id=None,
@@ -3636,33 +3864,50 @@ class ManifestCompiler:
         )
 
         self.manifest_def = self.def_provider.get_def(manifest_type)
-        source_data = self.pull_source_data()
+        source_rows = self.iter_source_data()
+        first_row = next(source_rows, None)
 
-        if not source_data:
+        if first_row is None:
             logging.info(f'No records found for manifest type: {manifest_type}.')
             return {
                 "code": GenomicSubProcessResult.NO_FILES,
                 "record_count": 0,
             }
 
-        validation_failed, message = self._validate_source_data(source_data, manifest_type)
-        if validation_failed:
-            message = f'{self.controller.job_id.name}: {message}'
-            self.controller.create_incident(
-                source_job_run_id=self.run_id,
-                code=GenomicIncidentCode.MANIFEST_GENERATE_DATA_VALIDATION_FAILED.name,
-                slack=True,
-                message=message
-            )
-            raise RuntimeError
+        source_rows = chain([first_row], source_rows)
+        validator = self._get_source_data_validator(manifest_type)
+        sample_ids = []
 
-        if self.max_num and len(source_data) > self.max_num:
-            current_list, count = [], 0
+        def validated_rows(rows):
+            # Rows are validated and their sample ids collected as they are written to the manifest,
+            # raising once they have all been read so the partially written file isn't uploaded
+            for row in rows:
+                if validator:
+                    validator.check_row(row)
+                sample_ids.append(row.sampleId if hasattr(row, 'sampleId') else row.sample_id)
+                yield row
+            if validator and validator.get_error_message():
+                raise _InvalidManifestSourceData(validator.get_error_message())
 
-            for obj in source_data:
-                current_list.append(obj)
-                if len(current_list) == self.max_num:
-                    count += 1
+        try:
+            split_rows = None
+            if self.max_num:
+                split_rows = list(islice(source_rows, self.max_num))
+                next_row = next(source_rows, None)
+                if next_row is None:
+                    source_rows, split_rows = iter(split_rows), None
+                else:
+                    source_rows = chain(split_rows, [next_row], source_rows)
+
+            if split_rows is not None:
+                if validator:
+                    # Validate all of the rows first, so none of the files are uploaded if a later one is invalid
+                    validation_failed, message = self._validate_source_data(self.iter_source_data(), manifest_type)
+                    if validation_failed:
+                        raise _InvalidManifestSourceData(message)
+                    validator = None
+
+                for count, current_list in enumerate(self._iter_source_chunks(source_rows, self.max_num), start=1):
                     self.output_file_name = self.manifest_def.output_filename
                     self.output_file_name = f'{self.output_file_name.split(".csv")[0]}_{count}.csv'
                     file_path = f'{self.manifest_def.destination_bucket}/{self.output_file_name}'
@@ -3672,17 +3917,26 @@ class ManifestCompiler:
                         f'{file_path}'
                     )
 
-                    self._write_and_upload_manifest(current_list)
+                    self._write_and_upload_manifest(validated_rows(current_list))
                     self.controller.manifests_generated.append({
                         'file_path': file_path,
                         'record_count': len(current_list)
                     })
-                    current_list.clear()
 
-            if current_list:
-                count += 1
+            else:
                 self.output_file_name = self.manifest_def.output_filename
-                self.output_file_name = f'{self.output_file_name.split(".csv")[0]}_{count}.csv'
+                # If the new manifest is a feedback manifest,
+                # it will have an input manifest
+                if "input_manifest" in kwargs.keys():
+                    # AW2F manifest file name is based of of AW1
+                    if manifest_type == GenomicManifestTypes.AW2F:
+                        new_name = kwargs['input_manifest'].filePath.split('/')[-1]
+                        new_name = new_name.replace('.csv', f'_contamination_{version}.csv')
+                        self.output_file_name = self.manifest_def.output_filename.replace(
+                            "GC_AoU_DataType_PKG-YYMM-xxxxxx_contamination.csv",
+                            f"{new_name}"
+                        )
+
                 file_path = f'{self.manifest_def.destination_bucket}/{self.output_file_name}'
 
                 logging.info(
@@ -3690,41 +3944,23 @@ class ManifestCompiler:
                     f'{file_path}'
                 )
 
-                self._write_and_upload_manifest(current_list)
+                self._write_and_upload_manifest(validated_rows(source_rows))
                 self.controller.manifests_generated.append({
                     'file_path': file_path,
-                    'record_count': len(current_list)
+                    'record_count': len(sample_ids)
                 })
 
-        else:
-            self.output_file_name = self.manifest_def.output_filename
-            # If the new manifest is a feedback manifest,
-            # it will have an input manifest
-            if "input_manifest" in kwargs.keys():
-                # AW2F manifest file name is based of of AW1
-                if manifest_type == GenomicManifestTypes.AW2F:
-                    new_name = kwargs['input_manifest'].filePath.split('/')[-1]
-                    new_name = new_name.replace('.csv', f'_contamination_{version}.csv')
-                    self.output_file_name = self.manifest_def.output_filename.replace(
-                        "GC_AoU_DataType_PKG-YYMM-xxxxxx_contamination.csv",
-                        f"{new_name}"
-                    )
-
-            file_path = f'{self.manifest_def.destination_bucket}/{self.output_file_name}'
-
-            logging.info(
-                f'Preparing manifest of type {manifest_type}...'
-                f'{file_path}'
+        except _InvalidManifestSourceData as e:
+            message = f'{self.controller.job_id.name}: {e}'
+            self.controller.create_incident(
+                source_job_run_id=self.run_id,
+                code=GenomicIncidentCode.MANIFEST_GENERATE_DATA_VALIDATION_FAILED.name,
+                slack=True,
+                message=message
             )
+            raise RuntimeError
 
-            self._write_and_upload_manifest(source_data)
-            self.controller.manifests_generated.append({
-                'file_path': file_path,
-                'record_count': len(source_data)
-            })
-
-        for row in source_data:
-            sample_id = row.sampleId if hasattr(row, 'sampleId') else row.sample_id
+        for sample_id in sample_ids:
             member = self.member_dao.get_member_from_sample_id(sample_id, genome_type)
 
             if not member:
@@ -3797,70 +4033,58 @@ class ManifestCompiler:
         Runs the source data query
         :return: result set
         """
+        return list(self.iter_source_data())
+
+    def iter_source_data(self):
+        """
+        Runs the source data query, streaming the rows from a server side cursor
+        so the whole result set isn't held in memory
+        :return: generator of result rows
+        """
         if self.manifest_def.query:
             params = self.manifest_def.params or {}
-            return self.manifest_def.query(**params)
-
-        with self.member_dao.session() as session:
-            return session.execute(self.manifest_def.source_data).fetchall()
+            yield from self.manifest_def.query(**params)
+            return
 
-    def _validate_source_data(self, data, manifest_type):
-        invalid = False
-        message = None
+        with database_factory.make_server_cursor_database().session() as session:
+            cursor = session.execute(self.manifest_def.source_data)
+            try:
+                rows = cursor.fetchmany(self.SOURCE_DATA_BATCH_SIZE)
+                while rows:
+                    yield from rows
+                    rows = cursor.fetchmany(self.SOURCE_DATA_BATCH_SIZE)
+            finally:
+                cursor.close()
 
+    @staticmethod
+    def _iter_source_chunks(rows, chunk_size):
+        rows = iter(rows)
+        chunk = list(islice(rows, chunk_size))
+        while chunk:
+            yield chunk
+            chunk = list(islice(rows, chunk_size))
+
+    def _get_source_data_validator(self, manifest_type):
+        """
+        :return: validator for the rows of the manifest type, or None if they aren't validated
+        """
         if manifest_type in [
             GenomicManifestTypes.AW3_ARRAY,
             GenomicManifestTypes.AW3_WGS
         ]:
-            prefix = get_biobank_id_prefix()
-            path_positions = []
-            biobank_ids, sample_ids, sex_at_birth = [], [], []
-
-            for i, col in enumerate(self.manifest_def.columns):
-                if 'sample_id' in col:
-                    sample_ids = [row[i] for row in data]
-                if 'biobank_id' in col:
-                    biobank_ids = [row[i] for row in data]
-                if 'sex_at_birth' in col:
-                    sex_at_birth = [row[i] for row in data]
-                if '_path' in col:
-                    path_positions.append(i)
-
-            needs_prefixes = any(bid for bid in biobank_ids if prefix not in bid)
-            if needs_prefixes:
-                message = 'Biobank IDs are missing correct prefix'
-                invalid = True
-                return invalid, message
-
-            biobank_ids.clear()
-
-            dup_sample_ids = {sample_id for sample_id in sample_ids if sample_ids.count(sample_id) > 1}
-            if dup_sample_ids:
-                message = f'Sample IDs {list(dup_sample_ids)} are not distinct'
-                invalid = True
-                return invalid, message
-
-            sample_ids.clear()
-
-            invalid_sex_values = any(val for val in sex_at_birth if val not in ['M', 'F', 'NA'])
-            if invalid_sex_values:
-                message = 'Invalid Sex at Birth values'
-                invalid = True
-                return invalid, message
-
-            sex_at_birth.clear()
-
-            for row in data:
-                for i, val in enumerate(row):
-                    if i in path_positions and val:
-                        if not val.startswith('gs://') \
-                            or (val.startswith('gs://')
-                                and len(val.split('gs://')[1].split('/')) < 3):
-                            message = f'Path {val} is invalid formatting'
-                            invalid = True
-                            return invalid, message
-
-        return invalid, message
+            return ManifestSourceDataValidator(self.manifest_def.columns)
+        return None
+
+    def _validate_source_data(self, data, manifest_type):
+        validator = self._get_source_data_validator(manifest_type)
+        if not validator:
+            return False, None
+
+        for row in data:
+            validator.check_row(row)
+
+        message = validator.get_error_message()
+        return message is not None, message
 
     def _write_and_upload_manifest(self, source_data):
         """
@@ -3872,7 +4096,8 @@ class ManifestCompiler:
             exporter = SqlExporter(self.bucket_name)
             with exporter.open_cloud_writer(self.output_file_name) as writer:
                 writer.write_header(self.manifest_def.columns)
-                writer.write_rows(source_data)
+                for rows in self._iter_source_chunks(source_data, self.SOURCE_DATA_BATCH_SIZE):
+                    writer.write_rows(rows)
             return GenomicSubProcessResult.SUCCESS
         except RuntimeError:
             return GenomicSubProcessResult.ERROR
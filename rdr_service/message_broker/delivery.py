@@ -0,0 +1,260 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+from datetime import timedelta
+from typing import Callable, Tuple
+
+from rdr_service import config, singletons
+from rdr_service.clock import CLOCK
+
+
+class AccessTokenCache:
+    # Seconds before a token expires that it stops being used, so it doesn't expire while a request is in flight.
+    EXPIRATION_MARGIN_SECONDS = 20
+
+    def __init__(self):
+        """
+        Keeps the access token for each message broker destination in memory, so sending a message doesn't need
+        to read the destination's auth info from the database. When a token expires only one thread loads the
+        new one, any other thread sending to the same destination waits for it.
+        """
+        self._lock = threading.Lock()
+        # Destination -> (access token, expiration time).
+        self._tokens = {}
+        # Destination -> lock held while the destination's token is loaded.
+        self._load_locks = {}
+        self._stats = {
+            'hits': 0,
+            'loads': 0,
+            'waits': 0
+        }
+
+    def _get_valid_token(self, destination):
+        entry = self._tokens.get(destination)
+        if entry is not None and entry[1] > CLOCK.now() + timedelta(seconds=self.EXPIRATION_MARGIN_SECONDS):
+            return entry[0]
+        return None
+
+    def get_token(self, destination, load: Callable[[], Tuple[str, object]]):
+        """
+        Return the destination's access token, calling load() to get it if there isn't a valid one cached.
+        load() should return the token and its expiration time, exceptions it raises are passed to the caller.
+        """
+        with self._lock:
+            token = self._get_valid_token(destination)
+            if token is not None:
+                self._stats['hits'] += 1
+                return token
+            load_lock = self._load_locks.setdefault(destination, threading.Lock())
+
+        with load_lock:
+            with self._lock:
+                # Another thread may have loaded the token while this one waited for the lock.
+                token = self._get_valid_token(destination)
+                if token is not None:
+                    self._stats['waits'] += 1
+                    return token
+
+            token, expires_at = load()
+            with self._lock:
+                self._tokens[destination] = (token, expires_at)
+                self._stats['loads'] += 1
+            return token
+
+    def clear(self):
+        with self._lock:
+            self._tokens.clear()
+            for counter in self._stats:
+                self._stats[counter] = 0
+
+    def get_stats(self):
+        """ Return the cache metrics, waits are sends that used a token loaded by another thread """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = len(self._tokens)
+        return stats
+
+
+def get_access_token_cache():
+    """ Return the process wide cache of message broker access tokens """
+    return singletons.get(singletons.MESSAGE_BROKER_TOKEN_CACHE_INDEX, AccessTokenCache)
+
+
+class MessageSender:
+    DEFAULT_WORKERS = 4
+    DEFAULT_QUEUE_SIZE = 1000
+    DEFAULT_MAX_ATTEMPTS = 5
+    # Seconds waited before the first retry of a message, doubled for each retry after it.
+    RETRY_BACKOFF_SECONDS = 1
+    MAX_RETRY_BACKOFF_SECONDS = 30
+
+    def __init__(self, workers=DEFAULT_WORKERS, queue_size=DEFAULT_QUEUE_SIZE, max_attempts=DEFAULT_MAX_ATTEMPTS):
+        """
+        Delivers message broker messages from background threads, so API requests don't wait for the destination
+        to respond. Messages that fail with a server error or a connection error are sent again, with exponential
+        backoff, until max_attempts have been made.
+
+        :param workers: Number of messages sent at the same time.
+        :param queue_size: Maximum number of messages waiting to be sent.
+        :param max_attempts: Maximum number of times each message is sent.
+        """
+        self.workers = workers
+        self.max_attempts = max_attempts
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        # Notified whenever a message is done, for wait_until_idle().
+        self._idle = threading.Condition(self._lock)
+        self._pending = 0
+        self._threads = []
+        self._stopped = threading.Event()
+        self._stats = {
+            'queued': 0,
+            'sent': 0,
+            'retries': 0,
+            'failed': 0,
+            'rejected': 0,
+            'max_queue_depth': 0
+        }
+
+    def send(self, message_broker, on_response: Callable) -> bool:
+        """
+        Queue the message broker's message to be sent. on_response is called from the sending thread with the
+        response code, body and error once the message is delivered, or once it has failed for the last time.
+        Returns False, without queueing the message, if the queue is full.
+        """
+        self._start()
+        with self._lock:
+            self._pending += 1
+        try:
+            self._queue.put_nowait((message_broker, on_response))
+        except queue.Full:
+            self._message_done('rejected')
+            logging.warning('Message broker send queue is full, the message will be sent during the request.')
+            return False
+
+        with self._lock:
+            self._stats['queued'] += 1
+            self._stats['max_queue_depth'] = max(self._stats['max_queue_depth'], self._queue.qsize())
+        return True
+
+    def _start(self):
+        with self._lock:
+            self._threads = [thread for thread in self._threads if thread.is_alive()]
+            if self._stopped.is_set():
+                self._stopped.clear()
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._run, daemon=True,
+                                          name=f'message-broker-sender-{len(self._threads)}')
+                thread.start()
+                self._threads.append(thread)
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                message_broker, on_response = self._queue.get(timeout=1)
+            except queue.Empty:
+                continue
+            self._deliver(message_broker, on_response)
+
+    @staticmethod
+    def _should_retry(response_code):
+        return response_code == 429 or response_code >= 500
+
+    def _deliver(self, message_broker, on_response):
+        response = None
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                response = message_broker.send_request()
+            except Exception as e:  # pylint: disable=broad-except
+                logging.warning(f'Failed to send message broker message (attempt {attempt}): {e}')
+                # Errors without a response code are connection errors, which are worth retrying.
+                response = (getattr(e, 'code', None), None, str(e))
+            if response[0] is not None and not self._should_retry(response[0]):
+                break
+
+            if attempt < self.max_attempts:
+                self._record('retries')
+                backoff_seconds = min(self.RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1), self.MAX_RETRY_BACKOFF_SECONDS)
+                time.sleep(backoff_seconds)
+
+        response_code = response[0]
+        delivered = response_code is not None and not self._should_retry(response_code)
+        try:
+            on_response(*response)
+        except Exception:  # pylint: disable=broad-except
+            logging.error('Failed to save the message broker response.', exc_info=True)
+        self._message_done('sent' if delivered else 'failed')
+
+    def _record(self, counter):
+        with self._lock:
+            self._stats[counter] += 1
+
+    def _message_done(self, counter):
+        with self._lock:
+            self._stats[counter] += 1
+            self._pending -= 1
+            if not self._pending:
+                self._idle.notify_all()
+
+    def wait_until_idle(self, timeout=None):
+        """ Wait for all the queued messages to be sent, returns False if they weren't all sent before the timeout """
+        with self._idle:
+            return self._idle.wait_for(lambda: not self._pending, timeout)
+
+    def drain(self, timeout=None):
+        """
+        Send the queued messages, then stop the background threads.
+        :param timeout: Maximum number of seconds to wait for the queued messages to be sent.
+        """
+        if not self.wait_until_idle(timeout):
+            logging.warning(f'Message broker sender stopped with {self._pending} messages not sent.')
+        self._stopped.set()
+        logging.info(f'Message broker sender drained: {self.get_stats()}')
+
+    def get_stats(self):
+        """
+        Return the sender metrics. Rejected messages were sent during the request because the queue was full,
+        queue_depth is the number of messages waiting to be sent.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        stats['queue_depth'] = self._queue.qsize()
+        return stats
+
+
+_sender = None
+_sender_enabled = None
+_sender_lock = threading.Lock()
+
+
+def get_message_sender():
+    """
+    Return the process wide message sender, configured from the message broker config settings.
+    Returns None if messages should be sent during the request.
+    """
+    global _sender, _sender_enabled
+    if _sender_enabled is None:
+        with _sender_lock:
+            if _sender_enabled is None:
+                if config.getSettingJson(config.MESSAGE_BROKER_ASYNC_DELIVERY, False):
+                    _sender = MessageSender(
+                        workers=config.getSettingJson(config.MESSAGE_BROKER_SENDER_WORKERS,
+                                                      MessageSender.DEFAULT_WORKERS),
+                        queue_size=config.getSettingJson(config.MESSAGE_BROKER_SENDER_QUEUE_SIZE,
+                                                         MessageSender.DEFAULT_QUEUE_SIZE),
+                        max_attempts=config.getSettingJson(config.MESSAGE_BROKER_MAX_DELIVERY_ATTEMPTS,
+                                                           MessageSender.DEFAULT_MAX_ATTEMPTS)
+                    )
+                    # Don't lose the queued messages when the process shuts down.
+                    atexit.register(_sender.drain)
+                _sender_enabled = _sender is not None
+    return _sender
+
+
+def drain_message_sender(timeout=None):
+    """ Send any queued message broker messages, if the sender has been used by this process """
+    if _sender is not None:
+        _sender.drain(timeout)
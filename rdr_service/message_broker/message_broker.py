@@ -1,11 +1,14 @@
 import logging
+import threading
 from datetime import timedelta
 
 import backoff
 import requests
+from requests.adapters import HTTPAdapter
 from werkzeug.exceptions import BadRequest, BadGateway, HTTPException
 
 from rdr_service import clock
+from rdr_service.message_broker.delivery import get_access_token_cache
 from rdr_service.model.message_broker import MessageBrokerDestAuthInfo
 from rdr_service.model.utils import to_client_participant_id
 from rdr_service.dao.database_utils import format_datetime
@@ -15,6 +18,17 @@ from rdr_service.dao.message_broker_dest_auth_info_dao import MessageBrokerDestA
 
 # this is added based on the document, PTSC's test env is not ready, no test on real env yet
 class BaseMessageBroker:
+    """
+    Sends a message to its destination. Messages to the same destination share a pooled HTTP session,
+    so connections are kept open and reused, and the destination's access token is cached in memory.
+    """
+    # Number of connections kept open to each destination.
+    HTTP_POOL_SIZE = 16
+    REQUEST_TIMEOUT_SECONDS = 30
+
+    _session_lock = threading.Lock()
+    _sessions = {}
+
     def __init__(self, message):
         self.message = message
         self.message_metadata_dao = MessageBrokerMetadataDao()
@@ -24,6 +38,10 @@ class BaseMessageBroker:
     # used for machine to machine authentication/authorization.
     def get_access_token(self):
         """Returns the access token for the API endpoint."""
+        return get_access_token_cache().get_token(self.message.messageDest, self._load_access_token)
+
+    def _load_access_token(self):
+        """Returns the token stored for the destination, or a new one if it has expired, with its expiration time"""
         auth_info = self.dest_auth_dao.get_auth_info(self.message.messageDest)
         if not auth_info:
             raise BadRequest(f'can not find auth info for dest: {self.message.messageDest}')
@@ -33,9 +51,9 @@ class BaseMessageBroker:
         # to make sure we use a valid token
         secs_later = now + timedelta(seconds=20)
         if auth_info.accessToken and auth_info.expiredAt > secs_later:
-            return auth_info.accessToken
+            return auth_info.accessToken, auth_info.expiredAt
         else:
-            return self._request_new_token(auth_info=auth_info)
+            return self._request_new_token(auth_info=auth_info), auth_info.expiredAt
 
     @backoff.on_exception(backoff.constant, HTTPException, max_tries=3)
     def _request_new_token(self, auth_info: MessageBrokerDestAuthInfo):
@@ -70,13 +88,31 @@ class BaseMessageBroker:
         """Returns the request body that need to be sent to the destination. Must be overridden by subclasses."""
         raise NotImplementedError()
 
+    @classmethod
+    def get_session(cls, destination) -> requests.Session:
+        """Returns the HTTP session shared by all the messages sent to the destination"""
+        with cls._session_lock:
+            session = cls._sessions.get(destination)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=cls.HTTP_POOL_SIZE, pool_maxsize=cls.HTTP_POOL_SIZE)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                cls._sessions[destination] = session
+            return session
+
     def send_request(self):
         dest_url = self._get_message_dest_url()
         token = self.get_access_token()
         request_body = self.make_request_body()
 
         # Token should be included in the HTTP Authorization header using the Bearer scheme.
-        response = requests.post(dest_url, json=request_body, headers={"Authorization": "Bearer " + token})
+        response = self.get_session(self.message.messageDest).post(
+            dest_url,
+            json=request_body,
+            headers={"Authorization": "Bearer " + token},
+            timeout=self.REQUEST_TIMEOUT_SECONDS
+        )
         if response.status_code == 200:
             return response.status_code, response.json(), ''
         else:
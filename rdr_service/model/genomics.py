@@ -418,6 +418,8 @@ class GenomicFileProcessed(Base):
                         Enum(GenomicSubProcessResult),
                         default=GenomicSubProcessResult.UNSET)
     uploadDate = Column('upload_date', UTCDateTime, nullable=True)
+    # Number of rows whose ingestion has been committed, a failed ingestion resumes after them
+    ingestedRowCount = Column('ingested_row_count', Integer, nullable=True)
 
 
 event.listen(GenomicFileProcessed, 'before_insert', model_insert_listener)
@@ -1,11 +1,21 @@
 
-from sqlalchemy import event, Column, String, Integer, ForeignKey, BigInteger, UniqueConstraint, Index
+from sqlalchemy import event, Column, Computed, String, Integer, ForeignKey, BigInteger, UniqueConstraint, Index
 from sqlalchemy.dialects.mysql import JSON
 
 from rdr_service.model.base import Base, model_insert_listener, model_update_listener
 from rdr_service.model.utils import UTCDateTime6
 
 
+def _json_string(path):
+    """ Generated column expression for a string field in the resource JSON """
+    return f"json_unquote(json_extract(`resource`, '{path}'))"
+
+
+def _json_integer(path):
+    """ Generated column expression for an integer field in the resource JSON, NULL if it isn't an integer """
+    return f"if(json_type(json_extract(`resource`, '{path}')) = 'INTEGER', json_extract(`resource`, '{path}'), NULL)"
+
+
 class ResourceData(Base):
     """
     Resource Data Model
@@ -29,6 +39,16 @@ class ResourceData(Base):
     parentID = Column("parent_id", BigInteger, nullable=True)
     parentTypeID = Column("parent_type_id", BigInteger, nullable=True)
     resource = Column("resource", JSON, nullable=False)
+    # Virtual columns generated from the resource JSON fields that are searched most often, so searches on them
+    # use an index instead of reading the JSON of every record of the resource type.
+    searchParticipantOrigin = Column("search_participant_origin", String(80),
+                                     Computed(_json_string('$.participant_origin'), persisted=False))
+    searchEnrollmentStatusID = Column("search_enrollment_status_id", Integer,
+                                      Computed(_json_integer('$.enrollment_status_id'), persisted=False))
+    searchWithdrawalStatusID = Column("search_withdrawal_status_id", Integer,
+                                      Computed(_json_integer('$.withdrawal_status_id'), persisted=False))
+    searchOrganizationID = Column("search_organization_id", Integer,
+                                  Computed(_json_integer('$.organization_id'), persisted=False))
 
     __table_args__ = (
         UniqueConstraint("uri"),
@@ -37,6 +57,19 @@ class ResourceData(Base):
 Index("ix_res_data_type_modified_hpo_id", ResourceData.resourceTypeID, ResourceData.modified, ResourceData.hpoId)
 Index('ix_res_data_type_pk_id', ResourceData.resourceTypeID, ResourceData.resourcePKID)
 Index('ix_res_data_type_pkalt_id', ResourceData.resourceTypeID, ResourceData.resourcePKAltID)
+Index('ix_res_data_type_search_origin', ResourceData.resourceTypeID, ResourceData.searchParticipantOrigin)
+Index('ix_res_data_type_search_enrl_status', ResourceData.resourceTypeID, ResourceData.searchEnrollmentStatusID)
+Index('ix_res_data_type_search_wdrl_status', ResourceData.resourceTypeID, ResourceData.searchWithdrawalStatusID)
+Index('ix_res_data_type_search_org_id', ResourceData.resourceTypeID, ResourceData.searchOrganizationID)
+
+# Resource JSON fields with an indexed generated column, resource field name -> column.  Adding a field needs a
+# generated column above and a migration creating it.
+RESOURCE_DATA_SEARCH_COLUMNS = {
+    'participant_origin': ResourceData.searchParticipantOrigin,
+    'enrollment_status_id': ResourceData.searchEnrollmentStatusID,
+    'withdrawal_status_id': ResourceData.searchWithdrawalStatusID,
+    'organization_id': ResourceData.searchOrganizationID
+}
 
 event.listen(ResourceData, "before_insert", model_insert_listener)
 event.listen(ResourceData, "before_update", model_update_listener)
@@ -22,6 +22,7 @@ class ResourceSearchResults(Base):
 
 
 Index("ix_res_data_type_modified_hpo_id", ResourceSearchResults.searchKey, ResourceSearchResults.pageNo)
+Index("ix_res_search_results_created", ResourceSearchResults.created)
 
 event.listen(ResourceSearchResults, "before_insert", model_insert_listener)
 event.listen(ResourceSearchResults, "before_update", model_update_listener)
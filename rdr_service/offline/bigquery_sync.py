@@ -2,11 +2,13 @@ import json
 import logging
 import math
 import random
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime
 
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
-from sqlalchemy import func
+from sqlalchemy import and_, func, or_
 
 from rdr_service import config
 from rdr_service.cloud_utils.bigquery import BigQueryJob
@@ -48,57 +50,53 @@ def dispatch_participant_rebuild_tasks(pid_list, batch_size=100, project_id=GAE_
         is localhost
     :param build_participant_summary:  Boolean value indicating whether PDR participant summary data should be rebuilt
     :param build_modules: Boolean value indicating whether PDR module data for the participant should be rebuilt
+    :return: List of the participant ids whose rebuild tasks could not be created
     """
 
     if config.GAE_PROJECT not in _bq_env:
         logging.warning(f'BigQuery operations not supported in {config.GAE_PROJECT}, skipping.')
-        return
-
-    count = 0
-    batch_count = 0
-    batch = list()
-    task = GCPCloudTask()
+        return []
 
     if build_locally is None:
         build_locally = project_id == 'localhost'
 
-    # queue up a batch of participant ids and send them to be rebuilt.
-    for pid_data in pid_list:
-        if isinstance(pid_data, (int, str)):
-            batch.append({'pid': pid_data})
-        elif isinstance(pid_data, dict):
-            # payload = {'pid': pid_data['pid'], 'patch': pid_data['patch']}
-            batch.append(pid_data)
-
-        count += 1
-
-        if count == batch_size:
-            payload = {'batch': batch, 'build_participant_summary': build_participant_summary,
+    def batch_payloads():
+        """ Queue up batches of participant ids to be rebuilt """
+        batch = list()
+        for pid_data in pid_list:
+            if isinstance(pid_data, (int, str)):
+                batch.append({'pid': pid_data})
+            elif isinstance(pid_data, dict):
+                # payload = {'pid': pid_data['pid'], 'patch': pid_data['patch']}
+                batch.append(pid_data)
+
+            if len(batch) == batch_size:
+                yield {'batch': batch, 'build_participant_summary': build_participant_summary,
                        'build_modules': build_modules}
+                # reset for next batch
+                batch = list()
 
-            if build_locally:
-                batch_rebuild_participants_task(payload, project_id=project_id)
-            else:
-                task.execute('rebuild_participants_task', payload=payload, in_seconds=15,
-                             queue='resource-rebuild', quiet=True, project_id=project_id)
-
-            batch_count += 1
-            # reset for next batch
-            batch = list()
-            count = 0
-
-    # send last batch if needed.
-    if count:
-        payload = {'batch': batch, 'build_participant_summary': build_participant_summary,
+        # send last batch if needed.
+        if batch:
+            yield {'batch': batch, 'build_participant_summary': build_participant_summary,
                    'build_modules': build_modules}
-        batch_count += 1
-        if build_locally:
+
+    failed_pids = list()
+    if build_locally:
+        batch_count = 0
+        for payload in batch_payloads():
             batch_rebuild_participants_task(payload, project_id=project_id)
-        else:
-            task.execute('rebuild_participants_task', payload=payload, in_seconds=15,
-                         queue='resource-rebuild', quiet=True, project_id=project_id)
+            batch_count += 1
+    else:
+        result = GCPCloudTask().execute_batch('rebuild_participants_task', batch_payloads(), in_seconds=15,
+                                              queue='resource-rebuild', quiet=True, project_id=project_id)
+        batch_count = result.created
+        failed_pids = [item['pid'] for failure in result.failures for item in failure.payload['batch']]
+        if failed_pids:
+            logging.error(f'Rebuild tasks not created for {len(failed_pids)} participants: {failed_pids}')
 
     logging.info(f'Submitted {batch_count} tasks.')
+    return failed_pids
 
 
 def rebuild_bigquery_handler():
@@ -199,6 +197,206 @@ def insert_batch_into_bq(bq, project_id, dataset, table, batch, dryrun=False):
     return True, resp
 
 
+class BigQuerySyncTableStats(object):
+    """ Throughput counters for syncing a single BigQuery table """
+
+    def __init__(self, project_id, dataset_id, table_id):
+        self.table = f'{project_id}.{dataset_id}.{table_id}'
+        self.rows = 0
+        self.errors = 0
+        self.batches = 0
+        self.start_ts = datetime.now()
+        self.end_ts = None
+
+    @property
+    def seconds(self):
+        return ((self.end_ts or datetime.now()) - self.start_ts).total_seconds()
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def __str__(self):
+        return f'{self.rows - self.errors} inserts and {self.errors} errors for {self.table} ' \
+               f'in {self.batches} batches, {self.seconds:.1f} seconds ({self.rows_per_second:.1f} rows/sec).'
+
+
+class BigQuerySyncEngine(object):
+    """
+    Stream bigquery_sync records to BigQuery.  Records are read from the replica database in keyset paginated
+    pages that include the JSON resource, grouped into insertAll batches by payload size and sent through a
+    bounded pool of worker threads so several requests per table are in flight at once.
+    """
+    # Google recommends a maximum of 500 rows and 10MB per insertAll request.
+    MAX_BATCH_ROWS = 500
+    MAX_BATCH_BYTES = 5 * 1024 * 1024
+    FETCH_SIZE = 1000
+    MAX_WORKERS = 4
+    # Run for 110 seconds before exiting, so we don't have overlapping cron jobs.
+    RUN_LIMIT_SECONDS = (2 * 60) - 10
+
+    def __init__(self, dryrun=False, max_workers=MAX_WORKERS, max_batch_rows=MAX_BATCH_ROWS,
+                 max_batch_bytes=MAX_BATCH_BYTES, fetch_size=FETCH_SIZE, run_limit=RUN_LIMIT_SECONDS):
+        """
+        :param dryrun: Don't send to bigquery if True
+        :param max_workers: Maximum number of insertAll requests in flight at the same time.
+        :param max_batch_rows: Maximum number of rows in a single insertAll request.
+        :param max_batch_bytes: Approximate maximum payload size of a single insertAll request.
+        :param fetch_size: Number of bigquery_sync records to read from the database at a time.
+        :param run_limit: Number of seconds to run before stopping.
+        """
+        self.dryrun = dryrun
+        self.max_workers = max_workers
+        self.max_batch_rows = max_batch_rows
+        self.max_batch_bytes = max_batch_bytes
+        self.fetch_size = fetch_size
+        self.run_limit = run_limit
+        self.table_stats = list()
+        self._start_ts = None
+        self._local = threading.local()
+
+    def _get_bq_service(self):
+        """ The discovery service http object is not thread safe, so each worker thread gets its own. """
+        if self.dryrun:
+            return None
+        if not hasattr(self._local, 'bq'):
+            # https://github.com/googleapis/google-api-python-client/issues/299
+            # https://github.com/pior/appsecrets/issues/7
+            self._local.bq = build('bigquery', 'v2', cache_discovery=False)
+        return self._local.bq
+
+    def _time_limit_reached(self):
+        return (datetime.now() - self._start_ts).total_seconds() > self.run_limit
+
+    def _insert_batch(self, project_id, dataset_id, table_id, batch):
+        """ Worker thread function, returns the number of rows sent and the error response, if any. """
+        result, resp = insert_batch_into_bq(self._get_bq_service(), project_id, dataset_id, table_id, batch,
+                                            self.dryrun)
+        return len(batch), (None if result else resp)
+
+    def _iter_records(self, session, project_id, dataset_id, table_id, max_modified):
+        """
+        Yield (id, created, modified, resource, resource size) tuples for all records modified since max_modified,
+        ordered by the modified timestamp. Pages are selected by the last (modified, id) key seen so large tables
+        are never read with an offset and rows sharing the same modified timestamp are not sent twice.
+        """
+        last_modified = max_modified
+        last_id = 0
+        while True:
+            records = session.query(BigQuerySync.id, BigQuerySync.created, BigQuerySync.modified,
+                                    BigQuerySync.resource, func.length(BigQuerySync.resource)). \
+                filter(BigQuerySync.projectId == project_id, BigQuerySync.tableId == table_id,
+                       BigQuerySync.datasetId == dataset_id,
+                       or_(BigQuerySync.modified > last_modified,
+                           and_(BigQuerySync.modified == last_modified, BigQuerySync.id > last_id))). \
+                order_by(BigQuerySync.modified, BigQuerySync.id).limit(self.fetch_size).all()
+            for record in records:
+                yield record
+            if len(records) < self.fetch_size:
+                return
+            last_modified, last_id = records[-1].modified, records[-1].id
+
+    def _iter_batches(self, records):
+        """ Group records into insertAll row batches limited by row count and approximate payload size. """
+        batch = list()
+        batch_bytes = 0
+        for rec_id, created, modified, resource, resource_size in records:
+            # The JSON column is deserialized by the database driver, only parse it here if it wasn't.
+            rec_data = json.loads(resource) if isinstance(resource, str) else resource
+            rec_data['id'] = rec_id
+            rec_data['created'] = created.isoformat()
+            rec_data['modified'] = modified.isoformat()
+
+            row_bytes = (resource_size or 0) + 100
+            if batch and (len(batch) >= self.max_batch_rows or batch_bytes + row_bytes > self.max_batch_bytes):
+                yield batch
+                batch = list()
+                batch_bytes = 0
+            batch.append({'insertId': str(rec_id), 'json': rec_data})
+            batch_bytes += row_bytes
+        if batch:
+            yield batch
+
+    def sync_table(self, session, pool, project_id, dataset_id, table_id):
+        """
+        Send all records modified since the last sync to the BigQuery table.
+        :param session: Read only database session.
+        :param pool: ThreadPoolExecutor object used to send insertAll requests.
+        :return: BigQuerySyncTableStats object
+        """
+        stats = BigQuerySyncTableStats(project_id, dataset_id, table_id)
+        # pylint: disable=unused-variable
+        max_created, max_modified = _get_remote_max_timestamps(project_id, dataset_id, table_id) \
+            if self.dryrun is False else (datetime.min, datetime.min)
+
+        errors = list()
+        in_flight = set()
+
+        def collect(futures):
+            for future in futures:
+                count, error = future.result()
+                stats.rows += count
+                stats.batches += 1
+                if error:
+                    errors.append(error)
+                    stats.errors += len(error['insertErrors'])
+
+        records = self._iter_records(session, project_id, dataset_id, table_id, max_modified)
+        for batch in self._iter_batches(records):
+            # Keep at most max_workers requests in flight, wait for one to finish before sending the next.
+            if len(in_flight) >= self.max_workers:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                collect(done)
+            in_flight.add(pool.submit(self._insert_batch, project_id, dataset_id, table_id, batch))
+            # Don't exceed our execution time limit.
+            if self._time_limit_reached():
+                logging.info('Hit {0} second time limit.'.format(self.run_limit))
+                break
+
+        done, _ = wait(in_flight)
+        collect(done)
+        stats.end_ts = datetime.now()
+
+        if errors:
+            logging.error(errors)
+        if stats.rows == 0:
+            logging.info('No rows to sync for {0}.{1}.'.format(dataset_id, table_id))
+        else:
+            logging.info(str(stats))
+        return stats
+
+    def run(self):
+        """
+        Sync all tables with records in the bigquery_sync table.
+        :return: Total number of successful inserts.
+        """
+        self._start_ts = datetime.now()
+        self.table_stats = list()
+        ro_dao = BigQuerySyncDao(backup=True)
+
+        with ro_dao.session() as ro_session, ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            tables = ro_session.query(BigQuerySync.projectId, BigQuerySync.datasetId, BigQuerySync.tableId). \
+                distinct(BigQuerySync.projectId, BigQuerySync.datasetId, BigQuerySync.tableId). \
+                filter(BigQuerySync.projectId != None).all()
+
+            # don't always process the list in the same order so we don't get stuck processing the same table
+            # each run.
+            table_list = [(row.projectId, row.datasetId, row.tableId) for row in tables]
+            random.shuffle(table_list)
+
+            for project_id, dataset_id, table_id in table_list:
+                try:
+                    stats = self.sync_table(ro_session, pool, project_id, dataset_id, table_id)
+                except BigQueryJobError:
+                    logging.warning('Failed to retrieve max date values from bigquery, skipping this run.')
+                    return 0
+                self.table_stats.append(stats)
+                if self._time_limit_reached():
+                    break
+
+        return sum([stats.rows - stats.errors for stats in self.table_stats])
+
+
 def sync_bigquery_handler(dryrun=False):
     """
     Cron entry point, Sync MySQL records to bigquery.
@@ -212,108 +410,8 @@ def sync_bigquery_handler(dryrun=False):
     if config.GAE_PROJECT not in _bq_env:
         return
 
-    ro_dao = BigQuerySyncDao(backup=True)
-    # https://github.com/googleapis/google-api-python-client/issues/299
-    # https://github.com/pior/appsecrets/issues/7
-    bq = build('bigquery', 'v2', cache_discovery=False) if dryrun is False else None
-    total_inserts = 0
-    # Google says maximum of 500 in a batch. Pretty sure they are talking about log shipping, I believe
-    # that one participant summary record is larger than their expected average log record size.
-    batch_size = 100
-    run_limit = (2 * 60) - 10  # Run for 110 seconds before exiting, so we don't have overlapping cron jobs.
-    limit_reached = False
-    start_ts = datetime.now()
-    table_list = list()
-
-    with ro_dao.session() as ro_session:
-        tables = ro_session.query(BigQuerySync.projectId, BigQuerySync.datasetId, BigQuerySync.tableId). \
-            distinct(BigQuerySync.projectId, BigQuerySync.datasetId, BigQuerySync.tableId). \
-            filter(BigQuerySync.projectId != None).all()
-
-        # don't always process the list in the same order so we don't get stuck processing the same table each run.
-        for table_row in tables:
-            table_list.append((table_row.projectId, table_row.datasetId, table_row.tableId))
-        random.shuffle(table_list)
-
-        for item in table_list:
-            project_id = item[0]
-            dataset_id = item[1]
-            table_id = item[2]
-            count = 0
-            errors = ''
-            error_count = 0
-            try:
-                # pylint: disable=unused-variable
-                max_created, max_modified = _get_remote_max_timestamps(project_id, dataset_id, table_id) \
-                    if dryrun is False else (datetime.min, datetime.min)
-            except BigQueryJobError:
-                logging.warning('Failed to retrieve max date values from bigquery, skipping this run.')
-                return 0
-
-            # figure out how many records need to be sync'd and divide into slices.
-            total_rows = ro_session.query(BigQuerySync.id). \
-                filter(BigQuerySync.projectId == project_id, BigQuerySync.tableId == table_id,
-                       BigQuerySync.datasetId == dataset_id, BigQuerySync.modified >= max_modified).count()
-
-            if total_rows == 0:
-                logging.info('No rows to sync for {0}.{1}.'.format(dataset_id, table_id))
-                continue
-            slices = int(math.ceil(float(total_rows) / float(batch_size)))
-            slice_num = 0
-
-            while slice_num < slices:
-                results = ro_session.query(BigQuerySync.id, BigQuerySync.created, BigQuerySync.modified). \
-                    filter(BigQuerySync.projectId == project_id, BigQuerySync.tableId == table_id,
-                           BigQuerySync.datasetId == dataset_id, BigQuerySync.modified >= max_modified). \
-                    order_by(BigQuerySync.modified).limit(batch_size).all()
-                slice_num += 1
-                batch = list()
-
-                for row in results:
-                    count += 1
-                    max_modified = row.modified
-                    rec = ro_session.query(BigQuerySync.resource).filter(BigQuerySync.id == row.id).first()
-                    if isinstance(rec.resource, str):
-                        rec_data = json.loads(rec.resource)
-                    else:
-                        rec_data = rec.resource
-                    rec_data['id'] = row.id
-                    rec_data['created'] = row.created.isoformat()
-                    rec_data['modified'] = row.modified.isoformat()
-                    data = {
-                        'insertId': str(row.id),
-                        'json': rec_data
-                    }
-                    batch.append(data)
-
-                if len(batch) > 0:
-                    result, resp = insert_batch_into_bq(bq, project_id, dataset_id, table_id, batch, dryrun)
-                    if result is False:
-                        # errors are cumulative, so wait until the end of the while
-                        # statement before printing errors.
-                        errors = resp
-                        error_count += len(resp['insertErrors'])
-                # Don't exceed our execution time limit.
-                if (datetime.now() - start_ts).seconds > run_limit:
-                    logging.info('Hit {0} second time limit.'.format(run_limit))
-                    limit_reached = True
-                    break
-
-            if errors:
-                logging.error(errors)
-
-            total_inserts += (count - error_count)
-            msg = '{0} inserts and {1} errors for {2}.{3}.{4}'.format(count, error_count, project_id, dataset_id,
-                                                                      table_id)
-            if error_count == 0:
-                logging.info(msg)
-            else:
-                logging.info(msg)
-
-            if limit_reached:
-                break
-
-    return total_inserts
+    engine = BigQuerySyncEngine(dryrun=dryrun)
+    return engine.run()
 
 
 def _get_remote_max_timestamps(project_id, dataset_id, table_id):
@@ -6,10 +6,12 @@ Also updates ParticipantSummary data related to samples.
 import csv
 import datetime
 from dateutil.parser import parse
+from itertools import islice
 import logging
 import math
 import os
 import pytz
+import time
 from sqlalchemy import case
 from sqlalchemy.orm import aliased, Query
 from sqlalchemy.sql import func, or_
@@ -88,15 +90,22 @@ def upsert_from_latest_csv():
             % (csv_filename, timestamp, now),
             external=True,
         )
+    timings = {}
     with open_cloud_file(csv_file_path) as csv_file:
         csv_reader = csv.DictReader(csv_file, delimiter="\t")
-        written = _upsert_samples_from_csv(csv_reader)
+        written = _upsert_samples_from_csv(csv_reader, timings)
 
     since_ts = clock.CLOCK.now()
     dao = ParticipantSummaryDao()
+    start = time.perf_counter()
     dao.update_from_biobank_stored_samples()
+    timings['summary update'] = time.perf_counter() - start
     update_bigquery_sync_participants(since_ts, dao)
 
+    logging.info('Biobank: imported {0} samples, {1}.'.format(
+        written, ', '.join(f'{phase} {seconds:.1f}s' for phase, seconds in timings.items())
+    ))
+
     return written, timestamp
 
 def update_bigquery_sync_participants(ts, dao):
@@ -212,35 +221,54 @@ class CsvColumns(object):
     )
 
 
-def _upsert_samples_from_csv(csv_reader):
-    """Inserts/updates BiobankStoredSamples from a csv.DictReader."""
+def _upsert_samples_from_csv(csv_reader, timings=None):
+    """Inserts/updates BiobankStoredSamples from a csv.DictReader.
+
+  Args:
+    timings: Optional dictionary the seconds spent parsing rows, resolving participants and upserting
+        samples are added to.
+  """
     missing_cols = set(CsvColumns.ALL) - set(csv_reader.fieldnames)
     if missing_cols:
         raise DataError("CSV is missing columns %s, had columns %s." % (missing_cols, csv_reader.fieldnames))
     samples_dao = BiobankStoredSampleDao()
+    participant_dao = ParticipantDao()
     biobank_id_prefix = get_biobank_id_prefix()
+    if timings is None:
+        timings = {}
+    for phase in ('parse', 'resolve', 'upsert'):
+        timings.setdefault(phase, 0.0)
     written = 0
     try:
-        samples = []
-        with ParticipantDao().session() as session:
-
-            for row in csv_reader:
-                sample = _create_sample_from_row(row, biobank_id_prefix)
-                if sample:
-                    # DA-601 - Ensure biobank_id exists before accepting a sample record.
-                    if session.query(Participant).filter(Participant.biobankId == sample.biobankId).count() < 1:
+        with participant_dao.session() as session:
+            while True:
+                start = time.perf_counter()
+                rows = list(islice(csv_reader, _BATCH_SIZE))
+                samples = [sample for sample in (_create_sample_from_row(row, biobank_id_prefix) for row in rows)
+                           if sample]
+                resolve_start = time.perf_counter()
+                timings['parse'] += resolve_start - start
+                if not rows:
+                    break
+
+                # DA-601 - Ensure biobank_id exists before accepting a sample record.
+                known_biobank_ids = participant_dao.get_existing_biobank_ids(
+                    session, {sample.biobankId for sample in samples}
+                )
+                accepted_samples = []
+                for sample in samples:
+                    if sample.biobankId not in known_biobank_ids:
                         logging.error(
                             "Bio bank Id ({0}) does not exist in the Participant table.".format(sample.biobankId)
                         )
                         continue
+                    accepted_samples.append(sample)
+                upsert_start = time.perf_counter()
+                timings['resolve'] += upsert_start - resolve_start
 
-                    samples.append(sample)
-                    if len(samples) >= _BATCH_SIZE:
-                        written += samples_dao.upsert_all(samples)
-                        samples = []
-
-            if samples:
-                written += samples_dao.upsert_all(samples)
+                if accepted_samples:
+                    written += samples_dao.upsert_all(accepted_samples)
+                timings['upsert'] += time.perf_counter() - upsert_start
 
         return written
     except ValueError:
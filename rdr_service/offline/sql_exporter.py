@@ -1,7 +1,8 @@
 import contextlib
 import csv
+import gzip
+import io
 import logging
-import tempfile
 from sqlalchemy import text
 
 from rdr_service.api_util import open_cloud_file
@@ -13,20 +14,33 @@ _BATCH_SIZE = 1000
 
 
 class SqlExportFileWriter(object):
-    """Writes rows to a CSV file, optionally filtering on a predicate."""
+    """Writes rows to a CSV file, optionally filtering on a predicate.
+
+  Each call formats its rows in memory and writes them to the file as a single block."""
 
     def __init__(self, dest, predicate=None):
-        self._writer = csv.writer(dest, delimiter=DELIMITER)
+        self._dest = dest
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer, delimiter=DELIMITER)
         self._predicate = predicate
 
+    def _write_buffer(self):
+        block = self._buffer.getvalue()
+        if block:
+            self._dest.write(block)
+            self._buffer.seek(0)
+            self._buffer.truncate()
+
     def write_header(self, keys):
         self._writer.writerow(keys)
+        self._write_buffer()
 
     def write_rows(self, results):
         if self._predicate:
             results = [result for result in results if self._predicate(result)]
         if results:
             self._writer.writerows(results)
+            self._write_buffer()
 
 
 class SqlExporter(object):
@@ -36,38 +50,17 @@ class SqlExporter(object):
         self._bucket_name = bucket_name
 
     def run_export(self, file_name, sql, query_params=None, backup=False, transformf=None, instance_name=None,
-                   predicate=None):
-        tmp_file_name = self.write_temp_export_file(sql, query_params, backup, transformf, instance_name, predicate)
-        self.upload_export_file(tmp_file_name, file_name, predicate)
-
-    def write_temp_export_file(self, sql, query_params, backup, transformf, instance_name, predicate):
-        with tempfile.NamedTemporaryFile(mode='w+', delete=False) as tmp_file:
-            tmp_file_name = tmp_file.name
-
-            logging.info(f"Exporting to temporary file: {tmp_file_name}")
-
-            sql_writer = SqlExportFileWriter(tmp_file, predicate=predicate)
-            # write data to temp file
+                   predicate=None, gzip_output=False):
+        """
+        Stream the query results from a server side cursor straight into the cloud file, applying the
+        transform and predicate to each row once.
+        :param gzip_output: Compress the file while it is written.
+        """
+        with self.open_cloud_writer(file_name, predicate, gzip_output=gzip_output) as writer:
             self.run_export_with_writer(
-                sql_writer, sql, query_params, backup=backup, transformf=transformf, instance_name=instance_name
+                writer, sql, query_params, backup=backup, transformf=transformf, instance_name=instance_name
             )
 
-        return tmp_file_name
-
-    def upload_export_file(self, tmp_file_name, file_name, predicate):
-        logging.info(f"Opening {tmp_file_name} for export.")
-        with open(tmp_file_name) as tmp_file:
-            csv_reader = csv.reader(tmp_file)
-
-            logging.info("Exporting temp file with cloud writer...")
-            with self.open_cloud_writer(file_name, predicate) as cloud_writer:
-                headers = next(csv_reader)
-                cloud_writer.write_header(headers)
-
-                logging.info("Writing rows to cloud file.")
-                for row in csv_reader:
-                    cloud_writer.write_rows([row])
-
     def run_export_with_writer(self, writer, sql, query_params, backup=False, transformf=None, instance_name=None):
         with database_factory.make_server_cursor_database(backup, instance_name).session() as session:
             self.run_export_with_session(writer, session, sql, query_params=query_params, transformf=transformf)
@@ -98,13 +91,16 @@ class SqlExporter(object):
             cursor.close()
 
     @contextlib.contextmanager
-    def open_cloud_writer(self, file_name, predicate=None):
+    def open_cloud_writer(self, file_name, predicate=None, gzip_output=False):
         gcs_path = "/%s/%s" % (self._bucket_name, file_name)
         # Logging does not expand in GCloud, so I'm trying this out.
         message = f"Exporting data to {gcs_path}"
         logging.info(message)
-        with open_cloud_file(gcs_path, mode='w') as dest:
-            writer = SqlExportFileWriter(dest, predicate)
-            yield writer
+        with open_cloud_file(gcs_path, mode='wb' if gzip_output else 'w') as dest:
+            if gzip_output:
+                with gzip.open(dest, mode='wt', newline='') as gzip_dest:
+                    yield SqlExportFileWriter(gzip_dest, predicate)
+            else:
+                yield SqlExportFileWriter(dest, predicate)
             message = f"Export to {gcs_path} complete."
             logging.info(message)
@@ -3,22 +3,26 @@ Sync Consent Files
 
 Organize all consent files from PTSC source bucket into proper awardee buckets.
 """
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 from dateutil.relativedelta import relativedelta
+from itertools import islice
 import logging
 import os
 import pytz
 import shutil
 import tempfile
-from typing import Collection, Dict, List
+import time
+from typing import Collection, Dict, Iterator, List, Tuple
 from zipfile import ZipFile
 
 from sqlalchemy import or_
 from sqlalchemy.orm import Session
 
 from rdr_service import config
-from rdr_service.api_util import copy_cloud_file, download_cloud_file, get_blob, list_blobs, parse_date
+from rdr_service.api_util import copy_cloud_file, download_cloud_file, list_blobs, parse_date
 from rdr_service.dao import database_factory
 from rdr_service.dao.participant_dao import ParticipantDao, ParticipantHistoryDao
 from rdr_service.dao.participant_summary_dao import ParticipantSummaryDao
@@ -56,6 +60,124 @@ class PairingHistoryRecord:
     start_date: datetime
 
 
+class CloudStorageSyncEngine:
+    """
+    Copies files between buckets with server-side copies. The destination folders are listed once, and any file
+    that already has the same content at its destination is skipped.
+    """
+    # Default number of copies, downloads or listings run at the same time.
+    DEFAULT_WORKERS = 8
+
+    def __init__(self, storage_provider: GoogleCloudStorageProvider, max_workers=None):
+        self.storage_provider = storage_provider
+        self.max_workers = max_workers or config.getSettingJson(config.CONSENT_SYNC_WORKERS, self.DEFAULT_WORKERS)
+
+    def copy_files(self, file_paths: List[Tuple[str, str]], destination_folders: Collection[str] = None) -> int:
+        """
+        Copies each (source path, destination path) pair, returning the number of files that needed to be copied.
+        Paths use the bucket/blob_name format, with or without a leading slash.
+
+        :param destination_folders: Folders listed to find the files already at their destination, including
+            their sub-folders. Defaults to the folder of each destination path. The source folders are only
+            listed for files found at their destination, to compare their content.
+        """
+        if not file_paths:
+            return 0
+
+        start_time = time.monotonic()
+        if destination_folders is None:
+            destination_folders = {
+                os.path.dirname(_strip_leading_slash(destination_path)) for _, destination_path in file_paths
+            }
+        destination_fingerprints = self.list_fingerprints(
+            {_strip_leading_slash(folder) for folder in destination_folders}
+        )
+        source_folders = {
+            os.path.dirname(_strip_leading_slash(source_path)) for source_path, destination_path in file_paths
+            if _strip_leading_slash(destination_path) in destination_fingerprints
+        }
+        source_fingerprints = self.list_fingerprints(source_folders) if source_folders else {}
+        changed_file_paths = [
+            (source_path, destination_path) for source_path, destination_path in file_paths
+            if not _same_content(
+                source_fingerprints.get(_strip_leading_slash(source_path)),
+                destination_fingerprints.get(_strip_leading_slash(destination_path))
+            )
+        ]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            copies = [
+                executor.submit(
+                    self.storage_provider.copy_blob,
+                    source_path=source_path,
+                    destination_path=destination_path
+                )
+                for source_path, destination_path in changed_file_paths
+            ]
+            for copy in copies:
+                copy.result()
+
+        _log_sync_rate('Copied', len(changed_file_paths), start_time)
+        if len(changed_file_paths) < len(file_paths):
+            logging.info(f'Skipped {len(file_paths) - len(changed_file_paths)} files already at their destination')
+        return len(changed_file_paths)
+
+    def download_files(self, source_paths: List[str]) -> Iterator[Tuple[str, str]]:
+        """
+        Downloads the files to a temporary directory, yielding the (source path, local path) of each file once
+        it is downloaded. Only as many files as there are workers are kept on disk at once, each downloaded file
+        is deleted when the caller asks for the next one.
+        """
+        start_time = time.monotonic()
+        source_paths = iter(source_paths)
+        with tempfile.TemporaryDirectory() as download_dir, \
+                ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            in_flight = {
+                executor.submit(self._download_file, source_path, download_dir): source_path
+                for source_path in islice(source_paths, self.max_workers)
+            }
+            downloaded_count = 0
+
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    source_path = in_flight.pop(future)
+                    local_path = future.result()
+                    yield source_path, local_path
+                    os.remove(local_path)
+                    downloaded_count += 1
+
+                    next_source_path = next(source_paths, None)
+                    if next_source_path is not None:
+                        in_flight[executor.submit(self._download_file, next_source_path, download_dir)] = \
+                            next_source_path
+
+        _log_sync_rate('Downloaded', downloaded_count, start_time)
+
+    def list_fingerprints(self, folder_paths: Collection[str]) -> Dict[str, str]:
+        """
+        Lists the folders, returning a dictionary of the content fingerprint for each file found, keyed by
+        the file's path (using the bucket/blob_name format)
+        """
+        def list_folder(folder_path):
+            bucket_name, _, prefix = folder_path.partition('/')
+            return {
+                f'{bucket_name}/{blob.name}': _get_fingerprint(blob)
+                for blob in self.storage_provider.list(bucket_name, f'{prefix}/' if prefix else None)
+            }
+
+        fingerprints = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for folder_fingerprints in executor.map(list_folder, folder_paths):
+                fingerprints.update(folder_fingerprints)
+        return fingerprints
+
+    def _download_file(self, source_path, download_dir):
+        file_handle, local_path = tempfile.mkstemp(dir=download_dir, suffix=f'_{os.path.basename(source_path)}')
+        os.close(file_handle)
+        self.storage_provider.download_blob(source_path=source_path, destination_path=local_path)
+        return local_path
+
+
 class FileSyncHandler:
     """Responsible for syncing a specific group of consent files"""
     def __init__(self, zip_files: bool, dest_bucket: str, storage_provider: GoogleCloudStorageProvider,
@@ -66,93 +188,79 @@ class FileSyncHandler:
         self.storage_provider = storage_provider
         self.root_destination_folder = root_destination_folder
         self.participant_pairing_info_map = participant_pairing_info
+        self.sync_engine = CloudStorageSyncEngine(storage_provider=storage_provider)
 
     def sync_files(self) -> Collection[ConsentFile]:
-        for file in self.files_to_sync:
-            pairing_info = self.participant_pairing_info_map[file.participant_id]
-            if self.zip_files:
-                file_sync_function = self._download_file_for_zip
-            else:
-                file_sync_function = self._copy_file_in_cloud
-            file_sync_function(
-                file=file,
-                org_name=pairing_info.org_name or DEFAULT_ORG_NAME,
-                site_name=pairing_info.site_name or DEFAULT_GOOGLE_GROUP
-            )
-
-            file.sync_time = datetime.utcnow()
-            file.sync_status = ConsentSyncStatus.SYNC_COMPLETE
+        if not self.files_to_sync:
+            return self.files_to_sync
 
         if self.zip_files:
             self._zip_and_upload()
+        else:
+            self._copy_files_in_cloud()
 
-        return self.files_to_sync
-
-    def _download_file_for_zip(self, file: ConsentFile, org_name, site_name):
-        if config.GAE_PROJECT == 'localhost' and not os.environ.get('UNITTEST_FLAG', None):
-            raise Exception(
-                'Can not download consent files to machines outside the cloud, '
-                'please sync consent files using the cloud environment'
-            )
+        sync_time = datetime.utcnow()
+        for file in self.files_to_sync:
+            file.sync_time = sync_time
+            file.sync_status = ConsentSyncStatus.SYNC_COMPLETE
 
-        file_name = os.path.basename(file.file_path)
-        temp_file_destination = (
-            TEMP_CONSENTS_PATH + f'/{self.dest_bucket}/{org_name}/{site_name}/P{file.participant_id}/{file_name}'
-        )
-        os.makedirs(os.path.dirname(temp_file_destination), exist_ok=True)
+        return self.files_to_sync
 
-        self.storage_provider.download_blob(
-            source_path=file.file_path,
-            destination_path=temp_file_destination
-        )
+    def _get_org_and_site_names(self, file: ConsentFile):
+        pairing_info = self.participant_pairing_info_map[file.participant_id]
+        return pairing_info.org_name or DEFAULT_ORG_NAME, pairing_info.site_name or DEFAULT_GOOGLE_GROUP
 
-    def _copy_file_in_cloud(self, file: ConsentFile, org_name, site_name):
-        destination_path = self._build_cloud_destination_path(
-            org_name=org_name,
-            site_name=site_name,
-            participant_id=file.participant_id,
-            file_name=os.path.basename(file.file_path)
-        )
-        self.storage_provider.copy_blob(source_path=file.file_path, destination_path=destination_path)
+    def _copy_files_in_cloud(self):
+        file_paths = []
+        # Each site's folder is listed once, instead of the folder of every participant
+        site_folders = set()
+        for file in self.files_to_sync:
+            org_name, site_name = self._get_org_and_site_names(file)
+            site_folders.add(f'{self.dest_bucket}/{self.root_destination_folder}/{org_name}/{site_name}')
+            file_paths.append((
+                file.file_path,
+                self._build_cloud_destination_path(
+                    org_name=org_name,
+                    site_name=site_name,
+                    participant_id=file.participant_id,
+                    file_name=os.path.basename(file.file_path)
+                )
+            ))
+        self.sync_engine.copy_files(file_paths, destination_folders=site_folders)
 
     def _build_cloud_destination_path(self, org_name, site_name, participant_id, file_name):
         return f'{self.dest_bucket}/{self.root_destination_folder}/{org_name}/{site_name}/P{participant_id}/{file_name}'
 
     def _zip_and_upload(self):
-        if not os.path.isdir(TEMP_CONSENTS_PATH):
-            # The directory wouldn't exist if there were no files downloaded that need to be zipped
-            return
+        if config.GAE_PROJECT == 'localhost' and not os.environ.get('UNITTEST_FLAG', None):
+            raise Exception(
+                'Can not download consent files to machines outside the cloud, '
+                'please sync consent files using the cloud environment'
+            )
 
-        logging.info("zipping and uploading consent files...")
-        for bucket_dir in _directories_in(TEMP_CONSENTS_PATH):
-            for org_dir in _directories_in(bucket_dir):
-                for site_dir in _directories_in(org_dir):
-                    zip_file_path = os.path.join(org_dir.path, site_dir.name + '.zip')
-                    with ZipFile(zip_file_path, 'w') as zip_file:
-                        self._zip_files_in_directory(zip_file, site_dir.path)
-                    self._upload_zip_file(
-                        zip_file_path=zip_file_path,
-                        bucket_name=bucket_dir.name,
-                        org_name=org_dir.name
-                    )
-
-        shutil.rmtree(TEMP_CONSENTS_PATH)
+        # Group the files by the zip file they go in, keyed by the path of the file within the zip so that
+        # any duplicates are only added once
+        zip_groups: Dict[Tuple[str, str], Dict[str, ConsentFile]] = defaultdict(dict)
+        for file in self.files_to_sync:
+            org_name, site_name = self._get_org_and_site_names(file)
+            path_in_zip = f'P{file.participant_id}/{os.path.basename(file.file_path)}'
+            zip_groups[(org_name, site_name)][path_in_zip] = file
 
-    @classmethod
-    def _zip_files_in_directory(cls, zip_file: ZipFile, directory_path):
-        for current_path, _, files in os.walk(directory_path):
-            # os.walk will recurse into sub_directories, so we only need to handle the files in the current directory
-            for file in files:
-                file_path = os.path.join(current_path, file)
-                file_path_in_zip = file_path[len(directory_path):]
-                zip_file.write(file_path, arcname=file_path_in_zip)
-
-    def _upload_zip_file(self, zip_file_path, bucket_name, org_name):
-        file_name = os.path.basename(zip_file_path)
-        self.storage_provider.upload_from_file(
-            source_file=zip_file_path,
-            path=f'{bucket_name}/{self.root_destination_folder}/{org_name}/{file_name}'
-        )
+        logging.info("zipping and uploading consent files...")
+        for (org_name, site_name), files_in_zip in zip_groups.items():
+            zip_paths = {file.file_path: path_in_zip for path_in_zip, file in files_in_zip.items()}
+            # Each file is written to the archive as soon as it downloads, so only the archive being built
+            # and the files currently downloading are kept on disk
+            with tempfile.NamedTemporaryFile(suffix='.zip') as archive:
+                with ZipFile(archive, 'w') as zip_file:
+                    for source_path, local_path in self.sync_engine.download_files(list(zip_paths)):
+                        zip_file.write(local_path, arcname=zip_paths[source_path])
+                archive.flush()
+
+                self.storage_provider.upload_from_file(
+                    source_file=archive.name,
+                    path=f'{self.dest_bucket}/{self.root_destination_folder}/{org_name}/{site_name}.zip'
+                )
 
 
 class ConsentSyncGuesser:
@@ -549,35 +657,58 @@ def cloudstorage_copy_objects_task(source, destination, start_date: str = None,
         timezone = pytz.timezone('Etc/Greenwich')
         start_date = timezone.localize(parse_date(start_date))
 
-    path = source if source[0:1] != '/' else source[1:]
+    path = _strip_leading_slash(source)
     bucket_name, _, prefix = path.partition('/')
     prefix = None if prefix == '' else prefix
+    source_blobs = [blob for blob in list_blobs(bucket_name, prefix) if not blob.name.endswith('/')]  # Skip folders
+
+    # List everything at the destination once, rather than looking up each file to see if it was already copied
+    destination_fingerprints = {}
+    if source_blobs and not zip_files:
+        destination_bucket_name, _, destination_prefix = _strip_leading_slash(destination).partition('/')
+        destination_fingerprints = {
+            f'{destination_bucket_name}/{blob.name}': _get_fingerprint(blob)
+            for blob in list_blobs(destination_bucket_name, destination_prefix or None)
+        }
+
     files_found = False
-    for source_blob in list_blobs(bucket_name, prefix):
-        if not source_blob.name.endswith('/'):  # Exclude folders
-            source_file_path = os.path.normpath('/' + bucket_name + '/' + source_blob.name)
-            destination_file_path = destination + source_file_path[len(source):]
-            if (zip_files or _not_previously_copied(source_file_path, destination_file_path)) and\
-                    _meets_date_requirements(source_blob, start_date) and\
-                    _matches_file_filter(source_blob.name, file_filter):
-                files_found = True
-                move_file_function = _download_file if zip_files else copy_cloud_file
-                move_file_function(source_file_path, destination_file_path)
+    for source_blob in source_blobs:
+        source_file_path = os.path.normpath('/' + bucket_name + '/' + source_blob.name)
+        destination_file_path = destination + source_file_path[len(source):]
+        previously_copied = _same_content(
+            _get_fingerprint(source_blob),
+            destination_fingerprints.get(os.path.normpath(_strip_leading_slash(destination_file_path)))
+        )
+        if (zip_files or not previously_copied) and\
+                _meets_date_requirements(source_blob, start_date) and\
+                _matches_file_filter(source_blob.name, file_filter):
+            files_found = True
+            move_file_function = _download_file if zip_files else copy_cloud_file
+            move_file_function(source_file_path, destination_file_path)
     if not files_found:
         logging.warning(f'No files copied from {source}')
 
 
-def _not_previously_copied(source_file_path, destination_file_path):
-    destination_file_path = destination_file_path if destination_file_path[0:1] != '/' else destination_file_path[1:]
-    destination_bucket_name, _, destination_blob_name = destination_file_path.partition('/')
-    destination_blob = get_blob(destination_bucket_name, destination_blob_name)
-    if destination_blob is None:
-        return True
+def _strip_leading_slash(path):
+    return path if path[0:1] != '/' else path[1:]
+
+
+def _get_fingerprint(blob):
+    """
+    Cloud Storage gives each object its own etag, even when it was copied from another object, so the md5 hash of
+    the content is used when the blob has one (composite objects don't)
+    """
+    return blob.md5_hash or blob.etag
+
+
+def _same_content(source_fingerprint, destination_fingerprint):
+    return source_fingerprint is not None and source_fingerprint == destination_fingerprint
+
 
-    source_file_path = source_file_path if source_file_path[0:1] != '/' else source_file_path[1:]
-    source_bucket_name, _, source_blob_name = source_file_path.partition('/')
-    source_blob = get_blob(source_bucket_name, source_blob_name)
-    return source_blob.etag != destination_blob.etag
+def _log_sync_rate(action, file_count, start_time):
+    elapsed_seconds = time.monotonic() - start_time
+    files_per_second = file_count / elapsed_seconds if elapsed_seconds else 0
+    logging.info(f'{action} {file_count} consent files in {elapsed_seconds:.2f}s ({files_per_second:.1f} files/sec)')
 
 
 def _meets_date_requirements(source_blob, start_date):
@@ -15,6 +15,7 @@ import time
 from sqlalchemy import and_
 from sqlalchemy.exc import IntegrityError
 
+from rdr_service import clock
 from rdr_service.dao.resource_dao import ResourceDataDao
 from rdr_service.model.code import Code
 from rdr_service.model.participant import Participant
@@ -249,6 +250,92 @@ class ResourceRecordSet(object):
         """
         return self._save(resources=[self._resource], schema=self._schema, schema_meta=self._meta, w_dao=w_dao)
 
+    # Maximum number of values to include in a single IN clause when saving resources in bulk.
+    SAVE_CHUNK_SIZE = 1000
+
+    @classmethod
+    def save_all(cls, record_sets, w_dao=None):
+        """
+        Save a list of resources sharing the same schema to the database.  Existing records are found with one
+        query per chunk of resources and written with bulk inserts and updates, instead of a query and commit
+        for every resource.
+        :param record_sets: List of ResourceRecordSet objects.
+        :param w_dao: Writable DAO object.
+        :return: Number of resource records saved.
+        """
+        if not record_sets:
+            return 0
+        first = record_sets[0]
+        if any(type(rs.get_schema()) is not type(first.get_schema()) for rs in record_sets):
+            raise ValueError('All resources saved together must use the same schema.')
+
+        if not w_dao:
+            w_dao = ResourceDataDao()
+        type_rec = first._get_or_create_type_record(w_dao, first._meta)
+        schema_rec = first._get_or_create_schema_record(w_dao, type_rec, first._schema)
+        pk_fld = type_rec.resourcePKField
+
+        # Keyed by uri, so a resource listed twice is saved once with its last values, like repeated save() calls.
+        mappings = dict()
+        for record_set in record_sets:
+            resource = record_set.get_resource()
+            pid = None
+            if 'participant_id' in resource and resource['participant_id']:
+                pid = int(re.sub('[^0-9]', '', str(resource['participant_id'])))
+                # Force the 'participant_id' field to a string with a 'P' prefix.
+                resource['participant_id'] = f'P{pid}'
+
+            res_uri = type_rec.resourceURI + '/' + str(resource[type_rec.resourcePKField])
+            mappings[res_uri] = {
+                'resourceTypeID': type_rec.id,
+                'resourceSchemaID': schema_rec.id,
+                'uri': res_uri,
+                'hpoId': resource['hpo_id'] if 'hpo_id' in resource else None,
+                'resourcePKID': pid if pk_fld in ['participant_id'] else
+                                resource[pk_fld] if isinstance(resource[pk_fld], int) else None,
+                'resourcePKAltID': str(resource[pk_fld]) if isinstance(resource[pk_fld], str) else None,
+                'resource': resource,
+                # Participant id used to find a missing hpo id, removed before saving.
+                '_pid': pid if 'hpo_id' not in resource else None
+            }
+
+        uris = list(mappings.keys())
+        now = clock.CLOCK.now()
+        inserts = list()
+        updates = list()
+        with w_dao.session() as session:
+            pids = [m['_pid'] for m in mappings.values() if m['_pid']]
+            hpo_ids = dict()
+            for index in range(0, len(pids), cls.SAVE_CHUNK_SIZE):
+                query = session.query(Participant.participantId, Participant.hpoId). \
+                    filter(Participant.participantId.in_(pids[index:index + cls.SAVE_CHUNK_SIZE]))
+                hpo_ids.update({row.participantId: row.hpoId for row in query})
+
+            existing = dict()
+            for index in range(0, len(uris), cls.SAVE_CHUNK_SIZE):
+                query = session.query(ResourceData.id, ResourceData.uri). \
+                    filter(ResourceData.uri.in_(uris[index:index + cls.SAVE_CHUNK_SIZE]))
+                existing.update({row.uri: row.id for row in query})
+
+            for uri, mapping in mappings.items():
+                pid = mapping.pop('_pid')
+                if pid:
+                    mapping['hpoId'] = hpo_ids.get(pid)
+                # Bulk operations skip the model event listeners, so set the timestamps here.
+                mapping['modified'] = now
+                if uri in existing:
+                    mapping['id'] = existing[uri]
+                    updates.append(mapping)
+                else:
+                    mapping['created'] = now
+                    inserts.append(mapping)
+
+            session.bulk_insert_mappings(ResourceData, inserts)
+            session.bulk_update_mappings(ResourceData, updates)
+            session.commit()
+
+        return len(mappings)
+
     def get_schema(self):
         """ Return data schema """
         return self._schema
@@ -9,7 +9,8 @@ from collections import OrderedDict
 from dateutil import parser, tz
 from dateutil.parser import ParserError
 from dateutil.relativedelta import relativedelta
-from sqlalchemy import func, desc, exc
+from sqlalchemy import bindparam, func, desc, exc, text
+from sqlalchemy.orm.exc import MultipleResultsFound
 from werkzeug.exceptions import NotFound
 
 from rdr_service import config
@@ -23,7 +24,10 @@ from rdr_service.code_constants import (
     WITHDRAWAL_CEREMONY_YES,
     WITHDRAWAL_CEREMONY_NO
 )
+from rdr_service.dao.hpo_dao import HPODao
+from rdr_service.dao.organization_dao import OrganizationDao
 from rdr_service.dao.resource_dao import ResourceDataDao
+from rdr_service.dao.site_dao import SiteDao
 # TODO: Replace BQRecord here with a Resource alternative.
 from rdr_service.model.bq_base import BQRecord
 # TODO: Create new versions of these ENUMs in resource.constants.
@@ -162,11 +166,502 @@ def _act(timestamp, group: ActivityGroupEnum, event: ParticipantEventEnum, **kwa
     return event
 
 
+class ModuleAnswersLoader(object):
+    """
+    Load questionnaire module responses and answers for one or more participants with set based queries, and
+    return the layered module answers in the same form get_module_answers() always has.
+    """
+    _module_info_sql = """
+        SELECT DISTINCT qr.questionnaire_id,
+               qr.questionnaire_response_id,
+               qr.created,
+               q.version,
+               qr.authored,
+               qr.language,
+               qr.participant_id,
+               qr.status,
+               c1.value as module_name
+        FROM questionnaire_response qr
+                INNER JOIN questionnaire_concept qc on qr.questionnaire_id = qc.questionnaire_id
+                INNER JOIN questionnaire q on q.questionnaire_id = qc.questionnaire_id
+                INNER JOIN code c1 on c1.code_id = qc.code_id
+        WHERE qr.participant_id in :p_ids and c1.value in :modules
+            AND qr.classification_type != 1
+        ORDER BY qr.participant_id, qr.created;
+    """
+
+    # The answer code value is joined in SQL so answers are sorted with the database collation, which determines
+    # both duplicate detection and the order of comma separated multi-select answers.
+    _answers_sql = """
+        SELECT qra.questionnaire_response_id,
+               qra.question_id,
+               qq.code_id,
+               COALESCE(ac.value,
+                        qra.value_integer, qra.value_decimal,
+                        qra.value_boolean, qra.value_string, qra.value_system,
+                        qra.value_uri, qra.value_date, qra.value_datetime) as answer
+        FROM questionnaire_response_answer qra
+                 INNER JOIN questionnaire_question qq
+                            ON qra.question_id = qq.questionnaire_question_id
+                 LEFT OUTER JOIN code ac
+                            ON ac.code_id = qra.value_code_id
+        WHERE qra.questionnaire_response_id in :qr_ids
+              and (qra.ignore is null or qra.ignore = 0)
+        -- Order by question and the calculated answer so duplicates can be caught when results are processed
+        ORDER BY qra.questionnaire_response_id, qra.question_id, answer
+    """
+
+    _code_sql = "SELECT code_id, value FROM code WHERE code_id in :code_ids"
+
+    # Maximum number of ids to include in a single IN clause.
+    QUERY_CHUNK_SIZE = 1000
+
+    def __init__(self, ro_dao=None):
+        """
+        :param ro_dao: Readonly dao object
+        """
+        self.ro_dao = ro_dao or ResourceDataDao(backup=True)
+        # { (participant id, module): OrderedDict({ questionnaire response id: response data dict }) }
+        self._responses = dict()
+        # { code id: code value }, shared by every participant and module loaded.
+        self._code_map = dict()
+
+    @classmethod
+    def _chunks(cls, items):
+        for index in range(0, len(items), cls.QUERY_CHUNK_SIZE):
+            yield items[index:index + cls.QUERY_CHUNK_SIZE]
+
+    def _load_codes(self, session, code_ids):
+        """ Add any code ids not already in the code map """
+        missing = [code_id for code_id in code_ids if code_id not in self._code_map]
+        sql = text(self._code_sql).bindparams(bindparam('code_ids', expanding=True))
+        for chunk in self._chunks(missing):
+            for row in session.execute(sql, {'code_ids': chunk}):
+                self._code_map[row.code_id] = row.value
+        # Codes that don't exist map to None, just like the original correlated sub-query.
+        for code_id in missing:
+            self._code_map.setdefault(code_id, None)
+
+    def load(self, p_ids, modules):
+        """
+        Load the responses and answers for the given participants and modules.
+        :param p_ids: List of participant ids
+        :param modules: List of module names
+        """
+        p_ids = [int(p_id) for p_id in p_ids]
+        modules = list(modules)
+        # Module names are compared in the database using a case insensitive collation.
+        module_keys = dict()
+        for module in modules:
+            module_keys.setdefault(module.lower(), list()).append(module)
+
+        loaded = dict()
+        for p_id in p_ids:
+            for module in modules:
+                loaded[(p_id, module)] = OrderedDict()
+
+        qr_ids = list()
+        info_sql = text(self._module_info_sql).bindparams(bindparam('p_ids', expanding=True),
+                                                         bindparam('modules', expanding=True))
+        answers_sql = text(self._answers_sql).bindparams(bindparam('qr_ids', expanding=True))
+
+        with self.ro_dao.session() as session:
+            for p_id_chunk in self._chunks(p_ids):
+                results = session.execute(info_sql, {'p_ids': p_id_chunk, 'modules': modules})
+                for row in results:
+                    data = self.ro_dao.to_dict(row, result_proxy=results)
+                    del data['module_name']
+                    for module in module_keys.get(row.module_name.lower(), []):
+                        module_responses = loaded[(row.participant_id, module)]
+                        # DISTINCT can still return a response more than once if the questionnaire has multiple
+                        # concept codes with the same value.
+                        if row.questionnaire_response_id not in module_responses:
+                            module_responses[row.questionnaire_response_id] = data.copy()
+                            qr_ids.append(row.questionnaire_response_id)
+
+            answers = dict()
+            for qr_id_chunk in self._chunks(list(set(qr_ids))):
+                for qnan in session.execute(answers_sql, {'qr_ids': qr_id_chunk}):
+                    answers.setdefault(qnan.questionnaire_response_id, list()).append(qnan)
+
+            self._load_codes(session, {qnan.code_id for qnans in answers.values() for qnan in qnans})
+
+        for (p_id, module), module_responses in loaded.items():
+            for questionnaire_response_id, data in module_responses.items():
+                self._apply_answers(module, data, questionnaire_response_id,
+                                    answers.get(questionnaire_response_id, []))
+        self._responses.update(loaded)
+
+    def _apply_answers(self, module, data, questionnaire_response_id, qnans):
+        """
+        Save the answers of a single response into its data dict.
+        Note on special logic for GROR module:  the original GROR consent questionnaire was quickly replaced by
+        a revised questionnaire with a different consent question/answer structure.  GROR consents (~200)
+        that came in for the old/deprecated questionnaire_id were resent by PTSC using the new questionnaire_id
+        (See ROC-447/ROC-475)
+
+        When processing a deprecated GROR response, add a key/value pair to the data
+        simulating what the consent answer would look like in the revised consent.  E.g., if the
+        deprecated GROR consent response had these question codes/boolean answer values (only one will be True/1):
+          'CheckDNA_Yes': '0',
+          'CheckDNA_No': '1',
+          'CheckDNA_NotSure': '0'
+        ... then this key/value pair will be added to simulate the revised GROR consent question code/answer code:
+           'ResultsConsent_CheckDNA': 'CheckDNA_No'
+
+        This way the answers returned can have the same logic applied to them by _prep_modules(), for all GROR
+        consents.  This is intended to help resolve some mismatch issues between RDR and PDR GROR data
+        """
+        # Ignore duplicate answers to the same question from the same response
+        # (See: questionnaire_response_id 680418686 as an example)
+        last_question_id = None
+        last_answer = None
+        skipped_duplicates = 0
+        for qnan in qnans:
+            if last_question_id == qnan.question_id and last_answer == qnan.answer:
+                skipped_duplicates += 1
+                continue
+            else:
+                last_question_id = qnan.question_id
+                last_answer = qnan.answer
+
+            code_name = self._code_map.get(qnan.code_id)
+            # For question codes with multiple distinct responses, created comma-separated list of answers
+            if qnan.answer:
+                if code_name in data:
+                    data[code_name] += f',{qnan.answer}'
+                else:
+                    data[code_name] = qnan.answer
+
+            # Special handling of GROR deprecated responses
+            if module == 'GROR' \
+                and data['questionnaire_id'] == _deprecated_gror_consent_questionnaire_id \
+                and code_name in _deprecated_gror_consent_question_code_names \
+                and qnan.answer and qnan.answer == '1':
+                # The deprecated consent question code name (if it has the selected/True value), ends up being
+                # the answer code value for the updated GROR consent question
+                data[_consent_module_question_map['GROR']] = code_name
+
+        if skipped_duplicates:
+            logging.warning('Questionnaire response {0} contained {1} duplicate answers. Please investigate' \
+                            .format(questionnaire_response_id, skipped_duplicates))
+
+    def is_loaded(self, module, p_id):
+        return (int(p_id), module) in self._responses
+
+    def get_module_answers(self, module, p_id, qr_id=None, return_responses=False):
+        """
+        Apply the loaded answers for the module, response by response, until we reach the end or the specific
+        response id.  See ParticipantSummaryGenerator.get_module_answers() for parameter details.
+        :return: dicts
+        """
+        answers = OrderedDict((qr_key, qr_data.copy())
+                              for qr_key, qr_data in self._responses.get((int(p_id), module), {}).items())
+
+        data = dict()
+        unlayered_codes = _unlayered_question_codes_map.get(module, [])
+        for questionnaire_response_id, qnans in answers.items():
+            # This excludes the layering of prior answers to certain question codes if they do not exist in the more
+            # recent response
+            for q_code in unlayered_codes:
+                if q_code in data.keys() and q_code not in qnans.keys():
+                    del data[q_code]
+
+            data.update(qnans)
+            if qr_id and qr_id == questionnaire_response_id:
+                break
+
+        # Map empty data dict to a None return and return the unlayered raw responses if requested
+        # Returning the raw responses enables some additional special case logic in _prep_consentpii()
+        rtn_data = None
+        if bool(data):
+            rtn_data = data
+        if return_responses:
+            return rtn_data, answers
+        else:
+            return rtn_data
+
+
+class ParticipantBatchLoader(object):
+    """
+    Prefetch the rows ParticipantSummaryGenerator needs for a batch of participants.  Each table is read with
+    one query per chunk of participants and the rows are grouped by participant in memory, instead of running
+    a set of queries for every participant.
+    """
+    # SQL to generate a list of biobank orders associated with the participants
+    _biobank_orders_sql = """
+       select bo.participant_id, bo.biobank_order_id, bo.created, bo.order_status,
+               bo.collected_site_id, (select google_group from site where site.site_id = bo.collected_site_id) as collected_site,
+               bo.processed_site_id, (select google_group from site where site.site_id = bo.processed_site_id) as processed_site,
+               bo.finalized_site_id, (select google_group from site where site.site_id = bo.finalized_site_id) as finalized_site,
+               bo.finalized_time,
+               case when bmko.id is not null then 1 else 2 end as collection_method
+         from biobank_order bo left outer join biobank_mail_kit_order bmko on bmko.biobank_order_id = bo.biobank_order_id
+         where bo.participant_id in :p_ids
+         order by bo.participant_id, bo.created desc;
+     """
+
+    # SQL to collect all the ordered samples associated with the participants' biobank orders
+    _biobank_ordered_samples_sql = """
+        select bo.participant_id, bo.biobank_order_id, bos.*
+        from biobank_order bo
+        inner join biobank_ordered_sample bos on bo.biobank_order_id = bos.order_id
+        where bo.participant_id in :p_ids
+        order by bos.order_id, test;
+    """
+
+    # SQL to select all the stored samples associated with the participants' biobank_ids
+    # This may include stored samples for which we don't have an associated biobank order
+    # See: https://precisionmedicineinitiative.atlassian.net/browse/PDR-89.
+    _biobank_stored_samples_sql = """
+        select
+            (select p.participant_id from participant p where p.biobank_id = bss.biobank_id) as participant_id,
+            (select distinct boi.biobank_order_id from
+               biobank_order_identifier boi where boi.`value` = bss.biobank_order_identifier
+            ) as biobank_order_id,
+            bss.*
+        from biobank_stored_sample bss
+        where bss.biobank_id in :bb_ids
+        order by bss.biobank_id, biobank_order_id, bss.test, bss.created;
+    """
+
+    _patient_status_sql = """
+        SELECT psh.id,
+               psh.participant_id,
+               psh.created,
+               psh.modified,
+               psh.authored,
+               psh.patient_status,
+               psh.hpo_id,
+               (select t.name from hpo t where t.hpo_id = psh.hpo_id) as hpo_name,
+               psh.organization_id,
+               (select t.external_id from organization t where t.organization_id = psh.organization_id) AS organization_name,
+               psh.site_id,
+               (select t.google_group from site t where t.site_id = psh.site_id) as site_name,
+               psh.comment,
+               psh.user
+        FROM patient_status_history psh
+        WHERE psh.participant_id in :p_ids
+        ORDER BY psh.participant_id, psh.id
+    """
+
+    # Maximum number of ids to include in a single IN clause.
+    QUERY_CHUNK_SIZE = 1000
+
+    def __init__(self, ro_dao=None, answer_modules=None):
+        """
+        :param ro_dao: Readonly dao object
+        :param answer_modules: List of module names to load answers for, see ModuleAnswersLoader.
+        """
+        self.ro_dao = ro_dao or ResourceDataDao(backup=True)
+        self.module_answers = ModuleAnswersLoader(self.ro_dao)
+        self._answer_modules = answer_modules or list()
+        self._p_ids = set()
+        # { row set name: { participant id, biobank id or biobank order id: [rows] } }
+        self._rows = dict()
+
+    @classmethod
+    def _chunks(cls, items):
+        for index in range(0, len(items), cls.QUERY_CHUNK_SIZE):
+            yield items[index:index + cls.QUERY_CHUNK_SIZE]
+
+    def _add_rows(self, name, rows, key='participant_id'):
+        """ Group query result rows by the value of the key column """
+        group = self._rows.setdefault(name, dict())
+        for row in rows:
+            group.setdefault(getattr(row, key), list()).append(row)
+
+    @staticmethod
+    def _participant_rows(session, p_ids):
+        return session.query(
+                Participant.participantId.label('participant_id'), Participant.biobankId, Participant.researchId,
+                Participant.participantOrigin, Participant.lastModified, Participant.signUpTime, Participant.hpoId,
+                Participant.organizationId, Participant.siteId, Participant.withdrawalStatus,
+                Participant.withdrawalReason, Participant.withdrawalTime, Participant.withdrawalAuthored,
+                Participant.withdrawalReasonJustification, Participant.suspensionStatus, Participant.suspensionTime,
+                Participant.isGhostId, Participant.isTestParticipant). \
+            filter(Participant.participantId.in_(p_ids)).all()
+
+    @staticmethod
+    def _deceased_rows(session, p_ids):
+        # See DeceasedReportDao._update_participant_summary(), DENIED reports are not reflected in the summary.
+        return session.query(DeceasedReport.participantId.label('participant_id'), DeceasedReport.status,
+                             DeceasedReport.reviewed, DeceasedReport.authored, DeceasedReport.dateOfDeath). \
+            filter(DeceasedReport.participantId.in_(p_ids),
+                   DeceasedReport.status != DeceasedReportStatus.DENIED).all()
+
+    @staticmethod
+    def _ceremony_rows(session, p_ids):
+        # PDR-252:  The AIAN withdrawal ceremony decision answers, latest authored first.
+        ceremony_question_code = session.query(Code.codeId).filter(Code.value == WITHDRAWAL_CEREMONY_QUESTION_CODE)
+        answer_code_filter = Code.value.in_([WITHDRAWAL_CEREMONY_NO, WITHDRAWAL_CEREMONY_YES])
+        return session.query(QuestionnaireResponse.participantId.label('participant_id'), Code.value).\
+            join(QuestionnaireResponseAnswer, QuestionnaireResponseAnswer.valueCodeId == Code.codeId).\
+            join(QuestionnaireResponse,
+                 QuestionnaireResponse.questionnaireResponseId == QuestionnaireResponseAnswer.questionnaireResponseId).\
+            join(QuestionnaireQuestion,
+                 QuestionnaireResponseAnswer.questionId == QuestionnaireQuestion.questionnaireQuestionId).\
+            filter(QuestionnaireResponse.participantId.in_(p_ids),
+                   QuestionnaireQuestion.codeId == ceremony_question_code, answer_code_filter).\
+            order_by(QuestionnaireResponse.participantId, desc(QuestionnaireResponse.authored)).all()
+
+    @staticmethod
+    def _cohort_pilot_rows(session, p_ids):
+        return session.query(ParticipantCohortPilot.participantId.label('participant_id'),
+                             ParticipantCohortPilot.participantCohortPilot). \
+            filter(ParticipantCohortPilot.participantId.in_(p_ids)).all()
+
+    @staticmethod
+    def _pairing_rows(session, p_ids):
+        return session.query(ParticipantHistory.participantId.label('participant_id'),
+                             ParticipantHistory.lastModified, ParticipantHistory.hpoId, HPO.name.label('hpo'),
+                             ParticipantHistory.organizationId, Organization.externalId.label('organization'),
+                             ParticipantHistory.siteId, Site.googleGroup.label('site')). \
+            outerjoin(HPO, HPO.hpoId == ParticipantHistory.hpoId).\
+            outerjoin(Organization, Organization.organizationId == ParticipantHistory.organizationId).\
+            outerjoin(Site, Site.siteId == ParticipantHistory.siteId).\
+            filter(ParticipantHistory.participantId.in_(p_ids)).\
+            order_by(ParticipantHistory.participantId, ParticipantHistory.lastModified).all()
+
+    @staticmethod
+    def _summary_rows(session, p_ids):
+        # TODO: Workaround for PDR-106 and PDR-364, pull a few fields from participant_summary.
+        return session.query(ParticipantSummary.participantId.label('participant_id'),
+                             ParticipantSummary.consentCohort, ParticipantSummary.ehrStatus,
+                             ParticipantSummary.ehrReceiptTime, ParticipantSummary.ehrUpdateTime,
+                             ParticipantSummary.enrollmentStatusCoreOrderedSampleTime,
+                             ParticipantSummary.enrollmentStatusCoreStoredSampleTime,
+                             ParticipantSummary.isEhrDataAvailable) \
+            .filter(ParticipantSummary.participantId.in_(p_ids)).all()
+
+    @staticmethod
+    def _ehr_receipt_rows(session, p_ids):
+        # Note:  None of the columns in the participant_ehr_receipt table are nullable
+        return session.query(ParticipantEhrReceipt.participantId.label('participant_id'), ParticipantEhrReceipt.id,
+                             ParticipantEhrReceipt.fileTimestamp, ParticipantEhrReceipt.firstSeen,
+                             ParticipantEhrReceipt.lastSeen) \
+            .filter(ParticipantEhrReceipt.participantId.in_(p_ids)) \
+            .order_by(ParticipantEhrReceipt.participantId, ParticipantEhrReceipt.firstSeen,
+                      ParticipantEhrReceipt.fileTimestamp).all()
+
+    @staticmethod
+    def _response_rows(session, p_ids):
+        code_id_query = session.query(func.max(QuestionnaireConcept.codeId)). \
+            filter(QuestionnaireResponse.questionnaireId ==
+                   QuestionnaireConcept.questionnaireId).label('codeId')
+
+        # Responses are sorted by authored date ascending and then created date descending
+        # This should result in a list where any replays of a response are adjacent (most recently created first).
+        # Note: There is at least one instance where there are two responses for the same survey with identical
+        #       'authored' and 'created' timestamps, but they are not a duplicate response, so we also add
+        #       "externalId" to the order_by. 'questionnaireResponseId' is randomly generated and can't be used.
+        return session.query(
+                QuestionnaireResponse.participantId.label('participant_id'), QuestionnaireResponse.answerHash,
+                QuestionnaireResponse.questionnaireResponseId, QuestionnaireResponse.authored,
+                QuestionnaireResponse.created, QuestionnaireResponse.language, QuestionnaireHistory.externalId,
+                QuestionnaireResponse.status, code_id_query, QuestionnaireResponse.nonParticipantAuthor,
+                QuestionnaireResponse.classificationType, QuestionnaireHistory.semanticVersion,
+                QuestionnaireHistory.irbMapping). \
+            join(QuestionnaireHistory). \
+            filter(QuestionnaireResponse.participantId.in_(p_ids),
+                   QuestionnaireResponse.classificationType != QuestionnaireResponseClassificationType.DUPLICATE). \
+            order_by(QuestionnaireResponse.participantId, QuestionnaireResponse.authored,
+                     QuestionnaireResponse.created.desc(), QuestionnaireResponse.externalId.desc()).all()
+
+    @staticmethod
+    def _physical_measurements_rows(session, p_ids):
+        return session.query(PhysicalMeasurements.participantId.label('participant_id'),
+                             PhysicalMeasurements.physicalMeasurementsId, PhysicalMeasurements.created,
+                             PhysicalMeasurements.createdSiteId, PhysicalMeasurements.final,
+                             PhysicalMeasurements.finalized, PhysicalMeasurements.finalizedSiteId,
+                             PhysicalMeasurements.status, PhysicalMeasurements.amendedMeasurementsId). \
+            filter(PhysicalMeasurements.participantId.in_(p_ids)). \
+            order_by(PhysicalMeasurements.participantId, desc(PhysicalMeasurements.created)).all()
+
+    def load(self, p_ids):
+        """
+        Load the rows for the given participants.  Rows for participants already loaded are replaced.
+        :param p_ids: List of participant ids
+        """
+        p_ids = sorted({int(p_id) for p_id in p_ids})
+        for p_id in p_ids:
+            self.release(p_id)
+
+        orders_sql = text(self._biobank_orders_sql).bindparams(bindparam('p_ids', expanding=True))
+        ordered_sql = text(self._biobank_ordered_samples_sql).bindparams(bindparam('p_ids', expanding=True))
+        stored_sql = text(self._biobank_stored_samples_sql).bindparams(bindparam('bb_ids', expanding=True))
+        status_sql = text(self._patient_status_sql).bindparams(bindparam('p_ids', expanding=True))
+
+        with self.ro_dao.session() as session:
+            for chunk in self._chunks(p_ids):
+                participants = self._participant_rows(session, chunk)
+                self._add_rows('participant', participants)
+                self._add_rows('deceased', self._deceased_rows(session, chunk))
+                self._add_rows('ceremony', self._ceremony_rows(session, chunk))
+                self._add_rows('cohort_pilot', self._cohort_pilot_rows(session, chunk))
+                self._add_rows('pairing', self._pairing_rows(session, chunk))
+                self._add_rows('summary', self._summary_rows(session, chunk))
+                self._add_rows('ehr_receipt', self._ehr_receipt_rows(session, chunk))
+                self._add_rows('response', self._response_rows(session, chunk))
+                self._add_rows('physical_measurements', self._physical_measurements_rows(session, chunk))
+
+                self._add_rows('biobank_order', session.execute(orders_sql, {'p_ids': chunk}))
+                self._add_rows('biobank_ordered_sample', session.execute(ordered_sql, {'p_ids': chunk}),
+                               key='biobank_order_id')
+                bb_ids = [p.biobankId for p in participants if p.biobankId is not None]
+                if bb_ids:
+                    self._add_rows('biobank_stored_sample', session.execute(stored_sql, {'bb_ids': bb_ids}),
+                                   key='biobank_id')
+
+                try:
+                    self._add_rows('patient_status', session.execute(status_sql, {'p_ids': chunk}))
+                except exc.ProgrammingError:
+                    # The patient_status_history table does not exist when running unittests.
+                    pass
+
+        if self._answer_modules:
+            self.module_answers.load(p_ids, self._answer_modules)
+        self._p_ids.update(p_ids)
+
+    def is_loaded(self, p_id):
+        return int(p_id) in self._p_ids
+
+    def get(self, name, key):
+        """
+        Return the rows loaded for a participant id, biobank id or biobank order id.
+        :param name: Row set name, IE: 'participant', 'biobank_order'.
+        :param key: Participant id, or the biobank id/biobank order id for stored/ordered samples.
+        :return: list
+        """
+        return self._rows.get(name, dict()).get(key, list())
+
+    def release(self, p_id):
+        """ Drop the rows loaded for a participant, so the next build reads fresh data """
+        p_id = int(p_id)
+        if p_id not in self._p_ids:
+            return
+        self._p_ids.discard(p_id)
+        participant = self.get('participant', p_id)
+        for order in self.get('biobank_order', p_id):
+            self._rows.get('biobank_ordered_sample', dict()).pop(order.biobank_order_id, None)
+        if participant:
+            self._rows.get('biobank_stored_sample', dict()).pop(participant[0].biobankId, None)
+        for name, group in self._rows.items():
+            if name not in ('biobank_ordered_sample', 'biobank_stored_sample'):
+                group.pop(p_id, None)
+
+
 class ParticipantSummaryGenerator(generators.BaseGenerator):
     """
     Generate a Participant Summary Resource object
     """
     ro_dao = None
+    # ParticipantBatchLoader object with the prefetched rows for the participants being built.
+    _batch = None
+    # ModuleAnswersLoader object with the module answers for the participant currently being built.
+    _module_answers = None
+    # Modules whose answers are used to build the participant summary.
+    _answer_modules = ['ConsentPII', 'TheBasics'] + [mod for mod in _consent_module_question_map if mod != 'ConsentPII']
     # Retrieve module and sample test lists from config.
     _baseline_modules = [mod.replace('questionnaireOn', '')
                          for mod in config.getSettingList('baseline_ppi_questionnaire_fields')]
@@ -182,43 +677,116 @@ class ParticipantSummaryGenerator(generators.BaseGenerator):
         if not self.ro_dao:
             self.ro_dao = ResourceDataDao(backup=True)
 
-        with self.ro_dao.session() as ro_session:
-            # prep participant info from Participant record
-            summary = self._prep_participant(p_id, ro_session)
-            # prep additional participant profile info
-            summary = self._merge_schema_dicts(summary, self._prep_participant_profile(p_id, ro_session))
-            # prep ConsentPII questionnaire information
-            summary = self._merge_schema_dicts(summary, self._prep_consentpii_answers(p_id))
-            # prep questionnaire modules information, includes gathering extra consents.
-            summary = self._merge_schema_dicts(summary, self._prep_modules(p_id, ro_session))
-            # prep physical measurements
-            summary = self._merge_schema_dicts(summary, self._prep_physical_measurements(p_id, ro_session))
-            # prep race, gender and sexual orientation
-            summary = self._merge_schema_dicts(summary, self._prep_the_basics(p_id, ro_session))
-            # prep biobank orders and samples
-            summary = self._merge_schema_dicts(summary, self._prep_biobank_info(p_id, summary['biobank_id'],
-                                                                                ro_session))
-            # prep patient status history
-            summary = self._merge_schema_dicts(summary, self._prep_patient_status_info(p_id, ro_session))
-            # calculate enrollment status for participant
-            summary = self._merge_schema_dicts(summary, self._calculate_enrollment_status(summary, p_id))
-            # calculate distinct visits
-            summary = self._merge_schema_dicts(summary, self._calculate_distinct_visits(summary))
-            # calculate UBR flags
-            summary = self._merge_schema_dicts(summary, self._calculate_ubr(p_id, summary, ro_session))
-            # calculate test participant status (if it was not already set by _prep_participant() )
-            if summary['test_participant'] == 0:
-                summary = self._merge_schema_dicts(summary, self._check_for_test_credentials(summary))
-
-            summary['activity'] = self.validate_activity_timestamps(summary['activity'])
-            # data = self.ro_dao.to_resource_dict(summary, schema=schemas.ParticipantSchema)
-
-            # DA-2611 related: Closes a gap where primary consent metrics records in PDR have some stale errors for
-            # invalid DOB/invalid age at consent
-            if summary.get('date_of_birth', None):
-                self.generate_primary_consent_metrics(p_id, ro_session)
-
-            return generators.ResourceRecordSet(schemas.ParticipantSchema, summary)
+        # Use the rows prefetched for this participant's batch, or load them now.  A participant that wasn't
+        # prefetched is added to the current batch, so the rows prefetched for the other participants are kept.
+        if not self._batch:
+            self._batch = ParticipantBatchLoader(self.ro_dao, answer_modules=self._answer_modules)
+        if not self._batch.is_loaded(p_id):
+            self._batch.load([p_id])
+        self._module_answers = self._batch.module_answers
+
+        try:
+            with self.ro_dao.session() as ro_session:
+                # prep participant info from Participant record
+                summary = self._prep_participant(p_id, ro_session)
+                # prep additional participant profile info
+                summary = self._merge_schema_dicts(summary, self._prep_participant_profile(p_id, ro_session))
+                # prep ConsentPII questionnaire information
+                summary = self._merge_schema_dicts(summary, self._prep_consentpii_answers(p_id))
+                # prep questionnaire modules information, includes gathering extra consents.
+                summary = self._merge_schema_dicts(summary, self._prep_modules(p_id, ro_session))
+                # prep physical measurements
+                summary = self._merge_schema_dicts(summary, self._prep_physical_measurements(p_id, ro_session))
+                # prep race, gender and sexual orientation
+                summary = self._merge_schema_dicts(summary, self._prep_the_basics(p_id, ro_session))
+                # prep biobank orders and samples
+                summary = self._merge_schema_dicts(summary, self._prep_biobank_info(p_id, summary['biobank_id'],
+                                                                                    ro_session))
+                # prep patient status history
+                summary = self._merge_schema_dicts(summary, self._prep_patient_status_info(p_id, ro_session))
+                # calculate enrollment status for participant
+                summary = self._merge_schema_dicts(summary, self._calculate_enrollment_status(summary, p_id))
+                # calculate distinct visits
+                summary = self._merge_schema_dicts(summary, self._calculate_distinct_visits(summary))
+                # calculate UBR flags
+                summary = self._merge_schema_dicts(summary, self._calculate_ubr(p_id, summary, ro_session))
+                # calculate test participant status (if it was not already set by _prep_participant() )
+                if summary['test_participant'] == 0:
+                    summary = self._merge_schema_dicts(summary, self._check_for_test_credentials(summary))
+
+                summary['activity'] = self.validate_activity_timestamps(summary['activity'])
+                # data = self.ro_dao.to_resource_dict(summary, schema=schemas.ParticipantSchema)
+
+                # DA-2611 related: Closes a gap where primary consent metrics records in PDR have some stale errors for
+                # invalid DOB/invalid age at consent
+                if summary.get('date_of_birth', None):
+                    self.generate_primary_consent_metrics(p_id, ro_session)
+
+                return generators.ResourceRecordSet(schemas.ParticipantSchema, summary)
+        finally:
+            # Prefetched rows are only used once, so repeated builds of the same participant read fresh data.
+            self._batch.release(p_id)
+
+    def prefetch(self, p_ids):
+        """
+        Load the data for a batch of participants up front, make_resource() uses it for these participants
+        instead of querying each table per participant.
+        :param p_ids: List of participant ids
+        """
+        if not self.ro_dao:
+            self.ro_dao = ResourceDataDao(backup=True)
+        self._batch = ParticipantBatchLoader(self.ro_dao, answer_modules=self._answer_modules)
+        self._batch.load(p_ids)
+
+    @staticmethod
+    def _one_or_none(rows, description):
+        """ Mirror Query.one_or_none() for a list of prefetched rows """
+        if len(rows) > 1:
+            raise MultipleResultsFound(f'Multiple rows were found for the {description}.')
+        return rows[0] if rows else None
+
+    def _lookup_site_name(self, site_id, ro_session):
+        """
+        Look up the site name, using the site cache when the site is in it.
+        :param site_id: site id integer
+        :param ro_session: Readonly DAO session object
+        :return: string
+        """
+        site = SiteDao().get(site_id) if site_id is not None else None
+        if site:
+            return site.googleGroup
+        return super(ParticipantSummaryGenerator, self)._lookup_site_name(site_id, ro_session)
+
+    @staticmethod
+    def _lookup_hpo_name(hpo_id, ro_session):
+        """
+        Look up the HPO name, using the HPO cache when the HPO is in it.
+        :param hpo_id: hpo id integer
+        :param ro_session: Readonly DAO session object
+        :return: string
+        """
+        if hpo_id is None:
+            return None
+        hpo = HPODao().get(hpo_id)
+        if not hpo:
+            hpo = ro_session.query(HPO.name).filter(HPO.hpoId == hpo_id).first()
+        return hpo.name if hpo else None
+
+    @staticmethod
+    def _lookup_organization_name(organization_id, ro_session):
+        """
+        Look up the organization external id, using the organization cache when the organization is in it.
+        :param organization_id: organization id integer
+        :param ro_session: Readonly DAO session object
+        :return: string
+        """
+        if organization_id is None:
+            return None
+        organization = OrganizationDao().get(organization_id)
+        if not organization:
+            organization = ro_session.query(Organization.externalId). \
+                filter(Organization.organizationId == organization_id).first()
+        return organization.externalId if organization else None
 
     def patch_resource(self, p_id, data):
         """
@@ -290,23 +858,22 @@ class ParticipantSummaryGenerator(generators.BaseGenerator):
         """
         # Note: We need to be careful here, there is a delay from when a participant is inserted in the primary DB
         # and when it shows up in the replica DB instance.
-        p: Participant = ro_session.query(Participant).filter(Participant.participantId == p_id).first()
-        if not p:
+        p_id = int(p_id)
+        participants = self._batch.get('participant', p_id)
+        if not participants:
             msg = f'Participant lookup for P{p_id} failed.'
             logging.error(msg)
             raise NotFound(msg)
+        p = participants[0]
 
-        hpo = ro_session.query(HPO.name).filter(HPO.hpoId == p.hpoId).first()
-        organization = ro_session.query(Organization.externalId). \
-            filter(Organization.organizationId == p.organizationId).first()
+        hpo_name = self._lookup_hpo_name(p.hpoId, ro_session)
+        organization_name = self._lookup_organization_name(p.organizationId, ro_session)
 
         # See DeceasedReportDao._update_participant_summary() for the logic for populating
         # the deceased status details in participant_summary.  DENIED reports are not reflected in
         # participant_summary, only PENDING and APPROVED.  Also, when records are inserted into the deceased_report
         # table there is a check to ensure each participant only has one report that is PENDING or APPROVED
-        deceased = ro_session.query(DeceasedReport) \
-            .filter(DeceasedReport.participantId == p_id,
-                    DeceasedReport.status != DeceasedReportStatus.DENIED).one_or_none()
+        deceased = self._one_or_none(self._batch.get('deceased', p_id), f'deceased report for P{p_id}')
         if deceased:
             deceased_status = DeceasedStatus(str(deceased.status))
             deceased_authored = deceased.reviewed if deceased_status == DeceasedStatus.APPROVED else deceased.authored
@@ -322,17 +889,8 @@ class ParticipantSummaryGenerator(generators.BaseGenerator):
 
         # PDR-252:  The AIAN withdrawal ceremony decision needs to be made available to PDR.  Look for the latest
         # authored answer code, if one exists
-        ceremony_question_code = ro_session.query(Code.codeId).filter(Code.value == WITHDRAWAL_CEREMONY_QUESTION_CODE)
-        answer_code_filter = Code.value.in_([WITHDRAWAL_CEREMONY_NO, WITHDRAWAL_CEREMONY_YES])
-        ceremony_response = ro_session.query(Code.value).\
-            join(QuestionnaireResponseAnswer, QuestionnaireResponseAnswer.valueCodeId == Code.codeId).\
-            join(QuestionnaireResponse,
-                 QuestionnaireResponse.questionnaireResponseId == QuestionnaireResponseAnswer.questionnaireResponseId).\
-            join(QuestionnaireQuestion,
-                 QuestionnaireResponseAnswer.questionId == QuestionnaireQuestion.questionnaireQuestionId).\
-            filter(QuestionnaireResponse.participantId == p_id,
-                   QuestionnaireQuestion.codeId == ceremony_question_code, answer_code_filter).\
-            order_by(desc(QuestionnaireResponse.authored)).one_or_none()
+        ceremony_response = self._one_or_none(self._batch.get('ceremony', p_id),
+                                              f'withdrawal ceremony response for P{p_id}')
 
         if ceremony_response:
             withdrawal_aian_ceremony_status = \
@@ -348,8 +906,7 @@ class ParticipantSummaryGenerator(generators.BaseGenerator):
         #
         # Note this query assumes participant_cohort_pilot only contains entries for the cohort 2 pilot
         # participants for genomics and has not been used for identifying participants in more recent pilots
-        cohort_2_pilot = ro_session.query(ParticipantCohortPilot.participantCohortPilot). \
-            filter(ParticipantCohortPilot.participantId == p_id).first()
+        cohort_2_pilot = self._batch.get('cohort_pilot', p_id)
 
         cohort_2_pilot_flag = \
             ParticipantCohortPilotFlag.COHORT_2_PILOT if cohort_2_pilot else ParticipantCohortPilotFlag.UNSET
@@ -358,12 +915,12 @@ class ParticipantSummaryGenerator(generators.BaseGenerator):
         # An additional check will be made later at the end of the participant summary data setup, after we've
         # added details like email and phone numbers to the summary data dict, in case they have fake participant
         # credentials but are not correctly flagged in the participant table
-        test_participant = p.isGhostId == 1 or p.isTestParticipant == 1 or (hpo and hpo.name == TEST_HPO_NAME)
+        test_participant = p.isGhostId == 1 or p.isTestParticipant == 1 or hpo_name == TEST_HPO_NAME
 
         # TODO: Workaround for PDR-364 is to pull cohort value from participant_summary. LIMITED USE CASE ONLY
-        cohort = ConsentCohortEnum.UNSET if not p or not p.participantSummary \
-                    or p.participantSummary.consentCohort is None \
-                    else ConsentCohortEnum(int(p.participantSummary.consentCohort))
+        ps = self._batch.get('summary', p_id)
+        cohort = ConsentCohortEnum.UNSET if not ps or ps[0].consentCohort is None \
+                    else ConsentCohortEnum(int(ps[0].consentCohort))
 
         data = {
             'participant_id': f'P{p_id}',
@@ -374,9 +931,9 @@ class ParticipantSummaryGenerator(generators.BaseGenerator):
             'consent_cohort_id': cohort.value,
             'last_modified': p.lastModified,
             'sign_up_time': p.signUpTime,
-            'hpo': hpo.name if hpo else None,
+            'hpo': hpo_name,
             'hpo_id': p.hpoId,
-            'organization': organization.externalId if organization else None,
+            'organization': organization_name,
             'organization_id': p.organizationId,
 
             'withdrawal_status': str(withdrawal_status),
@@ -408,15 +965,7 @@ class ParticipantSummaryGenerator(generators.BaseGenerator):
 
         # Collect participant pairing history
         pairing_history = None
-        query = ro_session.query(ParticipantHistory.lastModified, ParticipantHistory.hpoId, HPO.name.label('hpo'),
-                                   ParticipantHistory.organizationId, Organization.externalId.label('organization'),
-                                   ParticipantHistory.siteId, Site.googleGroup.label('site')). \
-                outerjoin(HPO, HPO.hpoId == ParticipantHistory.hpoId).\
-                outerjoin(Organization, Organization.organizationId == ParticipantHistory.organizationId).\
-                outerjoin(Site, Site.siteId == ParticipantHistory.siteId).\
-                filter(ParticipantHistory.participantId == p_id).order_by(ParticipantHistory.lastModified)
-        # sql = self.ro_dao.query_to_text(query)
-        pairing = query.all()
+        pairing = self._batch.get('pairing', p_id)
         if pairing:
             pairing_history = list()
             for item in pairing:
@@ -463,12 +1012,8 @@ class ParticipantSummaryGenerator(generators.BaseGenerator):
         # Long term solution may mean creating a participant_profile table for these outlier fields that are managed
         # outside of the RDR API, and query that table instead.
         data = {}
-        ps = ro_session.query(ParticipantSummary.ehrStatus, ParticipantSummary.ehrReceiptTime,
-                              ParticipantSummary.ehrUpdateTime,
-                              ParticipantSummary.enrollmentStatusCoreOrderedSampleTime,
-                              ParticipantSummary.enrollmentStatusCoreStoredSampleTime,
-                              ParticipantSummary.isEhrDataAvailable) \
-            .filter(ParticipantSummary.participantId == p_id).first()
+        summaries = self._batch.get('summary', int(p_id))
+        ps = summaries[0] if summaries else None
 
         if not ps:
             logging.debug(f'No participant_summary record found for {p_id}')
@@ -490,15 +1035,7 @@ class ParticipantSummaryGenerator(generators.BaseGenerator):
                 # Brand new field as of RDR 1.83.1/DA-1781; convert boolean to integer for our BQ data dict
                 'is_ehr_data_available': int(ps.isEhrDataAvailable)
             }
-            # Note:  None of the columns in the participant_ehr_receipt table are nullable
-            pehr_results = ro_session.query(ParticipantEhrReceipt.id,
-                                            ParticipantEhrReceipt.fileTimestamp,
-                                            ParticipantEhrReceipt.firstSeen,
-                                            ParticipantEhrReceipt.lastSeen
-                                            ) \
-                .filter(ParticipantEhrReceipt.participantId == p_id) \
-                .order_by(ParticipantEhrReceipt.firstSeen,
-                          ParticipantEhrReceipt.fileTimestamp).all()
+            pehr_results = self._batch.get('ehr_receipt', int(p_id))
 
             if len(pehr_results):
                 for row in pehr_results:
@@ -539,7 +1076,7 @@ class ParticipantSummaryGenerator(generators.BaseGenerator):
 
         # PDR-178:  Retrieve both the processed (layered) answers result, and the raw responses. This allows us to
         # do some extra processing of the ConsentPII data without having to query all over again.
-        qnans, responses = self.get_module_answers(self.ro_dao, 'ConsentPII', p_id, return_responses=True)
+        qnans, responses = self._get_module_answers('ConsentPII', p_id, return_responses=True)
         if not qnans:
             # return the minimum data required when we don't have the questionnaire data.
             return {'email': None, 'is_ghost_id': 0}
@@ -609,29 +1146,8 @@ class ParticipantSummaryGenerator(generators.BaseGenerator):
         :return: dict
         """
         activity = list()
-        code_id_query = ro_session.query(func.max(QuestionnaireConcept.codeId)). \
-            filter(QuestionnaireResponse.questionnaireId ==
-                   QuestionnaireConcept.questionnaireId).label('codeId')
-
-        # Responses are sorted by authored date ascending and then created date descending
-        # This should result in a list where any replays of a response are adjacent (most recently created first).
-        # Note: There is at least one instance where there are two responses for the same survey with identical
-        #       'authored' and 'created' timestamps, but they are not a duplicate response, so we also add
-        #       "externalId" to the order_by. 'questionnaireResponseId' is randomly generated and can't be used.
-        query = ro_session.query(
-                QuestionnaireResponse.answerHash,
-                QuestionnaireResponse.questionnaireResponseId, QuestionnaireResponse.authored,
-                QuestionnaireResponse.created, QuestionnaireResponse.language, QuestionnaireHistory.externalId,
-                QuestionnaireResponse.status, code_id_query, QuestionnaireResponse.nonParticipantAuthor,
-                QuestionnaireResponse.classificationType, QuestionnaireHistory.semanticVersion,
-                QuestionnaireHistory.irbMapping). \
-            join(QuestionnaireHistory). \
-            filter(QuestionnaireResponse.participantId == p_id,
-                   QuestionnaireResponse.classificationType != QuestionnaireResponseClassificationType.DUPLICATE). \
-            order_by(QuestionnaireResponse.authored, QuestionnaireResponse.created.desc(),
-                     QuestionnaireResponse.externalId.desc())
-        # sql = self.ro_dao.query_to_text(query)
-        results = query.all()
+        # Responses are sorted so any replays of a response are adjacent, see ParticipantBatchLoader.
+        results = self._batch.get('response', int(p_id))
 
         modules = list()
         consents = list()
@@ -678,7 +1194,7 @@ class ParticipantSummaryGenerator(generators.BaseGenerator):
                 }
                 # check if this is a module with consents.
                 if module_name in _consent_module_question_map:
-                    qnans = self.get_module_answers(self.ro_dao, module_name, p_id, row.questionnaireResponseId)
+                    qnans = self._get_module_answers(module_name, p_id, row.questionnaireResponseId)
                     if qnans:
                         qnan = BQRecord(schema=None, data=qnans)  # use only most recent questionnaire.
                         # TODO: Consent table depreciated, remove consent field sets after BigQuery table support
@@ -792,7 +1308,7 @@ class ParticipantSummaryGenerator(generators.BaseGenerator):
         if not qr_id:
             return {}
 
-        qnans = self.get_module_answers(self.ro_dao, 'TheBasics', p_id, qr_id=qr_id, return_responses=False)
+        qnans = self._get_module_answers('TheBasics', p_id, qr_id=qr_id, return_responses=False)
         if not qnans or len(qnans) == 0:
             return {}
 
@@ -858,14 +1374,7 @@ class ParticipantSummaryGenerator(generators.BaseGenerator):
         pm_list = list()
         activity = list()
 
-        query = ro_session.query(PhysicalMeasurements.physicalMeasurementsId, PhysicalMeasurements.created,
-                                 PhysicalMeasurements.createdSiteId, PhysicalMeasurements.final,
-                                 PhysicalMeasurements.finalized, PhysicalMeasurements.finalizedSiteId,
-                                 PhysicalMeasurements.status, PhysicalMeasurements.amendedMeasurementsId). \
-            filter(PhysicalMeasurements.participantId == p_id). \
-            order_by(desc(PhysicalMeasurements.created))
-        # sql = self.dao.query_to_text(query)
-        results = query.all()
+        results = self._batch.get('physical_measurements', int(p_id))
 
         for row in results:
             # Imitate some of the RDR 'participant_summary' table logic, the PM status value defaults to COMPLETED
@@ -990,49 +1499,11 @@ class ParticipantSummaryGenerator(generators.BaseGenerator):
                 'disposed_reason_id': int(SampleStatus(stored_status)) if stored_status else None,
             }
 
-        # SQL to generate a list of biobank orders associated with a participant
-        _biobank_orders_sql = """
-           select bo.participant_id, bo.biobank_order_id, bo.created, bo.order_status,
-                   bo.collected_site_id, (select google_group from site where site.site_id = bo.collected_site_id) as collected_site,
-                   bo.processed_site_id, (select google_group from site where site.site_id = bo.processed_site_id) as processed_site,
-                   bo.finalized_site_id, (select google_group from site where site.site_id = bo.finalized_site_id) as finalized_site,
-                   bo.finalized_time,
-                   case when bmko.id is not null then 1 else 2 end as collection_method
-             from biobank_order bo left outer join biobank_mail_kit_order bmko on bmko.biobank_order_id = bo.biobank_order_id
-             where bo.participant_id = :p_id
-             order by bo.created desc;
-         """
-
-        # SQL to collect all the ordered samples associated with a biobank order
-        _biobank_ordered_samples_sql = """
-            select bo.participant_id, bo.biobank_order_id, bos.*
-            from biobank_order bo
-            inner join biobank_ordered_sample bos on bo.biobank_order_id = bos.order_id
-            where bo.participant_id = :p_id and bo.biobank_order_id = :bo_id
-            order by bos.order_id, test;
-        """
-
-        # SQL to select all the stored samples associated with a participant's biobank_id
-        # This may include stored samples for which we don't have an associated biobank order
-        # See: https://precisionmedicineinitiative.atlassian.net/browse/PDR-89.
-        _biobank_stored_samples_sql = """
-            select
-                (select p.participant_id from participant p where p.biobank_id = bss.biobank_id) as participant_id,
-                (select distinct boi.biobank_order_id from
-                   biobank_order_identifier boi where boi.`value` = bss.biobank_order_identifier
-                ) as biobank_order_id,
-                bss.*
-            from biobank_stored_sample bss
-            where bss.biobank_id = :bb_id
-            order by biobank_order_id, bss.test, bss.created;
-        """
-
         data = {}
         orders = list()
         activity = list()
         # Find all biobank orders associated with this participant
-        cursor = ro_session.execute(_biobank_orders_sql, {'p_id': p_id})
-        biobank_orders = [r for r in cursor]
+        biobank_orders = self._batch.get('biobank_order', int(p_id))
         # Create a unique identifier for each biobank order. This uid must be repeatable, so we sort by 'created'.
         # This unique biobank order id will be used as the prefix of the unique id for each biobank sample record.
         # Note: This is why every database table should have an 'id' integer field as the primary key, so we don't
@@ -1046,16 +1517,14 @@ class ParticipantSummaryGenerator(generators.BaseGenerator):
 
         # Find stored samples associated with this participant. For any stored samples for which there
         # is no known biobank order, create a separate list that will be consolidated into a "pseudo" order record
-        cursor = ro_session.execute(_biobank_stored_samples_sql, {'bb_id': p_bb_id})
-        bss_results = [r for r in cursor]
+        bss_results = self._batch.get('biobank_stored_sample', p_bb_id)
         bss_missing_orders = list(filter(lambda r: r.biobank_order_id is None, bss_results))
 
         # Create an order record for each of this participant's biobank orders
         # This will reconcile ordered samples and stored samples (when available) to create sample summary records
         # for each sample associated with the order record
         for row in biobank_orders:
-            cursor = ro_session.execute(_biobank_ordered_samples_sql, {'p_id': p_id, 'bo_id': row.biobank_order_id})
-            bos_results = [r for r in cursor]
+            bos_results = self._batch.get('biobank_ordered_sample', row.biobank_order_id)
             bbo_samples = list()
             stored_count = 0
             # Count the number of DNA and Baseline tests in this order.
@@ -1201,30 +1670,7 @@ class ParticipantSummaryGenerator(generators.BaseGenerator):
         :return: dict
         """
         data = {}
-        sql = """
-            SELECT psh.id,
-                   psh.created,
-                   psh.modified,
-                   psh.authored,
-                   psh.patient_status,
-                   psh.hpo_id,
-                   (select t.name from hpo t where t.hpo_id = psh.hpo_id) as hpo_name,
-                   psh.organization_id,
-                   (select t.external_id from organization t where t.organization_id = psh.organization_id) AS organization_name,
-                   psh.site_id,
-                   (select t.google_group from site t where t.site_id = psh.site_id) as site_name,
-                   psh.comment,
-                   psh.user
-            FROM patient_status_history psh
-            WHERE psh.participant_id = :pid
-            ORDER BY psh.id
-        """
-        try:
-            cursor = ro_session.execute(sql, {'pid': p_id})
-        except exc.ProgrammingError:
-            # The patient_status_history table does not exist when running unittests.
-            return data
-        results = [r for r in cursor]
+        results = self._batch.get('patient_status', int(p_id))
         if results:
             status_recs = list()
             for row in results:
@@ -1374,134 +1820,20 @@ class ParticipantSummaryGenerator(generators.BaseGenerator):
         :param return_responses:  Return the responses (unlayered) in addition to the processed answer data
         :return: dicts
         """
-        _module_info_sql = """
-            SELECT DISTINCT qr.questionnaire_id,
-                   qr.questionnaire_response_id,
-                   qr.created,
-                   q.version,
-                   qr.authored,
-                   qr.language,
-                   qr.participant_id,
-                   qr.status
-            FROM questionnaire_response qr
-                    INNER JOIN questionnaire_concept qc on qr.questionnaire_id = qc.questionnaire_id
-                    INNER JOIN questionnaire q on q.questionnaire_id = qc.questionnaire_id
-            WHERE qr.participant_id = :p_id and qc.code_id in (select c1.code_id from code c1 where c1.value = :mod)
-                AND qr.classification_type != 1
-            ORDER BY qr.created;
-        """
-
-        _answers_sql = """
-            SELECT qr.questionnaire_id,
-                   qra.question_id,
-                   qq.code_id,
-                   (select c.value from code c where c.code_id = qq.code_id) as code_name,
-                   COALESCE((SELECT c.value from code c where c.code_id = qra.value_code_id),
-                            qra.value_integer, qra.value_decimal,
-                            qra.value_boolean, qra.value_string, qra.value_system,
-                            qra.value_uri, qra.value_date, qra.value_datetime) as answer
-            FROM questionnaire_response qr
-                     INNER JOIN questionnaire_response_answer qra
-                                ON qra.questionnaire_response_id = qr.questionnaire_response_id
-                     INNER JOIN questionnaire_question qq
-                                ON qra.question_id = qq.questionnaire_question_id
-                     INNER JOIN questionnaire q
-                                ON qq.questionnaire_id = q.questionnaire_id
-            WHERE qr.questionnaire_response_id = :qr_id
-                  and (qra.ignore is null or qra.ignore = 0)
-            -- Order by question and the calculated answer so duplicates can be caught when results are processed
-            ORDER BY qra.question_id, answer
-        """
-
-        answers = OrderedDict()
-
-        if not ro_dao:
-            ro_dao = ResourceDataDao(backup=True)
-
-        with ro_dao.session() as session:
-            results = session.execute(_module_info_sql, {"p_id": p_id, "mod": module})
-            if not results:
-                return None
-
-            # Query the answers for all responses found.
-            # Note on special logic for GROR module:  the original GROR consent questionnaire was quickly replaced by
-            # a revised questionnaire with a different consent question/answer structure.  GROR consents (~200)
-            # that came in for the old/deprecated questionnaire_id were resent by PTSC using the new questionnaire_id
-            # (See ROC-447/ROC-475)
-            #
-            # When processing a deprecated GROR response, add a key/value pair to the data
-            # simulating what the consent answer would look like in the revised consent.  E.g., if the
-            # deprecated GROR consent response had these question codes/boolean answer values (only one will be True/1):
-            #   'CheckDNA_Yes': '0',
-            #   'CheckDNA_No': '1',
-            #   'CheckDNA_NotSure': '0'
-            # ... then this key/value pair will be added to simulate the revised GROR consent question code/answer code:
-            #    'ResultsConsent_CheckDNA': 'CheckDNA_No'
-            #
-            # This way the answers returned can have the same logic applied to them by _prep_modules(), for all GROR
-            # consents.  This is intended to help resolve some mismatch issues between RDR and PDR GROR data
-            for row in results:
-                # Save parent record field values into data dict.
-                data = ro_dao.to_dict(row, result_proxy=results)
-                qnans = session.execute(_answers_sql, {'qr_id': row.questionnaire_response_id})
-                # Save answers into data dict.  Ignore duplicate answers to the same question from the same response
-                # (See: questionnaire_response_id 680418686 as an example)
-                last_question_id = None
-                last_answer = None
-                skipped_duplicates = 0
-                for qnan in qnans:
-                    if last_question_id == qnan.question_id and last_answer == qnan.answer:
-                        skipped_duplicates += 1
-                        continue
-                    else:
-                        last_question_id = qnan.question_id
-                        last_answer = qnan.answer
-
-                    # For question codes with multiple distinct responses, created comma-separated list of answers
-                    if qnan.answer:
-                        if qnan.code_name in data:
-                            data[qnan.code_name] += f',{qnan.answer}'
-                        else:
-                            data[qnan.code_name] = qnan.answer
-
-                    # Special handling of GROR deprecated responses
-                    if module == 'GROR' \
-                        and data['questionnaire_id'] == _deprecated_gror_consent_questionnaire_id \
-                        and qnan.code_name in _deprecated_gror_consent_question_code_names \
-                        and qnan.answer and qnan.answer == '1':
-                        # The deprecated consent question code name (if it has the selected/True value), ends up being
-                        # the answer code value for the updated GROR consent question
-                        data[_consent_module_question_map['GROR']] = qnan.code_name
-
-                # Insert data dict into answers list.
-                answers[row.questionnaire_response_id] = data
-                if skipped_duplicates:
-                    logging.warning('Questionnaire response {0} contained {1} duplicate answers. Please investigate' \
-                                    .format(row.questionnaire_response_id, skipped_duplicates))
-
-        # Apply answers to data dict, response by response, until we reach the end or the specific response id.
-        data = dict()
-        unlayered_codes = _unlayered_question_codes_map.get(module, [])
-        for questionnaire_response_id, qnans in answers.items():
-            # This excludes the layering of prior answers to certain question codes if they do not exist in the more
-            # recent response
-            for q_code in unlayered_codes:
-                if q_code in data.keys() and q_code not in qnans.keys():
-                    del data[q_code]
-
-            data.update(qnans)
-            if qr_id and qr_id == questionnaire_response_id:
-                break
+        loader = ModuleAnswersLoader(ro_dao)
+        loader.load([p_id], [module])
+        return loader.get_module_answers(module, p_id, qr_id=qr_id, return_responses=return_responses)
 
-        # Map empty data dict to a None return and return the unlayered raw responses if requested
-        # Returning the raw responses enables some additional special case logic in _prep_consentpii()
-        rtn_data = None
-        if bool(data):
-            rtn_data = data
-        if return_responses:
-            return rtn_data, answers
-        else:
-            return rtn_data
+    def _get_module_answers(self, module, p_id, qr_id=None, return_responses=False):
+        """
+        Return the module answers for the participant from the answers pre-loaded by make_resource(), falling back
+        to querying for them if the participant and module were not pre-loaded.
+        See get_module_answers() for parameter details.
+        """
+        if self._module_answers and self._module_answers.is_loaded(module, p_id):
+            return self._module_answers.get_module_answers(module, p_id, qr_id=qr_id,
+                                                           return_responses=return_responses)
+        return self.get_module_answers(self.ro_dao, module, p_id, qr_id=qr_id, return_responses=return_responses)
 
     @staticmethod
     def is_replay(prev_data_dict, prev_answer_hash,
@@ -1617,7 +1949,7 @@ class ParticipantSummaryGenerator(generators.BaseGenerator):
         if not qr_id:
             return data
 
-        qnan = self.get_module_answers(self.ro_dao, 'TheBasics', p_id=p_id, qr_id=qr_id)
+        qnan = self._get_module_answers('TheBasics', p_id=p_id, qr_id=qr_id)
 
         # ubr_sex
         data['ubr_sex'] = ubr.ubr_sex(qnan.get('BiologicalSexAtBirth_SexAtBirth', None))
@@ -4,6 +4,7 @@
 #
 # import json
 import logging
+import time
 from datetime import datetime
 
 import rdr_service.config as config
@@ -13,6 +14,7 @@ from rdr_service.dao.bigquery_sync_dao import BigQuerySyncDao
 from rdr_service.dao.bq_participant_summary_dao import BQParticipantSummaryGenerator, rebuild_bq_participant
 from rdr_service.dao.bq_pdr_participant_summary_dao import BQPDRParticipantSummaryGenerator
 from rdr_service.dao.bq_questionnaire_dao import BQPDRQuestionnaireResponseGenerator
+from rdr_service.model.bq_pdr_participant_summary import BQPDRParticipantSummary
 from rdr_service.model.bq_questionnaires import PDR_MODULE_LIST
 from rdr_service.cloud_utils.gcp_cloud_tasks import GCPCloudTask
 from rdr_service.resource import generators
@@ -51,6 +53,8 @@ def batch_rebuild_participants_task(payload, project_id=None):
     if not build_modules:
         logging.info('Skipping rebuild of participant module responses')
 
+    # Participants needing a full rebuild are prefetched and built together, patches are applied one at a time.
+    rebuild_pids = list()
     for item in batch:
         p_id = item['pid']
         patch_data = item.get('patch', None)
@@ -60,30 +64,76 @@ def batch_rebuild_participants_task(payload, project_id=None):
             logging.warning(f'Skipping rebuild of test pid {p_id} data')
             continue
 
-        if build_participant_summary:
+        if build_participant_summary and patch_data:
             rebuild_participant_summary_resource(p_id, res_gen=res_gen, patch_data=patch_data)
+            rebuild_bq_participant(p_id, ps_bqgen=ps_bqgen, pdr_bqgen=pdr_bqgen, patch_data=patch_data,
+                                   project_id=project_id)
+            continue
 
-            ps_bqr = rebuild_bq_participant(p_id, ps_bqgen=ps_bqgen, pdr_bqgen=pdr_bqgen, patch_data=patch_data,
-                                            project_id=project_id)
-            # Test to see if participant record has been filtered or we are just patching.
-            if not ps_bqr or patch_data:
-                continue
-
-        if build_modules:
-            # Generate participant questionnaire module response data
-            for module in PDR_MODULE_LIST:
-                mod = module()
-                table, mod_bqrs = mod_bqgen.make_bqrecord(p_id, mod.get_schema().get_module_name())
-                if not table:
-                    continue
-
-                # TODO: Switch this to ResourceDataDAO, but make sure we don't break anything when the switch is made.
-                w_dao = BigQuerySyncDao()
-                with w_dao.session() as w_session:
-                    for mod_bqr in mod_bqrs:
-                        mod_bqgen.save_bqrecord(mod_bqr.questionnaire_response_id, mod_bqr, bqtable=table,
-                                                w_dao=w_dao, w_session=w_session, project_id=project_id)
+        if int(p_id) not in rebuild_pids:
+            rebuild_pids.append(int(p_id))
+
+    start_ts = time.perf_counter()
+    if build_participant_summary and rebuild_pids:
+        res_gen.prefetch(rebuild_pids)
+    prefetch_ts = time.perf_counter()
+
+    resources = list()
+    pdr_bqrs = list()
+    # { BQTable: [(questionnaire_response_id, BQRecord)] }
+    mod_bqrs_by_table = dict()
+    failed_pids = list()
+    for p_id in rebuild_pids:
+        # A participant's records are only saved if all of them were built, so one bad participant doesn't stop
+        # the rest of the batch from being saved before the task fails.
+        try:
+            p_resources = list()
+            p_pdr_bqrs = list()
+            p_mod_bqrs = list()
+            if build_participant_summary:
+                # Build the participant summary once and use it for both the resource and BigQuery records.
+                res = res_gen.make_resource(p_id)
+                p_resources.append(res)
+                ps_bqr = ps_bqgen.make_bqrecord(p_id, res=res)
+                p_pdr_bqrs.append((p_id, pdr_bqgen.make_bqrecord(p_id, ps_bqr=ps_bqr)))
+
+            if build_modules:
+                # Generate participant questionnaire module response data
+                for module in PDR_MODULE_LIST:
+                    mod = module()
+                    table, mod_bqrs = mod_bqgen.make_bqrecord(p_id, mod.get_schema().get_module_name())
+                    if not table:
+                        continue
+                    p_mod_bqrs.append(
+                        (table, [(mod_bqr.questionnaire_response_id, mod_bqr) for mod_bqr in mod_bqrs]))
+        except Exception:  # pylint: disable=broad-except
+            logging.error(f'Failed to rebuild participant {p_id}.', exc_info=True)
+            failed_pids.append(p_id)
+            continue
 
+        resources.extend(p_resources)
+        pdr_bqrs.extend(p_pdr_bqrs)
+        for table, mod_bqrs in p_mod_bqrs:
+            mod_bqrs_by_table.setdefault(table, list()).extend(mod_bqrs)
+    build_ts = time.perf_counter()
+
+    generators.ResourceRecordSet.save_all(resources)
+    # TODO: Switch this to ResourceDataDAO, but make sure we don't break anything when the switch is made.
+    w_dao = BigQuerySyncDao()
+    with w_dao.session() as w_session:
+        if pdr_bqrs:
+            pdr_bqgen.save_bqrecords(pdr_bqrs, bqtable=BQPDRParticipantSummary, w_session=w_session,
+                                     project_id=project_id)
+        for table, mod_bqrs in mod_bqrs_by_table.items():
+            mod_bqgen.save_bqrecords(mod_bqrs, bqtable=table, w_session=w_session, project_id=project_id)
+    save_ts = time.perf_counter()
+
+    logging.info(f'Rebuilt {len(rebuild_pids) - len(failed_pids)} participants: '
+                 f'prefetch {prefetch_ts - start_ts:.2f}s, build {build_ts - prefetch_ts:.2f}s, '
+                 f'save {save_ts - build_ts:.2f}s.')
+    if failed_pids:
+        # Fail the task after saving the rest of the batch, so Cloud Tasks retries the failed participants.
+        raise RuntimeError(f'Failed to rebuild {len(failed_pids)} participants: {failed_pids}')
     logging.info(f'End time: {datetime.utcnow()}, rebuilt BigQuery data for {count} participants.')
 
 
@@ -158,6 +208,7 @@ def dispatch_rebuild_consent_metrics_tasks(id_list, in_seconds=15, quiet=True, b
                                            project_id=None, build_locally=False):
     """
     Helper method to handle queuing batch rebuild requests for rebuilding consent metrics resource data
+    :return: List of the consent_file ids whose rebuild tasks could not be created
     """
     if project_id is None:
         project_id = config.GAE_PROJECT
@@ -167,16 +218,18 @@ def dispatch_rebuild_consent_metrics_tasks(id_list, in_seconds=15, quiet=True, b
 
     if build_locally or project_id == 'localhost':
         batch_rebuild_consent_metrics_task({'batch': id_list})
-    else:
-        completed_batches = 0
-        task = GCPCloudTask()
-        for batch in list_chunks(id_list, batch_size):
-            payload = {'batch': batch}
-            task.execute('batch_rebuild_consent_metrics_task', payload=payload, in_seconds=in_seconds,
-                         queue='resource-rebuild', quiet=quiet, project_id=project_id)
-            completed_batches += 1
-
-        logging.info(f'Dispatched {completed_batches} batch_rebuild_consent_metrics tasks of max size {batch_size}')
+        return []
+
+    result = GCPCloudTask().execute_batch(
+        'batch_rebuild_consent_metrics_task', ({'batch': batch} for batch in list_chunks(id_list, batch_size)),
+        in_seconds=in_seconds, queue='resource-rebuild', quiet=quiet, project_id=project_id
+    )
+
+    logging.info(f'Dispatched {result.created} batch_rebuild_consent_metrics tasks of max size {batch_size}')
+    failed_ids = [id_ for failure in result.failures for id_ in failure.payload['batch']]
+    if failed_ids:
+        logging.error(f'Consent metrics rebuild tasks not created for consent files: {failed_ids}')
+    return failed_ids
 
 def dispatch_check_consent_errors_task(in_seconds=30, quiet=True, origin=None,
                                        project_id=config.GAE_PROJECT, build_locally=False):
@@ -1,14 +1,18 @@
 from abc import ABC, abstractmethod
 from datetime import datetime
 from dateutil import parser
-from io import BytesIO
 from os.path import basename
+from tempfile import SpooledTemporaryFile
 from typing import List, Optional, Union
 
 from geometry import Rect
 from google.cloud.storage.blob import Blob
-from pdfminer.high_level import extract_pages, extract_text
-from pdfminer.layout import LTChar, LTCurve, LTFigure, LTImage, LTTextBox
+from pdfminer.converter import PDFPageAggregator
+from pdfminer.layout import LAParams, LTChar, LTContainer, LTCurve, LTFigure, LTImage, LTText, LTTextBox
+from pdfminer.pdfdocument import PDFDocument
+from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+from pdfminer.pdfpage import PDFPage
+from pdfminer.pdfparser import PDFParser
 
 from rdr_service import config
 from rdr_service.storage import GoogleCloudStorageProvider
@@ -788,7 +792,44 @@ class CeWearConsentFile(WearConsentFile):
         return self.pdf_wrapper.get_date_signed_str()
 
 
+class _LazyPdfPages:
+    """
+    The pages of a PDF file, laid out by pdfminer the first time each of them is used.  Only the document
+    structure is parsed up front, so checking the signature page doesn't lay out every page of the file.
+    """
+
+    def __init__(self, file):
+        self._page_objects = list(PDFPage.create_pages(PDFDocument(PDFParser(file))))
+        resource_manager = PDFResourceManager(caching=True)
+        self._device = PDFPageAggregator(resource_manager, laparams=LAParams())
+        self._interpreter = PDFPageInterpreter(resource_manager, self._device)
+        self._layouts = {}
+
+    def __len__(self):
+        return len(self._page_objects)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('PDF page index out of range')
+
+        layout = self._layouts.get(index)
+        if layout is None:
+            self._interpreter.process_page(self._page_objects[index])
+            layout = self._layouts[index] = self._device.get_result()
+        return layout
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+
 class Pdf:
+    # Files up to this size are parsed from memory, larger ones are spooled to a temporary file on disk.
+    SPOOL_MAX_BYTES = 8 * 1024 * 1024
+    # Number of characters from the start of the file that has_text searches.
+    HAS_TEXT_LENGTH = 200
 
     def __init__(self, pages, blob: Blob):
         self.pages = pages
@@ -797,9 +838,11 @@ class Pdf:
 
     @classmethod
     def from_google_storage_blob(cls, blob: Blob):
-        file_bytes = BytesIO(blob.download_as_string())
-        pages = list(extract_pages(file_bytes))
-        return Pdf(pages, blob)
+        # The file is downloaded once, its pages are only parsed when they're needed
+        file = SpooledTemporaryFile(max_size=cls.SPOOL_MAX_BYTES)
+        blob.download_to_file(file)
+        file.seek(0)
+        return Pdf(_LazyPdfPages(file), blob)
 
     @classmethod
     def rect_for_element(cls, element) -> Optional[Rect]:
@@ -848,8 +891,7 @@ class Pdf:
 
     def has_text(self, search_strings):
         if self._pdf_text is None:
-            file_bytes = BytesIO(self._blob.download_as_string())
-            self._pdf_text = extract_text(file_bytes)[:200]
+            self._pdf_text = self._get_leading_text(self.HAS_TEXT_LENGTH)
 
         for search_token in search_strings:
             found_token_in_page = False
@@ -862,6 +904,26 @@ class Pdf:
 
         return True
 
+    def _get_leading_text(self, length):
+        """ Return the first characters of the file's text, reading only as many pages as needed """
+        text = ''
+        for page in self.pages:
+            text += ''.join(self._iter_element_text(page)) + '\f'
+            if len(text) >= length:
+                break
+        return text[:length]
+
+    @classmethod
+    def _iter_element_text(cls, element):
+        # Gives the same text as pdfminer's extract_text
+        if isinstance(element, LTContainer):
+            for child in element:
+                yield from cls._iter_element_text(child)
+        elif isinstance(element, LTText):
+            yield element.get_text()
+        if isinstance(element, LTTextBox):
+            yield '\n'
+
     @classmethod
     def get_first_child_of_element(cls, element):
         try:
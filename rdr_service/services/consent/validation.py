@@ -1,13 +1,18 @@
 from abc import ABC, abstractmethod
 from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import date, datetime, timedelta
+import gc
 from io import StringIO
+from itertools import islice
 import logging
+import psutil
 import pytz
 from typing import Collection, List
 
 from sqlalchemy.orm import Session
 
+from rdr_service import config
 from rdr_service.dao.consent_dao import ConsentDao
 from rdr_service.dao.hpo_dao import HPODao
 from rdr_service.dao.participant_summary_dao import ParticipantSummaryDao
@@ -304,6 +309,11 @@ class _ValidationOutputHelper:
 
 
 class ConsentValidationController:
+    DEFAULT_WORKERS = 4
+    DEFAULT_WORKER_MEMORY_MB = 512
+    # Number of participants loaded and validated before their results are stored.
+    PARTICIPANT_CHUNK_SIZE = 200
+
     def __init__(self, consent_dao: ConsentDao, participant_summary_dao: ParticipantSummaryDao,
                  hpo_dao: HPODao, storage_provider: GoogleCloudStorageProvider):
         self.consent_dao = consent_dao
@@ -311,6 +321,9 @@ class ConsentValidationController:
         self.storage_provider = storage_provider
 
         self.va_hpo_id = hpo_dao.get_by_name('VA').hpoId
+        self.max_workers = config.getSettingJson(config.CONSENT_VALIDATION_WORKERS, self.DEFAULT_WORKERS)
+        self.worker_memory_mb = config.getSettingJson(config.CONSENT_VALIDATION_WORKER_MEMORY_MB,
+                                                      self.DEFAULT_WORKER_MEMORY_MB)
 
     @classmethod
     def build_controller(cls):
@@ -346,6 +359,14 @@ class ConsentValidationController:
 
     def validate_consent_responses(self, summary: ParticipantSummary, output_strategy: ValidationOutputStrategy,
                                    consent_responses: Collection[ConsentResponse]):
+        for consent_response, validation_results in self._get_consent_response_results(summary, consent_responses):
+            for result in validation_results:
+                result.consent_response = consent_response
+            output_strategy.add_all(validation_results)
+
+    def _get_consent_response_results(self, summary: ParticipantSummary,
+                                      consent_responses: Collection[ConsentResponse]):
+        """Return a list of each consent response with the validation results of its files"""
         validator = self._build_validator(summary)
         validation_method_map = {
             ConsentType.PRIMARY: validator.get_primary_validation_results,
@@ -356,90 +377,165 @@ class ConsentValidationController:
             ConsentType.WEAR: validator.get_wear_validation_results
         }
 
+        response_results = []
         for consent_response in consent_responses:
             get_validation_results_func = validation_method_map[consent_response.type]
-            validation_results = self._process_validation_results(
+            response_results.append((consent_response, self._process_validation_results(
                 get_validation_results_func(expected_signing_date=consent_response.response.authored)
-            )
-            for result in validation_results:
-                result.consent_response = consent_response
-            output_strategy.add_all(validation_results)
+            )))
+        return response_results
 
     def validate_participant_consents(self, summary: ParticipantSummary, output_strategy: ValidationOutputStrategy,
                                       min_authored_date: date = None, max_authored_date: date = None,
                                       types_to_validate: Collection[ConsentType] = None):
+        output_strategy.add_all(self._get_participant_consent_results(
+            summary=summary,
+            min_authored_date=min_authored_date,
+            max_authored_date=max_authored_date,
+            types_to_validate=types_to_validate
+        ))
+
+    def _get_participant_consent_results(self, summary: ParticipantSummary, min_authored_date: date = None,
+                                         max_authored_date: date = None,
+                                         types_to_validate: Collection[ConsentType] = None) -> List[ParsingResult]:
         validator = self._build_validator(summary)
 
+        results = []
         if self._check_consent_type(ConsentType.PRIMARY, types_to_validate) and self._has_consent(
             consent_status=summary.consentForStudyEnrollment,
             authored=summary.consentForStudyEnrollmentFirstYesAuthored,
             min_authored=min_authored_date,
             max_authored=max_authored_date
         ):
-            output_strategy.add_all(self._process_validation_results(validator.get_primary_validation_results()))
+            results.extend(self._process_validation_results(validator.get_primary_validation_results()))
         if self._check_consent_type(ConsentType.CABOR, types_to_validate) and self._has_consent(
             consent_status=summary.consentForCABoR,
             authored=summary.consentForCABoRAuthored,
             min_authored=min_authored_date,
             max_authored=max_authored_date
         ):
-            output_strategy.add_all(self._process_validation_results(validator.get_cabor_validation_results()))
+            results.extend(self._process_validation_results(validator.get_cabor_validation_results()))
         if self._check_consent_type(ConsentType.EHR, types_to_validate) and self._has_consent(
             consent_status=summary.consentForElectronicHealthRecords,
             authored=summary.consentForElectronicHealthRecordsAuthored,
             min_authored=min_authored_date,
             max_authored=max_authored_date
         ):
-            output_strategy.add_all(self._process_validation_results(validator.get_ehr_validation_results()))
+            results.extend(self._process_validation_results(validator.get_ehr_validation_results()))
         if self._check_consent_type(ConsentType.GROR, types_to_validate) and self._has_consent(
             consent_status=summary.consentForGenomicsROR,
             authored=summary.consentForGenomicsRORAuthored,
             min_authored=min_authored_date,
             max_authored=max_authored_date
         ):
-            output_strategy.add_all(self._process_validation_results(validator.get_gror_validation_results()))
+            results.extend(self._process_validation_results(validator.get_gror_validation_results()))
         if self._check_consent_type(ConsentType.PRIMARY_UPDATE, types_to_validate) and self._has_primary_update_consent(
             summary=summary,
             min_authored=min_authored_date,
             max_authored=max_authored_date
         ):
-            output_strategy.add_all(self._process_validation_results(validator.get_primary_update_validation_results()))
+            results.extend(self._process_validation_results(validator.get_primary_update_validation_results()))
+        return results
 
     def validate_consent_uploads(self, session: Session, output_strategy: ValidationOutputStrategy,
                                  min_consent_date=None, max_consent_date=None):
         """
-        Find all the expected consents (filtering by dates if provided) and check the files that have been uploaded
+        Find all the expected consents (filtering by dates if provided) and check the files that have been uploaded.
+        Participants are validated in chunks on a pool of workers, and the results of each chunk are stored before
+        the next one starts so a restarted job only validates the participants that are left.
         """
 
-        # Workaround for this job frequently failing (OOM killer) before it can launch these tasks on a normal exit:
+        # Workaround for this job being stopped before it can launch these tasks on a normal exit:
         # Pre-schedule the error reporting tasks to run in 8 hours.  Ensures the error report check occurs once a day.
         dispatch_check_consent_errors_task(origin='vibrent', in_seconds=28800)
         dispatch_check_consent_errors_task(origin='careevolution', in_seconds=28800)
 
         # Retrieve consent response objects that need to be validated
         participant_id_consent_map = self.consent_dao.get_consent_responses_to_validate(session=session)
-        participant_summaries = self.participant_summary_dao.get_by_ids_with_session(
-            session=session,
-            obj_ids=participant_id_consent_map.keys()
+        summary_chunks = (
+            self.participant_summary_dao.get_by_ids_with_session(session=session, obj_ids=participant_ids)
+            for participant_ids in self._iter_chunks(participant_id_consent_map.keys())
+        )
+
+        def add_response_results(response_results):
+            for consent_response, validation_results in response_results:
+                for result in validation_results:
+                    result.consent_response = consent_response
+                output_strategy.add_all(validation_results)
+
+        self._validate_in_parallel(
+            summary_chunks=summary_chunks,
+            validate=lambda summary: self._get_consent_response_results(
+                summary, participant_id_consent_map[summary.participantId]
+            ),
+            add_results=add_response_results,
+            output_strategy=output_strategy
         )
-        for summary in participant_summaries:
-            self.validate_consent_responses(
-                summary=summary,
-                output_strategy=output_strategy,
-                consent_responses=participant_id_consent_map[summary.participantId]
-            )
-        output_strategy.process_results()
 
         # Use the legacy query for the day that the updated check is released (and in case any are missed)
         summaries_needing_validated = self.consent_dao.get_participants_with_unvalidated_files(session)
         logging.info(f'{len(summaries_needing_validated)} participants still needed validation')
-        for summary in summaries_needing_validated:
-            self.validate_participant_consents(
+        self._validate_in_parallel(
+            summary_chunks=self._iter_chunks(summaries_needing_validated),
+            validate=lambda summary: self._get_participant_consent_results(
                 summary=summary,
-                output_strategy=output_strategy,
                 min_authored_date=min_consent_date,
                 max_authored_date=max_consent_date
-            )
+            ),
+            add_results=output_strategy.add_all,
+            output_strategy=output_strategy
+        )
+
+    @classmethod
+    def _iter_chunks(cls, items):
+        items = iter(items)
+        chunk = list(islice(items, cls.PARTICIPANT_CHUNK_SIZE))
+        while chunk:
+            yield chunk
+            chunk = list(islice(items, cls.PARTICIPANT_CHUNK_SIZE))
+
+    def _validate_in_parallel(self, summary_chunks, validate, add_results, output_strategy: ValidationOutputStrategy):
+        """
+        Call validate(summary) for the participants of each chunk on a pool of worker threads, passing what it
+        returns to add_results on this thread (the output strategy and database session aren't thread safe).
+        The output strategy processes the results of each chunk once all of them are validated.
+
+        Workers start on new participants while the process stays under the memory ceiling of all the workers.
+        Above it, the engine waits for the participants in progress to finish and frees what they left behind.
+        The memory still held then isn't used by the workers (stored results, or memory the allocator keeps),
+        so the ceiling is recomputed from it instead of backing off for the rest of the run.
+        """
+        process = psutil.Process()
+        workers_memory = self.max_workers * self.worker_memory_mb * 1024 * 1024
+        memory_ceiling = process.memory_info().rss + workers_memory
+
+        def collect(futures):
+            for future in futures:
+                add_results(future.result())
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            for summaries in summary_chunks:
+                in_flight = set()
+                for summary in summaries:
+                    if process.memory_info().rss > memory_ceiling:
+                        logging.warning(f'Consent validation is over its {memory_ceiling // 1024 // 1024} MB memory '
+                                        f'ceiling, waiting for {len(in_flight)} participants to finish.')
+                        done, in_flight = wait(in_flight)
+                        collect(done)
+                        gc.collect()
+                        memory_ceiling = process.memory_info().rss + workers_memory
+                        logging.info(f'Consent validation memory ceiling reset to '
+                                     f'{memory_ceiling // 1024 // 1024} MB.')
+
+                    while len(in_flight) >= self.max_workers:
+                        done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                        collect(done)
+                    in_flight.add(pool.submit(validate, summary))
+
+                done, _ = wait(in_flight)
+                collect(done)
+                # Store the chunk's results, so they aren't validated again if the job is restarted
+                output_strategy.process_results()
 
     def validate_all_for_participant(self, participant_id: int, output_strategy: ValidationOutputStrategy):
         summary: ParticipantSummary = self.participant_summary_dao.get(participant_id)
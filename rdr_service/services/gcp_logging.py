@@ -351,7 +351,9 @@ class GCPStackDriverLogger(object):
 
         if _response:
             self._response_status_code = _response.status_code
-            self._response_size = len(_response.data)
+            # Reading the data of a streamed response would buffer all of it, the size isn't known yet.
+            if not _response.is_streamed:
+                self._response_size = len(_response.data)
 
         self.publish_to_stackdriver()
         self._reset()
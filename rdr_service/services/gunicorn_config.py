@@ -52,3 +52,12 @@ def post_request(worker, request, environment, response):  # pylint: disable=unu
         # we change to another worker type, or if Gunicorn updates the handle_quit code to do something with them,
         # then we may need to pass something in.
         worker.handle_abort(None, None)
+
+
+def worker_exit(server, worker):  # pylint: disable=unused-argument
+    # Save the requests_log records still waiting in the background writer's queue.
+    from rdr_service.services.request_log_writer import drain_request_log_writer
+    drain_request_log_writer(timeout=timeout)
+    # Send the message broker messages still waiting in the background sender's queue.
+    from rdr_service.message_broker.delivery import drain_message_sender
+    drain_message_sender(timeout=timeout)
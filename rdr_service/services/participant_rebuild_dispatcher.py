@@ -0,0 +1,129 @@
+import atexit
+import logging
+import threading
+
+from rdr_service import config
+from rdr_service.cloud_utils.gcp_cloud_tasks import GCPCloudTask
+
+
+class ParticipantRebuildDispatcher:
+    # Default number of seconds dirty participants are collected before their rebuild is dispatched.  Coalescing
+    # is opt-in: pending ids only live in memory, so they are lost if the instance is killed during the window.
+    DEFAULT_WINDOW_SECONDS = 0
+    # Default number of pending participants that dispatches their rebuilds without waiting for the window.
+    DEFAULT_BATCH_SIZE = 100
+
+    def __init__(self, window_seconds=DEFAULT_WINDOW_SECONDS, batch_size=DEFAULT_BATCH_SIZE,
+                 project_id=config.GAE_PROJECT):
+        """
+        Collects the ids of participants changed by API writes and dispatches one rebuild_one_participant_task
+        per participant once per window, instead of a rebuild task for every write.
+
+        :param window_seconds: Number of seconds to collect participant ids before dispatching them.
+        :param batch_size: Number of pending participants that are dispatched without waiting for the end of
+            the window.
+        :param project_id: String identifier for the GAE project
+        """
+        self.window_seconds = window_seconds
+        self.batch_size = batch_size
+        self.project_id = project_id
+
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        # Participant ids marked dirty since the last dispatch, in the order they were first marked.
+        self._dirty = dict()
+        self._stats = {
+            'writes': 0,
+            'participants_dispatched': 0,
+            'dispatch_errors': 0
+        }
+
+    def mark_dirty(self, participant_id):
+        """ Record that a participant needs to be rebuilt """
+        with self._lock:
+            self._stats['writes'] += 1
+            self._dirty[int(participant_id)] = True
+            full_batch = len(self._dirty) >= self.batch_size
+            if not self._thread or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, daemon=True, name='participant-rebuild-dispatcher')
+                self._thread.start()
+        if full_batch:
+            self._wake.set()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.window_seconds)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self):
+        """
+        Dispatch rebuild tasks for all the dirty participants.
+        :return: Number of participants dispatched.
+        """
+        with self._lock:
+            participant_ids = list(self._dirty.keys())
+            self._dirty.clear()
+        if not participant_ids:
+            return 0
+
+        # The same task and queue as an undelayed write, so coalesced rebuilds behave like the per-write ones.
+        try:
+            result = GCPCloudTask().execute_batch(
+                'rebuild_one_participant_task', ({'p_id': participant_id} for participant_id in participant_ids),
+                in_seconds=5, project_id=self.project_id, queue='resource-tasks', quiet=True
+            )
+            failed_ids = [failure.payload['p_id'] for failure in result.failures]
+        except Exception:  # pylint: disable=broad-except
+            logging.error(f'Failed to dispatch rebuild tasks for {len(participant_ids)} participants.', exc_info=True)
+            failed_ids = participant_ids
+
+        if failed_ids:
+            logging.error(f'Rebuild tasks for {len(failed_ids)} participants were not created, will retry.')
+            with self._lock:
+                self._stats['dispatch_errors'] += 1
+                for participant_id in failed_ids:
+                    self._dirty.setdefault(participant_id, True)
+
+        dispatched = len(participant_ids) - len(failed_ids)
+        with self._lock:
+            self._stats['participants_dispatched'] += dispatched
+        if not dispatched:
+            return 0
+        stats = self.get_stats()
+        logging.info(f'Dispatched rebuilds for {dispatched} participants, '
+                     f'{stats["rebuilds_coalesced"]} rebuilds coalesced from {stats["writes"]} writes so far.')
+        return dispatched
+
+    def get_stats(self):
+        """
+        Return the dispatch metrics.  rebuilds_coalesced is the number of writes that did not need their own
+        rebuild, because the participant was already waiting to be rebuilt.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['pending'] = len(self._dirty)
+        stats['rebuilds_coalesced'] = stats['writes'] - stats['participants_dispatched'] - stats['pending']
+        return stats
+
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_rebuild_dispatcher():
+    """ Return the process wide dispatcher, configured from the participant rebuild config settings """
+    global _dispatcher
+    if _dispatcher is None:
+        with _dispatcher_lock:
+            if _dispatcher is None:
+                _dispatcher = ParticipantRebuildDispatcher(
+                    window_seconds=config.getSettingJson(config.PARTICIPANT_REBUILD_WINDOW_SECONDS,
+                                                         ParticipantRebuildDispatcher.DEFAULT_WINDOW_SECONDS),
+                    batch_size=config.getSettingJson(config.PARTICIPANT_REBUILD_BATCH_SIZE,
+                                                     ParticipantRebuildDispatcher.DEFAULT_BATCH_SIZE)
+                )
+                # Don't lose the pending rebuilds when the process shuts down.
+                atexit.register(_dispatcher.flush)
+    return _dispatcher
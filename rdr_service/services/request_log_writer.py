@@ -0,0 +1,241 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+
+from sqlalchemy import inspect
+
+from rdr_service import clock, config
+from rdr_service.dao.base_dao import BaseDao
+from rdr_service.model.requests_log import RequestsLog
+
+
+class RequestLogWriter:
+    # Overflow policies, for when the queue is full.
+    DROP = 'drop'  # Drop the new record.
+    BLOCK = 'block'  # Wait for space in the queue, then drop the record if there still isn't any.
+    SYNC = 'sync'  # Save the record in the request thread.
+    OVERFLOW_POLICIES = (DROP, BLOCK, SYNC)
+
+    DEFAULT_QUEUE_SIZE = 10000
+    DEFAULT_BATCH_SIZE = 500
+    DEFAULT_FLUSH_SECONDS = 2
+    # Seconds a request waits for space in the queue with the BLOCK policy.
+    BLOCK_TIMEOUT_SECONDS = 1
+    # Queued by drain() to wake the background thread, so it doesn't wait out the flush time.
+    _STOP = object()
+
+    def __init__(self, queue_size=DEFAULT_QUEUE_SIZE, batch_size=DEFAULT_BATCH_SIZE,
+                 flush_seconds=DEFAULT_FLUSH_SECONDS, overflow_policy=DROP):
+        """
+        Saves RequestsLog records from a background thread, so API requests don't wait for the insert.
+        Records are queued and written with multi-row inserts once batch_size records are waiting or
+        flush_seconds have passed since the first of them was queued.
+
+        :param queue_size: Maximum number of records waiting to be written.
+        :param batch_size: Maximum number of records written by each insert.
+        :param flush_seconds: Maximum number of seconds a record waits before it is written.
+        :param overflow_policy: What to do with a record when the queue is full, one of OVERFLOW_POLICIES.
+        """
+        if overflow_policy not in self.OVERFLOW_POLICIES:
+            raise ValueError(f'Invalid request log overflow policy "{overflow_policy}"')
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.overflow_policy = overflow_policy
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stopped = threading.Event()
+        self._column_keys = [attr.key for attr in inspect(RequestsLog).column_attrs if attr.key != 'id']
+        self._stats = {
+            'queued': 0,
+            'written': 0,
+            'batches': 0,
+            'dropped': 0,
+            'written_in_request': 0,
+            'write_errors': 0,
+            'max_queue_depth': 0,
+            'last_flush_seconds': None,
+            'max_flush_seconds': 0.0
+        }
+
+    def _make_row(self, log: RequestsLog):
+        """ Copy the record's values, the model listeners don't run for bulk inserts """
+        row = {key: getattr(log, key) for key in self._column_keys}
+        now = clock.CLOCK.now()
+        row['created'] = row['modified'] = now
+        # Don't try to save values greater than the max value for a signed 32-bit integer.
+        for key in ('participantId', 'fpk_id'):
+            if isinstance(row[key], int) and row[key] > 0x7FFFFFFF:
+                row[key] = 0
+        return row
+
+    def write(self, log: RequestsLog):
+        """ Queue the record to be saved """
+        row = self._make_row(log)
+        self._start()
+        try:
+            if self.overflow_policy == self.BLOCK:
+                self._queue.put(row, timeout=self.BLOCK_TIMEOUT_SECONDS)
+            else:
+                self._queue.put_nowait(row)
+        except queue.Full:
+            if self.overflow_policy == self.SYNC:
+                self._write_rows([row])
+                self._record('written_in_request')
+            else:
+                self._record('dropped')
+                logging.warning('Request log queue is full, dropped requests_log record.')
+            return
+
+        with self._lock:
+            self._stats['queued'] += 1
+            self._stats['max_queue_depth'] = max(self._stats['max_queue_depth'], self._queue.qsize())
+
+    def _start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        with self._lock:
+            if not self._thread or not self._thread.is_alive():
+                self._stopped.clear()
+                self._thread = threading.Thread(target=self._run, daemon=True, name='request-log-writer')
+                self._thread.start()
+
+    def _record(self, counter, count=1):
+        with self._lock:
+            self._stats[counter] += count
+
+    def _next_batch(self):
+        """ Wait for the first record, then collect records until the batch is full or the flush time is up """
+        try:
+            row = self._queue.get(timeout=self.flush_seconds)
+        except queue.Empty:
+            return []
+        if row is self._STOP:
+            return []
+        rows = [row]
+        deadline = time.monotonic() + self.flush_seconds
+        while len(rows) < self.batch_size and not self._stopped.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                row = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if row is self._STOP:
+                break
+            rows.append(row)
+        return rows
+
+    def _run(self):
+        while not self._stopped.is_set():
+            rows = self._next_batch()
+            if rows:
+                self._write_rows(rows)
+
+    def _write_rows(self, rows):
+        start = time.perf_counter()
+        dao = BaseDao(RequestsLog)
+        try:
+            with dao.session() as session:
+                session.bulk_insert_mappings(RequestsLog, rows)
+        except Exception:  # pylint: disable=broad-except
+            logging.error(f'Failed to save {len(rows)} requests_log records, saving them one at a time.',
+                          exc_info=True)
+            self._record('write_errors')
+            for row in rows:
+                self._write_row(dao, row)
+        else:
+            self._record('written', len(rows))
+
+        seconds = time.perf_counter() - start
+        with self._lock:
+            self._stats['batches'] += 1
+            self._stats['last_flush_seconds'] = seconds
+            self._stats['max_flush_seconds'] = max(self._stats['max_flush_seconds'], seconds)
+
+    def _write_row(self, dao, row):
+        # Like save_raw_request_record(), try again without the resource data if the record can't be saved.
+        for attempt_row in (row, dict(row, resource=None)):
+            try:
+                with dao.session() as session:
+                    session.bulk_insert_mappings(RequestsLog, [attempt_row])
+                self._record('written')
+                return
+            except Exception:  # pylint: disable=broad-except
+                logging.error('Failed to save requests_log record.', exc_info=True)
+        self._record('dropped')
+
+    def drain(self, timeout=None):
+        """
+        Stop the background thread and save all the queued records.
+        :param timeout: Maximum number of seconds to wait for the background thread to finish its batch.
+        """
+        self._stopped.set()
+        if self._thread:
+            try:
+                self._queue.put_nowait(self._STOP)
+            except queue.Full:
+                # The thread doesn't wait for records while the queue has some, it stops after its current batch.
+                pass
+            self._thread.join(timeout)
+        while True:
+            rows = []
+            while len(rows) < self.batch_size:
+                try:
+                    row = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if row is not self._STOP:
+                    rows.append(row)
+            if not rows:
+                break
+            self._write_rows(rows)
+        logging.info(f'Request log writer drained: {self.get_stats()}')
+
+    def get_stats(self):
+        """ Return the writer metrics, queue_depth is the number of records waiting to be written """
+        with self._lock:
+            stats = dict(self._stats)
+        stats['queue_depth'] = self._queue.qsize()
+        return stats
+
+
+_writer = None
+_writer_enabled = None
+_writer_lock = threading.Lock()
+
+
+def get_request_log_writer():
+    """
+    Return the process wide request log writer, configured from the request log writer config settings.
+    Returns None if requests_log records should be saved during the request.
+    """
+    global _writer, _writer_enabled
+    if _writer_enabled is None:
+        with _writer_lock:
+            if _writer_enabled is None:
+                if config.getSettingJson(config.REQUEST_LOG_WRITER_ENABLED, False):
+                    _writer = RequestLogWriter(
+                        queue_size=config.getSettingJson(config.REQUEST_LOG_QUEUE_SIZE,
+                                                         RequestLogWriter.DEFAULT_QUEUE_SIZE),
+                        batch_size=config.getSettingJson(config.REQUEST_LOG_BATCH_SIZE,
+                                                         RequestLogWriter.DEFAULT_BATCH_SIZE),
+                        flush_seconds=config.getSettingJson(config.REQUEST_LOG_FLUSH_SECONDS,
+                                                            RequestLogWriter.DEFAULT_FLUSH_SECONDS),
+                        overflow_policy=config.getSettingJson(config.REQUEST_LOG_OVERFLOW_POLICY,
+                                                              RequestLogWriter.DROP)
+                    )
+                    # Don't lose the queued records when the process shuts down.
+                    atexit.register(_writer.drain)
+                _writer_enabled = _writer is not None
+    return _writer
+
+
+def drain_request_log_writer(timeout=None):
+    """ Save any queued requests_log records, if the writer has been used by this process """
+    if _writer is not None:
+        _writer.drain(timeout)
@@ -0,0 +1,86 @@
+import json
+import threading
+from collections import OrderedDict
+
+
+class VersionedResponseCache:
+    # Default maximum number of bytes of cached responses, measured as their JSON size.
+    DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        """
+        Caches API responses built from data that only changes as a whole, when a new version of it is
+        published.  All the cached responses are dropped when a request sees a new data version.
+
+        :param max_bytes: Maximum JSON size of the cached responses, the least recently used are removed first.
+            Zero disables the cache.
+        """
+        self.max_bytes = max_bytes
+
+        self._lock = threading.Lock()
+        self._version = None
+        # Cache key -> (response, JSON size), least recently used first.
+        self._entries = OrderedDict()
+        self._size_bytes = 0
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'invalidations': 0
+        }
+
+    def get(self, key, version, load):
+        """
+        Return the cached response for the key and data version, calling load() to build it if it isn't cached.
+        Responses for a version of None are never cached.
+        """
+        if not self.max_bytes or version is None:
+            return load()
+
+        with self._lock:
+            if version != self._version:
+                if self._version is not None:
+                    self._stats['invalidations'] += 1
+                self._clear_entries()
+                self._version = version
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._stats['hits'] += 1
+                return entry[0]
+            self._stats['misses'] += 1
+
+        response = load()
+        size = len(json.dumps(response, default=str))
+        with self._lock:
+            # Don't cache a response built from a version that was replaced while it was loading.
+            if version == self._version and size <= self.max_bytes:
+                previous = self._entries.pop(key, None)
+                if previous is not None:
+                    self._size_bytes -= previous[1]
+                self._entries[key] = (response, size)
+                self._size_bytes += size
+                while self._size_bytes > self.max_bytes:
+                    _, (_, evicted_size) = self._entries.popitem(last=False)
+                    self._size_bytes -= evicted_size
+                    self._stats['evictions'] += 1
+        return response
+
+    def _clear_entries(self):
+        self._entries.clear()
+        self._size_bytes = 0
+
+    def clear(self):
+        with self._lock:
+            self._clear_entries()
+            self._version = None
+            for counter in self._stats:
+                self._stats[counter] = 0
+
+    def get_stats(self):
+        """ Return the cache metrics, invalidations are the times a new data version dropped the cache """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = len(self._entries)
+            stats['size_bytes'] = self._size_bytes
+        return stats
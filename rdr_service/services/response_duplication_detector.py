@@ -78,6 +78,7 @@ class ResponseDuplicationDetector:
         :param duplicate_responses:  List of questionnaire_response_id values that have been marked as DUPLICATE
         :param session:  A get_database().session() object
         :param project:  project name
+        :return:  List of the participant ids whose rebuild tasks could not be created
         """
         # TODO:  Update to programmatically request deletion of PDR PostgreSQL records via pub/sub in the new
         # RDR-PDR pipeline.  Currently, corresponding records already populated over in PDR database(s) must be manually
@@ -107,16 +108,20 @@ class ResponseDuplicationDetector:
                     ).group_by(QuestionnaireResponse.participantId
                     ).all()
         pid_list = [{'pid': p.participantId} for p in participants]
-        task = GCPCloudTask()
-        for batch in list_chunks(pid_list, 100):
-            # Just want to rebuild the participant summary data (not the full modules), to remove remaining references
-            # to the newly flagged duplicate responses from the participant summary / participant_module nested data
-            payload = {'build_modules': False, 'batch': batch}
-            if project == 'localhost':    # e.g., unittest case
+        # Just want to rebuild the participant summary data (not the full modules), to remove remaining references
+        # to the newly flagged duplicate responses from the participant summary / participant_module nested data
+        payloads = ({'build_modules': False, 'batch': batch} for batch in list_chunks(pid_list, 100))
+        if project == 'localhost':    # e.g., unittest case
+            for payload in payloads:
                 batch_rebuild_participants_task(payload)
-            else:
-                task.execute('rebuild_participants_task', payload=payload, project_id=project,
-                             queue='resource-rebuild', in_seconds=15, quiet=True)
+            return []
+
+        result = GCPCloudTask().execute_batch('rebuild_participants_task', payloads, project_id=project,
+                                              queue='resource-rebuild', in_seconds=15, quiet=True)
+        failed_pids = [item['pid'] for failure in result.failures for item in failure.payload['batch']]
+        if failed_pids:
+            logging.error(f'Rebuild tasks not created for participants with duplicate responses: {failed_pids}')
+        return failed_pids
 
     def flag_duplicate_responses(self, num_days_ago=2, from_ts=datetime.utcnow()):
         """
@@ -0,0 +1,102 @@
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+
+from rdr_service import config, singletons
+from rdr_service.clock import CLOCK
+
+
+class SurveyDefinitionCache:
+    # Default number of seconds a loaded definition is used before it is loaded again.
+    DEFAULT_TTL_SECONDS = 3600
+    # Default maximum number of questionnaire versions cached.
+    DEFAULT_MAX_SIZE = 200
+
+    def __init__(self, ttl_seconds=DEFAULT_TTL_SECONDS, max_size=DEFAULT_MAX_SIZE):
+        """
+        Caches the definitions loaded for each version of a questionnaire, so they're shared by all the
+        responses submitted for it instead of being loaded again for each of them.  Cached definitions are
+        shared between threads, so they must not be changed once they are loaded.
+
+        :param ttl_seconds: Maximum number of seconds a definition is cached, zero disables the cache.
+        :param max_size: Maximum number of definitions cached, the least recently used are removed first.
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+
+        self._lock = threading.Lock()
+        # (questionnaire id, version) -> (definition, expiration time), least recently used first.
+        self._entries = OrderedDict()
+        # Questionnaire id -> number of times its definitions were invalidated.
+        self._generations = {}
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'invalidations': 0
+        }
+
+    def get(self, questionnaire_id, version, load):
+        """
+        Return the cached definition for the questionnaire version, calling load() to build it if it isn't cached.
+        Definitions of None aren't cached.
+        """
+        if not self.ttl_seconds:
+            return load()
+
+        key = (questionnaire_id, version)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[1] > CLOCK.now():
+                    self._entries.move_to_end(key)
+                    self._stats['hits'] += 1
+                    return entry[0]
+                del self._entries[key]
+            self._stats['misses'] += 1
+            generation = self._generations.get(questionnaire_id, 0)
+
+        definition = load()
+        with self._lock:
+            # Don't cache a definition that was loaded while the questionnaire was being updated.
+            if definition is not None and generation == self._generations.get(questionnaire_id, 0):
+                self._entries[key] = (definition, CLOCK.now() + timedelta(seconds=self.ttl_seconds))
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+                    self._stats['evictions'] += 1
+        return definition
+
+    def invalidate(self, questionnaire_id):
+        """ Drop the cached definitions of every version of the questionnaire """
+        with self._lock:
+            self._generations[questionnaire_id] = self._generations.get(questionnaire_id, 0) + 1
+            for key in [key for key in self._entries if key[0] == questionnaire_id]:
+                del self._entries[key]
+            self._stats['invalidations'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            for counter in self._stats:
+                self._stats[counter] = 0
+
+    def get_stats(self):
+        """ Return the cache metrics, invalidations are the times a questionnaire update dropped its definitions """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = len(self._entries)
+        return stats
+
+
+def get_survey_definition_cache():
+    """ Return the process wide cache of survey definitions, configured from the survey definition cache settings """
+    return singletons.get(
+        singletons.SURVEY_DEFINITION_CACHE_INDEX,
+        lambda: SurveyDefinitionCache(
+            ttl_seconds=config.getSettingJson(config.SURVEY_DEFINITION_CACHE_TTL_SECONDS,
+                                              SurveyDefinitionCache.DEFAULT_TTL_SECONDS),
+            max_size=config.getSettingJson(config.SURVEY_DEFINITION_CACHE_MAX_SIZE,
+                                           SurveyDefinitionCache.DEFAULT_MAX_SIZE)
+        )
+    )
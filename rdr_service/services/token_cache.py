@@ -0,0 +1,137 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Callable, Optional, Tuple
+
+from rdr_service.clock import CLOCK
+
+
+class _PendingVerification:
+    """ A verification in progress, that requests for the same token wait on """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.user_email = None
+        self.error = None
+
+
+class TokenVerificationCache:
+    # Default number of seconds a verified token is trusted without checking it again.
+    DEFAULT_TTL_SECONDS = 300
+    # Default number of seconds a token is trusted when Google didn't say when it expires.
+    DEFAULT_UNKNOWN_EXPIRY_TTL_SECONDS = 30
+    # Default maximum number of tokens kept in the cache.
+    DEFAULT_MAX_SIZE = 10000
+
+    def __init__(self, verify: Callable[[str], Tuple[str, Optional[int]]], ttl_seconds=DEFAULT_TTL_SECONDS,
+                 max_size=DEFAULT_MAX_SIZE, unknown_expiry_ttl_seconds=DEFAULT_UNKNOWN_EXPIRY_TTL_SECONDS):
+        """
+        Caches the email verified for each bearer token, so a client sending the same token with every request
+        doesn't need an authentication call to Google for each of them.  Only a hash of the token is stored.
+
+        A token that is revoked, or expires without Google having said when, keeps being accepted until its
+        cache entry expires: for up to unknown_expiry_ttl_seconds when the expiry isn't known (the userinfo
+        endpoint doesn't return it), otherwise for up to ttl_seconds but never past the token's expiry.
+
+        :param verify: Function verifying a token, returning the user email and the number of seconds until the
+            token expires (None when that isn't known).  Exceptions raised are passed on to every request
+            waiting for the verification, and nothing is cached.
+        :param ttl_seconds: Maximum number of seconds a verified token is cached, zero disables the cache.
+        :param max_size: Maximum number of tokens cached, the least recently used are removed first.
+        :param unknown_expiry_ttl_seconds: Maximum number of seconds a token is cached when verify doesn't
+            return its expiry.
+        """
+        self.verify = verify
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self.unknown_expiry_ttl_seconds = unknown_expiry_ttl_seconds
+
+        self._lock = threading.Lock()
+        # Token hash -> (user email, expiration time), least recently used first.
+        self._entries = OrderedDict()
+        # Token hash -> verification in progress.
+        self._pending = {}
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'waits': 0,
+            'errors': 0,
+            'evictions': 0
+        }
+
+    @staticmethod
+    def _hash(token):
+        return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+    def get_user_email(self, token):
+        """ Return the email for the token, verifying it if it isn't cached """
+        if not self.ttl_seconds:
+            return self.verify(token)[0]
+
+        key = self._hash(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[1] > CLOCK.now():
+                    self._entries.move_to_end(key)
+                    self._stats['hits'] += 1
+                    return entry[0]
+                del self._entries[key]
+
+            pending = self._pending.get(key)
+            is_verifying = pending is None
+            if is_verifying:
+                self._stats['misses'] += 1
+                pending = self._pending[key] = _PendingVerification()
+            else:
+                self._stats['waits'] += 1
+
+        if not is_verifying:
+            pending.done.wait()
+            if pending.error is not None:
+                raise pending.error
+            return pending.user_email
+
+        return self._verify(key, token, pending)
+
+    def _verify(self, key, token, pending):
+        try:
+            user_email, expires_in = self.verify(token)
+        except Exception as e:
+            with self._lock:
+                self._stats['errors'] += 1
+                del self._pending[key]
+            pending.error = e
+            pending.done.set()
+            raise
+
+        if expires_in is None:
+            expires_in = self.unknown_expiry_ttl_seconds
+        ttl_seconds = min(self.ttl_seconds, expires_in)
+        with self._lock:
+            if ttl_seconds > 0:
+                self._entries[key] = (user_email, CLOCK.now() + timedelta(seconds=ttl_seconds))
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+                    self._stats['evictions'] += 1
+            del self._pending[key]
+        pending.user_email = user_email
+        pending.done.set()
+        return user_email
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            for counter in self._stats:
+                self._stats[counter] = 0
+
+    def get_stats(self):
+        """
+        Return the cache metrics.  Waits are requests that shared the verification of another request
+        for the same token.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = len(self._entries)
+        return stats
@@ -1,10 +1,24 @@
+import logging
 import threading
+import time
 from datetime import timedelta
 
 from rdr_service.clock import CLOCK
 
+# Guards creation of the per-index locks and stats; each cache index is loaded under its own lock.
 singletons_lock = threading.RLock()
 singletons_map = {}
+_index_locks = {}
+# Cache index -> background refresh thread, while a refresh is running.
+_refresh_threads = {}
+# Cache index -> generation number, incremented by invalidate() so in-flight refreshes are discarded.
+_generations = {}
+# Cache index -> time the last background refresh failed, cleared when the value is loaded.
+_refresh_failures = {}
+# Fraction of the TTL to wait after a failed background refresh before starting another one.
+REFRESH_RETRY_TTL_FRACTION = 0.1
+# Cache index -> (lock, stats), each index's stats have their own lock so cache hits don't share one lock.
+_stats = {}
 
 CODE_CACHE_INDEX = 0
 HPO_CACHE_INDEX = 1
@@ -18,11 +32,76 @@ BACKUP_SQL_DATABASE_INDEX = 8
 ALEMBIC_SQL_DATABASE_INDEX = 9
 READ_UNCOMMITTED_DATABASE_INDEX = 10
 BASICS_PROFILE_UPDATE_CODES_CACHE_INDEX = 11
+GCS_CLIENT_INDEX = 12
+SURVEY_DEFINITION_CACHE_INDEX = 13
+MESSAGE_BROKER_TOKEN_CACHE_INDEX = 14
 
 
 def reset_for_tests():
+    for thread in list(_refresh_threads.values()):
+        thread.join()
     with singletons_lock:
         singletons_map.clear()
+        _generations.clear()
+        _refresh_failures.clear()
+        _stats.clear()
+
+
+def _index_lock(cache_index):
+    lock = _index_locks.get(cache_index)
+    if lock is None:
+        with singletons_lock:
+            lock = _index_locks.setdefault(cache_index, threading.RLock())
+    return lock
+
+
+def _index_stats(cache_index):
+    index_stats = _stats.get(cache_index)
+    if index_stats is None:
+        with singletons_lock:
+            index_stats = _stats.setdefault(cache_index, (threading.Lock(), {
+                'hits': 0,
+                'stale_hits': 0,
+                'misses': 0,
+                'refreshes': 0,
+                'refreshes_discarded': 0,
+                'refresh_errors': 0,
+                'last_refresh_seconds': None,
+                'max_refresh_seconds': 0.0,
+                'total_refresh_seconds': 0.0
+            }))
+    return index_stats
+
+
+def _record(cache_index, counter, refresh_seconds=None):
+    stats_lock, stats = _index_stats(cache_index)
+    with stats_lock:
+        stats[counter] += 1
+        if refresh_seconds is not None:
+            stats['last_refresh_seconds'] = refresh_seconds
+            stats['max_refresh_seconds'] = max(stats['max_refresh_seconds'], refresh_seconds)
+            stats['total_refresh_seconds'] += refresh_seconds
+
+
+def get_stats(cache_index=None):
+    """
+    Return a copy of the cache statistics.  Misses are synchronous loads, stale hits are expired values that
+    were returned while a background refresh ran.  Discarded refreshes finished after the cache was invalidated
+    or reloaded, so their values weren't stored.
+    :param cache_index: Return the stats of a single cache index, otherwise a dict of stats by cache index.
+    """
+    if cache_index is not None:
+        index_stats = _stats.get(cache_index)
+        if index_stats is None:
+            return {}
+        stats_lock, stats = index_stats
+        with stats_lock:
+            return dict(stats)
+    all_stats = {}
+    for index, (stats_lock, stats) in list(_stats.items()):
+        with stats_lock:
+            all_stats[index] = dict(stats)
+    return all_stats
 
 
 def _get(cache_index):
@@ -32,28 +111,103 @@ def _get(cache_index):
     return None
 
 
-def get(cache_index, constructor, cache_ttl_seconds=None, **kwargs):
+def _load(cache_index, constructor, cache_ttl_seconds, kwargs):
+    """ Build a new instance and store it, the caller must hold the index lock """
+    start = time.perf_counter()
+    new_instance = constructor(**kwargs)
+    expiration_time = None
+    if cache_ttl_seconds is not None:
+        expiration_time = CLOCK.now() + timedelta(seconds=cache_ttl_seconds)
+    singletons_map[cache_index] = (new_instance, expiration_time)
+    _refresh_failures.pop(cache_index, None)
+    _record(cache_index, 'refreshes', time.perf_counter() - start)
+    return new_instance
+
+
+def _refresh(cache_index, constructor, cache_ttl_seconds, kwargs, generation):
+    """ Background refresh of an expired entry, which keeps being served until the new instance is ready """
+    start = time.perf_counter()
+    try:
+        new_instance = constructor(**kwargs)
+    except Exception:  # pylint: disable=broad-except
+        logging.error(f'Failed to refresh singleton cache {cache_index}, serving the expired value.', exc_info=True)
+        _record(cache_index, 'refresh_errors')
+        with _index_lock(cache_index):
+            _refresh_failures[cache_index] = CLOCK.now()
+            _refresh_threads.pop(cache_index, None)
+        return
+
+    with _index_lock(cache_index):
+        # Drop the result if the cache was invalidated or reloaded while we were building it.
+        is_current = _generations.get(cache_index, 0) == generation
+        if is_current:
+            expiration_time = CLOCK.now() + timedelta(seconds=cache_ttl_seconds)
+            singletons_map[cache_index] = (new_instance, expiration_time)
+            _refresh_failures.pop(cache_index, None)
+        _refresh_threads.pop(cache_index, None)
+    if is_current:
+        _record(cache_index, 'refreshes', time.perf_counter() - start)
+    else:
+        _record(cache_index, 'refreshes_discarded')
+
+
+def _get_stale(cache_index, constructor, cache_ttl_seconds, max_stale_seconds, kwargs):
+    """ Return an expired value and start a background refresh, if the value is not older than max staleness """
+    existing_pair = singletons_map.get(cache_index)
+    if not existing_pair or existing_pair[1] is None:
+        return None
+    if max_stale_seconds is None:
+        max_stale_seconds = cache_ttl_seconds
+    if existing_pair[1] + timedelta(seconds=max_stale_seconds) < CLOCK.now():
+        return None
+
+    # Keep serving the expired value without retrying for a while after a failed refresh, so a failing
+    # constructor isn't called on every request.
+    last_failure = _refresh_failures.get(cache_index)
+    retry_time = last_failure and last_failure + timedelta(seconds=cache_ttl_seconds * REFRESH_RETRY_TTL_FRACTION)
+    if cache_index not in _refresh_threads and not (retry_time and retry_time > CLOCK.now()):
+        thread = threading.Thread(target=_refresh, daemon=True, name=f'singleton-refresh-{cache_index}',
+                                  args=(cache_index, constructor, cache_ttl_seconds, kwargs,
+                                        _generations.get(cache_index, 0)))
+        _refresh_threads[cache_index] = thread
+        thread.start()
+    return existing_pair[0]
+
+
+def get(cache_index, constructor, cache_ttl_seconds=None, stale_while_revalidate=False, max_stale_seconds=None,
+        **kwargs):
     """Get a cache with a specified index from the list above. If not initialized, use
-  constructor to initialize it; if cache_ttl_seconds is set, reload it after that period."""
+  constructor to initialize it; if cache_ttl_seconds is set, reload it after that period.
+
+  With stale_while_revalidate set, an expired value keeps being returned while a single background
+  thread reloads it. Values expired for longer than max_stale_seconds (defaults to the TTL) are
+  reloaded synchronously."""
     # First try without a lock
     result = _get(cache_index)
     if result:
+        _record(cache_index, 'hits')
         return result
 
-    # Then grab the lock and try again
-    with singletons_lock:
+    # Then grab the lock for this index and try again
+    with _index_lock(cache_index):
         result = _get(cache_index)
         if result:
+            _record(cache_index, 'hits')
             return result
-        else:
-            new_instance = constructor(**kwargs)
-            expiration_time = None
-            if cache_ttl_seconds is not None:
-                expiration_time = CLOCK.now() + timedelta(seconds=cache_ttl_seconds)
-            singletons_map[cache_index] = (new_instance, expiration_time)
-            return new_instance
+        if stale_while_revalidate and cache_ttl_seconds is not None:
+            result = _get_stale(cache_index, constructor, cache_ttl_seconds, max_stale_seconds, kwargs)
+            if result:
+                _record(cache_index, 'stale_hits')
+                return result
+
+        _record(cache_index, 'misses')
+        new_instance = _load(cache_index, constructor, cache_ttl_seconds, kwargs)
+        # Any background refresh still running for this index is now out of date.
+        _generations[cache_index] = _generations.get(cache_index, 0) + 1
+        return new_instance
 
 
 def invalidate(cache_index):
-    with singletons_lock:
+    with _index_lock(cache_index):
         singletons_map[cache_index] = None
+        _generations[cache_index] = _generations.get(cache_index, 0) + 1
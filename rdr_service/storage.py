@@ -8,16 +8,23 @@ import datetime
 import hashlib
 import pathlib
 import tempfile
+import threading
 
 from contextlib import ContextDecorator
 from abc import ABC, abstractmethod
 
+import google.auth
 from google.api_core.exceptions import RequestRangeNotSatisfiable
+from google.auth.transport.requests import AuthorizedSession
 from google.cloud import storage
 from google.cloud.exceptions import GatewayTimeout
 from google.cloud.storage import Blob
 from google.cloud._helpers import UTC
 from google.cloud._helpers import _RFC3339_MICROS
+from requests.adapters import HTTPAdapter
+
+from rdr_service import singletons
+from rdr_service.clock import CLOCK
 from rdr_service.provider import Provider
 
 
@@ -123,7 +130,8 @@ class LocalFilesystemStorageProvider(StorageProvider):
             updated = datetime.datetime.utcfromtimestamp(os.path.getmtime(file)).replace(tzinfo=UTC)
             updated = updated.strftime(_RFC3339_MICROS)
             properties = {
-                'updated': updated
+                'updated': updated,
+                'etag': self.md5_checksum(file)
             }
             blob = self._make_blob(blob_name, bucket=None, properties=properties)
             blob_list.append(blob)
@@ -131,6 +139,7 @@ class LocalFilesystemStorageProvider(StorageProvider):
 
     def upload_from_file(self, source_file, path):
         path = self._get_local_path(path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
         shutil.copyfile(source_file, path)
 
     def upload_from_string(self, contents, path):
@@ -148,6 +157,9 @@ class LocalFilesystemStorageProvider(StorageProvider):
         os.makedirs(os.path.dirname(destination_path), exist_ok=True)
         shutil.copy(source_path, destination_path)
 
+    def download_blob(self, source_path, destination_path):
+        shutil.copyfile(self._get_local_path(source_path), destination_path)
+
     def get_local_path(self, path):
         return self._get_local_path(path)
 
@@ -172,8 +184,7 @@ class LocalFilesystemStorageProvider(StorageProvider):
 
 class GoogleCloudStorageFile(ContextDecorator):
 
-    _lines = None
-    _line = 0
+    _line_reader = None
     _w_temp_file = None
 
     def __init__(self, provider=None, blob=None):
@@ -220,20 +231,33 @@ class GoogleCloudStorageFile(ContextDecorator):
         self.dirty = False
 
     def __next__(self):
-        if not self._lines:
-            self._filedata = self.read()
-            self._lines = self._filedata.decode('utf-8').splitlines()
+        line = self.readline()
+        if not line:
+            raise StopIteration
+        return line.rstrip('\r\n')
 
-        if self._line < len(self._lines):
-            data = self._lines[self._line]
-            self._line += 1
-            return data
-        raise StopIteration
+    def readline(self):
+        """
+        Return the next line from the blob, including the line terminator, or an empty string
+        once the end of the blob has been reached. The blob is streamed in chunks, so only the
+        current chunk and any partial line carried over from the previous chunk are held in memory.
+        """
+        if self._line_reader is None:
+            self._line_reader = self._iter_raw_lines()
+        line = next(self._line_reader, None)
+        if line is None:
+            return ''
+        return line.decode('utf-8')
 
     def __enter__(self):
         return self
 
     def __exit__(self, *exc):
+        if exc[0] is not None and self._w_temp_file is not None:
+            # Don't upload a file that was only partly written.
+            self._w_temp_file.close()
+            os.unlink(self._w_temp_file.name)
+            self._w_temp_file = None
         self.close()
         return False
 
@@ -253,91 +277,160 @@ class GoogleCloudStorageFile(ContextDecorator):
             else:
                 break
 
+    def _iter_raw_lines(self):
+        """
+        Yield each line of the blob as bytes, including the trailing newline. Newlines are found
+        with bytes.split() on each downloaded chunk, and any partial line at the end of a chunk is
+        carried over and joined with the start of the next one. A newline byte can never appear
+        inside a multi-byte UTF-8 sequence, so each yielded line can be safely decoded on its own.
+        """
+        partial = []
+        for chunk in self.iter_chunks():
+            lines = chunk.split(b'\n')
+            if len(lines) == 1:
+                # No newline in this chunk, the whole chunk belongs to the current line.
+                partial.append(chunk)
+                continue
+            if partial:
+                partial.append(lines[0])
+                lines[0] = b''.join(partial)
+                partial = []
+            last = lines.pop()
+            for line in lines:
+                yield line + b'\n'
+            if last:
+                partial.append(last)
+        if partial:
+            yield b''.join(partial)
+
     def iter_lines(self):
-        buffer = io.StringIO()
-        chunks = self.iter_chunks()
-        for chunk in chunks:
-            for character in chunk.decode('utf-8'):
-                if character == '\n':
-                    buffer.seek(0)
-                    yield buffer.read()
-                    buffer.seek(0)
-                    buffer.truncate(0)
-                else:
-                    buffer.write(character)
-        if buffer.tell() > 0:
-            buffer.seek(0)
-            yield buffer.read()
+        for line in self._iter_raw_lines():
+            yield line.decode('utf-8').rstrip('\n')
 
 
 class GoogleCloudStorageProvider(StorageProvider):
+    """
+    Google Cloud Storage provider. A single storage client, and its pooled keep-alive HTTP session, is shared
+    by every provider instance in the process. Buckets are only fetched when bucket metadata is needed and the
+    fetched handles are cached for BUCKET_CACHE_TTL_SECONDS, blob reads and writes use lazy bucket handles that
+    do not make any metadata requests.
+    """
+    BUCKET_CACHE_TTL_SECONDS = 600
+    HTTP_POOL_SIZE = 32
+
+    _bucket_lock = threading.RLock()
+    _bucket_cache = {}
+    _stats = {
+        'client_requests': 0,
+        'clients_created': 0,
+        'bucket_requests': 0,
+        'buckets_fetched': 0,
+        'bucket_lookups_skipped': 0
+    }
+
+    @classmethod
+    def _create_client(cls):
+        credentials, project = google.auth.default(scopes=storage.Client.SCOPE)
+        session = AuthorizedSession(credentials)
+        adapter = HTTPAdapter(pool_connections=cls.HTTP_POOL_SIZE, pool_maxsize=cls.HTTP_POOL_SIZE)
+        session.mount('https://', adapter)
+        with cls._bucket_lock:
+            cls._stats['clients_created'] += 1
+        return storage.Client(project=project, _http=session)
+
+    @classmethod
+    def get_client(cls):
+        """ Return the storage client shared by the process, creating it if needed. """
+        with cls._bucket_lock:
+            cls._stats['client_requests'] += 1
+        return singletons.get(singletons.GCS_CLIENT_INDEX, cls._create_client)
+
+    def _get_bucket(self, bucket_name):
+        """ Return a bucket with its metadata loaded, re-using a cached copy if it hasn't expired. """
+        with self._bucket_lock:
+            self._stats['bucket_requests'] += 1
+            cached = self._bucket_cache.get(bucket_name)
+            if cached and cached[1] >= CLOCK.now():
+                return cached[0]
+
+        bucket = self.get_client().get_bucket(bucket_name)
+        with self._bucket_lock:
+            self._stats['buckets_fetched'] += 1
+            expiration_time = CLOCK.now() + datetime.timedelta(seconds=self.BUCKET_CACHE_TTL_SECONDS)
+            self._bucket_cache[bucket_name] = (bucket, expiration_time)
+        return bucket
 
-    def open(self, path, mode):
-        client = storage.Client()
+    def _get_lazy_blob(self, path):
+        """ Return a blob handle for the path without making any bucket or blob metadata requests. """
         bucket_name, blob_name = self._parse_path(path)
-        bucket = client.get_bucket(bucket_name)
-        blob = storage.blob.Blob(blob_name, bucket)
-        return GoogleCloudStorageFile(self, blob)
+        with self._bucket_lock:
+            self._stats['bucket_lookups_skipped'] += 1
+        return self.get_client().bucket(bucket_name).blob(blob_name)
+
+    @classmethod
+    def get_stats(cls):
+        """
+        Return the client and bucket usage counters, including how many client and bucket
+        constructions were avoided by re-using the shared client and cached or lazy buckets.
+        """
+        with cls._bucket_lock:
+            stats = dict(cls._stats)
+        stats['clients_avoided'] = stats['client_requests'] - stats['clients_created']
+        stats['buckets_avoided'] = \
+            stats['bucket_requests'] - stats['buckets_fetched'] + stats['bucket_lookups_skipped']
+        return stats
+
+    @classmethod
+    def clear_cache(cls):
+        """ Drop the shared client and all cached buckets, and reset the usage counters. """
+        singletons.invalidate(singletons.GCS_CLIENT_INDEX)
+        with cls._bucket_lock:
+            cls._bucket_cache.clear()
+            for key in cls._stats:
+                cls._stats[key] = 0
+
+    def open(self, path, mode):
+        return GoogleCloudStorageFile(self, self._get_lazy_blob(path))
 
     def lookup(self, bucket_name):
-        client = storage.Client()
         _bucket_name = self._parse_bucket(bucket_name)
-        return client.lookup_bucket(_bucket_name)
+        return self.get_client().lookup_bucket(_bucket_name)
 
     def list(self, bucket_name, prefix):
-        client = storage.Client()
         _bucket_name = self._parse_bucket(bucket_name)
-        return client.list_blobs(_bucket_name, prefix=prefix)
+        return self.get_client().list_blobs(_bucket_name, prefix=prefix)
 
     def get_blob(self, bucket_name, blob_name):
-        client = storage.Client()
         _bucket_name = self._parse_bucket(bucket_name)
-        bucket = client.get_bucket(_bucket_name)
+        bucket = self._get_bucket(_bucket_name)
         return bucket.get_blob(blob_name)
 
     def upload_from_file(self, source_file, path):
-        client = storage.Client()
-        bucket_name, blob_name = self._parse_path(path)
-        bucket = client.get_bucket(bucket_name)
-        blob = bucket.blob(blob_name)
+        blob = self._get_lazy_blob(path)
         blob.upload_from_filename(source_file)
 
     def upload_from_string(self, contents, path):
-        client = storage.Client()
-        bucket_name, blob_name = self._parse_path(path)
-        bucket = client.get_bucket(bucket_name)
-        blob = Blob(blob_name, bucket)
+        blob = self._get_lazy_blob(path)
         blob.upload_from_string(contents)
 
     def delete(self, path):
-        client = storage.Client()
-        bucket_name, blob_name = self._parse_path(path)
-        bucket = client.get_bucket(bucket_name)
-        blob = storage.blob.Blob(blob_name, bucket)
+        blob = self._get_lazy_blob(path)
         blob.delete()
 
     def copy_blob(self, source_path, destination_path):
-        source_bucket_name, source_blob_name = self._parse_path(source_path)
+        source_blob = self._get_lazy_blob(source_path)
         destination_bucket_name, destination_blob_name = self._parse_path(destination_path)
-        storage_client = storage.Client()
-        source_bucket = storage_client.get_bucket(source_bucket_name)
-        source_blob = source_bucket.blob(source_blob_name)
-        destination_bucket = storage_client.get_bucket(destination_bucket_name)
+        destination_bucket = self.get_client().bucket(destination_bucket_name)
 
-        source_bucket.copy_blob(source_blob, destination_bucket, destination_blob_name)
+        source_blob.bucket.copy_blob(source_blob, destination_bucket, destination_blob_name)
 
     def download_blob(self, source_path, destination_path):
-        source_bucket_name, source_blob_name = self._parse_path(source_path)
-        storage_client = storage.Client()
-        source_bucket = storage_client.get_bucket(source_bucket_name)
-        source_blob = source_bucket.blob(source_blob_name)
+        source_blob = self._get_lazy_blob(source_path)
         source_blob.download_to_filename(destination_path)
 
     def exists(self, path):
-        bucket_name, blob_name = self._parse_path(path)
-        client = storage.Client()
-        bucket = client.bucket(bucket_name)
-        blob = storage.Blob(bucket=bucket, name=blob_name)
+        client = self.get_client()
+        blob = self._get_lazy_blob(path)
 
         retry = 3
         while retry:
@@ -0,0 +1,1005 @@
+#! /bin/env python
+#
+# Performance benchmarks for RDR components, run against local resources.
+#
+
+import argparse
+# pylint: disable=superfluous-parens
+# pylint: disable=broad-except
+# pylint: disable=protected-access
+import csv
+import datetime
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import namedtuple
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from zipfile import ZipFile
+
+from sqlalchemy import func, text
+from sqlalchemy.orm import subqueryload
+
+from rdr_service import clock
+from rdr_service.api.public_metrics_api import PublicMetricsApi
+from rdr_service.cloud_utils.gcp_cloud_tasks import GCPCloudTask, InMemoryCloudTasksClient
+from rdr_service.config import GENOME_TYPE_ARRAY
+from rdr_service.dao.hpo_dao import HPODao
+from rdr_service.dao.metrics_cache_dao import MetricsCacheJobStatusDao
+from rdr_service.dao.participant_summary_dao import ParticipantSummaryDao
+from rdr_service.dao.questionnaire_response_dao import QuestionnaireResponseDao
+from rdr_service.dao.genomics_dao import GenomicFileProcessedDao, GenomicJobRunDao, GenomicSetDao
+from rdr_service.dao.resource_dao import ResourceDataDao
+from rdr_service.dao.resource_search_dao import ResourceSearchDao
+from rdr_service.genomic.genomic_job_components import GenomicFileIngester, ManifestCompiler, \
+    ManifestDefinitionProvider
+from rdr_service.genomic.genomic_job_controller import GenomicJobController
+from rdr_service.genomic_enums import GenomicJob, GenomicManifestTypes, GenomicWorkflowState
+from rdr_service.message_broker.delivery import MessageSender, get_access_token_cache
+from rdr_service.message_broker.message_broker import PtscMessageBroker
+from rdr_service.model.config_utils import to_client_biobank_id
+from rdr_service.model.consent_file import ConsentType
+from rdr_service.model.genomics import GenomicFileProcessed, GenomicJobRun, GenomicSet, GenomicSetMember
+from rdr_service.model.message_broker import MessageBrokerRecord
+from rdr_service.model.participant_summary import ParticipantSummary
+from rdr_service.model.questionnaire_response import QuestionnaireResponse
+from rdr_service.model.resource_data import ResourceData
+from rdr_service.model.resource_schema import ResourceSchema
+from rdr_service.model.resource_search_results import ResourceSearchResults
+from rdr_service.model.resource_type import ResourceType
+from rdr_service.model.site import Site
+from rdr_service.offline.sql_exporter import SqlExporter
+from rdr_service.offline.sync_consent_files import CloudStorageSyncEngine
+from rdr_service.resource.schemas import ParticipantSchema
+from rdr_service.resource.tasks import batch_rebuild_participants_task
+from rdr_service.storage import GoogleCloudStorageFile, LocalFilesystemStorageProvider
+from rdr_service.services.response_cache import VersionedResponseCache
+from rdr_service.services.survey_definition_cache import SurveyDefinitionCache
+from rdr_service.services.system_utils import setup_logging, setup_i18n
+from rdr_service.tools.tool_libs import GCPProcessContext, GCPEnvConfigObject
+
+_logger = logging.getLogger("rdr_logger")
+
+# Tool_cmd and tool_desc name are required.
+# Remember to add/update bash completion in 'tool_lib/tools.bash'
+tool_cmd = "benchmark"
+tool_desc = "run local performance benchmarks of RDR components"
+
+
+class BenchmarkTimer(object):
+    """ Collect wall time and peak python memory for a single benchmark case """
+
+    def __init__(self, name, trace_memory=False):
+        self.name = name
+        self.trace_memory = trace_memory
+        self.seconds = 0.0
+        self.peak_memory = 0
+
+    def __enter__(self):
+        if self.trace_memory:
+            tracemalloc.start()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.seconds = time.perf_counter() - self._start
+        if self.trace_memory:
+            _, self.peak_memory = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        return False
+
+    def report(self, count=None, unit='rows'):
+        msg = f'  {self.name.ljust(30)}: {self.seconds:10.3f} sec'
+        if count is not None and self.seconds:
+            msg += f'  {count / self.seconds:14,.0f} {unit}/sec'
+        if self.trace_memory:
+            msg += f'  peak memory {self.peak_memory / 1024 / 1024:8.2f} MB'
+        _logger.info(msg)
+
+
+class BenchmarkBase(object):
+    def __init__(self, args, gcp_env: GCPEnvConfigObject):
+        """
+        :param args: command line arguments.
+        :param gcp_env: gcp environment information, see: gcp_initialize().
+        """
+        self.args = args
+        self.gcp_env = gcp_env
+
+    def run(self):
+        raise NotImplementedError
+
+
+class _LocalFileBlob(object):
+    """
+    Minimal stand-in for a google.cloud.storage.Blob that serves byte ranges from a local file,
+    so GoogleCloudStorageFile can be exercised against the LocalFilesystemStorageProvider.
+    """
+    def __init__(self, local_path):
+        self.local_path = local_path
+        self.size = os.path.getsize(local_path)
+
+    def download_as_string(self, start=0, end=None):
+        # GCS byte ranges are inclusive of the end position.
+        with open(self.local_path, 'rb') as handle:
+            handle.seek(start)
+            return handle.read() if end is None else handle.read(end - start + 1)
+
+
+class StorageReaderBenchmark(BenchmarkBase):
+    """ Compare the GoogleCloudStorageFile line readers on a large local CSV file """
+
+    def _create_test_file(self, provider, path):
+        local_path = provider.get_local_path(path)
+        if os.path.exists(local_path) and os.path.getsize(local_path) >= self.args.size_mb * 1024 * 1024:
+            return local_path
+
+        _logger.info(f'Generating {self.args.size_mb} MB test file {local_path}...')
+        with provider.open(path, 'wt') as handle:
+            writer = csv.writer(handle)
+            writer.writerow(['biobank_id', 'sample_id', 'test_code', 'status', 'confirmed', 'comment'])
+            row_num = 0
+            while handle.tell() < self.args.size_mb * 1024 * 1024:
+                for _ in range(10000):
+                    row_num += 1
+                    writer.writerow([f'A{row_num:09d}', f'{row_num:012d}', '1ED10', 'Received',
+                                     '2021-01-01 12:00:00', 'naïve sample comment'])
+        return local_path
+
+    def run(self):
+        provider = LocalFilesystemStorageProvider()
+        local_path = self._create_test_file(provider, 'benchmark/storage_reader.csv')
+        _logger.info(f'File size: {os.path.getsize(local_path) / 1024 / 1024:.1f} MB')
+
+        cases = [('iter_lines', lambda f: f.iter_lines()), ('csv.DictReader', csv.DictReader)]
+
+        for name, reader in cases:
+            cloud_file = GoogleCloudStorageFile(provider, _LocalFileBlob(local_path))
+            with BenchmarkTimer(name, trace_memory=self.args.trace_memory) as timer:
+                count = sum(1 for _ in reader(cloud_file))
+            timer.report(count, unit='lines')
+
+        return 0
+
+
+class ParticipantRebuildBenchmark(BenchmarkBase):
+    """ Time rebuilding batches of participants with the prefetching batch pipeline """
+
+    def run(self):
+        if self.gcp_env.project != 'localhost':
+            _logger.error('The participant rebuild benchmark writes resource data, it only runs against localhost.')
+            return 1
+        self.gcp_env.activate_sql_proxy()
+
+        dao = ResourceDataDao(backup=False)
+        with dao.session() as session:
+            pids = [row.participant_id for row in session.execute(
+                'select participant_id from participant order by participant_id limit :limit',
+                {'limit': self.args.batch_size * self.args.batches})]
+        if not pids:
+            _logger.error('No participants found, generate some fake participant data first.')
+            return 1
+
+        batches = [pids[index:index + self.args.batch_size] for index in range(0, len(pids), self.args.batch_size)]
+        for number, batch in enumerate(batches, 1):
+            _logger.info(f'Batch {number} of {len(batches)}, {len(batch)} participants:')
+            with BenchmarkTimer('batch pipeline', trace_memory=self.args.trace_memory) as timer:
+                batch_rebuild_participants_task({'batch': [{'pid': pid} for pid in batch]})
+            timer.report(len(batch), unit='participants')
+
+        return 0
+
+
+_HproConsentRow = namedtuple('_HproConsentRow', ['file_path', 'participant_id', 'consent_type'])
+_IncentiveRow = namedtuple('_IncentiveRow', ['incentiveId', 'participantId', 'site', 'createdBy', 'dateGiven',
+                                             'incentiveType', 'amount', 'occurrence', 'giftcardType', 'notes',
+                                             'cancelled', 'cancelledBy', 'cancelledDate', 'declined'])
+
+
+class SummaryBundleBenchmark(BenchmarkBase):
+    """
+    Time serializing a page of participant summaries the way ParticipantSummaryApi does for a
+    healthpro user, with consent file paths and incentives prefetched for every participant.
+    """
+
+    def _load_summaries(self, count):
+        """ Load existing summaries, repeating them with new participant ids to fill the page """
+        dao = ParticipantSummaryDao()
+        with dao.session() as session:
+            summaries = session.query(ParticipantSummary).limit(count).all()
+            site = session.query(Site).first()
+            for summary in summaries:
+                session.expunge(summary)
+
+        page = []
+        for index in range(count):
+            source = summaries[index % len(summaries)]
+            summary = ParticipantSummary(**{column.key: getattr(source, column.key)
+                                            for column in ParticipantSummary.__table__.columns})
+            summary.participantId = 100000000 + index
+            page.append(summary)
+        return page, site
+
+    @staticmethod
+    def _prefetched_rows(summaries, site):
+        consents, incentives = [], []
+        for summary in summaries:
+            p_id = summary.participantId
+            for consent_type in (ConsentType.PRIMARY, ConsentType.CABOR, ConsentType.EHR):
+                consents.append(_HproConsentRow(f'bucket/P{p_id}/{consent_type}.pdf', p_id, consent_type))
+            incentives.append(_IncentiveRow(p_id, p_id, site.siteId, 'benchmark@pmi-ops.org', '2022-01-01',
+                                            'CASH', 25, 'ONE_TIME', None, None, False, None, None, False))
+        return consents, incentives
+
+    @staticmethod
+    def _serialize(dao, summaries):
+        entries = [{'resource': dao.to_client_json(summary)} for summary in summaries]
+        return json.dumps({'resourceType': 'Bundle', 'type': 'searchset', 'entry': entries}, default=str)
+
+    def run(self):
+        self.gcp_env.activate_sql_proxy()
+
+        for count in self.args.rows:
+            summaries, site = self._load_summaries(count)
+            if not summaries or not site:
+                _logger.error('No participant summaries or sites found, generate some fake participant data first.')
+                return 1
+            consents, incentives = self._prefetched_rows(summaries, site)
+            _logger.info(f'{count} rows:')
+
+            dao = ParticipantSummaryDao()
+            with BenchmarkTimer('to_client_json', trace_memory=self.args.trace_memory) as timer:
+                dao.hpro_consents = consents
+                dao.participant_incentives = incentives
+                self._serialize(dao, summaries)
+            timer.report(count)
+
+        return 0
+
+
+class PublicMetricsBenchmark(BenchmarkBase):
+    """
+    Time the queries a public metrics dashboard repeats on every page load, with and without the
+    PublicMetrics response cache, and report the p50/p99 latency of each.
+    """
+
+    @staticmethod
+    def _dashboard_queries(end_date):
+        start_date = (end_date - datetime.timedelta(days=30)).strftime('%Y-%m-%d')
+        end_date = end_date.strftime('%Y-%m-%d')
+        queries = []
+        for stratification in ('TOTAL', 'ENROLLMENT_STATUS', 'GENDER_IDENTITY', 'AGE_RANGE', 'RACE', 'LANGUAGE',
+                               'PRIMARY_CONSENT', 'GEO_STATE', 'GEO_CENSUS', 'GEO_AWARDEE', 'LIFECYCLE'):
+            queries.append({
+                'stratification': stratification,
+                'start_date': start_date,
+                'end_date': end_date,
+                'enrollment_statuses': None,
+                'awardees': None,
+                'version': '2' if stratification in ('GENDER_IDENTITY', 'RACE') else None
+            })
+        return queries
+
+    @staticmethod
+    def _percentiles(latencies):
+        latencies = sorted(latencies)
+        return (latencies[int(len(latencies) * 0.50)] * 1000,
+                latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000)
+
+    def run(self):
+        self.gcp_env.activate_sql_proxy()
+
+        if MetricsCacheJobStatusDao().get_cache_version() is None:
+            _logger.error('No metrics cache data found, run the participant counts over time cron job first.')
+            return 1
+
+        api = PublicMetricsApi()
+        api.hpo_dao = HPODao()
+        queries = [api.validate_params(params) for params in self._dashboard_queries(clock.CLOCK.now().date())]
+        cache = VersionedResponseCache()
+        status_dao = MetricsCacheJobStatusDao()
+
+        def uncached(filters):
+            return api.get_filtered_results(**filters)
+
+        def cached(filters):
+            return cache.get(api.get_cache_key(filters), status_dao.get_cache_version(),
+                             lambda: api.get_filtered_results(**filters))
+
+        cases = [('uncached', uncached)] if not self.args.skip_legacy else []
+        cases.append(('response cache', cached))
+        for name, get_results in cases:
+            latencies = []
+            with BenchmarkTimer(name, trace_memory=self.args.trace_memory) as timer:
+                for _ in range(self.args.rounds):
+                    for filters in queries:
+                        start = time.perf_counter()
+                        get_results(filters)
+                        latencies.append(time.perf_counter() - start)
+            timer.report(len(latencies), unit='requests')
+            p50, p99 = self._percentiles(latencies)
+            _logger.info(f'  {"".ljust(30)}  p50 {p50:10.2f} ms  p99 {p99:10.2f} ms')
+
+        _logger.info(f'  response cache stats: {cache.get_stats()}')
+        return 0
+
+
+class SqlExportBenchmark(BenchmarkBase):
+    """
+    Time SqlExporter exports of generated rows to the local storage provider, reporting rows/sec and
+    peak memory.  Rows are generated by the database so no test data is needed.
+    """
+
+    @staticmethod
+    def _make_sql(rows):
+        digits = 'SELECT 0 d UNION ALL ' + ' UNION ALL '.join(f'SELECT {d}' for d in range(1, 10))
+        places = max(1, len(str(rows - 1)))
+        number = ' + '.join(f'd{place}.d * {10 ** place}' for place in range(places))
+        tables = ', '.join(f'({digits}) d{place}' for place in range(places))
+        return f"""
+            SELECT n id, CONCAT('A', LPAD(n, 9, '0')) biobank_id, '1ED10' test_code,
+                   DATE_ADD('2021-01-01', INTERVAL n SECOND) confirmed, 'Received' status
+            FROM (SELECT {number} n FROM {tables}) numbers
+            WHERE n < :rows
+        """
+
+    def run(self):
+        if self.gcp_env.project != 'localhost':
+            _logger.error('The sql export benchmark writes to local storage, it only runs against localhost.')
+            return 1
+        self.gcp_env.activate_sql_proxy()
+
+        sql = self._make_sql(self.args.rows)
+        cases = [('streaming export', False)]
+        if self.args.gzip:
+            cases.append(('streaming gzip export', True))
+
+        _logger.info(f'{self.args.rows} rows:')
+        for name, gzip_output in cases:
+            file_name = 'sql_export.csv.gz' if gzip_output else 'sql_export.csv'
+            with BenchmarkTimer(name, trace_memory=self.args.trace_memory) as timer:
+                SqlExporter('benchmark').run_export(file_name, sql, {'rows': self.args.rows},
+                                                    predicate=lambda row: int(row[0]) % 10 != 0,
+                                                    gzip_output=gzip_output)
+            timer.report(self.args.rows)
+
+        return 0
+
+
+class GenomicIngestBenchmark(BenchmarkBase):
+    """
+    Time AW1 and AW2 manifest ingestion of synthetic rows into the local database, reporting rows/sec.
+    Each run ingests rows for its own new genomic set members.
+    """
+
+    def _create_members(self, set_name, count, first_id):
+        set_dao = GenomicSetDao()
+        genomic_set = set_dao.insert(GenomicSet(genomicSetName=set_name, genomicSetCriteria='.',
+                                                genomicSetVersion=1))
+        now = clock.CLOCK.now()
+        with set_dao.session() as session:
+            session.bulk_insert_mappings(GenomicSetMember, [{
+                'created': now,
+                'modified': now,
+                'genomicSetId': genomic_set.id,
+                'participantId': 0,
+                'biobankId': str(first_id + i),
+                'collectionTubeId': str(first_id + i),
+                'genomeType': GENOME_TYPE_ARRAY,
+                'genomicWorkflowState': GenomicWorkflowState.AW0,
+                'genomicWorkflowStateStr': GenomicWorkflowState.AW0.name
+            } for i in range(count)])
+
+    @staticmethod
+    def _make_ingester(job_id):
+        job_run = GenomicJobRunDao().insert(GenomicJobRun(jobId=job_id, startTime=clock.CLOCK.now()))
+        ingester = GenomicFileIngester(job_id=job_id, job_run_id=job_run.id,
+                                  _controller=GenomicJobController(job_id=job_id))
+        file_name = f'RDR_AoU_GEN_PKG-{job_run.id}.csv'
+        ingester.file_obj = GenomicFileProcessedDao().insert(GenomicFileProcessed(
+            runId=job_run.id, startTime=clock.CLOCK.now(), filePath=f'benchmark/{file_name}',
+            bucketName='benchmark', fileName=file_name
+        ))
+        return ingester
+
+    @staticmethod
+    def _aw1_rows(count, first_id):
+        return [{
+            'Biobank ID': to_client_biobank_id(first_id + i),
+            'Collection Tube ID': str(first_id + i),
+            'Sample ID': str(first_id + i),
+            'Parent Sample ID': str(first_id + i),
+            'Genome Type': GENOME_TYPE_ARRAY,
+            'Failure Mode': '',
+            'Package ID': 'PKG-benchmark',
+            'Well Position': 'A01',
+        } for i in range(count)]
+
+    @staticmethod
+    def _aw2_rows(count, first_id):
+        return [{
+            'Biobank ID': str(first_id + i),
+            'Sample ID': str(first_id + i),
+            'LIMS ID': f'lims_{i}',
+            'Call Rate': '0.99',
+            'Contamination': '0.001',
+            'Processing Status': 'Pass',
+        } for i in range(count)]
+
+    def run(self):
+        if self.gcp_env.project != 'localhost':
+            _logger.error('The genomic ingest benchmark creates genomic records, it only runs against localhost.')
+            return 1
+        self.gcp_env.activate_sql_proxy()
+
+        rows = self.args.rows
+        _logger.info(f'{rows} rows:')
+        # Start above any existing ids, so each run ingests its own members.
+        first_id = int(time.time() * 1000) * 1000
+        self._create_members(f'benchmark_{first_id}', rows, first_id)
+
+        ingester = self._make_ingester(GenomicJob.AW1_MANIFEST)
+        aw1_rows = self._aw1_rows(rows, first_id)
+        with BenchmarkTimer('AW1', trace_memory=self.args.trace_memory) as timer:
+            ingester._ingest_aw1_manifest(aw1_rows)
+        timer.report(rows)
+
+        ingester = self._make_ingester(GenomicJob.METRICS_INGESTION)
+        aw2_rows = self._aw2_rows(rows, first_id)
+        with BenchmarkTimer('AW2', trace_memory=self.args.trace_memory) as timer:
+            ingester._process_gc_metrics_data_for_insert(aw2_rows)
+        timer.report(rows)
+
+        return 0
+
+
+class _StreamingManifestCompiler(ManifestCompiler):
+    """ Reads, validates and writes the source rows the way generate_and_transfer_manifest() does """
+
+    def compile(self):
+        validator = self._get_source_data_validator(GenomicManifestTypes.AW3_ARRAY)
+
+        def validated_rows(rows):
+            for row in rows:
+                validator.check_row(row)
+                yield row
+
+        self._write_and_upload_manifest(validated_rows(self.iter_source_data()))
+        validator.get_error_message()
+
+
+class ManifestCompileBenchmark(BenchmarkBase):
+    """
+    Time compiling an AW3 style manifest of generated rows to the local storage provider, reporting rows/sec
+    and peak memory.  Rows are generated by the database so no test data is needed.
+    """
+    COLUMNS = ('chipwellbarcode', 'biobank_id', 'sample_id', 'biobankidsampleid', 'sex_at_birth',
+               'site_id', 'red_idat_path', 'green_idat_path')
+
+    @staticmethod
+    def _make_sql(rows):
+        digits = 'SELECT 0 d UNION ALL ' + ' UNION ALL '.join(f'SELECT {d}' for d in range(1, 10))
+        places = max(1, len(str(rows - 1)))
+        number = ' + '.join(f'd{place}.d * {10 ** place}' for place in range(places))
+        tables = ', '.join(f'({digits}) d{place}' for place in range(places))
+        return text(f"""
+            SELECT CONCAT(n, '_R01C01') chipwellbarcode, CONCAT('A', n) biobank_id, n sample_id,
+                   CONCAT('A', n, '_', n) biobankidsampleid, 'F' sex_at_birth, 'jh' site_id,
+                   CONCAT('gs://benchmark/idats/', n, '_R01C01_Red.idat') red_idat_path,
+                   CONCAT('gs://benchmark/idats/', n, '_R01C01_Grn.idat') green_idat_path
+            FROM (SELECT {number} n FROM {tables}) numbers
+            WHERE n < {int(rows)}
+        """)
+
+    def run(self):
+        if self.gcp_env.project != 'localhost':
+            _logger.error('The manifest compile benchmark writes to local storage, it only runs against localhost.')
+            return 1
+        self.gcp_env.activate_sql_proxy()
+
+        for rows in self.args.rows:
+            manifest_def = ManifestDefinitionProvider.ManifestDef(
+                job_run_field=None, source_data=self._make_sql(rows), destination_bucket='benchmark',
+                output_filename='AW3_benchmark.csv', columns=self.COLUMNS, signal='bypass', query=None, params=None
+            )
+            _logger.info(f'{rows} rows:')
+            compiler = _StreamingManifestCompiler(bucket_name='benchmark')
+            compiler.manifest_def = manifest_def
+            compiler.output_file_name = manifest_def.output_filename
+            with BenchmarkTimer('streaming', trace_memory=self.args.trace_memory) as timer:
+                compiler.compile()
+            timer.report(rows)
+
+        return 0
+
+
+class QuestionnaireResponseBenchmark(BenchmarkBase):
+    """
+    Time the questionnaire lookup and answer validation that each questionnaire response insert runs, using
+    recent responses from the local database, with and without the survey definition cache.  Reports the
+    p50/p99 latency of each response.
+    """
+
+    @staticmethod
+    def _load_responses(count):
+        dao = QuestionnaireResponseDao()
+        with dao.session() as session:
+            return session.query(QuestionnaireResponse).options(
+                subqueryload(QuestionnaireResponse.answers)
+            ).order_by(QuestionnaireResponse.questionnaireResponseId.desc()).limit(count).all()
+
+    @staticmethod
+    def _prepare_insert(dao, session, response, cache):
+        """ The part of QuestionnaireResponseDao.insert_with_session that uses the questionnaire definition """
+        definition = cache.get(
+            response.questionnaireId,
+            response.questionnaireSemanticVersion,
+            lambda: dao._load_questionnaire_definition(response.questionnaireId,
+                                                       response.questionnaireSemanticVersion)
+        )
+        if definition is None:
+            return
+        questionnaire_history, answer_validator = definition
+        if answer_validator:
+            answer_validator.check_response(response)
+        dao._get_answered_questions(session, questionnaire_history, [answer.questionId for answer in response.answers])
+
+    def run(self):
+        if self.gcp_env.project != 'localhost':
+            _logger.error('The questionnaire response benchmark only runs against localhost.')
+            return 1
+        self.gcp_env.activate_sql_proxy()
+
+        responses = self._load_responses(self.args.responses)
+        if not responses:
+            _logger.error('No questionnaire responses found in the local database.')
+            return 1
+        _logger.info(f'{len(responses)} responses for {len({r.questionnaireId for r in responses})} questionnaires:')
+
+        # Validation warnings are expected for test data, only the timings are of interest.
+        logging.disable(logging.WARNING)
+        dao = QuestionnaireResponseDao()
+        cases = [('uncached', SurveyDefinitionCache(ttl_seconds=0))] if not self.args.skip_legacy else []
+        cache = SurveyDefinitionCache()
+        cases.append(('survey definition cache', cache))
+        try:
+            for name, case_cache in cases:
+                latencies = []
+                with dao.session() as session, BenchmarkTimer(name, trace_memory=self.args.trace_memory) as timer:
+                    for response in responses:
+                        start = time.perf_counter()
+                        self._prepare_insert(dao, session, response, case_cache)
+                        latencies.append(time.perf_counter() - start)
+                timer.report(len(latencies), unit='responses')
+                p50, p99 = PublicMetricsBenchmark._percentiles(latencies)
+                _logger.info(f'  {"".ljust(30)}  p50 {p50:10.2f} ms  p99 {p99:10.2f} ms')
+        finally:
+            logging.disable(logging.NOTSET)
+
+        _logger.info(f'  survey definition cache stats: {cache.get_stats()}')
+        return 0
+
+
+class ConsentSyncBenchmark(BenchmarkBase):
+    """
+    Sync generated consent files between two local buckets with the sync engine, which lists each folder once
+    and copies the changed files concurrently.
+    """
+    SOURCE_BUCKET = 'benchmark-consent-source'
+    DESTINATION_BUCKET = 'benchmark-consent-destination'
+
+    def _create_test_files(self, provider):
+        file_paths = []
+        for participant_id in range(self.args.files):
+            source_path = f'{self.SOURCE_BUCKET}/Participant/P{participant_id}/consent.pdf'
+            if not os.path.exists(provider.get_local_path(source_path)):
+                with provider.open(source_path, 'wb') as handle:
+                    handle.write(os.urandom(self.args.size_kb * 1024))
+            file_paths.append((
+                source_path,
+                f'{self.DESTINATION_BUCKET}/Participant/ORG/site/P{participant_id}/consent.pdf'
+            ))
+        return file_paths
+
+    def _clear_destination(self, provider):
+        shutil.rmtree(provider.get_local_path(self.DESTINATION_BUCKET), ignore_errors=True)
+
+    def run(self):
+        provider = LocalFilesystemStorageProvider()
+        file_paths = self._create_test_files(provider)
+        _logger.info(f'{len(file_paths)} consent files of {self.args.size_kb} KB, {self.args.workers} workers:')
+
+        # Only the timings are of interest, not the engine's own rate logging.
+        root_logger = logging.getLogger()
+        root_level = root_logger.level
+        root_logger.setLevel(logging.WARNING)
+        try:
+            engine = CloudStorageSyncEngine(provider, max_workers=self.args.workers)
+            self._clear_destination(provider)
+            for name in ('sync engine copy', 'sync engine (already synced)'):
+                with BenchmarkTimer(name, trace_memory=self.args.trace_memory) as timer:
+                    engine.copy_files(file_paths)
+                timer.report(len(file_paths), unit='files')
+
+            with BenchmarkTimer('sync engine zip', trace_memory=self.args.trace_memory) as timer:
+                with tempfile.TemporaryFile() as archive, ZipFile(archive, 'w') as zip_file:
+                    for source_path, local_path in engine.download_files([path for path, _ in file_paths]):
+                        zip_file.write(local_path, arcname=source_path)
+            timer.report(len(file_paths), unit='files')
+        finally:
+            root_logger.setLevel(root_level)
+            self._clear_destination(provider)
+
+        return 0
+
+
+class _MessageBrokerStubHandler(BaseHTTPRequestHandler):
+    """ Local stand-in for a message broker destination, responding to each message after a fixed delay """
+    protocol_version = 'HTTP/1.1'
+    latency_seconds = 0
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        time.sleep(self.latency_seconds)
+        body = json.dumps({'result': 'received'}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *_):
+        pass
+
+
+class _StubMessageBroker(PtscMessageBroker):
+    """ Sends to the local stub destination instead of the url stored in the message broker metadata """
+    dest_url = None
+
+    def _get_message_dest_url(self):
+        return self.dest_url
+
+
+class MessageBrokerBenchmark(BenchmarkBase):
+    """
+    Send messages to a local HTTP stub destination, comparing sends on the pooled session with the background
+    sender. Reports throughput and the p50/p99 latency seen by the API request.
+    """
+    DESTINATION = 'benchmark'
+
+    def _make_message_broker(self):
+        message = MessageBrokerRecord(
+            participantId=1,
+            eventType='result_viewed',
+            eventAuthoredTime=clock.CLOCK.now(),
+            messageDest=self.DESTINATION,
+            requestBody={'result_type': 'hdr_v1', 'report_revision_number': 0}
+        )
+        return _StubMessageBroker(message)
+
+    def _time_sends(self, name, send, wait_for_delivery=None):
+        latencies = []
+        with BenchmarkTimer(name, trace_memory=self.args.trace_memory) as timer:
+            for _ in range(self.args.messages):
+                start = time.perf_counter()
+                send(self._make_message_broker())
+                latencies.append(time.perf_counter() - start)
+            if wait_for_delivery:
+                wait_for_delivery()
+        timer.report(len(latencies), unit='messages')
+        p50, p99 = PublicMetricsBenchmark._percentiles(latencies)
+        _logger.info(f'  {"request latency".ljust(30)}  p50 {p50:10.2f} ms  p99 {p99:10.2f} ms')
+
+    def run(self):
+        if self.gcp_env.project != 'localhost':
+            _logger.error('The message broker benchmark only runs against localhost.')
+            return 1
+        self.gcp_env.activate_sql_proxy()
+
+        _MessageBrokerStubHandler.latency_seconds = self.args.latency_ms / 1000
+        server = ThreadingHTTPServer(('127.0.0.1', 0), _MessageBrokerStubHandler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        _StubMessageBroker.dest_url = f'http://127.0.0.1:{server.server_port}/message'
+        # The stub doesn't check tokens, so the token cache is filled with one that won't expire.
+        get_access_token_cache().get_token(
+            self.DESTINATION,
+            lambda: ('benchmark-token', clock.CLOCK.now() + datetime.timedelta(days=1))
+        )
+        _logger.info(f'{self.args.messages} messages, {self.args.latency_ms} ms destination latency:')
+
+        sender = MessageSender(workers=self.args.workers, queue_size=self.args.messages)
+        try:
+            self._time_sends('pooled session', lambda message_broker: message_broker.send_request())
+            self._time_sends('background sender',
+                             lambda message_broker: sender.send(message_broker, on_response=lambda *_: None),
+                             wait_for_delivery=sender.wait_until_idle)
+        finally:
+            sender.drain()
+            server.shutdown()
+
+        _logger.info(f'  background sender stats: {sender.get_stats()}')
+
+        _logger.info(f'  access token cache stats: {get_access_token_cache().get_stats()}')
+        return 0
+
+
+class CloudTasksBenchmark(BenchmarkBase):
+    """
+    Dispatch participant rebuild tasks to an in-memory Cloud Tasks queue, comparing one execute() call per task
+    with execute_batch(). The queue's latency simulates the Cloud Tasks API response time.
+    """
+    ENDPOINT = 'rebuild_participants_task'
+
+    def _payloads(self):
+        for batch_number in range(self.args.tasks):
+            yield {'batch': [{'pid': batch_number * 100 + offset} for offset in range(100)],
+                   'build_participant_summary': True, 'build_modules': True}
+
+    def _time_dispatch(self, name, dispatch):
+        client = InMemoryCloudTasksClient(latency_seconds=self.args.latency_ms / 1000)
+        with BenchmarkTimer(name, trace_memory=self.args.trace_memory) as timer:
+            dispatch(GCPCloudTask(client=client))
+        timer.report(sum(len(tasks) for tasks in client.tasks.values()), unit='tasks')
+
+    def _dispatch_one_at_a_time(self, task):
+        for payload in self._payloads():
+            task.execute(self.ENDPOINT, payload=payload, in_seconds=15, project_id='benchmark',
+                         queue='resource-rebuild', quiet=True)
+
+    def run(self):
+        if self.gcp_env.project != 'localhost':
+            _logger.error('The cloud tasks benchmark only runs against localhost.')
+            return 1
+
+        _logger.info(f'{self.args.tasks} tasks, {self.args.latency_ms} ms queue latency:')
+        self._time_dispatch('execute per task', self._dispatch_one_at_a_time)
+        self._time_dispatch(
+            f'execute_batch ({self.args.workers} workers)',
+            lambda task: task.execute_batch(self.ENDPOINT, self._payloads(), in_seconds=15, project_id='benchmark',
+                                            queue='resource-rebuild', quiet=True, max_workers=self.args.workers)
+        )
+        return 0
+
+
+class ResourceSearchBenchmark(BenchmarkBase):
+    """
+    Time searches of a synthetic resource type in resource_data, comparing filtering on the JSON without an
+    index with the indexed search columns. Also times reading pages of stored search results by search key.
+    The synthetic records are kept and reused by later runs.
+    """
+    RESOURCE_URI = 'BenchmarkParticipant'
+    ORIGINS = ['vibrent', 'careevolution', 'example']
+    ORGANIZATIONS = 500
+    INSERT_CHUNK_SIZE = 10000
+
+    def _get_or_create_records(self, dao):
+        with dao.session() as session:
+            type_rec = session.query(ResourceType).filter(ResourceType.resourceURI == self.RESOURCE_URI).first()
+            if not type_rec:
+                type_rec = ResourceType(resourceURI=self.RESOURCE_URI, resourcePKField='participant_id',
+                                        typeName=self.RESOURCE_URI, typeUID=9999)
+                session.add(type_rec)
+                session.flush()
+                session.add(ResourceSchema(resourceTypeID=type_rec.id, schema={}))
+            type_id = type_rec.id
+            schema_id = session.query(ResourceSchema.id).filter(ResourceSchema.resourceTypeID == type_id).scalar()
+            existing = session.query(func.count(ResourceData.id)).filter(ResourceData.resourceTypeID == type_id).\
+                scalar()
+
+        if existing < self.args.rows:
+            _logger.info(f'Creating {self.args.rows - existing} synthetic {self.RESOURCE_URI} records...')
+            now = clock.CLOCK.now()
+            for first in range(existing, self.args.rows, self.INSERT_CHUNK_SIZE):
+                with dao.session() as session:
+                    session.bulk_insert_mappings(ResourceData, [{
+                        'created': now,
+                        'modified': now,
+                        'resourceTypeID': type_id,
+                        'resourceSchemaID': schema_id,
+                        'uri': f'{self.RESOURCE_URI}/P{pid}',
+                        'resourcePKID': pid,
+                        'resource': self._make_resource(pid)
+                    } for pid in range(first + 1, min(first + self.INSERT_CHUNK_SIZE, self.args.rows) + 1)])
+        return type_id
+
+    def _make_resource(self, pid):
+        return {
+            'participant_id': f'P{pid}',
+            'participant_origin': self.ORIGINS[pid % len(self.ORIGINS)],
+            'enrollment_status_id': pid % 5,
+            'withdrawal_status_id': 2 if pid % 50 == 0 else 1,
+            'organization_id': pid % self.ORGANIZATIONS,
+            'sign_up_time': (datetime.datetime(2018, 1, 1) + datetime.timedelta(minutes=pid)).isoformat(),
+            # Padding so the records are about the size of a participant resource.
+            'modules': [{'module': f'module_{i}', 'status': 'SUBMITTED', 'status_id': 1} for i in range(20)]
+        }
+
+    def _time_searches(self, name, search):
+        latencies = []
+        results = 0
+        with BenchmarkTimer(name, trace_memory=self.args.trace_memory) as timer:
+            for round_no in range(self.args.rounds):
+                start = time.perf_counter()
+                results += search(round_no % self.ORGANIZATIONS)
+                latencies.append(time.perf_counter() - start)
+        timer.report(self.args.rounds, unit='searches')
+        p50, p99 = PublicMetricsBenchmark._percentiles(latencies)
+        _logger.info(f'  {"search latency".ljust(30)}  p50 {p50:10.2f} ms  p99 {p99:10.2f} ms'
+                     f'  ({results // self.args.rounds} results per search)')
+
+    def run(self):
+        if self.gcp_env.project != 'localhost':
+            _logger.error('The resource search benchmark creates resource records, it only runs against localhost.')
+            return 1
+        self.gcp_env.activate_sql_proxy()
+
+        dao = ResourceSearchDao()
+        type_id = self._get_or_create_records(dao)
+        schema = ParticipantSchema()
+        search_keys = []
+        _logger.info(f'{self.args.rows} resource records, searching by organization_id and participant_origin:')
+
+        def json_search(organization_id):
+            with dao.session() as session:
+                return session.query(ResourceData.id).filter(
+                    ResourceData.resourceTypeID == type_id,
+                    func.json_extract(ResourceData.resource, '$.organization_id') == organization_id,
+                    func.json_unquote(func.json_extract(ResourceData.resource, '$.participant_origin')) == 'vibrent'
+                ).count()
+
+        def indexed_search(organization_id):
+            with dao.session() as session:
+                query = session.query(ResourceData.id).filter(
+                    ResourceData.resourceTypeID == type_id,
+                    dao.get_field_filter(schema, 'organization_id', 'eq', str(organization_id)),
+                    dao.get_field_filter(schema, 'participant_origin', 'eq', 'vibrent')
+                ).order_by(ResourceData.id)
+                search_key, total, _ = dao.store_search_results(session, query, page_size=100,
+                                                                max_results=self.args.rows)
+                search_keys.append(search_key)
+                return total
+
+        def read_page(round_no):
+            with dao.session() as session:
+                records, _, _ = dao.get_search_page(session, search_keys[round_no % len(search_keys)], 1)
+                return len(records)
+
+        try:
+            self._time_searches('unindexed json filter', json_search)
+            self._time_searches('indexed search', indexed_search)
+            self._time_searches('page by search key', read_page)
+        finally:
+            with dao.session() as session:
+                session.query(ResourceSearchResults).filter(ResourceSearchResults.searchKey.in_(search_keys)).\
+                    delete(synchronize_session=False)
+        return 0
+
+
+def run():
+    # Set global debug value and setup application logging.
+    setup_logging(
+        _logger, tool_cmd, "--debug" in sys.argv, "{0}.log".format(tool_cmd) if "--log-file" in sys.argv else None
+    )
+    setup_i18n()
+
+    # Setup program arguments.
+    parser = argparse.ArgumentParser(prog=tool_cmd, description=tool_desc)
+    parser.add_argument("--debug", help="enable debug output", default=False, action="store_true")  # noqa
+    parser.add_argument("--log-file", help="write output to a log file", default=False, action="store_true")  # noqa
+    parser.add_argument("--project", help="gcp project name", default="localhost")  # noqa
+    parser.add_argument("--account", help="pmi-ops account", default=None)  # noqa
+    parser.add_argument("--service-account", help="gcp iam service account", default=None)  # noqa
+    parser.add_argument("--trace-memory", help="also report peak python memory usage (slower)",
+                        default=False, action="store_true")  # noqa
+
+    subparser = parser.add_subparsers(title='benchmarks', dest='benchmark', help='benchmark to run')
+
+    storage_parser = subparser.add_parser('storage-reader', help='GoogleCloudStorageFile line reading')
+    storage_parser.add_argument("--size-mb", help="size of the generated test file", type=int, default=300)
+
+    rebuild_parser = subparser.add_parser('participant-rebuild', help='batch participant resource/PDR rebuild')
+    rebuild_parser.add_argument("--batch-size", help="participants per batch", type=int, default=100)
+    rebuild_parser.add_argument("--batches", help="number of batches to time", type=int, default=3)
+
+    bundle_parser = subparser.add_parser('summary-bundle', help='participant summary bundle serialization')
+    bundle_parser.add_argument("--rows", help="page sizes to time", type=int, nargs='+', default=[100, 1000, 10000])
+
+    metrics_parser = subparser.add_parser('public-metrics', help='repeated PublicMetrics dashboard queries')
+    metrics_parser.add_argument("--rounds", help="times each dashboard query is repeated", type=int, default=20)
+    metrics_parser.add_argument("--skip-legacy", help="do not time the queries without the response cache",
+                                default=False, action="store_true")
+
+    export_parser = subparser.add_parser('sql-export', help='SqlExporter export to cloud storage')
+    export_parser.add_argument("--rows", help="number of rows exported", type=int, default=2000000)
+    export_parser.add_argument("--gzip", help="also time a compressed export", default=False, action="store_true")
+
+    genomic_parser = subparser.add_parser('genomic-ingest', help='AW1 and AW2 genomic manifest ingestion')
+    genomic_parser.add_argument("--rows", help="number of manifest rows ingested", type=int, default=10000)
+
+    manifest_parser = subparser.add_parser('manifest-compile', help='genomic manifest source validation and writing')
+    manifest_parser.add_argument("--rows", help="manifest sizes to time", type=int, nargs='+',
+                                 default=[10000, 100000, 1000000])
+
+    response_parser = subparser.add_parser('questionnaire-response', help='questionnaire response insert validation')
+    response_parser.add_argument("--responses", help="number of recent responses validated", type=int, default=1000)
+    response_parser.add_argument("--skip-legacy", help="do not time the validation without the survey cache",
+                                 default=False, action="store_true")
+
+    consent_parser = subparser.add_parser('consent-sync', help='consent file copies between buckets')
+    consent_parser.add_argument("--files", help="number of consent files synced", type=int, default=2000)
+    consent_parser.add_argument("--size-kb", help="size of each generated consent file", type=int, default=200)
+    consent_parser.add_argument("--workers", help="concurrent copies", type=int,
+                                default=CloudStorageSyncEngine.DEFAULT_WORKERS)
+
+    broker_parser = subparser.add_parser('message-broker', help='message broker delivery to a local HTTP stub')
+    broker_parser.add_argument("--messages", help="number of messages sent", type=int, default=2000)
+    broker_parser.add_argument("--latency-ms", help="response delay of the stub destination", type=int, default=20)
+    broker_parser.add_argument("--workers", help="background sender threads", type=int,
+                               default=MessageSender.DEFAULT_WORKERS)
+
+    tasks_parser = subparser.add_parser('cloud-tasks', help='cloud task dispatching to an in-memory queue')
+    tasks_parser.add_argument("--tasks", help="number of tasks dispatched", type=int, default=2000)
+    tasks_parser.add_argument("--latency-ms", help="response delay of the in-memory queue", type=int, default=20)
+    tasks_parser.add_argument("--workers", help="tasks created at the same time", type=int,
+                              default=GCPCloudTask.DEFAULT_BATCH_WORKERS)
+
+    search_parser = subparser.add_parser('resource-search', help='resource_data searches by resource fields')
+    search_parser.add_argument("--rows", help="number of synthetic resource records", type=int, default=1000000)
+    search_parser.add_argument("--rounds", help="number of searches timed", type=int, default=50)
+
+    args = parser.parse_args()
+
+    with GCPProcessContext(tool_cmd, args.project, args.account, args.service_account) as gcp_env:
+
+        if args.benchmark == 'storage-reader':
+            process = StorageReaderBenchmark(args, gcp_env)
+            exit_code = process.run()
+        elif args.benchmark == 'participant-rebuild':
+            process = ParticipantRebuildBenchmark(args, gcp_env)
+            exit_code = process.run()
+        elif args.benchmark == 'summary-bundle':
+            process = SummaryBundleBenchmark(args, gcp_env)
+            exit_code = process.run()
+        elif args.benchmark == 'public-metrics':
+            process = PublicMetricsBenchmark(args, gcp_env)
+            exit_code = process.run()
+        elif args.benchmark == 'sql-export':
+            process = SqlExportBenchmark(args, gcp_env)
+            exit_code = process.run()
+        elif args.benchmark == 'genomic-ingest':
+            process = GenomicIngestBenchmark(args, gcp_env)
+            exit_code = process.run()
+        elif args.benchmark == 'manifest-compile':
+            process = ManifestCompileBenchmark(args, gcp_env)
+            exit_code = process.run()
+        elif args.benchmark == 'questionnaire-response':
+            process = QuestionnaireResponseBenchmark(args, gcp_env)
+            exit_code = process.run()
+        elif args.benchmark == 'consent-sync':
+            process = ConsentSyncBenchmark(args, gcp_env)
+            exit_code = process.run()
+        elif args.benchmark == 'message-broker':
+            process = MessageBrokerBenchmark(args, gcp_env)
+            exit_code = process.run()
+        elif args.benchmark == 'cloud-tasks':
+            process = CloudTasksBenchmark(args, gcp_env)
+            exit_code = process.run()
+        elif args.benchmark == 'resource-search':
+            process = ResourceSearchBenchmark(args, gcp_env)
+            exit_code = process.run()
+        else:
+            _logger.info('Please select a benchmark to run. For help use "benchmark --help".')
+            exit_code = 1
+
+        return exit_code
+
+
+# --- Main Program Call ---
+if __name__ == "__main__":
+    sys.exit(run())
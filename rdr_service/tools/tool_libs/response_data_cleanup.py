@@ -94,12 +94,15 @@ class ValidationErrorHandler:
             f'... answers marked as invalid. '
             f'Sending rebuild task for {len(self._participant_ids_to_rebuild)} participants...'
         )
-        dispatch_participant_rebuild_tasks(
+        failed_pids = dispatch_participant_rebuild_tasks(
             pid_list=self._participant_ids_to_rebuild,
             project_id=self._project_id,
             build_locally=False
         )
-        logger.info('... rebuild task sent.')
+        if failed_pids:
+            logger.error(f'... rebuild tasks could not be sent for participants {failed_pids}.')
+        else:
+            logger.info('... rebuild task sent.')
 
     def handle_errors(self, validation_errors: Dict[str, List[ValidationError]], participant_id):
         logger.info(f'Will invalidate answers for participant P{participant_id}')
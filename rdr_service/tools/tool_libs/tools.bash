@@ -13,7 +13,7 @@ _python()
 
 
     # These are the specific tools we support
-    tools="--help migrate-bq verify oauth-token mysql app-engine alembic sync-consents edit-config fix-dup-pids genomic resource rdr-docs"
+    tools="--help migrate-bq verify oauth-token mysql app-engine alembic sync-consents edit-config fix-dup-pids genomic resource rdr-docs benchmark"
     # These are the standard options all tools support.
     stdopts="--help --debug --log-file --project --account --service-account"
 
@@ -285,6 +285,108 @@ _python()
             fi
             return 0
             ;;
+        benchmark)
+            # These are options specific to this tool.
+            local toolopts="--help --trace-memory storage-reader participant-rebuild summary-bundle public-metrics sql-export genomic-ingest manifest-compile questionnaire-response consent-sync message-broker cloud-tasks resource-search"
+            COMPREPLY=( $(compgen -W "${stdopts} ${toolopts}" -- ${cur}) )
+            return 0
+            ;;
+        storage-reader)
+            # benchmark storage-reader command
+            if echo ${COMP_WORDS[@]} | grep -w "benchmark" > /dev/null; then
+              local toolopts="--help --size-mb"
+              COMPREPLY=( $(compgen -W "${toolopts}" -- ${cur}) )
+            fi
+            return 0
+            ;;
+        participant-rebuild)
+            # benchmark participant-rebuild command
+            if echo ${COMP_WORDS[@]} | grep -w "benchmark" > /dev/null; then
+              local toolopts="--help --batch-size --batches"
+              COMPREPLY=( $(compgen -W "${toolopts}" -- ${cur}) )
+            fi
+            return 0
+            ;;
+        summary-bundle)
+            # benchmark summary-bundle command
+            if echo ${COMP_WORDS[@]} | grep -w "benchmark" > /dev/null; then
+              local toolopts="--help --rows"
+              COMPREPLY=( $(compgen -W "${toolopts}" -- ${cur}) )
+            fi
+            return 0
+            ;;
+        public-metrics)
+            # benchmark public-metrics command
+            if echo ${COMP_WORDS[@]} | grep -w "benchmark" > /dev/null; then
+              local toolopts="--help --rounds --skip-legacy"
+              COMPREPLY=( $(compgen -W "${toolopts}" -- ${cur}) )
+            fi
+            return 0
+            ;;
+        sql-export)
+            # benchmark sql-export command
+            if echo ${COMP_WORDS[@]} | grep -w "benchmark" > /dev/null; then
+              local toolopts="--help --rows --gzip"
+              COMPREPLY=( $(compgen -W "${toolopts}" -- ${cur}) )
+            fi
+            return 0
+            ;;
+        genomic-ingest)
+            # benchmark genomic-ingest command
+            if echo ${COMP_WORDS[@]} | grep -w "benchmark" > /dev/null; then
+              local toolopts="--help --rows"
+              COMPREPLY=( $(compgen -W "${toolopts}" -- ${cur}) )
+            fi
+            return 0
+            ;;
+        manifest-compile)
+            # benchmark manifest-compile command
+            if echo ${COMP_WORDS[@]} | grep -w "benchmark" > /dev/null; then
+              local toolopts="--help --rows"
+              COMPREPLY=( $(compgen -W "${toolopts}" -- ${cur}) )
+            fi
+            return 0
+            ;;
+        questionnaire-response)
+            # benchmark questionnaire-response command
+            if echo ${COMP_WORDS[@]} | grep -w "benchmark" > /dev/null; then
+              local toolopts="--help --responses --skip-legacy"
+              COMPREPLY=( $(compgen -W "${toolopts}" -- ${cur}) )
+            fi
+            return 0
+            ;;
+        consent-sync)
+            # benchmark consent-sync command
+            if echo ${COMP_WORDS[@]} | grep -w "benchmark" > /dev/null; then
+              local toolopts="--help --files --size-kb --workers"
+              COMPREPLY=( $(compgen -W "${toolopts}" -- ${cur}) )
+            fi
+            return 0
+            ;;
+        message-broker)
+            # benchmark message-broker command
+            if echo ${COMP_WORDS[@]} | grep -w "benchmark" > /dev/null; then
+              local toolopts="--help --messages --latency-ms --workers"
+              COMPREPLY=( $(compgen -W "${toolopts}" -- ${cur}) )
+            fi
+            return 0
+            ;;
+        cloud-tasks)
+            # benchmark cloud-tasks command
+            if echo ${COMP_WORDS[@]} | grep -w "benchmark" > /dev/null; then
+              local toolopts="--help --tasks --latency-ms --workers"
+              COMPREPLY=( $(compgen -W "${toolopts}" -- ${cur}) )
+            fi
+            return 0
+            ;;
+        resource-search)
+            # benchmark resource-search command
+            if echo ${COMP_WORDS[@]} | grep -w "benchmark" > /dev/null; then
+              local toolopts="--help --rows --rounds"
+              COMPREPLY=( $(compgen -W "${toolopts}" -- ${cur}) )
+            fi
+            return 0
+            ;;
         resurrect)
             # These are options specific to this tool.
             local toolopts="--help --pid --reason --reason-desc"
@@ -7,6 +7,7 @@ from rdr_service import clock
 from rdr_service.model.utils import to_client_participant_id
 from rdr_service.dao.database_utils import format_datetime
 from tests.helpers.unittest_base import BaseTestCase
+from rdr_service.message_broker.delivery import MessageSender, get_access_token_cache
 from rdr_service.message_broker.message_broker import MessageBrokerFactory
 from rdr_service.model.message_broker import MessageBrokerRecord, MessageBrokerDestAuthInfo
 from rdr_service.dao.message_broker_dest_auth_info_dao import MessageBrokerDestAuthInfoDao
@@ -71,6 +72,43 @@ class MessageBrokerApiTest(BaseTestCase):
 
         requests_api_patcher.stop()
 
+    def test_token_kept_in_memory(self):
+        expired_at = clock.CLOCK.now() + timedelta(seconds=600)
+        self._create_auth_info_record('vibrent', 'current_token', expired_at)
+        self.assertEqual('current_token',
+                         MessageBrokerFactory.create(MessageBrokerRecord(messageDest='vibrent')).get_access_token())
+
+        # Messages sent after the first use the token cached in memory, without reading the auth info again
+        with mock.patch.object(MessageBrokerDestAuthInfoDao, 'get_auth_info') as get_auth_info_mock:
+            token = MessageBrokerFactory.create(MessageBrokerRecord(messageDest='vibrent')).get_access_token()
+        self.assertEqual('current_token', token)
+        get_auth_info_mock.assert_not_called()
+        self.assertEqual(1, get_access_token_cache().get_stats()['hits'])
+
+    @mock.patch('rdr_service.dao.participant_dao.get_account_origin_id')
+    @mock.patch('rdr_service.message_broker.message_broker.PtscMessageBroker.send_request')
+    def test_send_message_in_background(self, send_request, request_origin):
+        send_request.return_value = 200, {'result': 'mocked result'}, ''
+        request_origin.return_value = 'color'
+        participant = self.data_generator.create_database_participant(participantOrigin='vibrent')
+        sender = MessageSender(workers=1)
+
+        with mock.patch('rdr_service.dao.message_broker_dao.get_message_sender', return_value=sender):
+            result = self.send_post("MessageBroker", {
+                "event": "result_viewed",
+                "eventAuthoredTime": "2021-05-19T21:05:41Z",
+                "participantId": to_client_participant_id(participant.participantId),
+                "messageBody": {'result_type': 'gem'}
+            })
+        # The message is recorded before it is delivered, and its response saved once it has been
+        self.assertIsNone(result['responseCode'])
+        self.assertTrue(sender.wait_until_idle(timeout=5))
+
+        record = self.record_dao.get_all()[0]
+        self.assertEqual('200', record.responseCode)
+        self.assertEqual({'result': 'mocked result'}, record.responseBody)
+        self.assertIsNotNone(record.responseTime)
+
     @mock.patch('rdr_service.dao.participant_dao.get_account_origin_id')
     @mock.patch('rdr_service.message_broker.message_broker.PtscMessageBroker.send_request')
     def test_send_valid_message(self, send_request, request_origin):
@@ -8,6 +8,7 @@ import unittest
 from copy import deepcopy
 from mock import patch
 from urllib.parse import urlencode
+from werkzeug.exceptions import BadRequest
 
 from rdr_service import config, main
 from rdr_service.api_util import PTC, CURATION, HEALTHPRO
@@ -1399,6 +1400,51 @@ class ParticipantSummaryApiTest(BaseTestCase):
         self.assertEqual(response2["total"], response["total"])
         self.assertEqual(response2["total"], num_participants)
 
+    def test_streamed_summary_list(self):
+        for _ in range(5):
+            self.data_generator.create_database_participant_summary()
+
+        url = "ParticipantSummary?_count=3&_includeTotal=true"
+        response = self.send_get(url)
+        streamed_response = self.send_get(url + "&_stream=true")
+        self.assertEqual(response["entry"], streamed_response["entry"])
+        self.assertEqual(5, streamed_response["total"])
+
+        # The next page is streamed as well
+        next_url = streamed_response["link"][0]["url"]
+        self.assertIn("_stream=true", next_url)
+        next_page = self.send_get(next_url[next_url.find("ParticipantSummary"):])
+        self.assertEqual(2, len(next_page["entry"]))
+        self.assertNotIn("link", next_page)
+
+    def test_streamed_summary_list_errors(self):
+        for _ in range(5):
+            self.data_generator.create_database_participant_summary()
+        url = "ParticipantSummary?_count=5&_includeTotal=true&_stream=true"
+
+        def failing_query(*_, **__):
+            raise BadRequest("Invalid filter")
+            yield  # pylint: disable=unreachable
+
+        # Errors reading the first chunk of results are returned with an error status
+        with mock.patch.object(ParticipantSummaryDao, "query_chunks", side_effect=failing_query):
+            self.send_get(url, expected_status=http.client.BAD_REQUEST)
+
+        query_chunks = ParticipantSummaryDao.query_chunks
+
+        def failing_second_chunk(dao, query_def, results, chunk_size=500):
+            chunks = query_chunks(dao, query_def, results, chunk_size=2)
+            yield next(chunks)
+            raise RuntimeError("Lost connection to the database")
+
+        # Errors after the response has started end the bundle with an error instead of the link and total
+        with mock.patch.object(ParticipantSummaryDao, "query_chunks", autospec=True,
+                               side_effect=failing_second_chunk):
+            response = self.send_get(url)
+        self.assertEqual(2, len(response["entry"]))
+        self.assertIn("error", response)
+        self.assertNotIn("total", response)
+
     def test_get_summary_list_returns_offset_results(self):
         num_participants = 10
         self.setup_codes([PMI_SKIP_CODE], code_type=CodeType.ANSWER)
@@ -1,5 +1,6 @@
 import datetime
 
+from rdr_service.api.public_metrics_api import get_response_cache
 from rdr_service.clock import FakeClock
 from rdr_service.code_constants import (
     PMI_SKIP_CODE,
@@ -16,12 +17,14 @@ from rdr_service.dao.code_dao import CodeDao
 from rdr_service.dao.hpo_dao import HPODao
 from rdr_service.offline.participant_counts_over_time import calculate_participant_metrics
 from rdr_service.dao.organization_dao import OrganizationDao
+from rdr_service.dao.participant_counts_over_time_service import STAGING_DATE_INSERTED
 from rdr_service.dao.participant_dao import ParticipantDao
 from rdr_service.dao.site_dao import SiteDao
 from rdr_service.dao.participant_summary_dao import ParticipantGenderAnswersDao, ParticipantSummaryDao
 from rdr_service.model.calendar import Calendar
 from rdr_service.model.code import Code, CodeType
 from rdr_service.model.hpo import HPO
+from rdr_service.model.metrics_cache import MetricsEnrollmentStatusCache, MetricsGenderCache
 from rdr_service.model.site import Site
 from rdr_service.model.participant import Participant
 from rdr_service.model.participant_summary import ParticipantGenderAnswers, ParticipantSummary
@@ -98,6 +101,7 @@ class PublicMetricsApiTest(BaseTestCase):
         self.clear_table_after_test('metrics_region_cache')
         self.clear_table_after_test('metrics_lifecycle_cache')
         self.clear_table_after_test('metrics_language_cache')
+        get_response_cache().clear()
 
     def _insert(
         self,
@@ -1447,6 +1451,45 @@ class PublicMetricsApiTest(BaseTestCase):
         self.assertIn({"date": "2018-01-07", "metrics": {"TOTAL": 2}}, response)
         self.assertIn({"date": "2018-01-08", "metrics": {"TOTAL": 2}}, response)
 
+    def test_public_metrics_responses_are_cached(self):
+        p1 = Participant(participantId=1, biobankId=4)
+        self._insert(
+            p1, "Bob", "Builder", "AZ_TUCSON", "AZ_TUCSON_BANNER_HEALTH", time_int=self.time2, time_study=self.time2
+        )
+        p2 = Participant(participantId=2, biobankId=5)
+        self._insert(p2, "Chad", "Caterpillar", "PITT", "PITT_BANNER_HEALTH", time_int=self.time3,
+                     time_study=self.time3)
+
+        calculate_participant_metrics()
+
+        qs = "&stratification=TOTAL" "&startDate=2018-01-01" "&endDate=2018-01-08" "&awardee=AZ_TUCSON,PITT"
+        first_response = self.send_get("PublicMetrics", query_string=qs)
+        self.assertIn({"date": "2018-01-02", "metrics": {"TOTAL": 2}}, first_response)
+
+        # Listing the awardees in another order is the same query
+        qs = "&stratification=TOTAL" "&startDate=2018-01-01" "&endDate=2018-01-08" "&awardee=PITT,AZ_TUCSON"
+        self.assertEqual(first_response, self.send_get("PublicMetrics", query_string=qs))
+
+        stats = get_response_cache().get_stats()
+        self.assertEqual(1, stats['misses'])
+        self.assertEqual(1, stats['hits'])
+
+    def test_metrics_cache_refresh_publishes_staged_rows(self):
+        p1 = Participant(participantId=1, biobankId=4)
+        self._insert(
+            p1, "Bob", "Builder", "AZ_TUCSON", "AZ_TUCSON_BANNER_HEALTH", time_int=self.time2, time_study=self.time2
+        )
+        p2 = Participant(participantId=2, biobankId=5)
+        self._insert(p2, "Chad", "Caterpillar", "PITT", "PITT_BANNER_HEALTH", time_int=self.time3,
+                     time_study=self.time3)
+
+        calculate_participant_metrics()
+
+        for model in (MetricsEnrollmentStatusCache, MetricsGenderCache):
+            # Rows are only inserted with the staging version until the refresh of every HPO is done
+            self.assertEqual(0, self.session.query(model).filter(model.dateInserted == STAGING_DATE_INSERTED).count())
+            self.assertGreater(self.session.query(model).count(), 0)
+
     def test_public_metrics_get_race_api(self):
 
         questionnaire_id = self.create_demographics_questionnaire()
@@ -0,0 +1,101 @@
+from copy import deepcopy
+from datetime import datetime, timedelta
+
+from rdr_service import config
+from rdr_service.api_util import RESOURCE
+from rdr_service.clock import FakeClock
+from rdr_service.model.resource_data import ResourceData
+from rdr_service.model.resource_schema import ResourceSchema
+from rdr_service.model.resource_search_results import ResourceSearchResults
+from rdr_service.model.resource_type import ResourceType
+from rdr_service.participant_enums import EnrollmentStatusV2, WithdrawalStatus
+from rdr_service.services.flask import RESOURCE_PREFIX
+from tests.helpers.unittest_base import BaseTestCase
+
+
+class ResourceSearchApiTest(BaseTestCase):
+    def setUp(self):
+        super(ResourceSearchApiTest, self).setUp()
+        new_user_info = deepcopy(config.getSettingJson(config.USER_INFO))
+        new_user_info['example@example.com']['roles'] = [RESOURCE]
+        self.temporarily_override_config_setting(config.USER_INFO, new_user_info)
+
+        from rdr_service.resource import main as resource_main
+        self.resource_client = resource_main.app.test_client()
+
+        resource_type = ResourceType(resourceURI='Participant', resourcePKField='participant_id',
+                                     typeName='participant', typeUID=2000)
+        self.session.add(resource_type)
+        self.session.commit()
+        resource_schema = ResourceSchema(resourceTypeID=resource_type.id, schema={})
+        self.session.add(resource_schema)
+        self.session.commit()
+
+        for participant_id in range(1, 8):
+            resource = {
+                'participant_id': f'P{participant_id}',
+                'participant_origin': 'vibrent' if participant_id % 2 else 'careevolution',
+                'enrollment_status': str(EnrollmentStatusV2(participant_id % 3 + 1)),
+                'enrollment_status_id': participant_id % 3 + 1,
+                'withdrawal_status_id': int(WithdrawalStatus.NOT_WITHDRAWN),
+                'sign_up_time': f'2022-01-0{participant_id}T00:00:00'
+            }
+            self.session.add(ResourceData(resourceTypeID=resource_type.id, resourceSchemaID=resource_schema.id,
+                                          uri=f'Participant/P{participant_id}', resourcePKID=participant_id,
+                                          resource=resource))
+        self.session.commit()
+
+    def _search(self, query_string, **kwargs):
+        return self.send_get('Participant/_search', query_string=query_string, prefix=RESOURCE_PREFIX,
+                             test_client=self.resource_client, **kwargs)
+
+    @staticmethod
+    def _participant_ids(response):
+        return [result['resource']['participant_id'] for result in response['results']]
+
+    def test_search_by_indexed_fields(self):
+        response = self._search({'participant_origin': 'vibrent', 'enrollment_status_id': 'ge2'})
+        self.assertEqual(['P1', 'P5', 'P7'], self._participant_ids(response))
+        self.assertEqual(3, response['total'])
+        self.assertEqual(1, response['pages'])
+        self.assertFalse(response['truncated'])
+
+    def test_search_by_other_fields(self):
+        response = self._search({'enrollment_status': str(EnrollmentStatusV2(2)), 'sign_up_time': 'lt2022-01-05'})
+        self.assertEqual(['P1', 'P4'], self._participant_ids(response))
+
+        # Arguments the resource schema doesn't have are ignored
+        self.assertEqual(7, self._search({'not_a_field': 'value'})['total'])
+        self.assertEqual({'count': 4}, self._search({'participant_origin': 'vibrent', '_count': 'true'}))
+
+    def test_pages_are_read_by_search_key(self):
+        first_page = self._search({'withdrawal_status_id': int(WithdrawalStatus.NOT_WITHDRAWN), '_page_size': 3})
+        self.assertEqual(['P1', 'P2', 'P3'], self._participant_ids(first_page))
+        self.assertEqual(3, first_page['pages'])
+
+        # Records changed after the search ran are still on the page they were found on
+        self.session.query(ResourceData).filter(ResourceData.resourcePKID == 4).update(
+            {ResourceData.resource: {'participant_id': 'P4', 'withdrawal_status_id': 2}},
+            synchronize_session=False
+        )
+        self.session.commit()
+        second_page = self._search({'_search_key': first_page['search_key'], '_page': 2})
+        self.assertEqual(['P4', 'P5', 'P6'], self._participant_ids(second_page))
+        self.assertEqual(7, second_page['total'])
+        self.assertEqual(
+            ['P7'], self._participant_ids(self._search({'_search_key': first_page['search_key'], '_page': 3}))
+        )
+        self._search({'_search_key': first_page['search_key'], '_page': 4}, expected_status=404)
+
+    def test_search_results_expire(self):
+        response = self._search({'participant_origin': 'careevolution'})
+        self.assertEqual(3, self.session.query(ResourceSearchResults).count())
+
+        with FakeClock(datetime.utcnow() + timedelta(hours=2)):
+            self._search({'_search_key': response['search_key']}, expected_status=404)
+        self.assertEqual(0, self.session.query(ResourceSearchResults).count())
+
+    def test_invalid_search_values(self):
+        self._search({'enrollment_status_id': 'not_a_number'}, expected_status=400)
+        self._search({'_page_size': 0}, expected_status=400)
+        self._search({'_search_key': 'abc'}, expected_status=400)
@@ -0,0 +1,65 @@
+import json
+import unittest
+
+import mock
+
+from rdr_service.cloud_utils.gcp_cloud_tasks import GCPCloudTask, InMemoryCloudTasksClient
+
+
+@mock.patch.object(GCPCloudTask, 'RETRY_DELAY_SECONDS', 0)
+class GCPCloudTaskBatchTest(unittest.TestCase):
+    def setUp(self):
+        super(GCPCloudTaskBatchTest, self).setUp()
+        self.client = InMemoryCloudTasksClient()
+        self.queue_path = self.client.queue_path('test-project', 'us-central1', 'resource-rebuild')
+
+    def _execute_batch(self, payloads, **kwargs):
+        return GCPCloudTask(client=self.client).execute_batch(
+            'rebuild_participants_task', payloads, project_id='test-project', queue='resource-rebuild', **kwargs
+        )
+
+    def test_task_created_for_each_payload(self):
+        payloads = ({'batch': [{'pid': pid}]} for pid in range(20))
+        result = self._execute_batch(payloads, max_workers=4)
+
+        self.assertEqual(20, result.created)
+        self.assertEqual([], result.failures)
+        tasks = self.client.tasks[self.queue_path]
+        self.assertCountEqual(
+            [{'batch': [{'pid': pid}]} for pid in range(20)],
+            [json.loads(task['app_engine_http_request']['body']) for task in tasks]
+        )
+        self.assertTrue(all(
+            task['app_engine_http_request']['relative_uri'] == '/resource/task/RebuildParticipantsTaskApi'
+            for task in tasks
+        ))
+
+    def test_failed_requests_are_retried(self):
+        self.client = InMemoryCloudTasksClient(failures=3)
+        result = self._execute_batch([{'batch': [1]}, {'batch': [2]}], max_workers=1)
+
+        self.assertEqual(2, result.created)
+        self.assertEqual([], result.failures)
+
+    def test_failures_are_returned_with_their_payload(self):
+        self.client = InMemoryCloudTasksClient(failures=GCPCloudTask.CREATE_ATTEMPTS)
+        result = self._execute_batch([{'batch': [1]}, ['not', 'a', 'dict'], {'batch': [2]}], max_workers=1)
+
+        # The first task fails on every attempt, the others are still created
+        self.assertEqual(1, result.created)
+        self.assertEqual([{'batch': [1]}, ['not', 'a', 'dict']], [failure.payload for failure in result.failures])
+        self.assertEqual(1, len(self.client.tasks[self.queue_path]))
+
+    def test_endpoint_validated_before_sending(self):
+        with self.assertRaises(ValueError):
+            GCPCloudTask(client=self.client).execute_batch('not_a_task', [{'batch': [1]}], project_id='test-project')
+        with self.assertRaises(ValueError):
+            self._execute_batch([{'batch': [1]}], project_id='localhost')
+
+        self.assertNotIn('not_a_task', GCPCloudTask._task_routes)
+        self.assertEqual(0, sum(len(tasks) for tasks in self.client.tasks.values()))
+
+    def test_execute_uses_provided_client(self):
+        GCPCloudTask(client=self.client).execute('rebuild_participants_task', payload={'batch': [1]},
+                                                 project_id='test-project', queue='resource-rebuild')
+        self.assertEqual(1, len(self.client.tasks[self.queue_path]))
@@ -0,0 +1,56 @@
+from datetime import datetime
+
+import mock
+
+from rdr_service.clock import FakeClock
+from rdr_service.model.bigquery_sync import BigQuerySync
+from rdr_service.offline.bigquery_sync import BigQuerySyncEngine
+from tests.helpers.unittest_base import BaseTestCase
+
+
+class BigQuerySyncEngineTest(BaseTestCase):
+    TIME_1 = datetime(2021, 3, 1, 12, 0, 0)
+    TIME_2 = datetime(2021, 3, 2, 12, 0, 0)
+
+    def setUp(self, **kwargs):
+        super(BigQuerySyncEngineTest, self).setUp(**kwargs)
+        self.sent_batches = list()
+
+        # Several records share the same modified timestamp so pages end in the middle of a timestamp.
+        for index in range(7):
+            with FakeClock(self.TIME_1 if index < 5 else self.TIME_2):
+                self.session.add(BigQuerySync(projectId='localhost', datasetId='rdr_ops_data_view',
+                                              tableId='participant_summary', pk_id=index,
+                                              resource={'participant_id': index, 'data': 'x' * 100}))
+                self.session.commit()
+
+    def _fake_insert(self, bq, project_id, dataset, table, batch, dryrun=False):
+        self.sent_batches.append(batch)
+        return True, {'kind': 'bigquery#tableDataInsertAllResponse'}
+
+    def test_sync_sends_each_record_once(self):
+        engine = BigQuerySyncEngine(dryrun=True, fetch_size=2, max_batch_rows=3, max_workers=2)
+        with mock.patch('rdr_service.offline.bigquery_sync.insert_batch_into_bq', side_effect=self._fake_insert):
+            total = engine.run()
+
+        self.assertEqual(7, total)
+        self.assertTrue(all(len(batch) <= 3 for batch in self.sent_batches))
+        sent_ids = [row['insertId'] for batch in self.sent_batches for row in batch]
+        self.assertEqual(7, len(set(sent_ids)))
+        self.assertEqual(7, len(sent_ids))
+
+        row = self.sent_batches[0][0]['json']
+        self.assertEqual(self.TIME_1.isoformat(), row['created'])
+        self.assertEqual(0, row['participant_id'])
+
+        stats = engine.table_stats[0]
+        self.assertEqual(7, stats.rows)
+        self.assertEqual(0, stats.errors)
+
+    def test_batches_are_limited_by_payload_size(self):
+        engine = BigQuerySyncEngine(dryrun=True, max_batch_bytes=500)
+        with mock.patch('rdr_service.offline.bigquery_sync.insert_batch_into_bq', side_effect=self._fake_insert):
+            engine.run()
+
+        self.assertGreater(len(self.sent_batches), 1)
+        self.assertEqual(7, sum(len(batch) for batch in self.sent_batches))
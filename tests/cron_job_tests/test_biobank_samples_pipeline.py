@@ -285,6 +285,35 @@ class BiobankSamplesPipelineTest(BaseTestCase, PDRGeneratorTestMixin):
         self.assertIn(mail_kit_1sal2_participant_id, rebuilt_participant_list)
         self.assertNotIn(no_order_1sal2_participant_id, rebuilt_participant_list)
 
+    def test_samples_upserted_in_batches(self):
+        self.clear_default_storage()
+        self.create_mock_buckets(self.mock_bucket_paths)
+        dao = BiobankStoredSampleDao()
+        biobank_ids = [self.participant_dao.insert(Participant()).biobankId for _ in range(4)]
+        # The third row's participant doesn't exist and the fourth row is a child sample.
+        biobank_ids.insert(2, max(biobank_ids) + 1)
+        cols = biobank_samples_pipeline.CsvColumns
+
+        for test_code in ('1ED10', '1SAL2'):
+            samples_file = test_data.open_biobank_samples(biobank_ids, [test_code] * len(biobank_ids))
+            reader = csv.DictReader(io.StringIO(samples_file), delimiter="\t")
+            timings = {}
+            with mock.patch('rdr_service.offline.biobank_samples_pipeline._BATCH_SIZE', 2):
+                written = biobank_samples_pipeline._upsert_samples_from_csv(reader, timings)
+
+            self.assertEqual(3, written)
+            self.assertEqual(['parse', 'resolve', 'upsert'], list(timings))
+            samples = dao.get_all()
+            self.assertEqual(3, len(samples))
+            self.assertEqual([test_code] * 3, [sample.test for sample in samples])
+            self.assertNotIn(biobank_ids[2], [sample.biobankId for sample in samples])
+            self.assertTrue(all(sample.rdrCreated and sample.modified for sample in samples))
+
+        reader = csv.DictReader(io.StringIO(samples_file), delimiter="\t")
+        sample_ids = [row[cols.SAMPLE_ID] for row in reader]
+        self.assertEqual(sorted([sample_ids[0], sample_ids[1], sample_ids[4]]),
+                         sorted(sample.biobankStoredSampleId for sample in dao.get_all()))
+
     def test_old_csv_not_imported(self):
         self.clear_default_storage()
         self.create_mock_buckets(self.mock_bucket_paths)
@@ -474,10 +503,10 @@ class BiobankSamplesPipelineTest(BaseTestCase, PDRGeneratorTestMixin):
             confirmed=self._datetime_days_ago(7)
         )
 
-        # Mocking the file writer to catch what gets exported and mocking the upload method because
+        # Mocking the file writer to catch what gets exported and mocking the cloud file because
         # that isn't what this test is meant to cover
         with mock.patch('rdr_service.offline.sql_exporter.csv.writer') as mock_writer_class,\
-                mock.patch('rdr_service.offline.sql_exporter.SqlExporter.upload_export_file'):
+                mock.patch('rdr_service.offline.sql_exporter.open_cloud_file'):
             biobank_samples_pipeline.write_reconciliation_report(datetime.now())
 
             mock_write_rows = mock_writer_class.return_value.writerows
@@ -543,10 +572,10 @@ class BiobankSamplesPipelineTest(BaseTestCase, PDRGeneratorTestMixin):
             confirmed=self._datetime_days_ago(7)
         )
 
-        # Mocking the file writer to catch what gets exported and mocking the upload method because
+        # Mocking the file writer to catch what gets exported and mocking the cloud file because
         # that isn't what this test is meant to cover
         with mock.patch('rdr_service.offline.sql_exporter.csv.writer') as mock_writer_class,\
-                mock.patch('rdr_service.offline.sql_exporter.SqlExporter.upload_export_file'):
+                mock.patch('rdr_service.offline.sql_exporter.open_cloud_file'):
             biobank_samples_pipeline.write_reconciliation_report(datetime.now())
 
             mock_write_rows = mock_writer_class.return_value.writerows
@@ -580,7 +609,7 @@ class BiobankSamplesPipelineTest(BaseTestCase, PDRGeneratorTestMixin):
 
     def _generate_withdrawal_report(self):
         with mock.patch('rdr_service.offline.sql_exporter.csv.writer') as mock_writer_class,\
-                mock.patch('rdr_service.offline.sql_exporter.SqlExporter.upload_export_file'):
+                mock.patch('rdr_service.offline.sql_exporter.open_cloud_file'):
 
             # Generate the withdrawal report
             day_range_of_report = 10
@@ -1,10 +1,12 @@
 import mock
+from types import SimpleNamespace
+from zipfile import ZipFile
 
 from rdr_service import config
 from rdr_service.dao.participant_dao import ParticipantDao
 from rdr_service.model.consent_file import ConsentFile
 from rdr_service.offline.sync_consent_files import ConsentSyncController, DEFAULT_GOOGLE_GROUP, DEFAULT_ORG_NAME
-from rdr_service.storage import GoogleCloudStorageProvider
+from rdr_service.storage import GoogleCloudStorageProvider, LocalFilesystemStorageProvider
 from tests.helpers.unittest_base import BaseTestCase
 
 @mock.patch('rdr_service.offline.sync_consent_files.dispatch_rebuild_consent_metrics_tasks')
@@ -77,6 +79,36 @@ class ConsentSyncControllerTest(BaseTestCase):
             any_order=True
         )
         mock_dispatch_rebuild.assert_called_once_with([first_file.id, second_file.id, third_file.id])
+        # The site's folder is listed once, and no source folders are listed when nothing is at the destination
+        self.storage_provider_mock.list.assert_called_once_with(
+            self.bob_bucket_name, f'Participant/{self.bob_org_name}/test-site-group/'
+        )
+
+    def test_files_already_at_destination_are_skipped(self, _):
+        first_file = ConsentFile(id=4, file_path='/source_bucket/test/one.pdf', participant_id=self.bob_participant_id)
+        second_file = ConsentFile(id=5, file_path='/source_bucket/test/two.pdf', participant_id=self.bob_participant_id)
+        self.consent_dao_mock.get_files_ready_to_sync.return_value = [first_file, second_file]
+        listed_blobs = {
+            self.bob_bucket_name: [SimpleNamespace(
+                name=f'Participant/{self.bob_org_name}/test-site-group/P{self.bob_participant_id}/one.pdf',
+                md5_hash='one-md5', etag='copy-etag'
+            )],
+            'source_bucket': [
+                SimpleNamespace(name='test/one.pdf', md5_hash='one-md5', etag='one-etag'),
+                SimpleNamespace(name='test/two.pdf', md5_hash='two-md5', etag='two-etag')
+            ]
+        }
+        self.storage_provider_mock.list.side_effect = lambda bucket_name, prefix: listed_blobs[bucket_name]
+
+        self.sync_controller.sync_ready_files()
+        self.storage_provider_mock.copy_blob.assert_called_once_with(
+            source_path=second_file.file_path, destination_path=mock.ANY
+        )
+        self.storage_provider_mock.list.assert_has_calls([
+            mock.call(self.bob_bucket_name, f'Participant/{self.bob_org_name}/test-site-group/'),
+            mock.call('source_bucket', 'test/')
+        ])
+        self.assertEqual(2, self.storage_provider_mock.list.call_count)
 
     def test_file_destinations(self, mock_dispatch_rebuild):
         """Test that consent files sync to the correct destinations based on participant data"""
@@ -210,6 +242,62 @@ class ConsentSyncControllerTest(BaseTestCase):
             ], any_order=True
         )
 
+    def test_sync_with_local_storage(self, _):
+        """Files already at their destination shouldn't be copied again, and zipped files should all be uploaded"""
+        storage_provider = LocalFilesystemStorageProvider()
+        self.clear_default_storage()
+        for file in [self.bob_file, self.foo_file, self.bar_file]:
+            with storage_provider.open(file.file_path, 'w') as source_file:
+                source_file.write(f'content of {file.file_path}')
+        self.temporarily_override_config_setting(
+            key=config.CONSENT_SYNC_BUCKETS,
+            value={
+                'orgs': {
+                    self.bob_org_name: {'bucket': self.bob_bucket_name, 'zip_consents': False},
+                    self.foo_org_name: {'bucket': self.foo_bucket_name, 'zip_consents': True}
+                },
+                'hpos': {
+                    self.bar_hpo_name: {'bucket': self.bar_bucket_name, 'zip_consents': False}
+                }
+            }
+        )
+        sync_controller = ConsentSyncController(
+            consent_dao=self.consent_dao_mock,
+            participant_dao=self.participant_dao_mock,
+            storage_provider=storage_provider
+        )
+
+        bar_dest_path = self._build_expected_dest_path(
+            bucket_name=self.bar_bucket_name,
+            org_id=DEFAULT_ORG_NAME,
+            site_group=DEFAULT_GOOGLE_GROUP,
+            participant_id=self.bar_participant_id,
+            file_name='bar.pdf'
+        )
+        storage_provider.copy_blob(source_path=self.bar_file.file_path, destination_path=bar_dest_path)
+        with mock.patch.object(storage_provider, 'copy_blob', wraps=storage_provider.copy_blob) as copy_blob_spy:
+            sync_controller.sync_ready_files()
+
+        copy_blob_spy.assert_called_once_with(
+            source_path=self.bob_file.file_path,
+            destination_path=self._build_expected_dest_path(
+                bucket_name=self.bob_bucket_name,
+                org_id=self.bob_org_name,
+                site_group='test-site-group',
+                participant_id=self.bob_participant_id,
+                file_name='bob.pdf'
+            )
+        )
+        with storage_provider.open(bar_dest_path, 'r') as bar_file:
+            self.assertEqual(f'content of {self.bar_file.file_path}', bar_file.read())
+
+        zip_path = f'{self.foo_bucket_name}/Participant/{self.foo_org_name}/{DEFAULT_GOOGLE_GROUP}.zip'
+        with ZipFile(storage_provider.get_local_path(zip_path)) as zip_file:
+            self.assertEqual(
+                f'content of {self.foo_file.file_path}',
+                zip_file.read(f'P{self.foo_participant_id}/foo.pdf').decode()
+            )
+
     @classmethod
     def _build_expected_dest_path(cls, bucket_name, org_id, site_group, participant_id, file_name):
         return f'{bucket_name}/Participant/{org_id}/{site_group}/P{participant_id}/{file_name}'
@@ -1,4 +1,5 @@
 import csv
+import gzip
 
 from rdr_service.offline.sql_exporter import SqlExporter
 from rdr_service.participant_enums import UNSET_HPO_ID
@@ -34,6 +35,19 @@ class SqlExporterTest(BaseTestCase):
             [["id", "name"], [str(UNSET_HPO_ID), "UNSET"], [str(AZ_HPO_ID), "AZ_TUCSON"], [str(PITT_HPO_ID), "PITT"]],
         )
 
+    def testHpoExport_gzip(self):
+        self.clear_default_storage()
+        self.create_mock_buckets(self.mock_bucket_paths)
+
+        SqlExporter(_BUCKET_NAME).run_export(
+            _FILE_NAME + ".gz", "SELECT hpo_id id, name name FROM hpo ORDER BY hpo_id",
+            predicate=lambda row: row.name != "UNSET", gzip_output=True
+        )
+        with open_cloud_file("/%s/%s.gz" % (_BUCKET_NAME, _FILE_NAME), mode="rb") as f:
+            rows = list(csv.reader(gzip.open(f, mode="rt", newline="")))
+
+        self.assertEqual([["id", "name"], [str(AZ_HPO_ID), "AZ_TUCSON"], [str(PITT_HPO_ID), "PITT"]], rows)
+
 
 def assert_csv_contents(test, bucket_name, file_name, contents):
     with open_cloud_file("/%s/%s" % (bucket_name, file_name)) as f:
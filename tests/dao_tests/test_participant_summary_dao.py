@@ -3,6 +3,7 @@ import datetime
 import json
 import time
 from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import namedtuple
 
 from rdr_service import clock, config
 from rdr_service.code_constants import BIOBANK_TESTS
@@ -10,10 +11,11 @@ from rdr_service.dao.base_dao import json_serial
 from rdr_service.dao.biobank_order_dao import BiobankOrderDao
 from rdr_service.dao.biobank_stored_sample_dao import BiobankStoredSampleDao
 from rdr_service.dao.participant_dao import ParticipantDao
-from rdr_service.dao.participant_summary_dao import ParticipantSummaryDao
+from rdr_service.dao.participant_summary_dao import ParticipantSummaryDao, _get_client_json_plan
 from rdr_service.dao.physical_measurements_dao import PhysicalMeasurementsDao
 from rdr_service.model.biobank_order import BiobankOrder, BiobankOrderIdentifier, BiobankOrderedSample
 from rdr_service.model.biobank_stored_sample import BiobankStoredSample
+from rdr_service.model.consent_file import ConsentType
 from rdr_service.model.measurements import PhysicalMeasurements
 from rdr_service.model.participant import Participant
 from rdr_service.model.participant_summary import ParticipantSummary
@@ -1032,6 +1034,21 @@ class ParticipantSummaryDaoTest(BaseTestCase):
         self.assertIsNotNone(participant_summary)
         self.assertEqual(pid, participant_summary.participantId)
 
+    def test_client_json_plan_reads_model_fields(self):
+        summary = self.data_generator.create_database_participant_summary(
+            dateOfBirth=datetime.date(1980, 3, 4),
+            consentForStudyEnrollmentTime=TIME_1
+        )
+        plan = _get_client_json_plan()
+        self.assertEqual(list(summary.asdict().items()), list(plan.asdict(summary).items()))
+
+        # The same plan is reused for every summary
+        self.assertIs(plan, _get_client_json_plan())
+        client_json = self.dao.to_client_json(summary)
+        self.assertEqual('1980-03-04', client_json['dateOfBirth'])
+        self.assertEqual(TIME_1.isoformat(), client_json['consentForStudyEnrollmentTime'])
+        self.assertNotIn('organizationId', client_json)
+
     def test_parse_enums_from_resource(self):
         resource = {
             "withdrawalStatus": "NO_USE",
@@ -1048,6 +1065,29 @@ class ParticipantSummaryDaoTest(BaseTestCase):
                          if type(key).__class__.__name__ == '_EnumClass'])
         self.assertTrue(all_enums)
 
+    def test_prefetched_consent_paths_lookup(self):
+        consent_row = namedtuple('consent_row', ['file_path', 'participant_id', 'consent_type'])
+        self.dao.hpro_consents = [
+            consent_row('bucket/P1/primary.pdf', 1, ConsentType.PRIMARY),
+            consent_row('bucket/P2/primary.pdf', 2, ConsentType.PRIMARY),
+            consent_row('bucket/P1/ehr.pdf', 1, ConsentType.EHR),
+            consent_row('bucket/P1/ehr_resubmitted.pdf', 1, ConsentType.EHR)
+        ]
+
+        result = self.dao.get_hpro_consent_paths({'participantId': 1})
+        self.assertEqual({
+            'participantId': 1,
+            'consentForStudyEnrollmentFilePath': 'bucket/P1/primary.pdf',
+            'consentForElectronicHealthRecordsFilePath': 'bucket/P1/ehr.pdf'
+        }, result)
+        self.assertEqual({'participantId': 3}, self.dao.get_hpro_consent_paths({'participantId': 3}))
+
+        # Replacing the prefetched records replaces the index
+        self.dao.hpro_consents = []
+        self.assertEqual({'participantId': 1}, self.dao.get_hpro_consent_paths({'participantId': 1}))
+        self.dao.participant_incentives = []
+        self.assertEqual([], self.dao.get_participant_incentives({'participantId': 1}))
+
     @staticmethod
     def _get_amended_info(order):
         amendment = dict(
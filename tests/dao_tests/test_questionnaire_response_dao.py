@@ -42,6 +42,7 @@ from rdr_service.model.questionnaire_response import QuestionnaireResponse, Ques
     QuestionnaireResponseStatus
 from rdr_service.model.resource_data import ResourceData
 from rdr_service.participant_enums import GenderIdentity, QuestionnaireStatus, WithdrawalStatus, ParticipantCohort
+from rdr_service.services.survey_definition_cache import get_survey_definition_cache
 from tests import test_data
 from tests.test_data import (
     consent_code,
@@ -560,6 +561,32 @@ class QuestionnaireResponseDaoTest(PDRGeneratorTestMixin, BaseTestCase):
         with self.assertRaises(IntegrityError):
             self._insert_questionnaire_response(qr2)
 
+    def test_insert_caches_questionnaire_definition(self):
+        self.insert_codes()
+        p = Participant(participantId=1, biobankId=2)
+        self.participant_dao.insert(p)
+        self._setup_questionnaire()
+        qr = self.data_generator._questionnaire_response(
+            questionnaireResponseId=1,
+            questionnaireId=1,
+            questionnaireVersion=1,
+            questionnaireSemanticVersion='V1',
+            participantId=1,
+            resource=QUESTIONNAIRE_RESPONSE_RESOURCE
+        )
+        qr.answers.extend(self._names_and_email_answers())
+        self._insert_questionnaire_response(qr)
+        self.check_response(qr)
+
+        cache = get_survey_definition_cache()
+        self.assertEqual(1, cache.get_stats()['size'])
+
+        # Updating the questionnaire drops its cached definitions
+        self.questionnaire_dao.update(
+            Questionnaire(questionnaireId=1, semanticVersion='V1', resource=QUESTIONNAIRE_RESOURCE)
+        )
+        self.assertEqual(0, cache.get_stats()['size'])
+
     def test_insert_skip_codes(self):
         self.insert_codes()
         p = Participant(participantId=1, biobankId=2)
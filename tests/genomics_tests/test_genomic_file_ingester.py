@@ -1,10 +1,14 @@
 
 
+import mock
+
 from rdr_service import clock, config
-from rdr_service.dao.genomics_dao import GenomicSetMemberDao
+from rdr_service.dao.genomics_dao import GenomicFileProcessedDao, GenomicGCValidationMetricsDao, \
+    GenomicIncidentDao, GenomicManifestFeedbackDao, GenomicSetMemberDao
 from rdr_service.genomic.genomic_job_components import GenomicFileIngester
 from rdr_service.genomic.genomic_job_controller import GenomicJobController
-from rdr_service.genomic_enums import GenomicJob
+from rdr_service.genomic_enums import GenomicIncidentCode, GenomicJob, GenomicSubProcessResult, \
+    GenomicSubProcessStatus, GenomicWorkflowState
 from tests.genomics_tests.test_genomic_pipeline import create_ingestion_test_file
 from tests.helpers.unittest_base import BaseTestCase
 
@@ -57,11 +61,11 @@ class GenomicFileIngesterTest(BaseTestCase):
         total_rows = len(data['rows'])
         sample_ids = [obj['Sample ID'] for obj in data['rows']]
 
-        iterations = file_ingester._set_data_ingest_iterations(data['rows'])
+        iterations = list(file_ingester._iter_data_ingest_chunks(data['rows']))
         self.assertEqual(len(iterations), 1)
 
         job_controller.max_num = config.getSetting(config.GENOMIC_MAX_NUM_INGEST)
-        iterations = file_ingester._set_data_ingest_iterations(data['rows'])
+        iterations = list(file_ingester._iter_data_ingest_chunks(data['rows']))
         correct_length = round(total_rows / job_controller.max_num)  # 3
 
         self.assertEqual(len(iterations), correct_length)
@@ -76,6 +80,59 @@ class GenomicFileIngesterTest(BaseTestCase):
         distinct_list = list(distinct_sample_ids)
         self.assertEqual(distinct_list.sort(), sample_ids.sort())
 
+    def test_streamed_rows_resume_after_ingested_rows(self):
+        subfolder = config.getSetting(config.GENOMIC_AW2_SUBFOLDERS[1])
+        test_file_name = create_ingestion_test_file(
+            'RDR_AoU_GEN_TestDataManifest.csv',
+            self.bucket_name,
+            folder=subfolder,
+        )
+        file_path = f"{self.bucket_name}/{subfolder}/{test_file_name}"
+
+        job_controller = GenomicJobController(job_id=GenomicJob.METRICS_INGESTION)
+        job_controller.max_num = 2
+        file_ingester = GenomicFileIngester(
+            job_id=GenomicJob.METRICS_INGESTION,
+            _controller=job_controller
+        )
+
+        loaded_data = file_ingester._retrieve_data_from_path(file_path)
+        streamed_data = file_ingester._stream_data_to_ingest(file_path)
+        self.assertEqual(loaded_data['fieldnames'], streamed_data['fieldnames'])
+        self.assertEqual(loaded_data['rows'], list(streamed_data['rows']))
+
+        # The rows are read from the file again, skipping the rows that were already ingested
+        chunks = list(file_ingester._iter_data_ingest_chunks(streamed_data['rows'], skip_rows=3))
+        self.assertTrue(all(len(chunk) <= 2 for chunk in chunks))
+        self.assertEqual(loaded_data['rows'][3:], [row for chunk in chunks for row in chunk])
+
+        job_run = self.data_generator.create_database_genomic_job_run(
+            jobId=GenomicJob.METRICS_INGESTION,
+            startTime=clock.CLOCK.now()
+        )
+        failed_file, retried_file = [
+            self.data_generator.create_database_genomic_file_processed(
+                runId=job_run.id,
+                startTime=clock.CLOCK.now(),
+                filePath=file_path,
+                bucketName=self.bucket_name,
+                fileName=test_file_name,
+                fileStatus=GenomicSubProcessStatus.QUEUED,
+                ingestedRowCount=ingested_row_count
+            ) for ingested_row_count in (3, None)
+        ]
+
+        file_processed_dao = GenomicFileProcessedDao()
+        self.assertEqual(3, file_processed_dao.get_resumable_row_count(retried_file))
+
+        # Ingestion starts over after an attempt that completed
+        file_processed_dao.update_file_record(
+            failed_file.id,
+            GenomicSubProcessStatus.COMPLETED,
+            GenomicSubProcessResult.ERROR
+        )
+        self.assertEqual(0, file_processed_dao.get_resumable_row_count(retried_file))
+
     def test_replating_copy(self):
 
         job_controller = GenomicJobController(job_id=1)
@@ -116,6 +173,128 @@ class GenomicFileIngesterTest(BaseTestCase):
         self.assertEquals(copy_member.blockResearchReason, block_research_reason)
         self.assertEqual(copy_member.blockResearch, 1)
 
+    def _make_file_ingester(self, job_id, file_name):
+        job_run = self.data_generator.create_database_genomic_job_run(
+            jobId=job_id,
+            startTime=clock.CLOCK.now()
+        )
+        file_ingester = GenomicFileIngester(
+            job_id=job_id,
+            job_run_id=job_run.id,
+            _controller=GenomicJobController(job_id=job_id)
+        )
+        file_ingester.file_obj = self.data_generator.create_database_genomic_file_processed(
+            runId=job_run.id,
+            startTime=clock.CLOCK.now(),
+            filePath=f"{self.bucket_name}/{file_name}",
+            bucketName=self.bucket_name,
+            fileName=file_name,
+        )
+        return file_ingester
+
+    @mock.patch.object(GenomicFileIngester, 'INGEST_BATCH_SIZE', 2)
+    def test_aw1_rows_ingested_in_batches(self):
+        for num in range(1, 4):
+            self.data_generator.create_database_genomic_set_member(
+                genomicSetId=self.gen_set.id,
+                biobankId=str(num),
+                collectionTubeId=f'100{num}',
+                genomeType='aou_array',
+                genomicWorkflowState=GenomicWorkflowState.AW0
+            )
+
+        def aw1_row(biobank_id, tube_id, sample_id):
+            return {
+                'Biobank ID': f'Z{biobank_id}',
+                'Collection Tube ID': tube_id,
+                'Sample ID': sample_id,
+                'Parent Sample ID': tube_id,
+                'Genome Type': 'aou_array',
+                'Failure Mode': '',
+            }
+
+        file_ingester = self._make_file_ingester(GenomicJob.AW1_MANIFEST, 'RDR_AoU_GEN_PKG-1908-218051.csv')
+        file_ingester._ingest_aw1_manifest([
+            aw1_row(1, '1001', '2001'),
+            aw1_row(2, '1002', '2002'),
+            aw1_row(4, '1004', '2004'),
+            # The member was given a sample by the earlier row, so it isn't found again
+            aw1_row(1, '1001', '2005'),
+        ])
+
+        members = {member.biobankId: member for member in self.member_dao.get_all()}
+        for biobank_id, sample_id in [('1', '2001'), ('2', '2002')]:
+            self.assertEqual(sample_id, members[biobank_id].sampleId)
+            self.assertEqual(GenomicWorkflowState.AW1, members[biobank_id].genomicWorkflowState)
+            self.assertEqual('rdr', members[biobank_id].gcSiteId)
+            self.assertEqual(file_ingester.job_run_id, members[biobank_id].reconcileGCManifestJobRunId)
+        self.assertIsNone(members['3'].sampleId)
+        self.assertEqual(GenomicWorkflowState.AW0, members['3'].genomicWorkflowState)
+
+        incidents = GenomicIncidentDao().get_all()
+        self.assertEqual(2, len(incidents))
+        self.assertTrue(all(incident.code == GenomicIncidentCode.UNABLE_TO_FIND_MEMBER.name
+                            for incident in incidents))
+        self.assertEqual({'2004', '2005'}, {incident.sample_id for incident in incidents})
+
+    @mock.patch.object(GenomicFileIngester, 'INGEST_BATCH_SIZE', 2)
+    def test_aw2_metrics_upserted_in_batches(self):
+        manifest = self.data_generator.create_database_genomic_manifest_file()
+        feedback = self.data_generator.create_database_genomic_manifest_feedback(
+            inputManifestFileId=manifest.id,
+            feedbackRecordCount=0
+        )
+        aw1_file_ingester = self._make_file_ingester(GenomicJob.AW1_MANIFEST, 'RDR_AoU_GEN_PKG-1908-218051.csv')
+        aw1_file = aw1_file_ingester.file_obj
+        aw1_file.genomicManifestFileId = manifest.id
+        self.session.merge(aw1_file)
+        self.session.commit()
+
+        members = []
+        for num in range(1, 3):
+            members.append(self.data_generator.create_database_genomic_set_member(
+                genomicSetId=self.gen_set.id,
+                biobankId=str(num),
+                sampleId=f'200{num}',
+                genomeType='aou_array',
+                genomicWorkflowState=GenomicWorkflowState.AW1,
+                aw1FileProcessedId=aw1_file.id
+            ))
+        existing_metrics = self.data_generator.create_database_genomic_gc_validation_metrics(
+            genomicSetMemberId=members[1].id,
+            limsId='old'
+        )
 
-
-
+        def aw2_row(biobank_id, sample_id, lims_id):
+            return {
+                'Biobank ID': biobank_id,
+                'Sample ID': sample_id,
+                'LIMS ID': lims_id,
+                'Contamination': '0.001',
+                'Processing Status': 'Pass',
+            }
+
+        file_ingester = self._make_file_ingester(GenomicJob.METRICS_INGESTION, 'RDR_AoU_GEN_TestDataManifest.csv')
+        file_ingester._process_gc_metrics_data_for_insert([
+            aw2_row('1', '2001', 'first'),
+            aw2_row('2', '2002', 'updated'),
+            # The metrics inserted for the first row are updated
+            aw2_row('1', '2001', 'second'),
+            aw2_row('3', '2003', 'missing'),
+        ])
+
+        metrics = {
+            obj.genomicSetMemberId: obj for obj in GenomicGCValidationMetricsDao().get_all()
+        }
+        self.assertEqual(2, len(metrics))
+        self.assertEqual('second', metrics[members[0].id].limsId)
+        self.assertEqual('updated', metrics[members[1].id].limsId)
+        self.assertEqual(existing_metrics.id, metrics[members[1].id].id)
+
+        for member in self.member_dao.get_all():
+            self.assertEqual(GenomicWorkflowState.AW2, member.genomicWorkflowState)
+            self.assertEqual(file_ingester.file_obj.id, member.aw2FileProcessedId)
+
+        # Only the new metrics are counted as feedback
+        self.assertEqual(1, GenomicManifestFeedbackDao().get(feedback.id).feedbackRecordCount)
+        self.assertEqual(1, len(GenomicIncidentDao().get_all()))
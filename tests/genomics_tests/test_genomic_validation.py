@@ -6,6 +6,7 @@ from rdr_service import clock
 from rdr_service.dao.genomics_dao import GenomicSetDao, GenomicSetMemberDao
 from rdr_service.dao.participant_dao import ParticipantDao
 from rdr_service.dao.participant_summary_dao import ParticipantSummaryDao
+from rdr_service.genomic.genomic_job_components import ManifestSourceDataValidator
 from rdr_service.genomic.validation import validate_and_update_genomic_set_by_id
 from rdr_service.model.genomics import (
     GenomicSet,
@@ -335,3 +336,45 @@ class GenomicSetValidationSafetyTestCase(GenomicSetValidationBaseTestCase):
         self.assertEqual(current_member.validatedTime, now)
         current_set = self.genomic_set_dao.get(genomic_set.id)
         self.assertEqual(current_set.validatedTime, now)
+
+
+@mock.patch('rdr_service.genomic.genomic_job_components.get_biobank_id_prefix', return_value='A')
+class ManifestSourceDataValidatorTest(BaseTestCase):
+    columns = ('biobank_id', 'sample_id', 'sex_at_birth', 'red_idat_path')
+
+    def __init__(self, *args, **kwargs):
+        super(ManifestSourceDataValidatorTest, self).__init__(*args, **kwargs)
+        self.uses_database = False
+
+    def _validate(self, rows):
+        validator = ManifestSourceDataValidator(self.columns)
+        for row in rows:
+            validator.check_row(row)
+        return validator.get_error_message()
+
+    def test_valid_rows(self, _):
+        self.assertIsNone(self._validate([
+            ('A1', '1001', 'M', 'gs://bucket/folder/1001_Red.idat'),
+            ('A2', '1002', 'NA', None)
+        ]))
+
+    def test_duplicate_sample_ids(self, _):
+        self.assertEqual("Sample IDs ['1001', '1002'] are not distinct", self._validate([
+            ('A1', '1001', 'M', None),
+            ('A2', '1002', 'F', None),
+            ('A3', '1001', 'F', None),
+            ('A4', '1002', 'F', None),
+            ('A5', '1001', 'F', None)
+        ]))
+
+    def test_errors_reported_in_check_order(self, _):
+        # The invalid path comes first, but sex at birth is checked before paths
+        self.assertEqual('Invalid Sex at Birth values', self._validate([
+            ('A1', '1001', 'M', 'gs://bucket/1001_Red.idat'),
+            ('A2', '1002', 'X', None)
+        ]))
+        self.assertEqual('Biobank IDs are missing correct prefix', self._validate([
+            ('A1', '1001', 'M', None),
+            ('A1', '1001', 'M', None),
+            ('B2', '1002', 'M', None)
+        ]))
@@ -920,7 +920,7 @@ class InMemorySqlExporter(sql_exporter.SqlExporter):
         self._path_to_buffer = collections.defaultdict(io.StringIO)
 
     @contextlib.contextmanager
-    def open_cloud_writer(self, file_name, predicate=None):
+    def open_cloud_writer(self, file_name, predicate=None, gzip_output=False):  # pylint: disable=unused-argument
         yield sql_exporter.SqlExportFileWriter(self._path_to_buffer[file_name], predicate)
 
     def assertFilesEqual(self, paths):
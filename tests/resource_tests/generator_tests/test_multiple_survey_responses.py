@@ -4,11 +4,16 @@
 #
 from datetime import datetime
 
+import mock
+
 from rdr_service import clock
 from rdr_service.dao.participant_dao import ParticipantDao
 from rdr_service.model.hpo import HPO
+from rdr_service.model.resource_data import ResourceData
 from rdr_service.model.site import Site
-from rdr_service.resource.generators.participant import ParticipantSummaryGenerator
+from rdr_service.participant_enums import OrderStatus, PatientStatusFlag
+from rdr_service.resource.generators.participant import ModuleAnswersLoader, ParticipantSummaryGenerator
+from rdr_service.resource.tasks import batch_rebuild_participants_task
 from tests.helpers.unittest_base import BaseTestCase
 
 
@@ -89,3 +94,163 @@ class MultipleQuestionnaireResponsesTest(BaseTestCase):
             # Verify data from second submission has been added.
             self.assertEqual(ps_data['login_phone_number'], '(555)-555-5555')
             self.assertEqual(ps_data['date_of_birth'], datetime(year=1960, month=10, day=1).date())
+
+    def test_batch_module_answers_loader(self):
+        """
+        Test that answers loaded for a batch of participants match the answers loaded for each participant.
+        """
+        with clock.FakeClock(self.TIME_2):
+            self.send_consent(self.participant_id)
+            first_name = self.first_name
+        with clock.FakeClock(self.TIME_3):
+            self.send_consent(self.participant_id, string_answers=[('loginPhoneNumber', '(555)-555-5555')])
+            second_participant = self.create_participant(self.provider_link)
+            second_pid = int(second_participant['participantId'].replace('P', ''))
+            self.send_consent(second_pid)
+            second_first_name = self.first_name
+
+        loader = ModuleAnswersLoader()
+        loader.load([self.participant_id, second_pid], ['ConsentPII', 'TheBasics'])
+
+        for pid in (self.participant_id, second_pid):
+            self.assertTrue(loader.is_loaded('ConsentPII', pid))
+            self.assertEqual(
+                ParticipantSummaryGenerator.get_module_answers(None, 'ConsentPII', pid, return_responses=True),
+                loader.get_module_answers('ConsentPII', pid, return_responses=True)
+            )
+
+        answers, responses = loader.get_module_answers('ConsentPII', self.participant_id, return_responses=True)
+        self.assertEqual(2, len(responses))
+        self.assertEqual(first_name, answers['PIIName_First'])
+        self.assertEqual('(555)-555-5555', answers['ConsentPII_VerifiedPrimaryPhoneNumber'])
+        self.assertEqual(second_first_name, loader.get_module_answers('ConsentPII', second_pid)['PIIName_First'])
+        self.assertIsNone(loader.get_module_answers('TheBasics', second_pid))
+
+    def _create_patient_status_history(self, participant_id, authored):
+        """ The patient_status_history table isn't in the unittest schema, create it with a status record """
+        self.session.execute("""
+            CREATE TABLE IF NOT EXISTS patient_status_history (
+                id INTEGER NOT NULL AUTO_INCREMENT PRIMARY KEY, participant_id INTEGER, created DATETIME,
+                modified DATETIME, authored DATETIME, patient_status SMALLINT, hpo_id INTEGER,
+                organization_id INTEGER, site_id INTEGER, comment TEXT, user VARCHAR(80)
+            )
+        """)
+        self.session.execute("""
+            INSERT INTO patient_status_history (participant_id, created, modified, authored, patient_status, hpo_id,
+                                                site_id, comment, user)
+            VALUES (:p_id, :authored, :authored, :authored, :status, :hpo_id, :site_id, 'test comment', 'test_user')
+        """, {'p_id': participant_id, 'authored': authored, 'status': int(PatientStatusFlag.YES),
+              'hpo_id': self.hpo.hpoId, 'site_id': self.site.siteId})
+        self.session.commit()
+
+    def test_batch_prefetch_builds_expected_values(self):
+        """
+        Test that participants built from a prefetched batch have their own module, biobank and patient status
+        data, and that the batch rebuild task saves a resource record for each of them.
+        """
+        with clock.FakeClock(self.TIME_2):
+            self.send_consent(self.participant_id, authored=self.TIME_2)
+            second_participant = self.create_participant(self.provider_link)
+            second_pid = int(second_participant['participantId'].replace('P', ''))
+            self.send_consent(second_pid)
+
+        order = self.data_generator.create_database_biobank_order(
+            participantId=self.participant_id, created=self.TIME_2, finalizedTime=self.TIME_3
+        )
+        self.data_generator.create_database_biobank_order_identifier(value='KIT-1', biobankOrderId=order.biobankOrderId)
+        self.data_generator.create_database_biobank_ordered_sample(biobankOrderId=order.biobankOrderId, test='1ED10',
+                                                                   collected=self.TIME_2)
+        self.data_generator.create_database_biobank_stored_sample(biobankId=self.biobank_id, test='1ED10',
+                                                                  biobankOrderIdentifier='KIT-1',
+                                                                  confirmed=self.TIME_3)
+        self._create_patient_status_history(self.participant_id, self.TIME_3)
+        try:
+            batch_gen = ParticipantSummaryGenerator()
+            batch_gen.prefetch([self.participant_id, second_pid])
+            data = batch_gen.make_resource(self.participant_id).get_data()
+            second_data = batch_gen.make_resource(second_pid).get_data()
+        finally:
+            self.session.execute('DROP TABLE patient_status_history')
+
+        self.assertEqual(['ConsentPII'], [mod['module'] for mod in data['modules']])
+        self.assertEqual(self.TIME_2, data['modules'][0]['module_authored'])
+        self.assertEqual(['ConsentPII'], [mod['module'] for mod in second_data['modules']])
+
+        self.assertEqual(1, len(data['biobank_orders']))
+        biobank_order = data['biobank_orders'][0]
+        self.assertEqual(order.biobankOrderId, biobank_order['biobank_order_id'])
+        self.assertEqual(str(OrderStatus.FINALIZED), biobank_order['finalized_status'])
+        self.assertEqual(1, biobank_order['tests_ordered'])
+        self.assertEqual(1, biobank_order['tests_stored'])
+        self.assertEqual(1, biobank_order['isolate_dna_confirmed'])
+        self.assertEqual(1, biobank_order['baseline_tests_confirmed'])
+        self.assertEqual([('1ED10', self.TIME_2, self.TIME_3)],
+                         [(sample['test'], sample['collected'], sample['confirmed'])
+                          for sample in biobank_order['samples']])
+        self.assertNotIn('biobank_orders', second_data)
+
+        self.assertEqual([{
+            'patient_status': str(PatientStatusFlag.YES),
+            'patient_status_authored': self.TIME_3,
+            'hpo': 'PITT',
+            'site': 'hpo-site-monroeville',
+            'comment': 'test comment'
+        }], [{key: status[key] for key in ('patient_status', 'patient_status_authored', 'hpo', 'site', 'comment')}
+             for status in data['patient_statuses']])
+        self.assertNotIn('patient_statuses', second_data)
+
+    def test_batch_rebuild_skips_failed_participants(self):
+        """
+        Test that a participant listed more than once is built once, and that a participant that fails to build
+        doesn't stop the rest of the batch from being saved, but still fails the task so it is retried.
+        """
+        with clock.FakeClock(self.TIME_2):
+            self.send_consent(self.participant_id)
+            second_participant = self.create_participant(self.provider_link)
+            second_pid = int(second_participant['participantId'].replace('P', ''))
+            self.send_consent(second_pid)
+            third_participant = self.create_participant(self.provider_link)
+            third_pid = int(third_participant['participantId'].replace('P', ''))
+
+        built_pids = list()
+        make_resource = ParticipantSummaryGenerator.make_resource
+
+        def make_resource_or_fail(gen, p_id):
+            built_pids.append(p_id)
+            if p_id == third_pid:
+                raise ValueError('bad participant data')
+            return make_resource(gen, p_id)
+
+        with mock.patch.object(ParticipantSummaryGenerator, 'make_resource', autospec=True,
+                               side_effect=make_resource_or_fail):
+            with self.assertRaises(RuntimeError) as context:
+                batch_rebuild_participants_task({'batch': [
+                    {'pid': self.participant_id}, {'pid': third_pid}, {'pid': second_pid}, {'pid': self.participant_id}
+                ]})
+
+        self.assertIn(str(third_pid), str(context.exception))
+        self.assertEqual([self.participant_id, third_pid, second_pid], built_pids)
+        resources = self.session.query(ResourceData).filter(
+            ResourceData.resourcePKID.in_([self.participant_id, second_pid, third_pid])).all()
+        self.assertEqual({self.participant_id, second_pid}, {rec.resourcePKID for rec in resources})
+        self.assertEqual({self.hpo.hpoId}, {rec.hpoId for rec in resources})
+
+    def test_unprefetched_participant_keeps_batch(self):
+        """
+        Test that building a participant that wasn't prefetched, or was already built, doesn't drop the rows
+        prefetched for the rest of the batch.
+        """
+        with clock.FakeClock(self.TIME_2):
+            self.send_consent(self.participant_id)
+            second_participant = self.create_participant(self.provider_link)
+            second_pid = int(second_participant['participantId'].replace('P', ''))
+            self.send_consent(second_pid)
+
+        batch_gen = ParticipantSummaryGenerator()
+        batch_gen.prefetch([second_pid])
+        batch_gen.make_resource(self.participant_id)
+        batch_gen.make_resource(self.participant_id)
+        # Prefetched rows are only used for one build.
+        self.assertFalse(batch_gen._batch.is_loaded(self.participant_id))
+        self.assertTrue(batch_gen._batch.is_loaded(second_pid))
+        self.assertEqual(f'P{second_pid}', batch_gen.make_resource(second_pid).get_data()['participant_id'])
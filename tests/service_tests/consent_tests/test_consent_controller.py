@@ -112,6 +112,38 @@ class ConsentControllerTest(BaseTestCase):
         # values from the expected_updates list
         self.assertDispatchRebuildConsentMetricsCalled([2, 5, 6, 4], call_count=2)
 
+    def test_consent_validation_results_stored_for_each_chunk(self):
+        """Results should be stored after each chunk of participants, so a restarted job can skip them"""
+        consent_responses = {
+            participant_id: [ConsentResponse(
+                response=QuestionnaireResponse(participantId=participant_id),
+                type=ConsentType.PRIMARY
+            )]
+            for participant_id in [1, 2, 3]
+        }
+        self.consent_dao_mock.get_consent_responses_to_validate.return_value = consent_responses
+        self.participant_summary_dao_mock.get_by_ids_with_session.side_effect = lambda session, obj_ids: [
+            ParticipantSummary(participantId=participant_id) for participant_id in obj_ids
+        ]
+        self.consent_validator_mock.get_primary_validation_results.side_effect = lambda expected_signing_date: [
+            ConsentFile(sync_status=ConsentSyncStatus.READY_FOR_SYNC, file_path='/valid_primary')
+        ]
+
+        with mock.patch.object(ConsentValidationController, 'PARTICIPANT_CHUNK_SIZE', 2):
+            self.consent_controller.validate_consent_uploads(
+                session=mock.MagicMock(),
+                output_strategy=self.store_strategy
+            )
+
+        summary_lookups = self.participant_summary_dao_mock.get_by_ids_with_session.call_args_list
+        self.assertEqual([[1, 2], [3]], [lookup.kwargs['obj_ids'] for lookup in summary_lookups])
+        self.assertEqual(2, self.consent_dao_mock.batch_update_consent_files.call_count)
+        stored_results: List[ConsentFile] = self.consent_dao_mock.batch_update_consent_files.call_args.args[0]
+        self.assertCountEqual(
+            [response for responses in consent_responses.values() for response in responses],
+            [result.consent_response for result in stored_results]
+        )
+
     def test_validating_specific_consents(self):
         """Make sure only the provided consent types are validated when specified"""
         # Create a participant that has consented to the primary, ehr, and gror consents
@@ -14,6 +14,16 @@ class ConsentFileParsingTest(BaseTestCase):
         super(ConsentFileParsingTest, self).__init__(*args, **kwargs)
         self.uses_database = False
 
+    def test_has_text_only_reads_leading_pages(self):
+        pdf = self._build_pdf([
+            [self._build_text_box('Consent to Join the All of Us Research Program ' * 5)],
+            [self._build_text_box('Text on a later page')]
+        ])
+        self.assertTrue(pdf.has_text([('Consent to Join', 'Consentimiento para participar')]))
+        self.assertFalse(pdf.has_text([('Text on a later page',)]))
+        # The file's text is found without laying out the second page
+        pdf.pages[1].__iter__.assert_not_called()
+
     def test_vibrent_primary_consent(self):
         for consent_example in self._get_vibrent_primary_test_data():
             consent_file = consent_example.file
@@ -669,6 +679,13 @@ class ConsentFileParsingTest(BaseTestCase):
 
         return element
 
+    def _build_text_box(self, text: str):
+        line = self._build_pdf_element(
+            cls=LTTextLineHorizontal,
+            children=[self._build_pdf_element(cls=LTChar, text=char) for char in text]
+        )
+        return self._build_pdf_element(cls=LTTextBoxHorizontal, children=[line])
+
     def _build_form_element(self, bbox, text: str = None, children: list = None):
         """
         Form elements don't have a get_text method, and (at least with the Vibrent PDFs) any text within them is
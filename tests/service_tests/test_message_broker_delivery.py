@@ -0,0 +1,154 @@
+import datetime
+import threading
+import time
+import unittest
+
+import mock
+from werkzeug.exceptions import BadRequest
+
+from rdr_service.clock import FakeClock
+from rdr_service.message_broker.delivery import AccessTokenCache, MessageSender
+
+
+class AccessTokenCacheTest(unittest.TestCase):
+    def test_tokens_are_loaded_once_until_they_expire(self):
+        cache = AccessTokenCache()
+        now = datetime.datetime(2022, 1, 1)
+        loaded = []
+
+        def load():
+            loaded.append(now)
+            return f'token_{len(loaded)}', now + datetime.timedelta(seconds=300)
+
+        with FakeClock(now):
+            self.assertEqual('token_1', cache.get_token('vibrent', load))
+            self.assertEqual('token_1', cache.get_token('vibrent', load))
+        # Tokens are replaced shortly before they expire
+        with FakeClock(now + datetime.timedelta(seconds=290)):
+            self.assertEqual('token_2', cache.get_token('vibrent', load))
+
+        stats = cache.get_stats()
+        self.assertEqual(1, stats['hits'])
+        self.assertEqual(2, stats['loads'])
+
+    def test_one_thread_loads_an_expired_token(self):
+        cache = AccessTokenCache()
+        load_started = threading.Event()
+        finish_load = threading.Event()
+        tokens = []
+
+        def load():
+            load_started.set()
+            finish_load.wait(5)
+            return 'new_token', datetime.datetime.utcnow() + datetime.timedelta(seconds=300)
+
+        def get_token():
+            tokens.append(cache.get_token('vibrent', load))
+
+        threads = [threading.Thread(target=get_token) for _ in range(5)]
+        threads[0].start()
+        load_started.wait(5)
+        for thread in threads[1:]:
+            thread.start()
+        finish_load.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(['new_token'] * 5, tokens)
+        self.assertEqual(1, cache.get_stats()['loads'])
+
+    def test_load_errors_are_not_cached(self):
+        cache = AccessTokenCache()
+
+        def failed_load():
+            raise BadRequest('can not find auth info for dest: vibrent')
+
+        with self.assertRaises(BadRequest):
+            cache.get_token('vibrent', failed_load)
+        self.assertEqual(
+            'token',
+            cache.get_token('vibrent', lambda: ('token', datetime.datetime.utcnow() + datetime.timedelta(seconds=300)))
+        )
+
+
+@mock.patch.object(MessageSender, 'RETRY_BACKOFF_SECONDS', 0)
+class MessageSenderTest(unittest.TestCase):
+    def setUp(self):
+        self.responses = []
+
+    def _on_response(self, *response):
+        self.responses.append(response)
+
+    @staticmethod
+    def _message_broker(*responses):
+        message_broker = mock.MagicMock()
+        message_broker.send_request.side_effect = responses
+        return message_broker
+
+    def test_messages_are_sent_in_the_background(self):
+        sender = MessageSender(workers=2)
+        for _ in range(3):
+            self.assertTrue(sender.send(self._message_broker((200, {'result': 'ok'}, '')), self._on_response))
+        self.assertTrue(sender.wait_until_idle(timeout=5))
+
+        self.assertEqual([(200, {'result': 'ok'}, '')] * 3, self.responses)
+        stats = sender.get_stats()
+        self.assertEqual(3, stats['queued'])
+        self.assertEqual(3, stats['sent'])
+        self.assertEqual(0, stats['queue_depth'])
+
+    def test_server_and_connection_errors_are_retried(self):
+        sender = MessageSender(workers=1)
+        message_broker = self._message_broker(
+            (503, 'unavailable', 'unavailable'),
+            ConnectionError('connection reset'),
+            (200, {'result': 'ok'}, '')
+        )
+        sender.send(message_broker, self._on_response)
+        self.assertTrue(sender.wait_until_idle(timeout=5))
+
+        self.assertEqual(3, message_broker.send_request.call_count)
+        self.assertEqual([(200, {'result': 'ok'}, '')], self.responses)
+        self.assertEqual(2, sender.get_stats()['retries'])
+
+    def test_client_errors_are_not_retried(self):
+        sender = MessageSender(workers=1)
+        message_broker = self._message_broker(BadRequest('no destination url found'))
+        sender.send(message_broker, self._on_response)
+        self.assertTrue(sender.wait_until_idle(timeout=5))
+
+        self.assertEqual(1, message_broker.send_request.call_count)
+        self.assertEqual(400, self.responses[0][0])
+        self.assertEqual(0, sender.get_stats()['retries'])
+
+    def test_last_failure_is_saved_after_max_attempts(self):
+        sender = MessageSender(workers=1, max_attempts=2)
+        sender.send(self._message_broker((502, 'bad gateway', 'bad gateway'), (504, 'timeout', 'timeout')),
+                    self._on_response)
+        self.assertTrue(sender.wait_until_idle(timeout=5))
+
+        self.assertEqual([(504, 'timeout', 'timeout')], self.responses)
+        self.assertEqual(1, sender.get_stats()['failed'])
+
+    def test_messages_are_rejected_when_the_queue_is_full(self):
+        sender = MessageSender(workers=1, queue_size=1)
+        release = threading.Event()
+
+        def slow_send():
+            release.wait(5)
+            return 200, {}, ''
+
+        slow_message_broker = mock.MagicMock()
+        slow_message_broker.send_request.side_effect = slow_send
+        sender.send(slow_message_broker, self._on_response)
+        # Wait for the worker to take the first message, so the second one fills the queue
+        deadline = time.monotonic() + 5
+        while sender.get_stats()['queue_depth'] and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertTrue(sender.send(self._message_broker((200, {}, '')), self._on_response))
+        self.assertFalse(sender.send(self._message_broker((200, {}, '')), self._on_response))
+
+        release.set()
+        self.assertTrue(sender.wait_until_idle(timeout=5))
+        self.assertEqual(2, len(self.responses))
+        self.assertEqual(1, sender.get_stats()['rejected'])
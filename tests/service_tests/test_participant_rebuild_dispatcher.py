@@ -0,0 +1,77 @@
+import mock
+
+from rdr_service.cloud_utils.gcp_cloud_tasks import CloudTaskBatchResult, CloudTaskFailure
+from rdr_service.services.participant_rebuild_dispatcher import ParticipantRebuildDispatcher
+from tests.helpers.unittest_base import BaseTestCase
+
+
+@mock.patch('rdr_service.services.participant_rebuild_dispatcher.GCPCloudTask')
+class ParticipantRebuildDispatcherTest(BaseTestCase):
+    def __init__(self, *args, **kwargs):
+        super(ParticipantRebuildDispatcherTest, self).__init__(*args, **kwargs)
+        self.uses_database = False
+
+    def setUp(self, *args, **kwargs) -> None:
+        super(ParticipantRebuildDispatcherTest, self).setUp(*args, **kwargs)
+        # A long window and large batch so only explicit flushes dispatch during the test.
+        self.dispatcher = ParticipantRebuildDispatcher(window_seconds=3600, batch_size=100,
+                                                       project_id='test-project')
+
+    @staticmethod
+    def _dispatched_payloads(task_mock):
+        return [list(call.args[1]) for call in task_mock.return_value.execute_batch.call_args_list]
+
+    def test_writes_are_coalesced(self, task_mock):
+        task_mock.return_value.execute_batch.return_value = CloudTaskBatchResult(created=3)
+        for participant_id in [11, 22, 11, 11, '22', 33]:
+            self.dispatcher.mark_dirty(participant_id)
+
+        self.assertEqual(3, self.dispatcher.flush())
+        self.assertEqual([[{'p_id': 11}, {'p_id': 22}, {'p_id': 33}]], self._dispatched_payloads(task_mock))
+        # Coalesced rebuilds use the same task and queue as a rebuild for a single write.
+        args, kwargs = task_mock.return_value.execute_batch.call_args
+        self.assertEqual('rebuild_one_participant_task', args[0])
+        self.assertEqual('resource-tasks', kwargs['queue'])
+        self.assertEqual('test-project', kwargs['project_id'])
+
+        stats = self.dispatcher.get_stats()
+        self.assertEqual(6, stats['writes'])
+        self.assertEqual(3, stats['participants_dispatched'])
+        self.assertEqual(3, stats['rebuilds_coalesced'])
+        self.assertEqual(0, stats['pending'])
+
+        # Nothing is dispatched when no participants changed.
+        self.assertEqual(0, self.dispatcher.flush())
+        self.assertEqual(1, task_mock.return_value.execute_batch.call_count)
+
+    def test_failed_dispatch_is_retried(self, task_mock):
+        task_mock.return_value.execute_batch.side_effect = [
+            Exception('queue unavailable'), CloudTaskBatchResult(created=1)
+        ]
+        self.dispatcher.mark_dirty(11)
+
+        self.assertEqual(0, self.dispatcher.flush())
+        self.assertEqual(1, self.dispatcher.get_stats()['pending'])
+        self.assertEqual(1, self.dispatcher.flush())
+
+        stats = self.dispatcher.get_stats()
+        self.assertEqual(1, stats['dispatch_errors'])
+        self.assertEqual(1, stats['participants_dispatched'])
+
+    def test_failed_tasks_are_retried(self, task_mock):
+        task_mock.return_value.execute_batch.side_effect = [
+            CloudTaskBatchResult(created=2, failures=[CloudTaskFailure(payload={'p_id': 22}, error=Exception())]),
+            CloudTaskBatchResult(created=1)
+        ]
+        for participant_id in [11, 22, 33]:
+            self.dispatcher.mark_dirty(participant_id)
+
+        self.assertEqual(2, self.dispatcher.flush())
+        self.assertEqual(1, self.dispatcher.get_stats()['pending'])
+        self.assertEqual(1, self.dispatcher.flush())
+        self.assertEqual([{'p_id': 22}], self._dispatched_payloads(task_mock)[1])
+
+        stats = self.dispatcher.get_stats()
+        self.assertEqual(1, stats['dispatch_errors'])
+        self.assertEqual(3, stats['participants_dispatched'])
+        self.assertEqual(0, stats['rebuilds_coalesced'])
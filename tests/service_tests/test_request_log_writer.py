@@ -0,0 +1,66 @@
+import mock
+
+from rdr_service.model.requests_log import RequestsLog
+from rdr_service.services.request_log_writer import RequestLogWriter
+from tests.helpers.unittest_base import BaseTestCase
+
+
+class RequestLogWriterTest(BaseTestCase):
+    @staticmethod
+    def _make_log(url, participant_id=None):
+        log = RequestsLog()
+        log.endpoint = 'participant'
+        log.method = 'GET'
+        log.url = url
+        log.version = 1
+        log.participantId = participant_id
+        log.complete = True
+        return log
+
+    def test_queued_records_are_saved_in_batches(self):
+        # A long flush time, the drain wakes the background thread instead of waiting for it.
+        writer = RequestLogWriter(batch_size=2, flush_seconds=3600)
+        writer.write(self._make_log('/rdr/v1/Participant/P1', participant_id=1))
+        writer.write(self._make_log('/rdr/v1/Participant/P2', participant_id=0x80000000))
+        writer.write(self._make_log('/rdr/v1/Participant/P3', participant_id=3))
+        writer.drain(timeout=30)
+        self.assertFalse(writer._thread.is_alive())
+
+        logs = self.session.query(RequestsLog).order_by(RequestsLog.url).all()
+        self.assertEqual(['/rdr/v1/Participant/P1', '/rdr/v1/Participant/P2', '/rdr/v1/Participant/P3'],
+                         [log.url for log in logs])
+        # Participant ids too large for the column are replaced, as they are when saved during the request.
+        self.assertEqual([1, 0, 3], [log.participantId for log in logs])
+        self.assertTrue(all(log.created for log in logs))
+
+        stats = writer.get_stats()
+        self.assertEqual(3, stats['queued'])
+        self.assertEqual(3, stats['written'])
+        self.assertEqual(0, stats['dropped'])
+        self.assertEqual(0, stats['queue_depth'])
+
+    def test_drain_wakes_waiting_thread(self):
+        writer = RequestLogWriter(flush_seconds=3600)
+        writer._start()
+        writer.drain(timeout=30)
+        self.assertFalse(writer._thread.is_alive())
+        self.assertEqual(0, writer.get_stats()['queue_depth'])
+
+    def test_overflow_policies(self):
+        with mock.patch.object(RequestLogWriter, '_start'):
+            writer = RequestLogWriter(queue_size=1, overflow_policy=RequestLogWriter.DROP)
+            writer.write(self._make_log('/rdr/v1/Participant/P1'))
+            writer.write(self._make_log('/rdr/v1/Participant/P2'))
+            self.assertEqual(1, writer.get_stats()['dropped'])
+            self.assertEqual(1, writer.get_stats()['queue_depth'])
+
+            writer = RequestLogWriter(queue_size=1, overflow_policy=RequestLogWriter.SYNC)
+            writer.write(self._make_log('/rdr/v1/Participant/P1'))
+            writer.write(self._make_log('/rdr/v1/Participant/P2'))
+            stats = writer.get_stats()
+            self.assertEqual(0, stats['dropped'])
+            self.assertEqual(1, stats['written_in_request'])
+            self.assertEqual(['/rdr/v1/Participant/P2'], [log.url for log in self.session.query(RequestsLog).all()])
+
+        with self.assertRaises(ValueError):
+            RequestLogWriter(overflow_policy='ignore')
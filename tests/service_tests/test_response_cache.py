@@ -0,0 +1,63 @@
+import unittest
+
+from rdr_service.services.response_cache import VersionedResponseCache
+
+
+class VersionedResponseCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.loaded_keys = []
+
+    def _loader(self, key, response=None):
+        def load():
+            self.loaded_keys.append(key)
+            return response if response is not None else {'key': key}
+        return load
+
+    def test_responses_are_cached_by_version(self):
+        cache = VersionedResponseCache()
+        self.assertEqual({'key': 'one'}, cache.get('one', 1, self._loader('one')))
+        self.assertEqual({'key': 'one'}, cache.get('one', 1, self._loader('one')))
+        self.assertEqual({'key': 'two'}, cache.get('two', 1, self._loader('two')))
+        self.assertEqual(['one', 'two'], self.loaded_keys)
+
+        # A new version drops everything cached for the previous one
+        cache.get('one', 2, self._loader('one'))
+        cache.get('two', 2, self._loader('two'))
+        self.assertEqual(['one', 'two', 'one', 'two'], self.loaded_keys)
+
+        stats = cache.get_stats()
+        self.assertEqual(1, stats['hits'])
+        self.assertEqual(4, stats['misses'])
+        self.assertEqual(1, stats['invalidations'])
+        self.assertEqual(2, stats['size'])
+
+    def test_unversioned_responses_are_not_cached(self):
+        cache = VersionedResponseCache()
+        cache.get('one', None, self._loader('one'))
+        cache.get('one', None, self._loader('one'))
+        self.assertEqual(['one', 'one'], self.loaded_keys)
+
+        cache = VersionedResponseCache(max_bytes=0)
+        cache.get('two', 1, self._loader('two'))
+        cache.get('two', 1, self._loader('two'))
+        self.assertEqual(['one', 'one', 'two', 'two'], self.loaded_keys)
+
+    def test_memory_bound(self):
+        response = ['x' * 90]  # 94 bytes of JSON
+        cache = VersionedResponseCache(max_bytes=200)
+        cache.get('one', 1, self._loader('one', response))
+        cache.get('two', 1, self._loader('two', response))
+        cache.get('one', 1, self._loader('one', response))
+        cache.get('three', 1, self._loader('three', response))
+
+        # 'two' was the least recently used response when 'three' didn't fit
+        stats = cache.get_stats()
+        self.assertEqual(1, stats['evictions'])
+        self.assertEqual(188, stats['size_bytes'])
+        cache.get('one', 1, self._loader('one', response))
+        cache.get('two', 1, self._loader('two', response))
+        self.assertEqual(['one', 'two', 'three', 'two'], self.loaded_keys)
+
+        # Responses larger than the whole cache aren't kept
+        cache.get('big', 1, self._loader('big', ['x' * 300]))
+        self.assertEqual(188, cache.get_stats()['size_bytes'])
@@ -0,0 +1,81 @@
+import datetime
+import unittest
+
+from rdr_service.clock import FakeClock
+from rdr_service.services.survey_definition_cache import SurveyDefinitionCache
+
+
+class SurveyDefinitionCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.loaded = []
+
+    def _loader(self, questionnaire_id, version, definition=True):
+        def load():
+            self.loaded.append((questionnaire_id, version))
+            return f'{questionnaire_id}-{version}' if definition else None
+        return load
+
+    def _get(self, cache, questionnaire_id, version, definition=True):
+        return cache.get(questionnaire_id, version, self._loader(questionnaire_id, version, definition))
+
+    def test_definitions_are_cached(self):
+        cache = SurveyDefinitionCache(ttl_seconds=60)
+        now = datetime.datetime(2022, 1, 1)
+        with FakeClock(now):
+            self.assertEqual('1-V1', self._get(cache, 1, 'V1'))
+            self.assertEqual('1-V1', self._get(cache, 1, 'V1'))
+            self.assertEqual('1-V2', self._get(cache, 1, 'V2'))
+        self.assertEqual([(1, 'V1'), (1, 'V2')], self.loaded)
+
+        # Definitions are loaded again once the TTL expires
+        with FakeClock(now + datetime.timedelta(seconds=61)):
+            self._get(cache, 1, 'V1')
+        self.assertEqual([(1, 'V1'), (1, 'V2'), (1, 'V1')], self.loaded)
+
+        stats = cache.get_stats()
+        self.assertEqual(1, stats['hits'])
+        self.assertEqual(3, stats['misses'])
+        self.assertEqual(2, stats['size'])
+
+    def test_missing_definitions_are_not_cached(self):
+        cache = SurveyDefinitionCache()
+        self.assertIsNone(self._get(cache, 1, 'V1', definition=False))
+        self.assertEqual('1-V1', self._get(cache, 1, 'V1'))
+        self.assertEqual([(1, 'V1'), (1, 'V1')], self.loaded)
+
+    def test_invalidate_drops_every_version_of_the_questionnaire(self):
+        cache = SurveyDefinitionCache()
+        for questionnaire_id, version in [(1, 'V1'), (1, 'V2'), (2, 'V1')]:
+            self._get(cache, questionnaire_id, version)
+        cache.invalidate(1)
+        for questionnaire_id, version in [(1, 'V1'), (1, 'V2'), (2, 'V1')]:
+            self._get(cache, questionnaire_id, version)
+
+        self.assertEqual([(1, 'V1'), (1, 'V2'), (2, 'V1'), (1, 'V1'), (1, 'V2')], self.loaded)
+        stats = cache.get_stats()
+        self.assertEqual(1, stats['invalidations'])
+        self.assertEqual(1, stats['hits'])
+
+    def test_definitions_loaded_during_an_update_are_not_cached(self):
+        cache = SurveyDefinitionCache()
+
+        def load_while_updating():
+            cache.invalidate(1)
+            return 'outdated'
+
+        self.assertEqual('outdated', cache.get(1, 'V1', load_while_updating))
+        self.assertEqual('1-V1', self._get(cache, 1, 'V1'))
+        self.assertEqual(0, cache.get_stats()['hits'])
+
+    def test_least_recently_used_definitions_are_evicted(self):
+        cache = SurveyDefinitionCache(max_size=2)
+        for questionnaire_id in [1, 2, 1, 3, 1, 2]:
+            self._get(cache, questionnaire_id, 'V1')
+        self.assertEqual([(1, 'V1'), (2, 'V1'), (3, 'V1'), (2, 'V1')], self.loaded)
+        self.assertEqual(2, cache.get_stats()['evictions'])
+
+    def test_zero_ttl_disables_the_cache(self):
+        cache = SurveyDefinitionCache(ttl_seconds=0)
+        self._get(cache, 1, 'V1')
+        self._get(cache, 1, 'V1')
+        self.assertEqual([(1, 'V1'), (1, 'V1')], self.loaded)
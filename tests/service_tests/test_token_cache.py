@@ -0,0 +1,102 @@
+import datetime
+import threading
+import unittest
+
+from werkzeug.exceptions import Unauthorized
+
+from rdr_service.clock import FakeClock
+from rdr_service.services.token_cache import TokenVerificationCache
+
+
+class TokenVerificationCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.verified_tokens = []
+
+    def _verify(self, token):
+        self.verified_tokens.append(token)
+        if token == 'bad':
+            raise Unauthorized
+        return f'{token}@example.com', None
+
+    def test_verified_tokens_are_cached(self):
+        cache = TokenVerificationCache(self._verify, ttl_seconds=60, unknown_expiry_ttl_seconds=60)
+        now = datetime.datetime(2022, 1, 1)
+        with FakeClock(now):
+            self.assertEqual('one@example.com', cache.get_user_email('one'))
+            self.assertEqual('one@example.com', cache.get_user_email('one'))
+            self.assertEqual('two@example.com', cache.get_user_email('two'))
+        self.assertEqual(['one', 'two'], self.verified_tokens)
+
+        # Tokens are verified again once the TTL expires
+        with FakeClock(now + datetime.timedelta(seconds=61)):
+            cache.get_user_email('one')
+        self.assertEqual(['one', 'two', 'one'], self.verified_tokens)
+
+        stats = cache.get_stats()
+        self.assertEqual(1, stats['hits'])
+        self.assertEqual(3, stats['misses'])
+        self.assertEqual(2, stats['size'])
+
+    def test_token_expiry_limits_ttl(self):
+        cache = TokenVerificationCache(lambda token: ('user@example.com', 10), ttl_seconds=60)
+        now = datetime.datetime(2022, 1, 1)
+        with FakeClock(now):
+            cache.get_user_email('token')
+        with FakeClock(now + datetime.timedelta(seconds=11)):
+            cache.get_user_email('token')
+        self.assertEqual(2, cache.get_stats()['misses'])
+
+    def test_unknown_expiry_uses_short_ttl(self):
+        cache = TokenVerificationCache(self._verify, ttl_seconds=300, unknown_expiry_ttl_seconds=30)
+        now = datetime.datetime(2022, 1, 1)
+        with FakeClock(now):
+            cache.get_user_email('one')
+        with FakeClock(now + datetime.timedelta(seconds=29)):
+            cache.get_user_email('one')
+        self.assertEqual(['one'], self.verified_tokens)
+        with FakeClock(now + datetime.timedelta(seconds=31)):
+            cache.get_user_email('one')
+        self.assertEqual(['one', 'one'], self.verified_tokens)
+
+    def test_failures_are_not_cached(self):
+        cache = TokenVerificationCache(self._verify)
+        for _ in range(2):
+            with self.assertRaises(Unauthorized):
+                cache.get_user_email('bad')
+        self.assertEqual(['bad', 'bad'], self.verified_tokens)
+        self.assertEqual(2, cache.get_stats()['errors'])
+
+    def test_least_recently_used_tokens_are_evicted(self):
+        cache = TokenVerificationCache(self._verify, max_size=2)
+        for token in ['one', 'two', 'one', 'three', 'one', 'two']:
+            cache.get_user_email(token)
+        self.assertEqual(['one', 'two', 'three', 'two'], self.verified_tokens)
+        self.assertEqual(2, cache.get_stats()['evictions'])
+
+    def test_concurrent_requests_share_a_verification(self):
+        release = threading.Event()
+
+        def slow_verify(token):
+            self.verified_tokens.append(token)
+            release.wait(5)
+            return 'user@example.com', None
+
+        cache = TokenVerificationCache(slow_verify)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get_user_email('token'))) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        while cache.get_stats()['waits'] < 4:
+            threading.Event().wait(0.01)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(['token'], self.verified_tokens)
+        self.assertEqual(['user@example.com'] * 5, results)
+
+    def test_zero_ttl_disables_the_cache(self):
+        cache = TokenVerificationCache(self._verify, ttl_seconds=0)
+        cache.get_user_email('one')
+        cache.get_user_email('one')
+        self.assertEqual(['one', 'one'], self.verified_tokens)
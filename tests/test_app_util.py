@@ -52,6 +52,8 @@ class AppUtilTest(BaseTestCase):
         fs = LocalFilesystemConfigProvider()
         fs.store(config.USER_INFO, self.user_info)
 
+        app_util.get_token_cache().clear()
+
     def test_date_header(self):
         response = lambda: None  # Dummy object; functions can have arbitrary attrs set on them.
         setattr(response, "headers", {})
@@ -382,11 +384,21 @@ class AppUtilTest(BaseTestCase):
             self.assertEqual(expected_user_email, app_util.get_oauth_id())
             mock_requests.get.assert_called_once()  # There should only be one call to get the user info
 
-        # Make sure another request will make another call to get the new requests user info
+        # Make sure another request with the same token uses the verified token cache
+        with Flask('test').test_request_context(headers={'Authorization': 'Bearer token'}):
+            self.assertEqual(expected_user_email, app_util.get_oauth_id())
+            mock_requests.get.assert_called_once()
+
+        # Make sure a request with another token will make another call to get the new requests user info
         another_email = 'another@test.com'
         auth_api_response.json.return_value = {'email': another_email}
-        with Flask('test').test_request_context(headers={'Authorization': 'Bearer token'}):
+        with Flask('test').test_request_context(headers={'Authorization': 'Bearer another_token'}):
             self.assertEqual(another_email, app_util.get_oauth_id())
+        self.assertEqual(2, mock_requests.get.call_count)
+
+        stats = app_util.get_token_cache().get_stats()
+        self.assertEqual(1, stats['hits'])
+        self.assertEqual(2, stats['misses'])
 
     def test_batch_manager(self):
         processed_objects = []
@@ -1,4 +1,5 @@
 import datetime
+import threading
 import unittest
 
 from rdr_service import singletons
@@ -7,6 +8,7 @@ from rdr_service.clock import FakeClock
 TIME_1 = datetime.datetime(2016, 1, 1)
 TIME_2 = datetime.datetime(2016, 1, 2)
 TIME_3 = datetime.datetime(2016, 1, 4)
+TIME_4 = datetime.datetime(2016, 1, 10)
 
 
 # TODO: represent in new test suite
@@ -39,3 +41,92 @@ class SingletonsTest(unittest.TestCase):
 
         with FakeClock(TIME_3):
             self.assertEqual(2, singletons.get(123, SingletonsTest.foo, 86401))
+
+    def _wait_for_refresh(self, cache_index):
+        thread = singletons._refresh_threads.get(cache_index)
+        if thread:
+            thread.join()
+
+    def test_stale_while_revalidate(self):
+        with FakeClock(TIME_1):
+            self.assertEqual(1, singletons.get(123, SingletonsTest.foo, 86400, stale_while_revalidate=True,
+                                               max_stale_seconds=86400 * 7))
+
+        # The expired value is returned while the refresh runs in the background.
+        refresh_started = threading.Event()
+        release_refresh = threading.Event()
+
+        def slow_foo():
+            refresh_started.set()
+            release_refresh.wait()
+            return SingletonsTest.foo()
+
+        with FakeClock(TIME_3):
+            self.assertEqual(1, singletons.get(123, slow_foo, 86400, stale_while_revalidate=True,
+                                               max_stale_seconds=86400 * 7))
+            refresh_started.wait()
+            # Only a single refresh is started.
+            self.assertEqual(1, singletons.get(123, slow_foo, 86400, stale_while_revalidate=True,
+                                               max_stale_seconds=86400 * 7))
+            release_refresh.set()
+            self._wait_for_refresh(123)
+            self.assertEqual(2, singletons.get(123, SingletonsTest.foo, 86400, stale_while_revalidate=True))
+
+        stats = singletons.get_stats(123)
+        self.assertEqual(1, stats['hits'])
+        self.assertEqual(2, stats['stale_hits'])
+        self.assertEqual(1, stats['misses'])
+        self.assertEqual(2, stats['refreshes'])
+        self.assertIsNotNone(stats['last_refresh_seconds'])
+
+    def test_max_staleness_refreshes_synchronously(self):
+        with FakeClock(TIME_1):
+            self.assertEqual(1, singletons.get(123, SingletonsTest.foo, 86400, stale_while_revalidate=True))
+        with FakeClock(TIME_4):
+            self.assertEqual(2, singletons.get(123, SingletonsTest.foo, 86400, stale_while_revalidate=True))
+        self.assertEqual(2, singletons.get_stats(123)['misses'])
+
+    def test_invalidate_discards_background_refresh(self):
+        with FakeClock(TIME_1):
+            singletons.get(123, SingletonsTest.foo, 86400, stale_while_revalidate=True, max_stale_seconds=86400 * 7)
+
+        release_refresh = threading.Event()
+
+        def slow_refresh():
+            release_refresh.wait()
+            return 'stale data'
+
+        with FakeClock(TIME_3):
+            singletons.get(123, slow_refresh, 86400, stale_while_revalidate=True, max_stale_seconds=86400 * 7)
+            singletons.invalidate(123)
+            release_refresh.set()
+            self._wait_for_refresh(123)
+            self.assertEqual(2, singletons.get(123, SingletonsTest.foo, 86400, stale_while_revalidate=True))
+
+        stats = singletons.get_stats(123)
+        self.assertEqual(1, stats['refreshes_discarded'])
+        self.assertEqual(2, stats['refreshes'])
+
+    def test_failed_refresh_keeps_serving_stale_value(self):
+        with FakeClock(TIME_1):
+            singletons.get(123, SingletonsTest.foo, 86400, stale_while_revalidate=True, max_stale_seconds=86400 * 7)
+
+        def broken():
+            raise ValueError('database unavailable')
+
+        with FakeClock(TIME_3):
+            self.assertEqual(1, singletons.get(123, broken, 86400, stale_while_revalidate=True,
+                                               max_stale_seconds=86400 * 7))
+            self._wait_for_refresh(123)
+            # Another refresh isn't started until a fraction of the TTL has passed since the failure.
+            self.assertEqual(1, singletons.get(123, broken, 86400, stale_while_revalidate=True,
+                                               max_stale_seconds=86400 * 7))
+            self.assertNotIn(123, singletons._refresh_threads)
+        self.assertEqual(1, singletons.get_stats(123)['refresh_errors'])
+
+        with FakeClock(TIME_3 + datetime.timedelta(seconds=86400 * singletons.REFRESH_RETRY_TTL_FRACTION + 1)):
+            self.assertEqual(1, singletons.get(123, broken, 86400, stale_while_revalidate=True,
+                                               max_stale_seconds=86400 * 7))
+            self._wait_for_refresh(123)
+        self.assertEqual(2, singletons.get_stats(123)['refresh_errors'])
+        self.assertEqual(3, singletons.get_stats(123)['stale_hits'])
@@ -0,0 +1,118 @@
+import csv
+import datetime
+import unittest
+
+import mock
+
+from rdr_service import singletons
+from rdr_service.clock import FakeClock
+from rdr_service.storage import GoogleCloudStorageFile, GoogleCloudStorageProvider
+
+
+class FakeBlob:
+    """ Serves byte ranges from memory, returning at most max_chunk bytes per download """
+
+    def __init__(self, data: bytes, max_chunk=7):
+        self.data = data
+        self.size = len(data)
+        self.max_chunk = max_chunk
+        self.download_count = 0
+
+    def download_as_string(self, start=0, end=None):
+        self.download_count += 1
+        end = self.size if end is None else end + 1
+        return self.data[start:min(end, start + self.max_chunk)]
+
+
+class GoogleCloudStorageFileTest(unittest.TestCase):
+
+    def test_iter_lines_across_chunk_boundaries(self):
+        data = 'first line\nsecond\n\nthird line is longer than a chunk\nlast'
+        cloud_file = GoogleCloudStorageFile(blob=FakeBlob(data.encode()))
+        self.assertEqual(data.split('\n'), list(cloud_file))
+
+    def test_iter_lines_trailing_newline(self):
+        cloud_file = GoogleCloudStorageFile(blob=FakeBlob(b'a\nb\n'))
+        self.assertEqual(['a', 'b'], list(cloud_file.iter_lines()))
+
+    def test_multibyte_characters_split_between_chunks(self):
+        data = 'naïve café\nrésumé ☃\n'
+        cloud_file = GoogleCloudStorageFile(blob=FakeBlob(data.encode('utf-8'), max_chunk=3))
+        self.assertEqual(['naïve café', 'résumé ☃'], list(cloud_file.iter_lines()))
+
+    def test_readline(self):
+        cloud_file = GoogleCloudStorageFile(blob=FakeBlob(b'one\r\ntwo\nthree'))
+        self.assertEqual('one\r\n', cloud_file.readline())
+        self.assertEqual('two\n', cloud_file.readline())
+        self.assertEqual('three', cloud_file.readline())
+        self.assertEqual('', cloud_file.readline())
+
+    def test_next_strips_line_endings(self):
+        cloud_file = GoogleCloudStorageFile(blob=FakeBlob(b'one\r\ntwo\n'))
+        self.assertEqual('one', next(cloud_file))
+        self.assertEqual('two', next(cloud_file))
+        with self.assertRaises(StopIteration):
+            next(cloud_file)
+
+    def test_csv_dict_reader(self):
+        data = 'biobank_id,sample_id\nA1,100\nA2,200\n'
+        cloud_file = GoogleCloudStorageFile(blob=FakeBlob(data.encode()))
+        rows = list(csv.DictReader(cloud_file))
+        self.assertEqual([{'biobank_id': 'A1', 'sample_id': '100'}, {'biobank_id': 'A2', 'sample_id': '200'}], rows)
+
+    def test_partial_write_is_not_uploaded(self):
+        blob = mock.MagicMock()
+        with self.assertRaises(ValueError):
+            with GoogleCloudStorageFile(blob=blob) as cloud_file:
+                cloud_file.write('header\n')
+                raise ValueError('export failed')
+        blob.upload_from_filename.assert_not_called()
+
+        with GoogleCloudStorageFile(blob=blob) as cloud_file:
+            cloud_file.write('header\n')
+        blob.upload_from_filename.assert_called_once()
+
+
+@mock.patch('rdr_service.storage.google.auth.default', return_value=(mock.MagicMock(), 'test-project'))
+@mock.patch('rdr_service.storage.storage.Client')
+class GoogleCloudStorageProviderTest(unittest.TestCase):
+
+    def setUp(self):
+        singletons.reset_for_tests()
+        GoogleCloudStorageProvider.clear_cache()
+
+    def test_client_is_shared(self, client_class_mock, _):
+        GoogleCloudStorageProvider().upload_from_string('test', '/bucket/one.txt')
+        GoogleCloudStorageProvider().delete('/bucket/one.txt')
+        GoogleCloudStorageProvider().list('bucket', 'prefix')
+
+        self.assertEqual(1, client_class_mock.call_count)
+        stats = GoogleCloudStorageProvider.get_stats()
+        self.assertEqual(1, stats['clients_created'])
+        self.assertEqual(2, stats['clients_avoided'])
+
+    def test_read_and_write_skip_bucket_lookup(self, client_class_mock, _):
+        client = client_class_mock.return_value
+        provider = GoogleCloudStorageProvider()
+        provider.open('/bucket/file.csv', 'rt')
+        provider.upload_from_file('/tmp/file.csv', '/bucket/file.csv')
+        provider.copy_blob('/bucket/file.csv', '/other_bucket/file.csv')
+
+        client.get_bucket.assert_not_called()
+        client.bucket.return_value.blob.return_value.upload_from_filename.assert_called_with('/tmp/file.csv')
+        self.assertEqual(3, GoogleCloudStorageProvider.get_stats()['bucket_lookups_skipped'])
+
+    def test_bucket_cache_ttl(self, client_class_mock, _):
+        client = client_class_mock.return_value
+        provider = GoogleCloudStorageProvider()
+        now = datetime.datetime(2021, 1, 1)
+        with FakeClock(now):
+            provider.get_blob('bucket', 'one.txt')
+            provider.get_blob('/bucket', 'two.txt')
+        self.assertEqual(1, client.get_bucket.call_count)
+
+        ttl = datetime.timedelta(seconds=GoogleCloudStorageProvider.BUCKET_CACHE_TTL_SECONDS + 1)
+        with FakeClock(now + ttl):
+            provider.get_blob('bucket', 'one.txt')
+        self.assertEqual(2, client.get_bucket.call_count)
+        self.assertEqual(1, GoogleCloudStorageProvider.get_stats()['buckets_avoided'])